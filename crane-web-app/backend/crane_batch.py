@@ -0,0 +1,189 @@
+import math
+import numpy as np
+
+from crane_solver import (
+    ANALYSIS_OUTPUTS, DEFAULT_PARAMS, MEMBER_NAMES, N_MEMBERS, N_NODES, NODE_NAMES, SUPPORT_NODES, TIP_NODE,
+    analyze, intermediate_nodes, member_lengths, node_coordinates, split_members,
+    subdivision_keys, with_defaults,
+)
+from crane_topology import require_default
+
+# Vectorized batch evaluation: every configuration shares the crane topology,
+# so element stiffness, assembly and the linear solve are stacked along a
+# leading batch axis. Rows are grouped by member subdivision and solved in
+# chunks to bound peak memory.
+
+CHUNK_SIZE = 256
+
+# Combined station stresses kept per member with stresses=True
+SUMMARY_KEYS = ('axial', 'torque', 'normal', 'shear', 'von_mises')
+
+
+def check_grid(grid):
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown grid parameter(s): {', '.join(sorted(unknown))}")
+
+
+def require_linear(params, what):
+    # The stacked solve is first-order only; a P-Delta request must not get
+    # the linear answer
+    analysis = params.get('analysis') or 'linear'
+    if analysis != 'linear':
+        raise ValueError(f"{what} supports only the linear analysis (got {analysis!r})")
+
+
+def grid_size(grid):
+    return math.prod(len(v) for v in grid.values())
+
+
+def grid_columns(grid, base=None, start=0, stop=None):
+    # Rows [start, stop) of the Cartesian product of {param: [values]} on top
+    # of base params -> columns (same row order as itertools.product)
+    check_grid(grid)
+    require_default(base or {}, "Batch evaluation")
+    require_linear(base or {}, "Batch evaluation")
+    base = with_defaults(base or {})
+    n_total = grid_size(grid)
+    stop = n_total if stop is None else min(stop, n_total)
+    rows = np.arange(start, max(stop, start))
+    columns = {k: np.full(rows.size, float(v)) for k, v in base.items()}
+    if grid:
+        idx = np.unravel_index(rows, tuple(len(v) for v in grid.values()))
+        for (k, values), ix in zip(grid.items(), idx):
+            columns[k] = np.asarray(values, dtype=float)[ix]
+    return columns
+
+
+def expand_grid(grid, base=None):
+    return grid_columns(grid, base)
+
+
+def rows_to_columns(rows):
+    # List of param dicts -> dict of float arrays (missing keys take defaults)
+    for r in rows:
+        require_default(r, "Batch evaluation")
+        require_linear(r, "Batch evaluation")
+    rows = [with_defaults(r) for r in rows]
+    return {k: np.array([r[k] for r in rows], dtype=float) for k in DEFAULT_PARAMS}
+
+
+def batch_size(columns):
+    shape = np.broadcast_shapes(*(np.shape(v) for v in columns.values()))
+    if len(shape) > 1:
+        raise ValueError("Batch parameters must be scalars or 1-D arrays")
+    return shape[0] if shape else 1
+
+
+def _solve_chunk(p, elements, out, idx, outputs=ANALYSIS_OUTPUTS):
+    try:
+        res = analyze(p, elements, outputs)
+    except ValueError:
+        # A singular row poisons the stacked solve; redo the chunk row by row
+        for r, i in enumerate(idx):
+            try:
+                _store(out, [i], analyze({k: v[r:r + 1] for k, v in p.items()}, elements, outputs))
+            except ValueError as e:
+                out['error'][i] = str(e)
+        return
+    _store(out, idx, res)
+
+
+def _store(out, idx, res):
+    out['tip'][idx] = res['displacements'][:, TIP_NODE, :3]
+    out['member_stress'][idx] = res['member_stress']
+    out['reactions'][idx] = res['reactions'][..., 2]
+    if 'displacements' in out:
+        out['displacements'][idx] = res['displacements'][..., :3]
+    if 'member_summary' in out:
+        for key in SUMMARY_KEYS:
+            out['member_summary'][key][idx] = res['member_summary'][key]
+
+
+def solve_batch(columns, chunk_size=CHUNK_SIZE, shapes=False, stresses=False):
+    # columns: {param: array of length N} (scalars broadcast, missing -> default).
+    # Returns columnar NumPy results; rows that cannot be solved get NaN and an error.
+    # shapes=True also keeps every row's node translations (n, n_nodes, 3),
+    # so the deformed frames can be exported later without a solve.
+    # stresses=True adds the combined station stresses per member
+    # ('member_summary': {SUMMARY_KEYS: (n, n_members)}).
+    p = {k: np.asarray(v, dtype=float) for k, v in with_defaults(columns).items()}
+    n = batch_size(p)
+    p = {k: np.broadcast_to(v, (n,)) for k, v in p.items()}
+
+    out = {
+        'tip': np.full((n, 3), np.nan),
+        'member_stress': np.full((n, N_MEMBERS), np.nan),
+        'reactions': np.full((n, len(SUPPORT_NODES)), np.nan),
+        'error': [None] * n,
+    }
+    if shapes:
+        out['displacements'] = np.full((n, N_NODES, 3), np.nan)
+    outputs = ANALYSIS_OUTPUTS
+    if stresses:
+        out['member_summary'] = {key: np.full((n, N_MEMBERS), np.nan) for key in SUMMARY_KEYS}
+        outputs = ANALYSIS_OUTPUTS + ('stresses',)
+    if n == 0:
+        return _finish(out, p)
+
+    xyz = node_coordinates(p)
+    valid = np.all(member_lengths(xyz) > 0.0, axis=-1)
+    for i in np.nonzero(~valid)[0]:
+        out['error'][i] = "Zero-length member"
+
+    rows = np.nonzero(valid)[0]
+    if rows.size:
+        mask, t = intermediate_nodes(xyz[rows])
+        keys = np.ascontiguousarray(subdivision_keys(mask, t))
+        # Rows as opaque byte strings: much faster to unique than axis=0
+        keys = keys.view(np.dtype((np.void, keys.shape[-1] * keys.itemsize))).ravel()
+        _, group = np.unique(keys, return_inverse=True)
+        for g in np.unique(group):
+            members = rows[group == g]
+            elements = split_members(xyz[members[0]])
+            for start in range(0, members.size, chunk_size):
+                idx = members[start:start + chunk_size]
+                _solve_chunk({k: v[idx] for k, v in p.items()}, elements, out, idx, outputs)
+
+    return _finish(out, p)
+
+
+def _finish(out, p):
+    out['tip_dz'] = out['tip'][:, 2]
+    stress = out['member_stress']
+    failed = stress > p['yield_stress'][:, None]
+    out['max_stress'] = np.maximum(stress.max(axis=-1, initial=-np.inf), 0.0)
+    out['failures'] = [[MEMBER_NAMES[m] for m in np.nonzero(row)[0]] for row in failed]
+    out['n_failures'] = failed.sum(axis=-1)
+    out['params'] = p
+    return out
+
+
+def _nan_to_none(a):
+    return [None if x != x else x for x in a.tolist()]
+
+
+def to_json_columns(out):
+    # JSON-friendly columnar layout (NaN -> null)
+    columns = {
+        'n': len(out['error']),
+        'params': {k: v.tolist() for k, v in out['params'].items()},
+        'tip_displacement_dz': _nan_to_none(out['tip_dz']),
+        'max_stress': _nan_to_none(out['max_stress']),
+        'n_failures': out['n_failures'].tolist(),
+        'failures': out['failures'],
+        'reactions': {n: _nan_to_none(out['reactions'][:, s]) for s, n in enumerate(SUPPORT_NODES)},
+        'member_names': MEMBER_NAMES,
+        'error': out['error'],
+    }
+    if 'displacements' in out:
+        # Per row: flat [dx, dy, dz] of every node and the bending stress per member
+        columns['node_names'] = NODE_NAMES
+        columns['node_displacements'] = [_nan_to_none(row.ravel()) for row in out['displacements']]
+        columns['member_stress'] = [_nan_to_none(row) for row in out['member_stress']]
+    return columns
+
+
+def solve_batch_json(columns, shapes=False):
+    # Solve and serialize in one call, so both run inside a pool worker
+    return to_json_columns(solve_batch(columns, shapes=shapes))
@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+# Benchmark and performance-regression suite.
+#
+#   python crane_bench.py run [--quick] [--out benchmarks/current.json]
+#   python crane_bench.py compare benchmarks/baseline.json benchmarks/current.json [--threshold 0.25]
+#
+# `run` measures
+#   solve        calculate_crane latency per engine (p50/p99)
+#   model_build  FEModel3D construction: cold (fresh interpreter: imports and
+#                first build) and warm (repeated builds)
+#   sweep        solve_batch throughput at several batch sizes
+#   api          /calculate through an in-process ASGI client: requests/s and
+#                p50/p99 latency, uncached (distinct params) and cached
+#   startup      fresh interpreter: `import main`, first answer per engine and
+#                /ready (crane_startup.measure_cold_start)
+# and writes {'meta', 'metrics': {name: {value, unit, better}}, 'details'}.
+# `compare` flags every metric that got worse than the baseline by more than
+# the threshold (relative) and exits with status 1 if there are any.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BACKEND_DIR, 'benchmarks', 'current.json')
+
+FULL = {'solve_repeat': {'numpy': 300, 'pynite': 40}, 'build_repeat': 40,
+        'sweep_sizes': [1, 16, 256, 4096], 'api_requests': 200, 'api_concurrency': 4}
+QUICK = {'solve_repeat': {'numpy': 30, 'pynite': 5}, 'build_repeat': 5,
+         'sweep_sizes': [1, 64], 'api_requests': 20, 'api_concurrency': 2}
+
+
+def _stats(samples_ms):
+    a = np.asarray(samples_ms, dtype=float)
+    return {'n': int(a.size), 'min': float(a.min()), 'mean': float(a.mean()),
+            'p50': float(np.percentile(a, 50)), 'p90': float(np.percentile(a, 90)),
+            'p99': float(np.percentile(a, 99))}
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e3)
+    return _stats(samples)
+
+
+def _quiet(fn, *args):
+    # PyNite prints a statics table on every analysis
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def bench_solve(repeat):
+    from crane_calc import calculate_crane
+    out = {}
+    for engine, n in repeat.items():
+        params = {'engine': engine}
+        _quiet(calculate_crane, params)  # warm-up
+        out[engine] = _timed(lambda: _quiet(calculate_crane, params), n)
+    return out
+
+
+COLD_SCRIPT = '''
+import json, time
+t0 = time.perf_counter()
+from crane_calc import build_pynite_model, calculate_crane
+t1 = time.perf_counter()
+build_pynite_model({})
+t2 = time.perf_counter()
+import contextlib, io
+with contextlib.redirect_stdout(io.StringIO()):
+    calculate_crane({})
+t3 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1e3, 'first_build_ms': (t2 - t1) * 1e3,
+                  'first_solve_ms': (t3 - t2) * 1e3}))
+'''
+
+
+def bench_model_build(repeat):
+    from crane_calc import build_pynite_model
+    proc = subprocess.run([sys.executable, '-c', COLD_SCRIPT], cwd=BACKEND_DIR,
+                          capture_output=True, text=True, check=True)
+    cold = json.loads(proc.stdout.strip().splitlines()[-1])
+    warm = _timed(lambda: build_pynite_model({}), repeat)
+    return {'cold': cold, 'warm': warm}
+
+
+def bench_sweep(sizes):
+    from crane_batch import solve_batch
+    out = {}
+    for n in sizes:
+        columns = {'arm_angle': np.linspace(0.0, 359.0, n), 'mass_tip': np.linspace(20.0, 120.0, n)}
+        solve_batch(columns)  # warm-up (subdivision memo, BLAS threads)
+        repeat = max(1, min(20, 4096 // n))
+        best = min(_timed(lambda: solve_batch(columns), 1)['min'] for _ in range(repeat))
+        out[str(n)] = {'best_ms': best, 'configs_per_s': n / (best / 1e3)}
+    return out
+
+
+async def _api_run(client, bodies, concurrency):
+    # Back-pressure (429) is counted, not retried: a rising 'rejected' count is a regression too
+    latencies = []
+    rejected = 0
+    queue = list(bodies)
+
+    async def worker():
+        nonlocal rejected
+        while queue:
+            body = queue.pop()
+            t0 = time.perf_counter()
+            r = await client.post('/calculate', json=body)
+            if r.status_code == 429:
+                rejected += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1e3)
+            if r.status_code != 200 or 'error' in r.json():
+                raise RuntimeError(f"/calculate failed: {r.status_code} {r.text[:200]}")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return dict(_stats(latencies), rps=len(latencies) / elapsed, rejected=rejected)
+
+
+def bench_api(n_requests, concurrency, engines=('numpy', 'pynite')):
+    import httpx
+    from main import app, result_cache, solver_pool
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        out = {}
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for engine in engines:
+                # Warm the pool workers, then distinct params so nothing is served from cache
+                await _api_run(client, [{'engine': engine, 'arm_angle': -1.0 - i} for i in range(concurrency)],
+                               concurrency)
+                result_cache.clear()
+                bodies = [{'engine': engine, 'arm_angle': 360.0 * i / n_requests} for i in range(n_requests)]
+                out[engine] = await _api_run(client, bodies, concurrency)
+            bodies = [{'engine': engines[0], 'arm_angle': 0.0}] * n_requests
+            await _api_run(client, bodies[:1], 1)
+            out['cached'] = await _api_run(client, bodies, concurrency)
+        return out
+
+    try:
+        return asyncio.run(run())
+    finally:
+        solver_pool.shutdown()
+
+
+def bench_startup():
+    from crane_startup import measure_cold_start
+    return measure_cold_start()
+
+
+def _metric(value, unit, better):
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+
+def collect_metrics(details):
+    m = {}
+    for engine, s in details.get('solve', {}).items():
+        m[f'solve.{engine}.p50_ms'] = _metric(s['p50'], 'ms', 'lower')
+        m[f'solve.{engine}.p99_ms'] = _metric(s['p99'], 'ms', 'lower')
+    build = details.get('model_build')
+    if build:
+        m['model_build.cold_import_ms'] = _metric(build['cold']['import_ms'], 'ms', 'lower')
+        m['model_build.cold_first_build_ms'] = _metric(build['cold']['first_build_ms'], 'ms', 'lower')
+        m['model_build.cold_first_solve_ms'] = _metric(build['cold']['first_solve_ms'], 'ms', 'lower')
+        m['model_build.warm_p50_ms'] = _metric(build['warm']['p50'], 'ms', 'lower')
+    for n, s in details.get('sweep', {}).items():
+        m[f'sweep.{n}.configs_per_s'] = _metric(s['configs_per_s'], 'configs/s', 'higher')
+    for name, s in details.get('api', {}).items():
+        m[f'api.{name}.rps'] = _metric(s['rps'], 'req/s', 'higher')
+        m[f'api.{name}.p50_ms'] = _metric(s['p50'], 'ms', 'lower')
+        m[f'api.{name}.p99_ms'] = _metric(s['p99'], 'ms', 'lower')
+    for name, ms in details.get('startup', {}).items():
+        m[f'startup.{name}'] = _metric(ms, 'ms', 'lower')
+    return m
+
+
+def run_benchmarks(config=FULL, only=None):
+    suites = {
+        'solve': lambda: bench_solve(config['solve_repeat']),
+        'model_build': lambda: bench_model_build(config['build_repeat']),
+        'sweep': lambda: bench_sweep(config['sweep_sizes']),
+        'api': lambda: bench_api(config['api_requests'], config['api_concurrency']),
+        'startup': bench_startup,
+    }
+    details = {}
+    for name, fn in suites.items():
+        if only and name not in only:
+            continue
+        t0 = time.perf_counter()
+        details[name] = fn()
+        print(f"[bench] {name}: {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'config': config,
+        },
+        'metrics': collect_metrics(details),
+        'details': details,
+    }
+
+
+def compare(baseline, current, threshold=0.25):
+    # -> list of rows {name, baseline, current, change, status}; change > 0 is worse
+    rows = []
+    for name, cur in current['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if base is None:
+            rows.append({'name': name, 'baseline': None, 'current': cur['value'], 'change': None, 'status': 'new'})
+            continue
+        if base['value'] == 0.0:
+            change = 0.0
+        elif cur['better'] == 'lower':
+            change = cur['value'] / base['value'] - 1.0
+        else:
+            change = base['value'] / cur['value'] - 1.0 if cur['value'] > 0.0 else float('inf')
+        status = 'REGRESSION' if change > threshold else 'improved' if change < -threshold else 'ok'
+        rows.append({'name': name, 'baseline': base['value'], 'current': cur['value'], 'change': change,
+                     'status': status})
+    for name in baseline['metrics']:
+        if name not in current['metrics']:
+            rows.append({'name': name, 'baseline': baseline['metrics'][name]['value'], 'current': None,
+                         'change': None, 'status': 'missing'})
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'metric':<36} {'baseline':>12} {'current':>12} {'worse by':>9}  status"]
+    for r in rows:
+        fmt = lambda v: '-' if v is None else f'{v:12.3f}'
+        change = '-' if r['change'] is None else f"{r['change'] * 100:+8.1f}%"
+        lines.append(f"{r['name']:<36} {fmt(r['baseline']):>12} {fmt(r['current']):>12} {change:>9}  {r['status']}")
+    return '\n'.join(lines)
+
+
+def _load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crane solver / API benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="run the benchmarks and write a JSON result")
+    run.add_argument('--out', default=DEFAULT_OUT)
+    run.add_argument('--quick', action='store_true', help="small repeat counts (smoke test)")
+    run.add_argument('--only', nargs='+', choices=['solve', 'model_build', 'sweep', 'api', 'startup'])
+    run.add_argument('--compare', metavar='BASELINE', help="compare against a baseline after running")
+    run.add_argument('--threshold', type=float, default=0.25)
+    cmp = sub.add_parser('compare', help="compare a result against a baseline")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        result = run_benchmarks(QUICK if args.quick else FULL, args.only)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as fh:
+            json.dump(result, fh, indent=2)
+        print(f"wrote {args.out}")
+        if not args.compare:
+            return 0
+        baseline, current = _load(args.compare), result
+    else:
+        baseline, current = _load(args.baseline), _load(args.current)
+
+    rows = compare(baseline, current, args.threshold)
+    print(format_rows(rows))
+    regressions = [r['name'] for r in rows if r['status'] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
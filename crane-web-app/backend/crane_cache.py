@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from crane_topology import DEFAULT_TOPOLOGY, topology_for
+
+# Result cache in front of calculate_crane.
+# Keys are the normalized (defaults filled in) and quantized parameters, so
+# sliders that land on the same value, or clients that omit defaults, share
+# one entry. Entries are evicted least-recently-used beyond `maxsize` and
+# after `ttl` seconds. Concurrent identical requests are coalesced: while a
+# solve for a key is running, later callers await the same future.
+# The parameters are those of the selected topology (crane_topology.py).
+
+QUANTIZE_DIGITS = 6
+
+
+def cache_key(params, digits=QUANTIZE_DIGITS):
+    topo = topology_for(params)
+    key = [(k, round(float(params.get(k, v)), digits)) for k, v in topo.params.items()]
+    key.append(('engine', params.get('engine', 'pynite')))
+    if topo.name != DEFAULT_TOPOLOGY:
+        key.append(('topology', topo.name))
+    if params.get('analysis', 'linear') != 'linear':
+        key.append(('analysis', params['analysis'], int(params.get('p_delta_div', 1))))
+    return tuple(key)
+
+
+class ResultCache:
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> asyncio.Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key, compute):
+        # compute: zero-argument coroutine function producing the result
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading caller was cancelled (e.g. a superseded live
+                # request), not us: take over the computation
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get_or_compute(key, compute)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited failure does not log a warning
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -1,110 +1,76 @@
-from Pynite import FEModel3D
 import math
+from crane_encode import project, required_outputs
+from crane_metrics import phase
+from crane_topology import topology_for
+import numpy as np
+from crane_solver import (
+    calculate_crane_numpy, element_max_moments, element_station_stresses, member_max, member_results,
+    member_stress_summary, stress_checks,
+)
+
+ENGINES = ('pynite', 'numpy')
+ANALYSES = ('linear', 'p_delta')
+
+def calculate_crane(params, fields=None):
+    # 'pynite' builds a full FEModel3D; 'numpy' uses the direct-stiffness
+    # engine in crane_solver.py (same result dict). Both build the frame
+    # selected by params['topology'] (see crane_topology.py).
+    # params['analysis'] = 'p_delta' runs a second-order analysis instead:
+    # crane_pdelta.py for numpy (optionally with p_delta_div subdivision),
+    # FEModel3D.analyze_PDelta for pynite; both add a 'p_delta' block with
+    # the amplification over the linear result.
+    # fields (see crane_encode.parse_fields) projects the result; the numpy
+    # engine also skips the analysis stages no requested field needs.
+    # Phases are timed for Server-Timing / metrics (see crane_metrics.py).
+    engine = params.get('engine', 'pynite')
+    analysis = params.get('analysis', 'linear')
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis: {analysis} (expected one of {', '.join(ANALYSES)})")
+    if engine == 'numpy':
+        with phase('analyze'):
+            if analysis == 'p_delta':
+                from crane_pdelta import calculate_crane_pdelta
+                result = calculate_crane_pdelta(params)
+            else:
+                result = calculate_crane_numpy(params, required_outputs(fields))
+    elif engine == 'pynite':
+        if analysis == 'p_delta' and params.get('p_delta_div', 1) != 1:
+            raise ValueError("p_delta_div requires the numpy engine")
+        result = calculate_crane_pynite(params, analysis)
+    else:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {', '.join(ENGINES)})")
+    with phase('project'):
+        return project(result, fields)
+
+def calculate_crane_pynite(params, analysis='linear'):
+    with phase('build'):
+        model, section = build_pynite_model(params)
 
-def calculate_crane(params):
-    # Extract parameters with defaults
-    pipe_od = params.get('pipe_od', 48.6)
-    t_wall = params.get('t_wall', 2.4)
-    base_len = params.get('base_len', 900.0)
-    base_wid = params.get('base_wid', 600.0)
-    arm_pivot_height = params.get('arm_pivot_height', 1800.0)
-    tripod_attach_height = params.get('tripod_attach_height', 1000.0)
-    brace_mast_height = params.get('brace_mast_height', 800.0)
-    arm_len = params.get('arm_len', 1000.0)
-    arm_angle = params.get('arm_angle', 180.0)
-    mass_tip = params.get('mass_tip', 50.0)
-    
-    # Derived parameters
-    R = pipe_od / 2.0
-    r = R - t_wall
-    z0 = pipe_od / 2.0
-    
-    # Section properties
-    A = math.pi * (R**2 - r**2)
-    I = (math.pi / 4.0) * (R**4 - r**4)
-    J = 2 * I
-    
-    # Material properties
-    E = 2.05e5
-    nu = 0.3
-    G = E / (2.0 * (1.0 + nu))
-    rho = 7.85e-6
-    
-    # Model generation
-    model = FEModel3D()
-    model.add_material('Steel', E, G, nu, rho)
-    model.add_section('Pipe48x2p4', A=A, Iy=I, Iz=I, J=J)
-    
-    # Nodes
-    L = base_len
-    W = base_wid
-    
-    nodes = {}
-    nodes['FL'] = (-L/2.0, -W/2.0, z0)
-    nodes['FR'] = ( L/2.0, -W/2.0, z0)
-    nodes['RR'] = ( L/2.0,  W/2.0, z0)
-    nodes['RL'] = (-L/2.0,  W/2.0, z0)
-    
-    nodes['Fmid']   = (0.0, -W/2.0, z0)
-    nodes['Rmid']   = (0.0,  W/2.0, z0)
-    nodes['Lmid']   = (-L/2.0, 0.0, z0)
-    nodes['RmidX0'] = ( L/2.0, 0.0, z0)
-    
-    nodes['M_brace'] = (-L/2.0, 0.0, z0 + brace_mast_height)
-    nodes['M_attach'] = (-L/2.0, 0.0, z0 + tripod_attach_height)
-    nodes['M_top']    = (-L/2.0, 0.0, z0 + arm_pivot_height)
-    
-    arm_rad = math.radians(arm_angle)
-    arm_dir = (math.cos(arm_rad), math.sin(arm_rad), 0.0)
-    
-    nodes['A_tip'] = (
-        nodes['M_top'][0] + arm_len * arm_dir[0],
-        nodes['M_top'][1] + arm_len * arm_dir[1],
-        nodes['M_top'][2] + arm_len * arm_dir[2],
-    )
-    
-    nodes['A_brace'] = (
-        nodes['M_top'][0] + (arm_len * 0.5) * arm_dir[0],
-        nodes['M_top'][1] + (arm_len * 0.5) * arm_dir[1],
-        nodes['M_top'][2] + (arm_len * 0.5) * arm_dir[2],
-    )
-    
-    for name, (x, y, z) in nodes.items():
-        model.add_node(name, x, y, z)
-        
-    # Members
-    def add_member(mname, ni, nj):
-        model.add_member(mname, ni, nj, 'Steel', 'Pipe48x2p4')
-        
-    add_member('M_base_FL_FR', 'FL', 'FR')
-    add_member('M_base_FR_RR', 'FR', 'RR')
-    add_member('M_base_RR_RL', 'RR', 'RL')
-    add_member('M_base_RL_FL', 'RL', 'FL')
-    add_member('M_base_Fmid_Rmid', 'Fmid', 'Rmid')
-    add_member('M_base_Lmid_RmidX0', 'Lmid', 'RmidX0')
-    
-    add_member('M_mast_1', 'Lmid',  'M_brace')
-    add_member('M_mast_2', 'M_brace', 'M_attach')
-    add_member('M_mast_3', 'M_attach','M_top')
-    
-    add_member('M_tripod_FL', 'M_attach', 'FL')
-    add_member('M_tripod_RL', 'M_attach', 'RL')
-    
-    add_member('M_arm', 'M_top', 'A_tip')
-    add_member('M_brace', 'M_brace', 'A_brace')
-    
-    # Supports
-    for n in ['FL', 'FR', 'RR', 'RL']:
-        model.def_support(n, True, True, True, False, False, False)
-        
-    # Load
-    P_tip = mass_tip * 9.81
-    model.add_node_load('A_tip', 'FZ', -P_tip, 'DL')
-    
     # Analyze
-    model.add_load_combo('Combo 1', {'DL': 1.0})
-    model.analyze(check_statics=True)
-    
+    with phase('analyze'):
+        if analysis == 'p_delta':
+            # The linear solution of the same model first, for the
+            # amplification in the 'p_delta' block
+            model.analyze(check_statics=False)
+            linear = extract_pynite_results(model, section, params)
+            model.analyze_PDelta()
+        else:
+            model.analyze(check_statics=True)
+
+    with phase('extract'):
+        result = extract_pynite_results(model, section, params)
+    if analysis == 'p_delta':
+        from crane_pdelta import amplification
+        load_node = topology_for(params).load_node
+        tip, tip_lin = ([r['node_displacements'][load_node][k] for k in ('dx', 'dy', 'dz')] for r in (result, linear))
+        moment, linear_moment = (max(m['max_moment'] for m in r['member_results'].values()) for r in (result, linear))
+        result['p_delta'] = dict(n_div=1, **amplification(tip, tip_lin, moment, linear_moment))
+    return result
+
+def extract_pynite_results(model, section, params):
+    R, A, I, J = section
+    topo = topology_for(params)
+
     # Extract Results
     combo = 'Combo 1'
     
@@ -117,67 +83,90 @@ def calculate_crane(params):
             'dz': node.DZ.get(combo, 0.0)
         }
 
-    # Member Stresses (simplified max bending stress)
-    # Sigma = M / Z = M / (I / (D/2)) = M * (D/2) / I
-    # We'll take the max moment from the member's internal forces
-    member_results = {}
-    max_stress_overall = 0.0
-    
-    # Yield Stress
+    # Member Stresses
+    # Local end forces of every sub-member (PhysMember splits members at
+    # intermediate nodes) are stacked and evaluated at stations in one
+    # vectorized pass: bending-only sigma = M_max * R / I as before, plus
+    # combined normal stress, torsional shear and von Mises utilization.
     YIELD_STRESS = params.get('yield_stress', 235.0)
-    
-    failures = []
 
-    for m_name, member in model.members.items():
-        # Get max moment (My or Mz)
-        # PyNite's Member3D stores max/min moments in attributes after analysis
-        # Check if attributes exist, otherwise default to 0
-        
-        # Try to get max moments directly from member attributes if available
-        # Depending on PyNite version, these might be stored differently.
-        # Let's try to access the moment arrays directly if possible, or use a safer approach.
-        
-        # Safe approach: Check end nodes internal forces if available, or just use 0 for now to fix the crash
-        # Real fix: PyNite members have .max_moment('My', combo) etc.
-        
-        try:
-            # Attempt to use the method if it exists
-            mz_max = max(abs(member.min_moment('Mz', combo)), abs(member.max_moment('Mz', combo)))
-            my_max = max(abs(member.min_moment('My', combo)), abs(member.max_moment('My', combo)))
-            m_max = max(mz_max, my_max)
-        except:
-            # Fallback if methods don't exist (older PyNite?)
-            m_max = 0.0
-        
-        # Calculate stress [N/mm^2]
-        # I is already defined (Iy=Iz=I)
-        # y = R (outer radius)
-        sigma = m_max * R / I
-        
-        if sigma > YIELD_STRESS:
-            failures.append(m_name)
-        
-        member_results[m_name] = {
-            'max_moment': m_max,
-            'max_stress': sigma
-        }
-        if sigma > max_stress_overall:
-            max_stress_overall = sigma
+    subs = [(m, sub) for m, member in enumerate(model.members.values()) for sub in member.sub_members.values()]
+    f = np.array([sub.f(combo)[:, 0] for _, sub in subs])
+    sub_L = np.array([sub.L() for _, sub in subs])
+    elem_member = np.array([m for m, _ in subs])
+    stations = element_station_stresses(f, sub_L, (R, A, I, J), YIELD_STRESS)
+    elements = {'elem_member': elem_member, 'topology': topo}
+    summary = member_stress_summary(elements, stations)
+    m_max = member_max(elements, element_max_moments(f, sub_L))
+    sigma = m_max * R / I
+    checks = stress_checks(sigma, summary, YIELD_STRESS, topo.member_names)
 
     results = {
         'tip_displacement': {
-            'dz': model.nodes['A_tip'].DZ.get(combo, 0.0)
+            'dz': model.nodes[topo.load_node].DZ.get(combo, 0.0)
         },
         'node_displacements': node_displacements,
-        'member_results': member_results,
-        'max_stress': max_stress_overall,
+        'member_results': member_results(m_max, sigma, summary, topo.member_names),
+        'max_stress': checks.pop('max_stress'),
         'yield_stress': YIELD_STRESS,
-        'failures': failures,
+        **checks,
         'reactions': {}
     }
         
-    for n_name in ['FL', 'FR', 'RR', 'RL']:
+    for n_name in topo.support_nodes:
         node = model.nodes[n_name]
         results['reactions'][n_name] = node.RxnFZ.get(combo, 0.0)
         
     return results
+
+def build_pynite_model(params):
+    # FEModel3D with nodes, members, supports, the tip load case and its
+    # combo (not yet analyzed); also returns the section (R, A, I, J).
+    # Pynite is imported on first use: it pulls in matplotlib and costs about
+    # a second at startup, which the numpy engine never needs.
+    from Pynite import FEModel3D
+
+    # Parameters with the topology's defaults
+    topo = topology_for(params)
+    p = topo.with_defaults(params)
+    pipe_od = p['pipe_od']
+    t_wall = p['t_wall']
+    mass_tip = p['mass_tip']
+
+    # Derived parameters
+    R = pipe_od / 2.0
+    r = R - t_wall
+
+    # Section properties
+    A = math.pi * (R**2 - r**2)
+    I = (math.pi / 4.0) * (R**4 - r**4)
+    J = 2 * I
+    
+    # Material properties
+    E = 2.05e5
+    nu = 0.3
+    G = E / (2.0 * (1.0 + nu))
+    rho = 7.85e-6
+    
+    # Model generation
+    model = FEModel3D()
+    model.add_material('Steel', E, G, nu, rho)
+    model.add_section('Pipe48x2p4', A=A, Iy=I, Iz=I, J=J)
+    
+    # Nodes, members and supports from the topology
+    xyz = topo.coordinates(p)
+    for name, (x, y, z) in zip(topo.node_names, xyz.tolist()):
+        model.add_node(name, x, y, z)
+
+    for mname, (ni, nj) in zip(topo.member_names, topo.member_node_names):
+        model.add_member(mname, ni, nj, 'Steel', 'Pipe48x2p4')
+
+    for n in topo.support_nodes:
+        model.def_support(n, True, True, True, False, False, False)
+
+    # Load
+    P_tip = mass_tip * 9.81
+    model.add_node_load(topo.load_node, 'FZ', -P_tip, 'DL')
+    
+    model.add_load_combo('Combo 1', {'DL': 1.0})
+    return model, (R, A, I, J)
@@ -0,0 +1,134 @@
+import numpy as np
+
+from crane_loads import load_vectors, solve_cases
+from crane_solver import (
+    GRAVITY, MEMBER_NAMES, SUPPORT_NODES, TIP_NODE, build_model, element_station_moments,
+    end_forces, support_reactions, with_defaults,
+)
+from crane_topology import require_default
+
+# Rated capacity: the largest hoisted mass the crane can carry.
+#
+# The analysis is linear, so every response is r(m) = r_dead + m * r_unit,
+# where r_unit comes from a 1 kg hoisted mass and r_dead from the
+# permanent loads (self-weight and optional ballast on the base corners).
+# Both are solved together on one factorization, and each criterion is
+# then a closed-form bound on m:
+#   stress      |M_dead + m M_unit| <= yield_stress * I / R at every station
+#   deflection  |dz_dead + m dz_unit| <= deflection_limit at the arm tip
+#   uplift      RxnFZ_dead + m RxnFZ_unit >= 0 at every support
+
+N_STATIONS = 11
+
+
+def _abs_bound(a, b, limit):
+    # Largest m >= 0 with |a + m b| <= limit for all values in [0, m]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = np.where(b > 0, (limit - a) / b, np.where(b < 0, (limit + a) / -b, np.inf))
+    return np.where(np.abs(a) > limit, 0.0, np.maximum(m, 0.0))
+
+
+def _min_bound(a, b):
+    # Largest m >= 0 with a + m b >= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = np.where(b < 0, a / -b, np.inf)
+    return np.where(a < 0, 0.0, np.maximum(m, 0.0))
+
+
+def _finite(x):
+    return None if np.isinf(x) else float(x)
+
+
+def rated_capacity(params, deflection_limit=None, self_weight=True, ballast=0.0):
+    # deflection_limit defaults to arm_len / 100; ballast [kg] is split over the four corners
+    require_default(params, "Rated capacity")
+    p = with_defaults(params)
+    if deflection_limit is None:
+        deflection_limit = p['arm_len'] / 100.0
+
+    model = build_model(dict(p, mass_tip=1.0))
+    dead = {'name': 'dead', 'self_weight': 1.0 if self_weight else 0.0,
+            'nodal_loads': [{'node': n, 'direction': 'FZ', 'magnitude': -ballast * GRAVITY / len(SUPPORT_NODES)}
+                            for n in SUPPORT_NODES]}
+    F, w, fer = load_vectors(model, [{'name': 'unit', 'hoist': 1.0}, dead])
+    D = solve_cases(model, F)
+
+    # Stress: moments at stations along every sub-element, both cases
+    M = element_station_moments(end_forces(model, D, fer), model['L'], w, N_STATIONS)
+    M_limit = p['yield_stress'] * float(model['I'][0]) / float(model['R_out'])
+    bound = _abs_bound(M[1], M[0], M_limit).reshape(M.shape[1], -1).min(axis=-1)
+    member_bound = np.full(len(MEMBER_NAMES), np.inf)
+    for e, m in enumerate(model['elem_member']):
+        member_bound[m] = min(member_bound[m], bound[e])
+
+    dz_unit, dz_dead = D[0, 6 * TIP_NODE + 2], D[1, 6 * TIP_NODE + 2]
+    m_deflection = float(_abs_bound(dz_dead, dz_unit, deflection_limit))
+
+    rz = support_reactions(model, D, F)[..., 2]
+    support_bound = _min_bound(rz[1], rz[0])
+
+    limits = {
+        'stress': float(member_bound.min()),
+        'deflection': m_deflection,
+        'uplift': float(support_bound.min()),
+    }
+    governing = min(limits, key=limits.get)
+    return {
+        'capacity': _finite(limits[governing]),
+        'governing': governing,
+        'limits': {k: _finite(v) for k, v in limits.items()},
+        'governing_member': MEMBER_NAMES[int(member_bound.argmin())],
+        'governing_support': SUPPORT_NODES[int(support_bound.argmin())],
+        'member_limits': {m: _finite(v) for m, v in zip(MEMBER_NAMES, member_bound)},
+        'support_limits': {n: _finite(v) for n, v in zip(SUPPORT_NODES, support_bound)},
+        'per_kg': {
+            'tip_dz': float(dz_unit),
+            'reactions': {n: float(v) for n, v in zip(SUPPORT_NODES, rz[0])},
+        },
+        'dead_load': {
+            'tip_dz': float(dz_dead),
+            'reactions': {n: float(v) for n, v in zip(SUPPORT_NODES, rz[1])},
+        },
+        'deflection_limit': deflection_limit,
+        'yield_stress': p['yield_stress'],
+    }
+
+
+def capacity_rows(params, arm_lens, arm_angles, options):
+    # Load-chart rows for several arm lengths (the unit of parallel work)
+    rows = []
+    for arm_len in arm_lens:
+        caps = [rated_capacity(dict(params, arm_len=float(arm_len), arm_angle=float(a)), **options)
+                for a in arm_angles]
+        rows.append({'capacity': [c['capacity'] for c in caps],
+                     'governing': [c['governing'] for c in caps]})
+    return rows
+
+
+def chart_chunks(arm_lens, n_chunks):
+    # Split the arm lengths into at most n_chunks contiguous pieces
+    n_chunks = max(1, min(n_chunks, len(arm_lens)))
+    return [list(c) for c in np.array_split(np.asarray(arm_lens, dtype=float), n_chunks)]
+
+
+def load_chart(params, arm_lens, arm_angles, executor=None, workers=1, **options):
+    # Capacity table over arm_len x arm_angle; with an executor (e.g. a
+    # ProcessPoolExecutor) the arm lengths are spread over `workers` tasks
+    require_default(params, "Rated capacity")
+    p = with_defaults(params)
+    if executor is None:
+        rows = capacity_rows(p, arm_lens, arm_angles, options)
+    else:
+        futures = [executor.submit(capacity_rows, p, chunk, arm_angles, options)
+                   for chunk in chart_chunks(arm_lens, workers)]
+        rows = [row for f in futures for row in f.result()]
+    return assemble_chart(arm_lens, arm_angles, rows)
+
+
+def assemble_chart(arm_lens, arm_angles, rows):
+    return {
+        'arm_len': [float(v) for v in arm_lens],
+        'arm_angle': [float(v) for v in arm_angles],
+        'capacity': [r['capacity'] for r in rows],
+        'governing': [r['governing'] for r in rows],
+    }
@@ -0,0 +1,196 @@
+import json
+import struct
+import numpy as np
+
+from crane_solver import MEMBER_NAMES, NODE_NAMES, SUPPORT_NODES
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for format=msgpack
+    msgpack = None
+
+# Output projection and compact encodings for /calculate.
+#
+# fields: comma-separated result keys, optionally narrowed one level with a
+# dot, e.g. "tip_displacement.dz,max_stress" or "member_results.M_arm".
+# Node, member and support names depend on the topology, so those are
+# checked against the result in `project` (the lists below are the
+# standard frame's).
+#
+# Compact formats replace the name-keyed dicts by one name table and
+# columnar float arrays (node_displacements (n_nodes, 3), member_moment,
+# member_stress, member_von_mises, member_utilization, reactions (n_supports,)):
+#   columnar  the same layout as JSON, arrays as lists
+#   msgpack   MessagePack map, arrays as little-endian binary blobs
+#   binary    uint32 LE header length | JSON header | float buffers; every
+#             buffer starts at an 8-byte aligned offset so it can be wrapped
+#             as a Float32Array / Float64Array without copying
+
+FIELDS = {
+    'tip_displacement': ['dz'],
+    'node_displacements': NODE_NAMES,
+    'member_results': MEMBER_NAMES,
+    'max_stress': None,
+    'yield_stress': None,
+    'max_von_mises': None,
+    'max_utilization': None,
+    'failures': None,
+    'utilization_failures': None,
+    'reactions': SUPPORT_NODES,
+    'p_delta': None,  # analysis=p_delta only
+}
+
+# Fields narrowed by node / member / support name
+NAMED_FIELDS = ('node_displacements', 'member_results', 'reactions')
+
+# Analysis stages (crane_solver.ANALYSIS_OUTPUTS) each field depends on
+FIELD_OUTPUTS = {
+    'tip_displacement': 'displacements',
+    'node_displacements': 'displacements',
+    'member_results': 'members',
+    'max_stress': 'members',
+    'yield_stress': 'displacements',
+    'max_von_mises': 'members',
+    'max_utilization': 'members',
+    'failures': 'members',
+    'utilization_failures': 'members',
+    'reactions': 'reactions',
+    'p_delta': 'displacements',
+}
+
+FORMATS = ('json', 'columnar', 'msgpack', 'binary')
+DTYPES = ('float64', 'float32')
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'columnar': 'application/json',
+    'msgpack': 'application/msgpack',
+    'binary': 'application/octet-stream',
+}
+
+
+def parse_fields(spec):
+    # "a,b.c" -> {'a': None, 'b': ('c',)} (None keeps the whole value)
+    if spec is None or not spec.strip():
+        return None
+    fields = {}
+    for item in spec.split(','):
+        key, _, sub = item.strip().partition('.')
+        if key not in FIELDS:
+            raise ValueError(f"Unknown field: {key} (expected one of {', '.join(FIELDS)})")
+        if not sub:
+            fields[key] = None
+            continue
+        if FIELDS[key] is None or (sub not in FIELDS[key] and key not in NAMED_FIELDS):
+            raise ValueError(f"Unknown field: {item.strip()}")
+        if key not in fields or fields[key] is not None:
+            fields[key] = tuple(sorted(set(fields.get(key) or ()) | {sub}))
+    return fields
+
+
+def fields_key(fields):
+    # Hashable, order-independent form for cache keys
+    return None if fields is None else tuple(sorted(fields.items()))
+
+
+def required_outputs(fields):
+    if fields is None:
+        return tuple(sorted(set(FIELD_OUTPUTS.values())))
+    return tuple(sorted({'displacements'} | {FIELD_OUTPUTS[k] for k in fields}))
+
+
+def project(result, fields):
+    if fields is None:
+        return result
+    out = {}
+    for key, sub in fields.items():
+        if key not in result:
+            raise ValueError(f"Field {key} is not part of this result")
+        value = result[key]
+        if sub is not None and not set(sub) <= set(value):
+            missing = sorted(set(sub) - set(value))
+            raise ValueError(f"Unknown field: {', '.join(f'{key}.{s}' for s in missing)}")
+        out[key] = value if sub is None else {s: value[s] for s in sub}
+    return out
+
+
+def to_columns(result, dtype='float64'):
+    # Name-keyed result dict -> {names, scalars, arrays, failures}
+    names, scalars, arrays = {}, {}, {}
+    if 'tip_displacement' in result:
+        scalars.update({f'tip_{k}': v for k, v in result['tip_displacement'].items()})
+    for key in ('max_stress', 'yield_stress', 'max_von_mises', 'max_utilization'):
+        if key in result:
+            scalars[key] = result[key]
+    if 'node_displacements' in result:
+        nodes = result['node_displacements']
+        names['nodes'] = list(nodes)
+        arrays['node_displacements'] = np.array([[d['dx'], d['dy'], d['dz']] for d in nodes.values()], dtype=dtype)
+    if 'member_results' in result:
+        members = result['member_results']
+        names['members'] = list(members)
+        arrays['member_moment'] = np.array([m['max_moment'] for m in members.values()], dtype=dtype)
+        arrays['member_stress'] = np.array([m['max_stress'] for m in members.values()], dtype=dtype)
+        arrays['member_von_mises'] = np.array([m['max_von_mises'] for m in members.values()], dtype=dtype)
+        arrays['member_utilization'] = np.array([m['utilization'] for m in members.values()], dtype=dtype)
+    if 'reactions' in result:
+        names['supports'] = list(result['reactions'])
+        arrays['reactions'] = np.array(list(result['reactions'].values()), dtype=dtype)
+    columns = {'dtype': dtype, 'names': names, 'scalars': scalars, 'arrays': arrays}
+    for key in ('failures', 'utilization_failures', 'p_delta'):
+        if key in result:
+            columns[key] = result[key]
+    return columns
+
+
+def encode_columnar(columns):
+    return json.dumps(dict(columns, arrays={k: v.tolist() for k, v in columns['arrays'].items()})).encode()
+
+
+def encode_msgpack(columns):
+    arrays = {k: {'shape': list(v.shape), 'data': v.astype(v.dtype.newbyteorder('<')).tobytes()}
+              for k, v in columns['arrays'].items()}
+    return msgpack.packb(dict(columns, arrays=arrays))
+
+
+def encode_binary(columns):
+    layout, buffers, offset = {}, [], 0
+    for k, v in columns['arrays'].items():
+        data = v.astype(v.dtype.newbyteorder('<')).tobytes()
+        layout[k] = {'offset': offset, 'length': int(v.size), 'shape': list(v.shape)}
+        pad = -len(data) % 8
+        buffers.append(data + b'\0' * pad)
+        offset += len(data) + pad
+    header = json.dumps(dict(columns, arrays=layout)).encode()
+    # Pad the header with spaces so the data section starts 8-byte aligned
+    header += b' ' * (-(4 + len(header)) % 8)
+    return struct.pack('<I', len(header)) + header + b''.join(buffers)
+
+
+def decode_binary(body):
+    # Inverse of encode_binary (used by tests and Python clients)
+    (n,) = struct.unpack_from('<I', body)
+    header = json.loads(body[4:4 + n])
+    data = memoryview(body)[4 + n:]
+    dtype = np.dtype(header['dtype']).newbyteorder('<')
+    header['arrays'] = {
+        k: np.frombuffer(data, dtype, a['length'], a['offset']).reshape(a['shape'])
+        for k, a in header['arrays'].items()
+    }
+    return header
+
+
+def check_format(fmt, dtype='float64'):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype} (expected one of {', '.join(DTYPES)})")
+    if fmt == 'msgpack' and msgpack is None:
+        raise ValueError("format=msgpack needs the msgpack package (pip install msgpack)")
+
+
+def encode(result, fmt, dtype='float64'):
+    # Compact formats only ('json' responses are the plain result dict)
+    columns = to_columns(result, dtype)
+    encoder = {'columnar': encode_columnar, 'msgpack': encode_msgpack, 'binary': encode_binary}[fmt]
+    return encoder(columns)
@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import struct
+import numpy as np
+
+from crane_solver import split_members
+from crane_topology import topology_for
+
+# Deformed-shape export to binary glTF (GLB) and binary STL, from results
+# that already exist: calculate_crane results (with their params) or a
+# /calculate/batch response solved with include_shapes. Nothing here runs
+# a solve.
+#
+#   python crane_export.py result.json crane.glb [--params params.json] [--scale 20]
+#   python crane_export.py batch.json sweep.glb --fps 5
+#   python crane_export.py batch.json frames.stl        (frames_0000.stl, ...)
+#
+# A frame is {'topology', 'params', 'disp' (n_nodes, 3), 'values'
+# (n_members,)}. values are the member colours as a fraction of the yield
+# stress: utilization (von Mises / yield), von_mises or the bending-only
+# stress. 0 is blue, 1 or more is red, unknown is grey.
+#
+# Every member is drawn along its sub-element chain, i.e. the nodes lying on
+# it. Each segment is a capped tube of n_sides faces between its two
+# deformed end nodes. All segments are generated at once into preallocated
+# float32 / uint8 / uint32 arrays. The index buffer only depends on the
+# number of segments, so frames share it.
+#
+# GLB has one mesh per frame. Several frames play as a flipbook: each frame
+# node has scale 1 during its own time step and 0 otherwise, with STEP
+# interpolation. The root node turns the Z-up millimetre model into glTF's
+# Y-up metres.
+# STL is one frame per file, in mm, Z-up. The member colour is stored in
+# the attribute word (15-bit RGB, bit 15 set: the SolidView convention).
+
+FORMATS = ('glb', 'stl')
+MEDIA_TYPES = {'glb': 'model/gltf-binary', 'stl': 'model/stl'}
+COLOR_BY = ('utilization', 'von_mises', 'stress')
+DEFAULT_SIDES = 12
+MAX_SIDES = 64
+MAX_FRAMES = 2000
+AUTO_SCALE = 0.05  # auto scale: largest displacement drawn as 5 % of the frame size
+
+# Colour ramp over [0, 1]: blue, cyan, green, yellow, red
+RAMP = np.array([[0.15, 0.25, 1.0], [0.0, 0.85, 0.95], [0.1, 0.8, 0.2], [1.0, 0.85, 0.0], [0.9, 0.05, 0.05]])
+GREY = np.array([0.6, 0.6, 0.6])
+
+FLOAT, UNSIGNED_BYTE, UNSIGNED_INT = 5126, 5121, 5125
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+
+
+def member_values(result, topo, color_by, yield_stress):
+    if color_by not in COLOR_BY:
+        raise ValueError(f"Unknown color_by: {color_by} (expected one of {', '.join(COLOR_BY)})")
+    members = result.get('member_results') or {}
+    key = {'utilization': 'utilization', 'von_mises': 'max_von_mises', 'stress': 'max_stress'}[color_by]
+    values = np.full(topo.n_members, np.nan)
+    for m, name in enumerate(topo.member_names):
+        r = members.get(name)
+        if r is None or r.get(key) is None:
+            continue
+        values[m] = r[key] if color_by == 'utilization' else r[key] / yield_stress
+    return values
+
+
+def frame_from_result(result, params, color_by='utilization'):
+    # One calculate_crane result (any engine / analysis) and the params it was solved with
+    topo = topology_for(params)
+    p = topo.with_defaults(params)
+    nodes = result.get('node_displacements')
+    if not nodes:
+        raise ValueError("The result has no node_displacements to export")
+    missing = [n for n in topo.node_names if n not in nodes]
+    if missing:
+        raise ValueError(f"node_displacements lacks node(s) {', '.join(missing)} of topology '{topo.name}'")
+    disp = np.array([[nodes[n]['dx'], nodes[n]['dy'], nodes[n]['dz']] for n in topo.node_names], dtype=float)
+    yield_stress = result.get('yield_stress', p['yield_stress'])
+    return {'topology': topo, 'params': p, 'disp': disp,
+            'values': member_values(result, topo, color_by, yield_stress)}
+
+
+def frames_from_batch(batch):
+    # Rows of a /calculate/batch response (include_shapes); failed rows are skipped
+    if 'node_displacements' not in batch:
+        raise ValueError("The batch result has no node_displacements (solve it with include_shapes)")
+    topo = topology_for({})
+    if batch.get('node_names', topo.node_names) != topo.node_names:
+        raise ValueError("The batch result's nodes do not match the standard topology")
+    frames = []
+    for r in range(batch['n']):
+        if batch['error'][r]:
+            continue
+        p = {k: v[r] for k, v in batch['params'].items()}
+        disp = np.array(batch['node_displacements'][r], dtype=float).reshape(topo.n_nodes, 3)
+        stress = np.array([np.nan if s is None else s for s in batch['member_stress'][r]])
+        frames.append({'topology': topo, 'params': topo.with_defaults(p), 'disp': disp,
+                       'values': stress / p.get('yield_stress', topo.params['yield_stress'])})
+    return frames
+
+
+def load_frames(data, params=None, color_by='utilization'):
+    # Frames from parsed JSON: a batch response, a result, {'params', 'result'}
+    # or a list of either of the last two
+    if isinstance(data, dict) and 'node_displacements' in data and isinstance(data['node_displacements'], list):
+        return frames_from_batch(data)
+    items = data if isinstance(data, list) else [data]
+    frames = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Expected a result object or a list of them")
+        if 'result' in item:
+            frames.append(frame_from_result(item['result'], item.get('params') or {}, color_by))
+        else:
+            frames.append(frame_from_result(item, params or {}, color_by))
+    return frames
+
+
+def auto_scale(frames):
+    # One displacement scale for all frames, so an animation is not rescaled per frame
+    size = max(np.ptp(f['topology'].coordinates(f['params']), axis=0).max() for f in frames)
+    peak = max(np.nanmax(np.abs(f['disp']), initial=0.0) for f in frames)
+    return AUTO_SCALE * size / peak if peak > 0.0 else 1.0
+
+
+def colors(values):
+    # (n,) values -> (n, 4) RGBA uint8 along RAMP; NaN -> grey
+    v = np.clip(np.nan_to_num(values, nan=0.0), 0.0, 1.0) * (len(RAMP) - 1)
+    i = np.minimum(v.astype(int), len(RAMP) - 2)
+    t = (v - i)[:, None]
+    rgb = RAMP[i] * (1.0 - t) + RAMP[i + 1] * t
+    rgb[np.isnan(values)] = GREY
+    rgba = np.empty((len(values), 4), dtype=np.uint8)
+    rgba[:, :3] = np.round(rgb * 255.0)
+    rgba[:, 3] = 255
+    return rgba
+
+
+_templates = {}
+
+
+def tube_indices(n_seg, n_sides):
+    # uint32 triangle indices of n_seg capped tubes (vertex layout of tube_vertices)
+    template = _templates.get(n_sides)
+    if template is None:
+        k = np.arange(n_sides)
+        k1 = (k + 1) % n_sides
+        a0, a1, b0, b1 = k, k1, n_sides + k, n_sides + k1
+        ca = np.full(n_sides, 2 * n_sides)
+        cb = ca + 1
+        template = np.concatenate([
+            np.stack([a0, a1, b1], axis=-1), np.stack([a0, b1, b0], axis=-1),  # side, outward
+            np.stack([ca, a1, a0], axis=-1), np.stack([cb, b0, b1], axis=-1),  # end caps
+        ]).ravel().astype(np.uint32)
+        _templates[n_sides] = template
+    stride = np.uint32(2 * n_sides + 2)
+    return (template[None, :] + stride * np.arange(n_seg, dtype=np.uint32)[:, None]).ravel()
+
+
+def tube_vertices(a, b, radius, n_sides):
+    # (n_seg * (2 n_sides + 2), 3) float32: ring at a, ring at b, centre a, centre b per segment
+    d = b - a
+    u = d / np.linalg.norm(d, axis=-1, keepdims=True)
+    helper = np.where(np.abs(u[:, 2:3]) < 0.9, [0.0, 0.0, 1.0], [1.0, 0.0, 0.0])
+    e1 = np.cross(u, helper)
+    e1 /= np.linalg.norm(e1, axis=-1, keepdims=True)
+    e2 = np.cross(u, e1)
+    angle = 2.0 * np.pi * np.arange(n_sides) / n_sides
+    ring = radius * (np.cos(angle)[None, :, None] * e1[:, None, :] + np.sin(angle)[None, :, None] * e2[:, None, :])
+    out = np.empty((len(a), 2 * n_sides + 2, 3), dtype=np.float32)
+    out[:, :n_sides] = a[:, None, :] + ring
+    out[:, n_sides:2 * n_sides] = b[:, None, :] + ring
+    out[:, 2 * n_sides] = a
+    out[:, 2 * n_sides + 1] = b
+    return out.reshape(-1, 3)
+
+
+def frame_mesh(frame, scale, n_sides=DEFAULT_SIDES):
+    # -> (positions (V, 3) float32, colours (V, 4) uint8, indices (3 T,) uint32)
+    topo, p = frame['topology'], frame['params']
+    xyz = topo.coordinates(p)
+    elem_nodes, elem_member = split_members(xyz, topo)
+    pos = xyz + scale * np.nan_to_num(frame['disp'])
+    a, b = pos[elem_nodes[:, 0]], pos[elem_nodes[:, 1]]
+    if np.any(np.linalg.norm(b - a, axis=-1) == 0.0):
+        raise ValueError("Displacement scale collapses a member to zero length")
+    vertices = tube_vertices(a, b, p['pipe_od'] / 2.0, n_sides)
+    rgba = np.repeat(colors(frame['values'][elem_member]), 2 * n_sides + 2, axis=0)
+    return vertices, rgba, tube_indices(len(elem_nodes), n_sides)
+
+
+def _check(frames, n_sides):
+    if not frames:
+        raise ValueError("Nothing to export")
+    if len(frames) > MAX_FRAMES:
+        raise ValueError(f"At most {MAX_FRAMES} frames can be exported at once")
+    if not 3 <= n_sides <= MAX_SIDES:
+        raise ValueError(f"n_sides must be between 3 and {MAX_SIDES}")
+
+
+def write_glb(frames, scale=None, n_sides=DEFAULT_SIDES, fps=10.0):
+    _check(frames, n_sides)
+    if not fps > 0.0:
+        raise ValueError("fps must be positive")
+    scale = auto_scale(frames) if scale is None else float(scale)
+    chunks, views, accessors = [], [], []
+    offset = 0
+
+    def view(data, target=None):
+        nonlocal offset
+        chunks.append(data + b'\0' * (-len(data) % 4))
+        v = {'buffer': 0, 'byteOffset': offset, 'byteLength': len(data)}
+        if target:
+            v['target'] = target
+        offset += len(chunks[-1])
+        views.append(v)
+        return len(views) - 1
+
+    def accessor(array, component, kind, target=None, bounds=False, normalized=False):
+        a = {'bufferView': view(np.ascontiguousarray(array).tobytes(), target), 'componentType': component,
+             'count': len(array), 'type': kind}
+        if bounds:
+            a['min'] = np.atleast_1d(array.min(axis=0)).tolist()
+            a['max'] = np.atleast_1d(array.max(axis=0)).tolist()
+        if normalized:
+            a['normalized'] = True
+        accessors.append(a)
+        return len(accessors) - 1
+
+    shared_indices = {}
+    meshes, nodes = [], []
+    for k, frame in enumerate(frames):
+        vertices, rgba, indices = frame_mesh(frame, scale, n_sides)
+        if len(indices) not in shared_indices:
+            shared_indices[len(indices)] = accessor(indices, UNSIGNED_INT, 'SCALAR', ELEMENT_ARRAY_BUFFER)
+        meshes.append({'name': f'frame_{k}', 'primitives': [{
+            'attributes': {
+                'POSITION': accessor(vertices, FLOAT, 'VEC3', ARRAY_BUFFER, bounds=True),
+                'COLOR_0': accessor(rgba, UNSIGNED_BYTE, 'VEC4', ARRAY_BUFFER, normalized=True),
+            },
+            'indices': shared_indices[len(indices)], 'material': 0, 'mode': 4,
+        }]})
+        node = {'name': f'frame_{k}', 'mesh': k,
+                'extras': {'params': frame['params'], 'topology': frame['topology'].name}}
+        if k > 0:
+            node['scale'] = [0.0, 0.0, 0.0]
+        nodes.append(node)
+
+    animations = []
+    if len(frames) > 1:
+        dt = 1.0 / fps
+        samplers, channels = [], []
+        for k in range(len(frames)):
+            # Visible (scale 1) from k dt to (k + 1) dt; the last frame stays
+            times = ([0.0] if k > 0 else []) + [k * dt] + ([(k + 1) * dt] if k < len(frames) - 1 else [])
+            shown = ([0.0] if k > 0 else []) + [1.0] + ([0.0] if k < len(frames) - 1 else [])
+            samplers.append({
+                'input': accessor(np.array(times, dtype=np.float32), FLOAT, 'SCALAR', bounds=True),
+                'output': accessor(np.repeat(np.array(shown, dtype=np.float32)[:, None], 3, axis=1), FLOAT, 'VEC3'),
+                'interpolation': 'STEP',
+            })
+            channels.append({'sampler': k, 'target': {'node': k, 'path': 'scale'}})
+        animations.append({'name': 'frames', 'samplers': samplers, 'channels': channels})
+
+    root = len(nodes)
+    nodes.append({'name': 'crane', 'children': list(range(len(frames))),
+                  # Z-up mm -> Y-up m
+                  'rotation': [-0.7071067811865476, 0.0, 0.0, 0.7071067811865476], 'scale': [1e-3] * 3})
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'crane_export.py'},
+        'scene': 0,
+        'scenes': [{'nodes': [root], 'extras': {'displacement_scale': scale, 'frames': len(frames)}}],
+        'nodes': nodes,
+        'meshes': meshes,
+        'materials': [{'name': 'steel', 'doubleSided': True,
+                       'pbrMetallicRoughness': {'baseColorFactor': [1.0, 1.0, 1.0, 1.0],
+                                                'metallicFactor': 0.0, 'roughnessFactor': 0.7}}],
+        'accessors': accessors,
+        'bufferViews': views,
+        'buffers': [{'byteLength': offset}],
+    }
+    if animations:
+        gltf['animations'] = animations
+    text = json.dumps(gltf, separators=(',', ':')).encode()
+    text += b' ' * (-len(text) % 4)
+    body = b''.join(chunks)
+    total = 12 + 8 + len(text) + 8 + len(body)
+    return b''.join([
+        struct.pack('<4sII', b'glTF', 2, total),
+        struct.pack('<I4s', len(text), b'JSON'), text,
+        struct.pack('<I4s', len(body), b'BIN\0'), body,
+    ])
+
+
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+
+def write_stl(frame, scale=None, n_sides=DEFAULT_SIDES):
+    _check([frame], n_sides)
+    scale = auto_scale([frame]) if scale is None else float(scale)
+    vertices, rgba, indices = frame_mesh(frame, scale, n_sides)
+    tri = indices.reshape(-1, 3)
+    records = np.zeros(len(tri), dtype=STL_RECORD)
+    records['vertices'] = vertices[tri]
+    v = records['vertices']
+    n = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    records['normal'] = n / np.maximum(np.linalg.norm(n, axis=-1, keepdims=True), 1e-30)
+    c = (rgba[tri[:, 0], :3] >> 3).astype(np.uint16)
+    records['attribute'] = 0x8000 | (c[:, 0] << 10) | (c[:, 1] << 5) | c[:, 2]
+    header = f"crane_export topology={frame['topology'].name} scale={scale:g}".encode()[:80].ljust(80, b' ')
+    return header + struct.pack('<I', len(tri)) + records.tobytes()
+
+
+def export(frames, fmt='glb', scale=None, n_sides=DEFAULT_SIDES, fps=10.0):
+    # bytes of one GLB (any number of frames) or one STL (one frame)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if fmt == 'glb':
+        return write_glb(frames, scale, n_sides, fps)
+    if len(frames) != 1:
+        raise ValueError("STL holds a single frame; export the frames one by one or use glb")
+    return write_stl(frames[0], scale, n_sides)
+
+
+def export_results(items=None, batch=None, fmt='glb', scale=None, n_sides=DEFAULT_SIDES, fps=10.0,
+                   color_by='utilization'):
+    # Pool entry point: items = [(params, result), ...] and / or a batch response
+    frames = [frame_from_result(result, params, color_by) for params, result in items or ()]
+    if batch is not None:
+        frames += frames_from_batch(batch)
+    return export(frames, fmt, scale, n_sides, fps)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export crane results as deformed GLB / STL geometry")
+    parser.add_argument('input', help="JSON: a calculate result, {params, result} (or a list), or a batch response")
+    parser.add_argument('output', help="output file (.glb or .stl)")
+    parser.add_argument('--params', help="params of a bare result (JSON text or file)")
+    parser.add_argument('--format', choices=FORMATS, help="default: from the output extension")
+    parser.add_argument('--scale', type=float, help="displacement scale (default: automatic)")
+    parser.add_argument('--sides', type=int, default=DEFAULT_SIDES, help="faces around each tube")
+    parser.add_argument('--fps', type=float, default=10.0, help="GLB animation frames per second")
+    parser.add_argument('--color-by', choices=COLOR_BY, default='utilization')
+    args = parser.parse_args(argv)
+
+    with open(args.input) as fh:
+        data = json.load(fh)
+    params = None
+    if args.params:
+        if os.path.exists(args.params):
+            with open(args.params) as fh:
+                params = json.load(fh)
+        else:
+            params = json.loads(args.params)
+    frames = load_frames(data, params, args.color_by)
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt == 'stl' and len(frames) > 1:
+        # One STL per frame: out_0000.stl, out_0001.stl, ...
+        stem, ext = os.path.splitext(args.output)
+        scale = auto_scale(frames) if args.scale is None else args.scale
+        for k, frame in enumerate(frames):
+            with open(f"{stem}_{k:04d}{ext or '.stl'}", 'wb') as fh:
+                fh.write(write_stl(frame, scale, args.sides))
+        print(f"Wrote {len(frames)} STL frames: {stem}_0000{ext or '.stl'} ...")
+        return
+    with open(args.output, 'wb') as fh:
+        fh.write(export(frames, fmt, args.scale, args.sides, args.fps))
+    print(f"Wrote {args.output} ({len(frames)} frame{'s' if len(frames) != 1 else ''})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,502 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every manager dispatches
+    fcntl = None
+
+from crane_batch import grid_columns, grid_size, rows_to_columns, solve_batch_json
+from crane_capacity import assemble_chart, capacity_rows
+from crane_optimize import optimize_crane
+from crane_reliability import make_plan, run_chunk, summarize
+
+# Background jobs for studies that take minutes (sweeps, load charts,
+# reliability runs, optimizations), with no broker: state lives in one
+# SQLite file and the chunks run in local worker processes.
+#
+#   python crane_jobs.py JOBS list [--status running]
+#   python crane_jobs.py JOBS show ID [--partial]
+#   python crane_jobs.py JOBS cancel ID
+#
+# A job is split into chunks when it is submitted (the plan is stored with
+# it). Every finished chunk is written to the chunks table at once, so after
+# a restart a job resumes from the chunks it is still missing and GET shows
+# partial results while it runs. Status: queued -> running -> done, failed
+# or cancelled.
+#
+# Scheduling: one dispatcher thread hands chunks to `workers` processes,
+# highest job priority first (then oldest). Interactive traffic stays ahead
+# of batch work in two ways: no new chunk is started while busy() is true
+# (main.py: any /calculate-style solve in flight in the solver pool), and
+# job processes run at a lower OS priority (nice), so a chunk already
+# running yields the CPU to the interactive pool. Chunks are small, so a
+# paused job waits at most one chunk per worker.
+
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+ACTIVE_STATES = ('queued', 'running')
+SWEEP_CHUNK = 1024
+REFRESH = 1.0  # s between rereads of the jobs table by the dispatcher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    n_chunks INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    resumed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority, created);
+CREATE TABLE IF NOT EXISTS chunks (
+    job TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job, idx)
+);
+"""
+
+
+# --- job kinds: plan(spec) -> (plan, n_chunks), chunk(plan, i), merge(plan, {i: chunk})
+
+def plan_sweep(spec):
+    # {grid, base} or {params: [rows]}; columnar results like /calculate/batch
+    chunk_size = min(max(int(spec.get('chunk_size') or SWEEP_CHUNK), 1), 65536)
+    if spec.get('grid'):
+        grid_columns(spec['grid'], spec.get('base') or {}, 0, 0)  # validates the grid keys
+        plan = {'grid': spec['grid'], 'base': spec.get('base') or {}, 'n': grid_size(spec['grid'])}
+    else:
+        rows = spec.get('params') or []
+        rows_to_columns(rows)
+        plan = {'rows': rows, 'n': len(rows)}
+    if plan['n'] == 0:
+        raise ValueError("Sweep has no configurations")
+    plan['chunk_size'] = chunk_size
+    return plan, -(-plan['n'] // chunk_size)
+
+
+def sweep_chunk(plan, i):
+    start = i * plan['chunk_size']
+    stop = min(start + plan['chunk_size'], plan['n'])
+    if 'rows' in plan:
+        columns = rows_to_columns(plan['rows'][start:stop])
+    else:
+        columns = grid_columns(plan['grid'], plan['base'], start, stop)
+    return solve_batch_json(columns)
+
+
+def merge_sweep(plan, chunks):
+    # Finished chunks concatenated in row order; 'row' gives each row's index
+    out = None
+    for i in sorted(chunks):
+        c = chunks[i]
+        start = i * plan['chunk_size']
+        rows = list(range(start, start + c['n']))
+        if out is None:
+            out = dict(c, row=rows)
+            out['params'] = {k: list(v) for k, v in c['params'].items()}
+            out['reactions'] = {k: list(v) for k, v in c['reactions'].items()}
+            for key in ('tip_displacement_dz', 'max_stress', 'n_failures', 'failures', 'error'):
+                out[key] = list(c[key])
+            continue
+        out['n'] += c['n']
+        out['row'] += rows
+        for key in ('params', 'reactions'):
+            for k, v in c[key].items():
+                out[key][k] += v
+        for key in ('tip_displacement_dz', 'max_stress', 'n_failures', 'failures', 'error'):
+            out[key] += c[key]
+    return out or {'n': 0, 'row': []}
+
+
+def plan_reliability(spec):
+    plan = make_plan(spec.get('params') or {}, spec.get('distributions'), spec.get('n_samples', 100_000),
+                     spec.get('seed', 0), spec.get('deflection_limit'), spec.get('self_weight', True),
+                     spec.get('ballast', 0.0), spec.get('confidence', 0.95))
+    return plan, plan['n_chunks']
+
+
+def merge_reliability(plan, chunks):
+    return summarize(plan, list(chunks.values()))
+
+
+def plan_chart(spec):
+    # One chunk per arm length
+    arm_lens = [float(v) for v in spec.get('arm_lens') or []]
+    arm_angles = [float(v) for v in spec.get('arm_angles') or []]
+    if not arm_lens or not arm_angles:
+        raise ValueError("Load chart needs arm_lens and arm_angles")
+    options = {k: spec.get(k, d) for k, d in (('deflection_limit', None), ('self_weight', True), ('ballast', 0.0))}
+    return {'params': spec.get('params') or {}, 'arm_lens': arm_lens, 'arm_angles': arm_angles,
+            'options': options}, len(arm_lens)
+
+
+def chart_chunk(plan, i):
+    return capacity_rows(plan['params'], [plan['arm_lens'][i]], plan['arm_angles'], plan['options'])[0]
+
+
+def merge_chart(plan, chunks):
+    # Rows not solved yet are null
+    missing = {'capacity': None, 'governing': None}
+    return assemble_chart(plan['arm_lens'], plan['arm_angles'],
+                          [chunks.get(i, missing) for i in range(len(plan['arm_lens']))])
+
+
+def plan_optimize(spec):
+    plan = {'params': spec.get('params') or {}, 'variables': spec.get('variables') or None,
+            'deflection_limit': spec.get('deflection_limit'),
+            'max_iter': min(max(int(spec.get('max_iter', 100)), 1), 500)}
+    return plan, 1
+
+
+def optimize_chunk(plan, i):
+    return optimize_crane(plan['params'], plan['variables'], plan['deflection_limit'], plan['max_iter'])
+
+
+def merge_optimize(plan, chunks):
+    return chunks.get(0)
+
+
+KINDS = {
+    'sweep': (plan_sweep, sweep_chunk, merge_sweep),
+    'reliability': (plan_reliability, run_chunk, merge_reliability),
+    'chart': (plan_chart, chart_chunk, merge_chart),
+    'optimize': (plan_optimize, optimize_chunk, merge_optimize),
+}
+
+
+def _lower_priority(nice):
+    # Worker process initializer
+    try:
+        os.nice(nice)
+    except OSError:
+        pass
+
+
+class JobManager:
+    def __init__(self, path, kind='process', workers=None, nice=10, busy=None, poll=0.05):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.path = path
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.nice = nice
+        self.busy = busy  # callable: True while interactive work should go first
+        self.poll = poll
+        os.makedirs(path, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._lock_file = None
+        self.completed_chunks = 0
+        self.paused = 0  # dispatch rounds skipped because busy() was true
+        with self._db() as db:
+            db.executescript(SCHEMA)
+
+    def _db(self):
+        # One connection per thread (API calls run in asyncio.to_thread)
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(os.path.join(self.path, 'jobs.sqlite'), timeout=30.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    # --- API
+
+    def submit(self, kind, spec, priority=0):
+        # Validates and plans the job, stores it and wakes the dispatcher
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind: {kind} (expected one of {', '.join(KINDS)})")
+        plan, n_chunks = KINDS[kind][0](spec)
+        job_id = uuid.uuid4().hex
+        self._db().execute(
+            'INSERT INTO jobs (id, kind, priority, status, plan, n_chunks, created) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, int(priority), 'queued', json.dumps(plan), n_chunks, time.time()))
+        self.start()
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id, partial=True):
+        row = self._db().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        job = self._describe(row)
+        if job['status'] == 'done':
+            job['result'] = json.loads(row[self._index('result')])
+        elif partial and job['progress']['done']:
+            plan = json.loads(row[self._index('plan')])
+            job['partial'] = KINDS[job['kind']][2](plan, self._chunks(job_id))
+        return job
+
+    def list(self, status=None, limit=100):
+        if status is not None and status not in JOB_STATES:
+            raise ValueError(f"Unknown job status: {status} (expected one of {', '.join(JOB_STATES)})")
+        sql = 'SELECT * FROM jobs'
+        args = ()
+        if status is not None:
+            sql += ' WHERE status = ?'
+            args = (status,)
+        rows = self._db().execute(sql + ' ORDER BY created DESC LIMIT ?', args + (int(limit),)).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def cancel(self, job_id):
+        # Queued chunks are dropped; chunks already running finish in their
+        # worker and are discarded. Works from any process sharing the directory.
+        cur = self._db().execute(
+            f"UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status IN {ACTIVE_STATES}",
+            (time.time(), job_id))
+        if cur.rowcount:
+            self._wake.set()
+        return self.get(job_id, partial=False)  # KeyError when unknown
+
+    def stats(self):
+        counts = dict(self._db().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'nice': self.nice,
+            'dispatcher': self._lock_file is not None,
+            'jobs': {s: counts.get(s, 0) for s in JOB_STATES},
+            'completed_chunks': self.completed_chunks,
+            'paused': self.paused,
+        }
+
+    # --- scheduler
+
+    def start(self):
+        # Starts the dispatcher thread; safe to call more than once
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='crane-jobs', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        # Unfinished jobs stay queued / running on disk and resume on the next start()
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _acquire(self):
+        # Only one process per jobs directory dispatches (e.g. one of several
+        # uvicorn workers); the others only store submissions. Whoever holds
+        # the lock resumes jobs left running by a process that went away.
+        fh = open(os.path.join(self.path, 'dispatcher.lock'), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+        self._lock_file = fh
+        self._db().execute("UPDATE jobs SET resumed = resumed + 1 WHERE status = 'running'")
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the flock
+            self._lock_file = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority,
+                                                     initargs=(self.nice,))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crane-job')
+        return self._executor
+
+    def _refresh(self, active, inflight):
+        # Syncs `active` with the jobs table: new submissions (from any
+        # process) are added with the chunks they still miss, cancelled or
+        # failed jobs are dropped
+        db = self._db()
+        rows = db.execute(f'SELECT id, kind, priority, plan, n_chunks, created FROM jobs '
+                          f'WHERE status IN {ACTIVE_STATES}')
+        current = set()
+        for job_id, kind, priority, plan, n_chunks, created in rows.fetchall():
+            current.add(job_id)
+            if job_id not in active:
+                plan = json.loads(plan)
+                done = {i for (i,) in db.execute('SELECT idx FROM chunks WHERE job = ?', (job_id,))}
+                active[job_id] = {'kind': kind, 'plan': plan, 'priority': priority, 'created': created,
+                                  'pending': [i for i in range(n_chunks) if i not in done]}
+        for job_id in list(active):
+            if job_id not in current:
+                del active[job_id]
+        running = {job_id for job_id, _ in inflight.values()}
+        for job_id in [j for j, a in active.items() if not a['pending'] and j not in running]:
+            # Every chunk is stored (e.g. finished just before a restart)
+            self._complete(job_id, active.pop(job_id))
+
+    def _next_chunk(self, active):
+        # Highest priority first, then the oldest job
+        ready = [(-a['priority'], a['created'], job_id) for job_id, a in active.items() if a['pending']]
+        if not ready:
+            return None
+        job_id = min(ready)[2]
+        return job_id, active[job_id]['pending'].pop(0)
+
+    def _run(self):
+        active = {}  # job id -> {'kind', 'plan', 'priority', 'created', 'pending': [chunk, ...]}
+        inflight = {}  # future -> (job id, chunk)
+        while not self._stop.is_set() and not self._acquire():
+            self._stop.wait(1.0)
+        try:
+            refreshed = 0.0
+            while not self._stop.is_set():
+                if self._wake.is_set() or time.monotonic() - refreshed > REFRESH:
+                    self._wake.clear()
+                    self._refresh(active, inflight)
+                    refreshed = time.monotonic()
+                if self.busy is not None and self.busy():
+                    self.paused += 1
+                else:
+                    while len(inflight) < self.workers:
+                        task = self._next_chunk(active)
+                        if task is None:
+                            break
+                        job_id, i = task
+                        a = active[job_id]
+                        self._db().execute("UPDATE jobs SET status = 'running', started = COALESCE(started, ?) "
+                                           "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+                        inflight[self._get_executor().submit(KINDS[a['kind']][1], a['plan'], i)] = (job_id, i)
+                if inflight:
+                    done, _ = wait(inflight, timeout=self.poll, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish_chunk(active, inflight, *inflight.pop(future), future)
+                else:
+                    self._wake.wait(self.poll)
+            for future in inflight:
+                future.cancel()
+        finally:
+            self._release()
+
+    def _finish_chunk(self, active, inflight, job_id, i, future):
+        a = active.get(job_id)
+        if a is None:  # cancelled or failed meanwhile: the chunk is discarded
+            return
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM); later chunks get a fresh pool
+            self._executor = None
+            self._fail(active, job_id, f"Worker process died: {e}")
+            return
+        except Exception as e:
+            self._fail(active, job_id, str(e))
+            return
+        db = self._db()
+        db.execute('INSERT OR REPLACE INTO chunks (job, idx, result) VALUES (?, ?, ?)',
+                   (job_id, i, json.dumps(result)))
+        db.execute('UPDATE jobs SET done = (SELECT COUNT(*) FROM chunks WHERE job = ?) WHERE id = ?',
+                   (job_id, job_id))
+        self.completed_chunks += 1
+        if not a['pending'] and job_id not in {j for j, _ in inflight.values()}:
+            self._complete(job_id, active.pop(job_id))
+
+    def _complete(self, job_id, a):
+        try:
+            result = KINDS[a['kind']][2](a['plan'], self._chunks(job_id))
+        except Exception as e:
+            self._fail({}, job_id, str(e))
+            return
+        db = self._db()
+        cur = db.execute(f"UPDATE jobs SET status = 'done', finished = ?, result = ? "
+                         f"WHERE id = ? AND status IN {ACTIVE_STATES}", (time.time(), json.dumps(result), job_id))
+        if cur.rowcount:
+            # The final result holds everything the chunks did
+            db.execute('DELETE FROM chunks WHERE job = ?', (job_id,))
+
+    def _fail(self, active, job_id, error):
+        active.pop(job_id, None)
+        self._db().execute(f"UPDATE jobs SET status = 'failed', finished = ?, error = ? "
+                           f"WHERE id = ? AND status IN {ACTIVE_STATES}", (time.time(), error, job_id))
+
+    # --- rows
+
+    def _chunks(self, job_id):
+        return {i: json.loads(r) for i, r in self._db().execute('SELECT idx, result FROM chunks WHERE job = ?',
+                                                                  (job_id,))}
+
+    def _index(self, column):
+        return self._columns().index(column)
+
+    def _columns(self):
+        if getattr(self, '_column_names', None) is None:
+            self._column_names = [row[1] for row in self._db().execute('PRAGMA table_info(jobs)')]
+        return self._column_names
+
+    def _describe(self, row):
+        job = dict(zip(self._columns(), row))
+        return {
+            'id': job['id'],
+            'kind': job['kind'],
+            'priority': job['priority'],
+            'status': job['status'],
+            'progress': {'done': job['done'], 'total': job['n_chunks'],
+                         'fraction': job['done'] / job['n_chunks'] if job['status'] != 'done' else 1.0},
+            'created': job['created'],
+            'started': job['started'],
+            'finished': job['finished'],
+            'resumed': job['resumed'],
+            'error': job['error'],
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crane background jobs")
+    parser.add_argument('jobs', help="jobs directory (CRANE_JOBS)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ls = sub.add_parser('list', help="most recent jobs")
+    ls.add_argument('--status', choices=JOB_STATES)
+    ls.add_argument('--limit', type=int, default=100)
+    show = sub.add_parser('show', help="status, progress and result of one job")
+    show.add_argument('id')
+    show.add_argument('--partial', action='store_true', help="include the partial result of an unfinished job")
+    cancel = sub.add_parser('cancel', help="cancel a queued or running job")
+    cancel.add_argument('id')
+    args = parser.parse_args(argv)
+
+    jobs = JobManager(args.jobs)
+    try:
+        if args.command == 'list':
+            for job in jobs.list(args.status, args.limit):
+                print(json.dumps(job))
+        elif args.command == 'show':
+            print(json.dumps(jobs.get(args.id, partial=args.partial), indent=2))
+        else:
+            print(json.dumps(jobs.cancel(args.id), indent=2))
+    except KeyError:
+        print(f"no such job: {args.id}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
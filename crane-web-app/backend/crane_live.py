@@ -0,0 +1,88 @@
+import asyncio
+
+# Live-drag channel: one per WebSocket connection.
+#
+# The client streams {seq, params} as a slider moves. Only the newest update
+# is kept; an update that arrives while a solve is running cancels that solve
+# (a solve still queued in the pool never starts; one already on a worker
+# finishes but its result is dropped) and the newest parameters are solved
+# next. Each connection has at most one solve in flight, and every reply
+# carries the seq it answers, so replies always arrive in increasing seq order
+# and only for the latest state at the time the solve finished.
+
+
+class LiveChannel:
+    def __init__(self, solve, send):
+        # solve: async params -> result; send: async reply dict -> None
+        self._solve = solve
+        self._send = send
+        self._latest = None  # (seq, params)
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._skipped = 0
+        self.received = 0
+        self.answered = 0
+        self.superseded = 0
+        self.cancelled = 0
+
+    def submit(self, seq, params):
+        self.received += 1
+        if self._latest is not None and seq <= self._latest[0]:
+            # Out-of-order or repeated update: already superseded
+            self.superseded += 1
+            self._skipped += 1
+            return
+        if self._latest is not None and self._wake.is_set():
+            # The previous update was never picked up
+            self.superseded += 1
+            self._skipped += 1
+        self._latest = (seq, params)
+        self._wake.set()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    async def run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            seq, params = self._latest
+            task = asyncio.ensure_future(self._solve(params))
+            # Retrieve the exception of a cancelled-too-late solve so it is not logged
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            newer = asyncio.ensure_future(self._wake.wait())
+            await asyncio.wait({task, newer}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+                self.superseded += 1
+                self._skipped += 1
+                continue
+            newer.cancel()
+            if self._closed:
+                return
+            if self._latest[0] != seq:
+                # A newer update arrived as the solve finished
+                self.superseded += 1
+                self._skipped += 1
+                continue
+
+            reply = {'seq': seq, 'superseded': self._skipped}
+            try:
+                reply['result'] = task.result()
+            except Exception as e:
+                reply['error'] = str(e)
+            self._skipped = 0
+            self.answered += 1
+            await self._send(reply)
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'answered': self.answered,
+            'superseded': self.superseded,
+            'cancelled': self.cancelled,
+        }
@@ -0,0 +1,174 @@
+import numpy as np
+
+from crane_solver import (
+    DENSITY, FREE_DOFS, GRAVITY, MEMBER_NAMES, NODE_INDEX, NODE_NAMES, N_DOF, N_MEMBERS,
+    SUPPORT_NODES, TIP_NODE, build_model, element_max_moments, end_forces, member_max,
+    support_reactions, with_defaults,
+)
+from crane_topology import require_default
+
+# Multi-load-case analysis with the NumPy engine.
+#
+# A load case combines any of:
+#   hoist        factor on the hoisted mass (mass_tip * g, -Z at A_tip);
+#                values > 1 model dynamic amplification
+#   self_weight  factor on the frame's own weight (DENSITY * A * g per mm, -Z)
+#   nodal_loads  [{'node', 'direction' (FX..MZ), 'magnitude'}]
+#   member_loads [{'member', 'direction' (FX/FY/FZ, global), 'w' (N/mm)}],
+#                uniform over the whole physical member
+# Load combinations are {combo: {case: factor}}. The stiffness matrix is
+# Cholesky-factorized once and every case is solved as one column of a
+# multi-column right-hand side; combinations are superposed from the cases.
+
+NODAL_DIRECTIONS = {'FX': 0, 'FY': 1, 'FZ': 2, 'MX': 3, 'MY': 4, 'MZ': 5}
+MEMBER_DIRECTIONS = {'FX': 0, 'FY': 1, 'FZ': 2}
+MEMBER_INDEX = {name: m for m, name in enumerate(MEMBER_NAMES)}
+
+DEFAULT_CASES = [{'name': 'DL', 'hoist': 1.0}]
+
+
+def _lookup(table, key, what):
+    if key not in table:
+        raise ValueError(f"Unknown {what}: {key} (expected one of {', '.join(table)})")
+    return table[key]
+
+
+def fixed_end_reactions(L, w):
+    # (..., n_e, 12) local fixed-end reactions for uniform local loads w (..., n_e, 3)
+    fer = np.zeros(w.shape[:-1] + (12,))
+    wx, wy, wz = w[..., 0], w[..., 1], w[..., 2]
+    fer[..., 0] = fer[..., 6] = -wx * L / 2.0
+    fer[..., 1] = fer[..., 7] = -wy * L / 2.0
+    fer[..., 2] = fer[..., 8] = -wz * L / 2.0
+    fer[..., 5] = -wy * L**2 / 12.0
+    fer[..., 11] = wy * L**2 / 12.0
+    fer[..., 4] = wz * L**2 / 12.0
+    fer[..., 10] = -wz * L**2 / 12.0
+    return fer
+
+
+def load_vectors(model, cases):
+    # -> F (n_cases, N_DOF) nodal + equivalent nodal loads,
+    #    w (n_cases, n_e, 3) uniform local member loads, fer (n_cases, n_e, 12)
+    n_cases = len(cases)
+    p = model['params']
+    F = np.zeros((n_cases, N_DOF))
+    w_member = np.zeros((n_cases, N_MEMBERS, 3))
+
+    for c, case in enumerate(cases):
+        F[c, 6 * TIP_NODE + 2] -= p['mass_tip'] * GRAVITY * case.get('hoist', 0.0)
+        w_member[c, :, 2] -= DENSITY * float(model['A'][0]) * GRAVITY * case.get('self_weight', 0.0)
+        for load in case.get('nodal_loads', []):
+            n = _lookup(NODE_INDEX, load['node'], 'node')
+            d = _lookup(NODAL_DIRECTIONS, load['direction'], 'nodal load direction')
+            F[c, 6 * n + d] += load['magnitude']
+        for load in case.get('member_loads', []):
+            m = _lookup(MEMBER_INDEX, load['member'], 'member')
+            d = _lookup(MEMBER_DIRECTIONS, load['direction'], 'member load direction')
+            w_member[c, m, d] += load['w']
+
+    # Global member loads -> local sub-element loads -> equivalent nodal loads
+    w = np.einsum('eij,cej->cei', model['R'], w_member[:, model['elem_member'], :])
+    fer = fixed_end_reactions(model['L'], w)
+    fer_global = (np.swapaxes(model['T'], -1, -2) @ fer[..., None])[..., 0]
+    for c in range(n_cases):
+        F[c] -= np.bincount(model['dofs'].ravel(), weights=fer_global[c].ravel(), minlength=N_DOF)
+    return F, w, fer
+
+
+def combination_matrix(case_names, combos):
+    C = np.zeros((len(combos), len(case_names)))
+    index = {name: i for i, name in enumerate(case_names)}
+    for r, factors in enumerate(combos.values()):
+        for case, factor in factors.items():
+            C[r, _lookup(index, case, 'load case')] += factor
+    return C
+
+
+def solve_cases(model, F):
+    # One Cholesky factorization of the free-dof stiffness; every load vector
+    # (n_cases, N_DOF) is one column of the right-hand side
+    from scipy.linalg import cho_factor, cho_solve  # deferred: ~0.3 s of import at startup
+    Kff = model['K'][FREE_DOFS[:, None], FREE_DOFS]
+    try:
+        factor = cho_factor(Kff)
+    except np.linalg.LinAlgError:
+        raise ValueError("Stiffness matrix is not positive definite: the structure is unstable")
+    D = np.zeros(F.shape)
+    D[:, FREE_DOFS] = cho_solve(factor, F[:, FREE_DOFS].T).T
+    return D
+
+
+def _governing(values, names, fn):
+    i = int(fn(values))
+    return {'value': float(values[i]), 'combo': names[i]}
+
+
+def calculate_load_cases(params, cases=None, combos=None):
+    require_default(params, "Load-case analysis")
+    p = with_defaults(params)
+    cases = cases or DEFAULT_CASES
+    case_names = [c['name'] for c in cases]
+    if len(set(case_names)) != len(case_names):
+        raise ValueError("Load case names must be unique")
+    combos = combos or {name: {name: 1.0} for name in case_names}
+    combo_names = list(combos)
+
+    model = build_model(p)
+    F, w, fer = load_vectors(model, cases)
+
+    D_cases = solve_cases(model, F)
+
+    # Superpose cases into combinations (linear analysis)
+    C = combination_matrix(case_names, combos)
+    D = C @ D_cases
+    F_combo = C @ F
+    f = np.einsum('rc,cek->rek', C, end_forces(model, D_cases, fer))
+    w_combo = np.einsum('rc,cei->rei', C, w)
+
+    moment = member_max(model, element_max_moments(f, model['L'], w_combo))
+    stress = moment * model['R_out'] / model['I'][0]
+    rxn = support_reactions(model, D, F_combo)
+    disp = D.reshape(len(combos), -1, 6)
+
+    results = {}
+    for r, name in enumerate(combo_names):
+        results[name] = {
+            'tip_displacement': {'dx': float(disp[r, TIP_NODE, 0]), 'dy': float(disp[r, TIP_NODE, 1]),
+                                 'dz': float(disp[r, TIP_NODE, 2])},
+            'node_displacements': {
+                n: {'dx': float(disp[r, i, 0]), 'dy': float(disp[r, i, 1]), 'dz': float(disp[r, i, 2])}
+                for i, n in enumerate(NODE_NAMES)
+            },
+            'member_results': {
+                m: {'max_moment': float(moment[r, i]), 'max_stress': float(stress[r, i])}
+                for i, m in enumerate(MEMBER_NAMES)
+            },
+            'max_stress': float(max(stress[r].max(), 0.0)),
+            'yield_stress': p['yield_stress'],
+            'failures': [m for i, m in enumerate(MEMBER_NAMES) if stress[r, i] > p['yield_stress']],
+            'reactions': {n: float(rxn[r, s, 2]) for s, n in enumerate(SUPPORT_NODES)},
+            'reaction_forces': {
+                n: {'fx': float(rxn[r, s, 0]), 'fy': float(rxn[r, s, 1]), 'fz': float(rxn[r, s, 2])}
+                for s, n in enumerate(SUPPORT_NODES)
+            },
+        }
+
+    member_combo = stress.argmax(axis=0)
+    envelope = {
+        'tip_dz_min': _governing(disp[:, TIP_NODE, 2], combo_names, np.argmin),
+        'tip_dz_max': _governing(disp[:, TIP_NODE, 2], combo_names, np.argmax),
+        'max_stress': _governing(stress.max(axis=1), combo_names, np.argmax),
+        'member_stress': {
+            m: {'value': float(stress[member_combo[i], i]), 'combo': combo_names[member_combo[i]]}
+            for i, m in enumerate(MEMBER_NAMES)
+        },
+        'reactions': {
+            n: {'min': _governing(rxn[:, s, 2], combo_names, np.argmin),
+                'max': _governing(rxn[:, s, 2], combo_names, np.argmax)}
+            for s, n in enumerate(SUPPORT_NODES)
+        },
+        'failures': sorted({m for r in results.values() for m in r['failures']},
+                           key=MEMBER_INDEX.get),
+    }
+    return {'load_cases': case_names, 'combos': results, 'envelope': envelope}
@@ -0,0 +1,315 @@
+import contextlib
+import contextvars
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Request instrumentation.
+#
+# A PhaseTimer lives in a context variable for the duration of one request
+# (set by ServerTimingMiddleware). Code on the hot path wraps its stages in
+# `with phase('analyze'):`, which costs two perf_counter calls when a timer is
+# active and nothing otherwise. Solves run in the worker pool, where the
+# request's context does not exist: timed_call runs there under its own timer
+# and ships the phases back with the result, and record_remote merges them
+# into the request's timer (the rest of the round trip is reported as 'pool':
+# queueing plus pickling).
+#
+# At response start the phases are sent as a Server-Timing header, e.g.
+#   Server-Timing: parse;dur=0.41, pool;dur=1.2, build;dur=0.3, analyze;dur=28.1,
+#                  extract;dur=2.2, encode;dur=0.1, cache;desc="miss", total;dur=33.0
+# and folded into the Prometheus histograms that Metrics.render exposes.
+#
+# Setting CRANE_PROFILE_SLOW_MS turns on a sampling profiler around every
+# pooled solve: a background thread samples the solving thread's stack every
+# CRANE_PROFILE_INTERVAL_MS, and solves slower than the threshold write the
+# samples in folded-stack format ('f1;f2;f3 count', readable by flamegraph.pl
+# and speedscope) to CRANE_PROFILE_DIR.
+
+PROFILE_SLOW_MS = float(os.getenv("CRANE_PROFILE_SLOW_MS")) if os.getenv("CRANE_PROFILE_SLOW_MS") else None
+PROFILE_INTERVAL_MS = float(os.getenv("CRANE_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("CRANE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "crane-profiles"))
+
+# Histogram buckets in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_timer = contextvars.ContextVar("crane_phase_timer", default=None)
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []   # [(name, seconds)] in the order they ran
+        self.notes = {}    # name -> description without a duration (cache hit/miss, ...)
+        self.labels = {}   # extra metric labels, e.g. engine
+        self.error = None  # exception type name of a failed solve
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def header(self):
+        parts = [f"{name};dur={seconds * 1e3:.3f}" for name, seconds in self.phases]
+        parts += [f'{name};desc="{desc}"' for name, desc in self.notes.items()]
+        parts.append(f"total;dur={self.elapsed() * 1e3:.3f}")
+        return ", ".join(parts)
+
+
+def current_timer():
+    return _timer.get()
+
+
+@contextlib.contextmanager
+def phase(name):
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - t0)
+
+
+def mark(name):
+    # Phase from the start of the request until now (e.g. body parsing and
+    # validation, which happen before the endpoint runs)
+    timer = _timer.get()
+    if timer is not None:
+        timer.add(name, timer.elapsed())
+
+
+def note(name, desc):
+    timer = _timer.get()
+    if timer is not None:
+        timer.notes[name] = desc
+
+
+def label(**labels):
+    timer = _timer.get()
+    if timer is not None:
+        timer.labels.update(labels)
+
+
+def record_failure(exc):
+    timer = _timer.get()
+    if timer is not None:
+        timer.error = type(exc).__name__
+
+
+def timed_call(fn, *args):
+    # Pool entry point: -> (fn(*args), [(phase, seconds)], profile file or None)
+    timer = PhaseTimer()
+    token = _timer.set(timer)
+    sampler = StackSampler().start() if PROFILE_SLOW_MS is not None else None
+    try:
+        result = fn(*args)
+    finally:
+        _timer.reset(token)
+        if sampler is not None:
+            sampler.stop()
+    profile = None
+    if sampler is not None and timer.elapsed() * 1e3 >= PROFILE_SLOW_MS:
+        profile = sampler.save(f"{getattr(fn, '__name__', 'solve')}-{timer.elapsed() * 1e3:.0f}ms")
+    return result, timer.phases, profile
+
+
+def record_remote(reply, elapsed):
+    # Merges a timed_call reply into the request's timer; -> the result
+    result, phases, profile = reply
+    timer = _timer.get()
+    if timer is not None:
+        timer.add("pool", max(elapsed - sum(s for _, s in phases), 0.0))
+        timer.phases.extend(phases)
+        if profile is not None:
+            timer.notes["profile"] = os.path.basename(profile)
+    return result
+
+
+class StackSampler:
+    # Samples one thread's Python stack from a background thread
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = (PROFILE_INTERVAL_MS if interval is None else interval) / 1e3
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="crane-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def save(self, name, directory=None):
+        directory = PROFILE_DIR if directory is None else directory
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}.folded")
+        with open(path, "w") as fh:
+            fh.write(self.folded())
+        return path
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    def escape(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}" if labels else ""
+
+
+def _number(v):
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, float) and math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Metrics:
+    # Aggregates per-request timings; rendered in the Prometheus text format
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = defaultdict(Histogram)  # (method, route) -> histogram
+        self.phase_seconds = defaultdict(Histogram)    # (route, engine, phase) -> histogram
+        self.requests = Counter()                      # (method, route, status)
+        self.failures = Counter()                      # (route, error type)
+        self.profiles = 0
+
+    def observe(self, method, route, status, timer):
+        engine = timer.labels.get("engine", "")
+        with self._lock:
+            self.requests[(method, route, str(status))] += 1
+            self.request_seconds[(method, route)].observe(timer.elapsed())
+            for name, seconds in timer.phases:
+                self.phase_seconds[(route, engine, name)].observe(seconds)
+            if timer.error is not None:
+                self.failures[(route, timer.error)] += 1
+            if "profile" in timer.notes:
+                self.profiles += 1
+
+    def render(self, stats=None):
+        # stats: {prefix: stats dict} from the cache / pool; numeric entries
+        # become gauges, except the ones listed in STATS_COUNTERS
+        out = []
+
+        def family(name, kind, help_text, samples):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                out.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+        def histogram_samples(hists, label_names):
+            for key, h in sorted(hists.items()):
+                labels = list(zip(label_names, key))
+                cumulative = 0
+                for upper, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    yield "_bucket", labels + [("le", _number(float(upper)))], cumulative
+                yield "_bucket", labels + [("le", "+Inf")], h.count
+                yield "_sum", labels, h.sum
+                yield "_count", labels, h.count
+
+        with self._lock:
+            family("crane_http_requests_total", "counter", "HTTP requests by route and status",
+                   [("", list(zip(("method", "route", "status"), k)), n) for k, n in sorted(self.requests.items())])
+            family("crane_http_request_duration_seconds", "histogram", "HTTP request latency (until response start)",
+                   list(histogram_samples(self.request_seconds, ("method", "route"))))
+            family("crane_phase_duration_seconds", "histogram", "Time spent in each request phase",
+                   list(histogram_samples(self.phase_seconds, ("route", "engine", "phase"))))
+            family("crane_solver_failures_total", "counter", "Solves that raised, by exception type",
+                   [("", list(zip(("route", "error"), k)), n) for k, n in sorted(self.failures.items())])
+            family("crane_profiles_captured_total", "counter", "Slow solves written to the profile directory",
+                   [("", [], self.profiles)])
+        for prefix, values in (stats or {}).items():
+            for key, value in values.items():
+                if isinstance(value, str) or value is None:
+                    continue
+                if key in STATS_COUNTERS:
+                    family(f"crane_{prefix}_{key}_total", "counter", f"{prefix} {key}", [("", [], value)])
+                else:
+                    family(f"crane_{prefix}_{key}", "gauge", f"{prefix} {key}", [("", [], value)])
+        return "\n".join(out) + "\n"
+
+
+# Monotonic entries of ResultCache.stats() and SolverPool.stats()
+STATS_COUNTERS = {"hits", "misses", "coalesced", "evictions", "completed", "rejected", "timeouts", "failed"}
+
+
+class ServerTimingMiddleware:
+    # ASGI middleware: one PhaseTimer per HTTP request, a Server-Timing header
+    # on the response and the request's phases folded into `metrics`
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timer = PhaseTimer()
+        token = _timer.set(timer)
+        status = 500
+        observed = False
+
+        def observe():
+            nonlocal observed
+            if not observed:
+                observed = True
+                route = getattr(scope.get("route"), "path", "unmatched")
+                self.metrics.observe(scope["method"], route, status, timer)
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.header().encode("latin-1")))
+                message = dict(message, headers=headers)
+                observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timer.reset(token)
+            observe()
@@ -0,0 +1,192 @@
+import math
+import numpy as np
+
+from crane_solver import (
+    DENSITY, assemble_sparse, build_model, element_dofs, local_stiffness, refine, transformation,
+)
+from crane_topology import topology_for
+
+# Natural frequencies and mode shapes of the loaded crane.
+#
+# The static model's sub-elements are refined into n_div equal beam
+# elements each, so the distributed mass of the tubes is resolved. The mass
+# matrix is either
+#   consistent  cubic-Hermite beam mass (axial / torsion linear)
+#   lumped      half the element mass on each node's translations, the
+#               section's rotary inertia on its rotations
+# from DENSITY, plus the hoisted mass_tip on the load node's translations
+# (the load is treated as rigidly attached: pendulum motion is not modelled).
+#
+# K and M are assembled as sparse matrices and only the n_modes
+# eigenpairs nearest the shift are extracted, with ARPACK in shift-invert
+# mode: one sparse LU of K - sigma M, then a few Lanczos iterations.
+# Models too small for ARPACK fall back to a dense eigh.
+#
+# Units: N, mm, kg, so K / M is in N / (mm kg) = 1000 s^-2.
+
+MASS_MATRICES = ('consistent', 'lumped')
+DEFAULT_MODES = 6
+MAX_MODES = 50
+DEFAULT_DIV = 4
+MAX_DIV = 50
+DIRECTIONS = ('x', 'y', 'z')
+OMEGA2 = 1000.0  # (N / (mm kg)) -> s^-2
+
+
+def local_mass(L, A, J, kind='consistent', rho=DENSITY):
+    # (..., 12, 12) local mass matrix of a 3D beam; Iy = Iz = J / 2
+    L, A, J = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (L, A, J)))
+    m = np.zeros(L.shape + (12, 12))
+    mass = rho * A * L
+    if kind == 'lumped':
+        for i in (0, 1, 2, 6, 7, 8):
+            m[..., i, i] = mass / 2.0
+        for i in (3, 9):
+            m[..., i, i] = rho * J * L / 2.0
+        for i in (4, 5, 10, 11):
+            m[..., i, i] = rho * J * L / 4.0
+        return m
+
+    def put(i, j, val):
+        m[..., i, j] = val
+        m[..., j, i] = val
+
+    put(0, 0, mass / 3.0); put(6, 6, mass / 3.0); put(0, 6, mass / 6.0)
+    tor = rho * J * L
+    put(3, 3, tor / 3.0); put(9, 9, tor / 3.0); put(3, 9, tor / 6.0)
+
+    c = mass / 420.0
+    # v, theta_z: dofs 1, 5, 7, 11 (same sign convention as local_stiffness)
+    put(1, 1, 156 * c); put(7, 7, 156 * c); put(1, 7, 54 * c)
+    put(1, 5, 22 * L * c); put(7, 11, -22 * L * c); put(1, 11, -13 * L * c); put(5, 7, 13 * L * c)
+    put(5, 5, 4 * L**2 * c); put(11, 11, 4 * L**2 * c); put(5, 11, -3 * L**2 * c)
+    # w, theta_y: dofs 2, 4, 8, 10
+    put(2, 2, 156 * c); put(8, 8, 156 * c); put(2, 8, 54 * c)
+    put(2, 4, -22 * L * c); put(8, 10, 22 * L * c); put(2, 10, 13 * L * c); put(4, 8, -13 * L * c)
+    put(4, 4, 4 * L**2 * c); put(10, 10, 4 * L**2 * c); put(4, 10, -3 * L**2 * c)
+    return m
+
+
+def modal_matrices(params, n_div=DEFAULT_DIV, mass='consistent', include_tip_mass=True, topology=None):
+    # Sparse global K and M of the refined model, plus what the results need
+    if mass not in MASS_MATRICES:
+        raise ValueError(f"Unknown mass matrix: {mass} (expected one of {', '.join(MASS_MATRICES)})")
+    if not 1 <= n_div <= MAX_DIV:
+        raise ValueError(f"n_div must be between 1 and {MAX_DIV}")
+    topo = topology or topology_for(params)
+    model = build_model(params, topology=topo)
+    if model['batch']:
+        raise ValueError("Modal analysis takes one configuration")
+    xyz, nodes, parent = refine(model, n_div)
+    n_dof = 6 * len(xyz)
+
+    L = model['L'][parent] / n_div
+    A, I, J = (float(model[k][0]) for k in ('A', 'I', 'J'))
+    T = transformation(model['R'][parent])
+    Tt = np.swapaxes(T, -1, -2)
+    dofs = element_dofs(nodes)
+    K = assemble_sparse(Tt @ local_stiffness(L, A, I, I, J) @ T, dofs, n_dof)
+    M = assemble_sparse(Tt @ local_mass(L, A, J, mass) @ T, dofs, n_dof)
+
+    tip_mass = float(model['params']['mass_tip']) if include_tip_mass else 0.0
+    if tip_mass < 0.0:
+        raise ValueError("mass_tip must not be negative")
+    if tip_mass:
+        from scipy.sparse import diags
+        point = np.zeros(n_dof)
+        point[6 * topo.load_index + np.arange(3)] = tip_mass
+        M = (M + diags(point)).tocsc()
+    free = np.setdiff1d(np.arange(n_dof), topo.fixed_dofs)
+    return {
+        'topology': topo, 'K': K, 'M': M, 'free': free, 'xyz': xyz, 'n_dof': n_dof,
+        'frame_mass': DENSITY * A * float(model['L'].sum()), 'tip_mass': tip_mass,
+    }
+
+
+def lowest_modes(K, M, n_modes, sigma=0.0):
+    # The n_modes eigenpairs of K v = lam M v nearest sigma, by ascending lam;
+    # vectors are M-normalized
+    n = K.shape[0]
+    if n_modes >= n - 1 or n <= 60:
+        from scipy.linalg import eigh
+        lam, V = eigh(K.toarray(), M.toarray())
+        order = np.argsort(np.abs(lam - sigma), kind='stable')[:n_modes]
+        lam, V = lam[order], V[:, order]
+        method = 'dense'
+    else:
+        from scipy.sparse.linalg import eigsh
+        try:
+            lam, V = eigsh(K, k=n_modes, M=M, sigma=sigma, which='LM')
+        except RuntimeError as e:
+            # Singular K - sigma M: sigma sits on an eigenvalue or the frame is unstable
+            raise ValueError(f"Shift-invert factorization failed ({e}); the structure may be unstable "
+                             "or the shift coincides with a natural frequency")
+        method = 'shift-invert'
+    order = np.argsort(lam, kind='stable')
+    return lam[order], V[:, order], method
+
+
+def modal_analysis(params, n_modes=DEFAULT_MODES, mass='consistent', n_div=DEFAULT_DIV, shift_hz=0.0,
+                   include_tip_mass=True, topology=None):
+    # Lowest natural frequencies (or those nearest shift_hz) with mode shapes
+    # keyed by node like node_displacements, scaled to a peak translation of 1
+    if not 1 <= n_modes <= MAX_MODES:
+        raise ValueError(f"n_modes must be between 1 and {MAX_MODES}")
+    if not math.isfinite(shift_hz) or shift_hz < 0.0:
+        raise ValueError("shift_hz must be a non-negative number")
+    mats = modal_matrices(params, n_div, mass, include_tip_mass, topology)
+    topo, free = mats['topology'], mats['free']
+    K = mats['K'][free][:, free]
+    M = mats['M'][free][:, free]
+    if n_modes > len(free):
+        raise ValueError(f"n_modes exceeds the {len(free)} degrees of freedom of the model")
+    sigma = (2.0 * math.pi * shift_hz) ** 2 / OMEGA2
+    lam, V, method = lowest_modes(K, M, n_modes, sigma)
+    if lam[0] <= 0.0:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+
+    # Effective modal mass per direction: (phi^T M r)^2 for unit rigid translations r
+    r = np.zeros((len(free), 3))
+    free_dir = free % 6
+    for d in range(3):
+        r[free_dir == d, d] = 1.0
+    total = np.einsum('id,id->d', r, M @ r)
+    gamma = V.T @ (M @ r)
+    effective = gamma ** 2
+
+    phi = np.zeros((mats['n_dof'], n_modes))
+    phi[free] = V
+    trans = phi.reshape(-1, 6, n_modes)[:, :3, :]
+    peak = np.abs(trans).reshape(-1, n_modes)
+    at = peak.argmax(axis=0)
+    scale = trans.reshape(-1, n_modes)[at, np.arange(n_modes)]
+    trans = trans / scale
+
+    modes = []
+    for k in range(n_modes):
+        omega = math.sqrt(lam[k] * OMEGA2)
+        shape = trans[:topo.n_nodes, :, k]
+        modes.append({
+            'mode': k + 1,
+            'frequency_hz': omega / (2.0 * math.pi),
+            'period_s': 2.0 * math.pi / omega,
+            'omega': omega,
+            'effective_mass': dict(zip(DIRECTIONS, effective[k].tolist())),
+            'mass_participation': dict(zip(DIRECTIONS, (effective[k] / total).tolist())),
+            'dominant_direction': DIRECTIONS[int(effective[k].argmax())],
+            'node_displacements': {
+                name: {'dx': float(shape[i, 0]), 'dy': float(shape[i, 1]), 'dz': float(shape[i, 2])}
+                for i, name in enumerate(topo.node_names)
+            },
+        })
+    return {
+        'modes': modes,
+        'cumulative_participation': dict(zip(DIRECTIONS, (effective.sum(axis=0) / total).tolist())),
+        'frame_mass': mats['frame_mass'],
+        'tip_mass': mats['tip_mass'],
+        'mass_matrix': mass,
+        'n_div': n_div,
+        'n_dof': int(len(free)),
+        'solver': method,
+        'shift_hz': shift_hz,
+    }
@@ -0,0 +1,298 @@
+import numpy as np
+
+from crane_solver import (
+    DENSITY, STATIONS_PER_ELEMENT, build_model, element_station_stresses, end_forces, member_lengths,
+    tip_load,
+)
+from crane_topology import topology_for
+
+# Minimum-mass design: pipe section and mast geometry.
+#
+# minimize    frame mass = DENSITY * A * total member length
+# subject to  KS(station von Mises utilization) <= 1      (stress)
+#             |tip dz| <= deflection_limit               (deflection)
+#             bounds and the linear ORDERING constraints
+# over any subset of the topology's parameters (DEFAULT_VARIABLES: pipe_od,
+# t_wall, brace_mast_height, tripod_attach_height), solved with SLSQP.
+#
+# The stress constraint aggregates every station of every member with the
+# Kreisselmeier-Steinhauser function KS(u) = max(u) + log(sum exp(rho (u -
+# max u))) / rho, a smooth upper bound of max(u) (tighter for larger rho).
+#
+# Gradients use the adjoint method. Per design point, K is factored once.
+# The displacements and one adjoint vector per constraint come from that
+# factorization, in a single solve with two right-hand sides:
+#   K lambda_g = dg/dD,   dg/dp = dg/dp|D - lambda_g . (dK/dp D)
+# dK/dp and the explicit dg/dp|D are semi-analytic. They are central
+# differences of the element matrices and of the stress recovery at fixed
+# D, built in one batched build_model call. So the cost per iteration
+# does not grow with the number of design variables beyond that batched
+# assembly.
+
+KS_RHO = 100.0
+ACTIVE_TOL = 1e-3     # |g| below this (normalized) counts as active
+STEP = 1e-5           # relative step of the element-level differences
+
+DEFAULT_VARIABLES = {
+    'pipe_od': (20.0, 120.0),
+    't_wall': (1.0, 6.0),
+    'brace_mast_height': (100.0, 1700.0),
+    'tripod_attach_height': (100.0, 1700.0),
+}
+
+# Linear consistency constraints sum(c * p) >= b. They keep the section open
+# and the mast nodes in order, so the member subdivision (and with it the
+# stiffness) stays smooth; applied when they involve a design variable
+ORDERING = [
+    ({'pipe_od': 1.0, 't_wall': -2.0}, 1.0),
+    ({'tripod_attach_height': 1.0, 'brace_mast_height': -1.0}, 50.0),
+    ({'arm_pivot_height': 1.0, 'tripod_attach_height': -1.0}, 50.0),
+]
+
+# Parameters that change the load or the limit rather than the stiffness
+NOT_DESIGN = ('mass_tip', 'yield_stress')
+
+
+def _ks(u, rho):
+    # KS aggregate over the last two axes and its weights d KS / d u
+    flat = u.reshape(u.shape[:-2] + (-1,))
+    peak = flat.max(axis=-1, keepdims=True)
+    e = np.exp(rho * (flat - peak))
+    s = e.sum(axis=-1, keepdims=True)
+    return (peak + np.log(s) / rho)[..., 0], (e / s).reshape(u.shape)
+
+
+def _stations(model, f, yield_stress):
+    section = (model['R_out'][..., None], model['A'], model['I'], model['J'])
+    return element_station_stresses(f, model['L'], section, yield_stress, n_stations=STATIONS_PER_ELEMENT)
+
+
+def _ks_force_gradient(model, f, weights, yield_stress):
+    # d KS / d f (n_e, 12) for the local end forces of one configuration,
+    # following element_station_stresses without member loads
+    R_out, A, I, J = float(model['R_out']), float(model['A'][0]), float(model['I'][0]), float(model['J'][0])
+    x = model['L'][:, None] * np.linspace(0.0, 1.0, STATIONS_PER_ELEMENT)
+    axial = -f[:, 0, None]
+    torque = -f[:, 3, None]
+    my = -f[:, 4, None] - f[:, 2, None] * x
+    mz = f[:, 5, None] - f[:, 1, None] * x
+    m = np.hypot(my, mz)
+    normal = np.abs(axial) / A + m * R_out / I
+    shear = np.abs(torque) * R_out / J
+    vm = np.sqrt(normal**2 + 3.0 * shear**2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dn = np.where(vm > 0.0, weights * normal / vm, 0.0) / yield_stress
+        ds = np.where(vm > 0.0, weights * 3.0 * shear / vm, 0.0) / yield_stress
+        c_my = np.where(m > 0.0, dn * my / m, 0.0) * R_out / I
+        c_mz = np.where(m > 0.0, dn * mz / m, 0.0) * R_out / I
+    g = np.zeros(f.shape)
+    g[:, 0] = -(dn * np.sign(axial)).sum(axis=-1) / A
+    g[:, 3] = -(ds * np.sign(torque)).sum(axis=-1) * R_out / J
+    g[:, 4] = -c_my.sum(axis=-1)
+    g[:, 2] = -(c_my * x).sum(axis=-1)
+    g[:, 5] = c_mz.sum(axis=-1)
+    g[:, 1] = -(c_mz * x).sum(axis=-1)
+    return g
+
+
+def deflection_limit_for(p, deflection_limit=None):
+    # Same default as rated capacity: arm_len / 100
+    if deflection_limit is not None:
+        return float(deflection_limit)
+    if 'arm_len' not in p:
+        raise ValueError("deflection_limit is required for topologies without arm_len")
+    return p['arm_len'] / 100.0
+
+
+def evaluate(params, names, deflection_limit=None, ks_rho=KS_RHO, gradients=True):
+    # Responses at one design point and, with gradients, their derivatives
+    # with respect to `names` (arrays in that order)
+    from scipy.linalg import cho_factor, cho_solve
+    topo = topology_for(params)
+    p = {k: float(v) for k, v in topo.with_defaults(params).items()}
+    limit = deflection_limit_for(p, deflection_limit)
+
+    model = build_model(p, topology=topo)
+    F = tip_load(model)
+    free = topo.free_dofs
+    try:
+        factor = cho_factor(model['K'][np.ix_(free, free)])
+    except np.linalg.LinAlgError:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+    D = np.zeros(topo.n_dof)
+    D[free] = cho_solve(factor, F[free])
+
+    f = end_forces(model, D)
+    u = _stations(model, f, p['yield_stress'])['utilization']
+    ks, weights = _ks(u, ks_rho)
+    tip = 6 * topo.load_index + 2
+    e, s = np.unravel_index(np.argmax(u), u.shape)
+    out = {
+        'mass': DENSITY * float(model['A'][0]) * float(member_lengths(model['xyz'], topo).sum()),
+        'max_utilization': float(u[e, s]),
+        'governing_member': topo.member_names[model['elem_member'][e]],
+        'tip_dz': float(D[tip]),
+        'deflection_limit': limit,
+        'stress': float(ks) - 1.0,
+        'deflection': float(abs(D[tip])) / limit - 1.0,
+    }
+    if not gradients:
+        return out
+
+    # Adjoint right-hand sides dg/dD for both constraints, one solve
+    gf = _ks_force_gradient(model, f, weights, p['yield_stress'])
+    kT = model['k'] @ model['T']
+    g_stress = np.bincount(model['dofs'].ravel(), weights=np.einsum('eji,ej->ei', kT, gf).ravel(),
+                           minlength=topo.n_dof)
+    g_defl = np.zeros(topo.n_dof)
+    g_defl[tip] = np.sign(D[tip]) / limit
+    adjoint = cho_solve(factor, np.stack([g_stress[free], g_defl[free]], axis=1))
+
+    # Element-level central differences: configuration j is +h_j, n + j is -h_j
+    n = len(names)
+    h = np.array([STEP * max(abs(p[k]), 1.0) for k in names])
+    cols = {k: np.full(2 * n, v) for k, v in p.items()}
+    for j, k in enumerate(names):
+        cols[k][j] += h[j]
+        cols[k][n + j] -= h[j]
+    pert = build_model(cols, (model['elem_nodes'], model['elem_member']), topo)
+
+    dKD = ((pert['K'][:n] - pert['K'][n:]) @ D) / (2.0 * h[:, None])
+    ks_pert, _ = _ks(_stations(pert, end_forces(pert, D), cols['yield_stress'])['utilization'], ks_rho)
+    mass_pert = DENSITY * pert['A'][:, 0] * member_lengths(pert['xyz'], topo).sum(axis=-1)
+
+    out['grad_mass'] = (mass_pert[:n] - mass_pert[n:]) / (2.0 * h)
+    out['grad_stress'] = (ks_pert[:n] - ks_pert[n:]) / (2.0 * h) - dKD[:, free] @ adjoint[:, 0]
+    out['grad_deflection'] = -dKD[:, free] @ adjoint[:, 1]
+    return out
+
+
+def sensitivities(params, variables=None, deflection_limit=None, ks_rho=KS_RHO):
+    # JSON-friendly responses and gradients {response: {param: d/dparam}}
+    names = list(variables or DEFAULT_VARIABLES)
+    r = evaluate(params, names, deflection_limit, ks_rho)
+    grads = {k: dict(zip(names, r.pop(f'grad_{k}').tolist())) for k in ('mass', 'stress', 'deflection')}
+    return dict(r, gradient=grads)
+
+
+def _check_variables(p, variables):
+    bounds = {}
+    for k, b in (variables or DEFAULT_VARIABLES).items():
+        if k not in p:
+            raise ValueError(f"Unknown design variable: {k}")
+        if k in NOT_DESIGN:
+            raise ValueError(f"{k} cannot be a design variable")
+        lo, hi = (float(v) for v in (b if b is not None else DEFAULT_VARIABLES[k]))
+        if not lo < hi:
+            raise ValueError(f"Empty bounds for {k}: [{lo}, {hi}]")
+        bounds[k] = (lo, hi)
+    if not bounds:
+        raise ValueError("No design variables")
+    return bounds
+
+
+def _ordering(p, names):
+    # ORDERING rows that involve a design variable: (coefficients, rhs, label)
+    rows = []
+    for coef, rhs in ORDERING:
+        if all(k in p for k in coef) and any(k in names for k in coef):
+            terms = ' '.join(f"{'+' if c > 0 else '-'} {'' if abs(c) == 1.0 else f'{abs(c):g}*'}{k}"
+                             for k, c in coef.items())
+            rows.append((coef, rhs, f"{terms.removeprefix('+ ')} >= {rhs:g}"))
+    return rows
+
+
+def optimize_crane(params, variables=None, deflection_limit=None, max_iter=100, tol=1e-6, ks_rho=KS_RHO):
+    # variables: {param: [lower, upper]} (None bounds take DEFAULT_VARIABLES).
+    # -> {'success', 'message', 'iterations', 'evaluations', 'initial',
+    #     'optimum', 'active_constraints', 'history'}
+    from scipy.optimize import minimize
+    topo = topology_for(params)
+    p0 = {k: float(v) for k, v in topo.with_defaults(params).items()}
+    bounds = _check_variables(p0, variables)
+    names = list(bounds)
+    lo = np.array([bounds[k][0] for k in names])
+    span = np.array([bounds[k][1] for k in names]) - lo
+    ordering = _ordering(p0, names)
+    extra = {k: v for k, v in params.items() if k not in p0}
+
+    def design(z):
+        return dict(p0, **{k: float(v) for k, v in zip(names, lo + span * z)})
+
+    cache = {}
+
+    def at(z):
+        key = np.asarray(z, dtype=float).tobytes()
+        if key not in cache:
+            cache[key] = evaluate(dict(design(z), **extra), names, deflection_limit, ks_rho)
+        return cache[key]
+
+    z0 = np.clip((np.array([p0[k] for k in names]) - lo) / span, 0.0, 1.0)
+    mass0 = at(z0)['mass']
+    history = []
+
+    def record(z):
+        r = at(z)
+        history.append({
+            'iteration': len(history),
+            'design': {k: design(z)[k] for k in names},
+            'mass': r['mass'],
+            'max_utilization': r['max_utilization'],
+            'tip_deflection': abs(r['tip_dz']),
+            'constraints': {'stress': r['stress'], 'deflection': r['deflection']},
+        })
+
+    # SLSQP works on z in [0, 1]^n; inequality constraints are c(z) >= 0
+    constraints = [
+        {'type': 'ineq', 'fun': lambda z: -at(z)['stress'], 'jac': lambda z: -at(z)['grad_stress'] * span},
+        {'type': 'ineq', 'fun': lambda z: -at(z)['deflection'], 'jac': lambda z: -at(z)['grad_deflection'] * span},
+    ]
+    for coef, rhs, _ in ordering:
+        c = np.array([coef.get(k, 0.0) for k in names])
+        fixed = sum(v * p0[k] for k, v in coef.items() if k not in names)
+        constraints.append({'type': 'ineq', 'fun': lambda z, c=c, fixed=fixed, rhs=rhs: (c @ (lo + span * z) + fixed - rhs) / rhs,
+                            'jac': lambda z, c=c, rhs=rhs: c * span / rhs})
+
+    record(z0)
+    res = minimize(lambda z: at(z)['mass'] / mass0, z0, jac=lambda z: at(z)['grad_mass'] * span / mass0,
+                   method='SLSQP', bounds=[(0.0, 1.0)] * len(names), constraints=constraints,
+                   callback=record, options={'maxiter': max_iter, 'ftol': tol})
+    z = np.clip(res.x, 0.0, 1.0)
+    best = at(z)
+    if not np.array_equal(z, res.x) or history[-1]['design'] != {k: design(z)[k] for k in names}:
+        record(z)
+    p = design(z)
+
+    active = []
+    for name in ('stress', 'deflection'):
+        if best[name] > -ACTIVE_TOL:
+            entry = {'type': name, 'value': best[name]}
+            if name == 'stress':
+                entry['member'] = best['governing_member']
+            active.append(entry)
+    for k, zk in zip(names, z):
+        if zk <= ACTIVE_TOL or zk >= 1.0 - ACTIVE_TOL:
+            active.append({'type': 'bound', 'param': k, 'side': 'lower' if zk <= ACTIVE_TOL else 'upper',
+                           'value': p[k]})
+    for coef, rhs, label in ordering:
+        if sum(c * p[k] for k, c in coef.items()) - rhs <= ACTIVE_TOL * rhs:
+            active.append({'type': 'ordering', 'constraint': label})
+
+    summary = lambda r, q: {
+        'design': {k: q[k] for k in names}, 'mass': r['mass'], 'max_utilization': r['max_utilization'],
+        'governing_member': r['governing_member'], 'tip_deflection': abs(r['tip_dz']),
+    }
+    return {
+        'success': bool(res.success and best['stress'] <= ACTIVE_TOL and best['deflection'] <= ACTIVE_TOL),
+        'message': str(res.message),
+        'iterations': int(res.nit),
+        'evaluations': len(cache),
+        'variables': {k: list(bounds[k]) for k in names},
+        'deflection_limit': best['deflection_limit'],
+        'ks_rho': ks_rho,
+        'initial': summary(at(z0), design(z0)),
+        'optimum': dict(summary(best, p), params=dict(p, **extra),
+                        constraints={'stress': best['stress'], 'deflection': best['deflection']}),
+        'active_constraints': active,
+        'history': history,
+    }
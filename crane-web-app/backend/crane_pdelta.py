@@ -0,0 +1,209 @@
+import numpy as np
+
+from crane_solver import (
+    E_MODULUS, STATIONS_PER_ELEMENT, assemble_sparse, build_model, element_dofs, element_max_moments,
+    element_station_stresses, local_stiffness, member_max, member_results, member_stress_summary, refine,
+    stress_checks, tip_load, transformation,
+)
+from crane_topology import topology_for
+
+# Second-order (P-Delta) analysis under the tip load.
+#
+# Equilibrium is taken on the deformed frame: (Ke + Kg(N)) D = F, with Kg
+# the consistent geometric stiffness of each beam for its axial force N
+# (tension positive, so compressed members soften). Starting from the
+# linear solution, each outer iteration takes N from the current D and
+# solves the updated system by conjugate gradients, preconditioned with
+# Ke's sparse LU (factored once). Ke^-1 (Ke + Kg) = I + Ke^-1 Kg differs
+# from the identity only in the few sway modes that compression softens,
+# so CG needs a handful of steps even close to buckling, where a plain
+# fixed-point iteration on Ke would crawl. N changes little between outer
+# iterations, so each one gains about two digits: 5 to 10 outer iterations
+# reach TOLERANCE.
+#
+# The elastic critical load factor for the converged axial forces is the
+# largest mu of -Kg v = mu Ke v, inverted (one small ARPACK run on the same
+# LU). A non-positive curvature in CG means the tip load exceeds it.
+#
+# Kg on the static model's sub-elements captures sway of the frame's
+# nodes (P-Delta). Member curvature (P-delta) needs interior nodes:
+# p_delta_div > 1 splits every sub-element, as crane_solver.refine does.
+# The matrices stay sparse, so the cost grows about linearly.
+
+MAX_DIV = 20
+MAX_ITER = 30       # outer (axial force) iterations
+MAX_CG = 500
+TOLERANCE = 1e-10   # relative displacement change / CG residual at convergence
+
+
+def local_geometric_stiffness(L, N, polar_ratio):
+    # (..., 12, 12) local geometric stiffness of a 3D beam under axial force N
+    # (tension positive); polar_ratio = (Iy + Iz) / A for the torsion term
+    L, N, polar_ratio = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (L, N, polar_ratio)))
+    kg = np.zeros(L.shape + (12, 12))
+    c = N / L
+
+    def put(i, j, val):
+        kg[..., i, j] = val
+        kg[..., j, i] = val
+
+    put(0, 0, c); put(6, 6, c); put(0, 6, -c)
+    put(3, 3, c * polar_ratio); put(9, 9, c * polar_ratio); put(3, 9, -c * polar_ratio)
+    # v, theta_z: dofs 1, 5, 7, 11 (same sign convention as local_stiffness)
+    put(1, 1, 1.2 * c); put(7, 7, 1.2 * c); put(1, 7, -1.2 * c)
+    put(1, 5, c * L / 10); put(1, 11, c * L / 10); put(5, 7, -c * L / 10); put(7, 11, -c * L / 10)
+    put(5, 5, 2 * c * L**2 / 15); put(11, 11, 2 * c * L**2 / 15); put(5, 11, -c * L**2 / 30)
+    # w, theta_y: dofs 2, 4, 8, 10
+    put(2, 2, 1.2 * c); put(8, 8, 1.2 * c); put(2, 8, -1.2 * c)
+    put(2, 4, -c * L / 10); put(2, 10, -c * L / 10); put(4, 8, c * L / 10); put(8, 10, c * L / 10)
+    put(4, 4, 2 * c * L**2 / 15); put(10, 10, 2 * c * L**2 / 15); put(4, 10, -c * L**2 / 30)
+    return kg
+
+
+def refined_model(params, n_div=1, topology=None):
+    # Element data of the static model, optionally with every sub-element
+    # split into n_div; the first n_nodes nodes stay the topology's nodes
+    if not 1 <= n_div <= MAX_DIV:
+        raise ValueError(f"p_delta_div must be between 1 and {MAX_DIV}")
+    topo = topology or topology_for(params)
+    model = build_model(params, topology=topo)
+    if n_div == 1:
+        xyz, nodes, parent = model['xyz'], model['elem_nodes'], np.arange(len(model['L']))
+    else:
+        xyz, nodes, parent = refine(model, n_div)
+    L = model['L'][parent] / n_div
+    A, I, J = (float(model[k][0]) for k in ('A', 'I', 'J'))
+    return {
+        'topology': topo, 'params': model['params'], 'xyz': xyz, 'n_dof': 6 * len(xyz),
+        'elem_nodes': nodes, 'elem_member': model['elem_member'][parent], 'dofs': element_dofs(nodes),
+        'R_out': float(model['R_out']), 'A': A, 'I': I, 'J': J,
+        'L': L, 'T': transformation(model['R'][parent]), 'k': local_stiffness(L, A, I, I, J),
+    }
+
+
+def _pcg(A, b, x, precondition, tol):
+    # Preconditioned conjugate gradients from x -> (x, steps)
+    r = b - A @ x
+    z = precondition(r)
+    d = z.copy()
+    rz = r @ z
+    limit = tol * np.linalg.norm(b)
+    for step in range(MAX_CG):
+        if np.linalg.norm(r) <= limit:
+            return x, step
+        Ad = A @ d
+        curvature = d @ Ad
+        if curvature <= 0.0:
+            raise ValueError("P-Delta analysis: the tip load exceeds the frame's elastic critical load (buckling)")
+        alpha = rz / curvature
+        x = x + alpha * d
+        r = r - alpha * Ad
+        z = precondition(r)
+        rz, rz_old = r @ z, rz
+        d = z + (rz / rz_old) * d
+    raise ValueError("P-Delta analysis: conjugate gradients did not converge")
+
+
+def solve_p_delta(model, F, max_iter=MAX_ITER, tol=TOLERANCE):
+    # -> (D_linear, D, local kg, info); D over all dofs of the model
+    from scipy.sparse.linalg import LinearOperator, eigsh, splu
+    topo, dofs, T = model['topology'], model['dofs'], model['T']
+    free = np.setdiff1d(np.arange(model['n_dof']), topo.fixed_dofs)
+    Tt = np.swapaxes(T, -1, -2)
+    Ke = assemble_sparse(Tt @ model['k'] @ T, dofs, model['n_dof'])[free][:, free].tocsc()
+    try:
+        lu = splu(Ke)
+    except RuntimeError:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+
+    def geometric(D):
+        d = (T @ D[dofs, None])[..., 0]
+        N = E_MODULUS * model['A'] / model['L'] * (d[:, 6] - d[:, 0])
+        kg = local_geometric_stiffness(model['L'], N, 2.0 * model['I'] / model['A'])
+        return kg, assemble_sparse(Tt @ kg @ T, dofs, model['n_dof'])[free][:, free]
+
+    D_lin = np.zeros(model['n_dof'])
+    D_lin[free] = lu.solve(F[free])
+    if not np.all(np.isfinite(D_lin)):
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+    D = D_lin.copy()
+    cg_steps = 0
+    for it in range(1, max_iter + 1):
+        kg, Kg = geometric(D)
+        x, steps = _pcg((Ke + Kg).tocsr(), F[free], D[free], lu.solve, tol)
+        cg_steps += steps
+        change = np.linalg.norm(x - D[free]) / max(np.linalg.norm(x), 1e-300)
+        D[free] = x
+        if change < tol:
+            break
+    else:
+        raise ValueError(f"P-Delta analysis did not converge in {max_iter} iterations")
+    kg, Kg = geometric(D)
+
+    critical = None
+    if Kg.nnz and len(free) > 2:
+        mu = eigsh(-Kg, k=1, M=Ke, Minv=LinearOperator(Ke.shape, matvec=lu.solve), which='LA',
+                   return_eigenvectors=False)[0]
+        critical = float(1.0 / mu) if mu > 0.0 else None
+    return D_lin, D, kg, {
+        'iterations': it,
+        'cg_iterations': cg_steps,
+        'critical_load_factor': critical,
+    }
+
+
+def calculate_crane_pdelta(params, n_div=None):
+    # Same result dict as calculate_crane_numpy, from the second-order
+    # solution, plus a 'p_delta' block comparing it with the linear one
+    topo = topology_for(params)
+    p = topo.with_defaults(params)
+    n_div = int(params.get('p_delta_div', 1) if n_div is None else n_div)
+    model = refined_model(p, n_div, topo)
+    F = np.zeros(model['n_dof'])
+    F[:topo.n_dof] = tip_load({'topology': topo, 'batch': (), 'params': p})
+    D_lin, D, kg, info = solve_p_delta(model, F)
+
+    def forces(D, kg=None):
+        k = model['k'] if kg is None else model['k'] + kg
+        return (k @ (model['T'] @ D[model['dofs'], None]))[..., 0]
+
+    section = (model['R_out'], model['A'], model['I'], model['J'])
+    f = forces(D, kg)
+    stations = element_station_stresses(f, model['L'], section, p['yield_stress'], n_stations=STATIONS_PER_ELEMENT)
+    summary = member_stress_summary(model, stations)
+    member_moment = member_max(model, element_max_moments(f, model['L']))
+    member_stress = member_moment * model['R_out'] / model['I']
+    linear_moment = member_max(model, element_max_moments(forces(D_lin), model['L']))
+
+    U = D.reshape(-1, 6)
+    U_lin = D_lin.reshape(-1, 6)
+    tip, tip_lin = U[topo.load_index, :3], U_lin[topo.load_index, :3]
+    Ke_D = np.zeros(model['n_dof'])
+    np.add.at(Ke_D, model['dofs'], (np.swapaxes(model['T'], -1, -2) @ f[..., None])[..., 0])
+    reactions = Ke_D[topo.fixed_dofs] - F[topo.fixed_dofs]
+
+    out = {'tip_displacement': {'dz': float(tip[2])}}
+    out['node_displacements'] = {
+        name: {'dx': float(U[i, 0]), 'dy': float(U[i, 1]), 'dz': float(U[i, 2])}
+        for i, name in enumerate(topo.node_names)
+    }
+    out['member_results'] = member_results(member_moment, member_stress, summary, topo.member_names)
+    checks = stress_checks(member_stress, summary, p['yield_stress'], topo.member_names)
+    out['max_stress'] = checks.pop('max_stress')
+    out['yield_stress'] = p['yield_stress']
+    out.update(checks)
+    out['reactions'] = {n: float(reactions[3 * s + 2]) for s, n in enumerate(topo.support_nodes)}
+    out['p_delta'] = dict(info, n_div=n_div, **amplification(tip, tip_lin, member_moment.max(), linear_moment.max()))
+    return out
+
+
+def amplification(tip, tip_lin, moment, linear_moment):
+    # Second-order over first-order response (tip translation, peak member
+    # moment), shared by both engines' 'p_delta' block
+    tip, tip_lin = np.asarray(tip, dtype=float), np.asarray(tip_lin, dtype=float)
+    norm_lin = float(np.linalg.norm(tip_lin))
+    return {
+        'tip_displacement_linear': dict(zip(('dx', 'dy', 'dz'), tip_lin.tolist())),
+        'amplification': float(np.linalg.norm(tip)) / norm_lin if norm_lin > 0.0 else 1.0,
+        'moment_amplification': float(moment / linear_moment) if linear_moment > 0.0 else 1.0,
+    }
@@ -0,0 +1,366 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from crane_batch import rows_to_columns, solve_batch
+from crane_solver import DEFAULT_PARAMS, MEMBER_NAMES, SUPPORT_NODES
+from crane_topology import DEFAULT_TOPOLOGY
+
+# Offline analysis of whole catalogs of crane configurations.
+#
+#   python crane_pipeline.py catalog.csv results/ [--format npz|parquet|csv] [--chunk-size 4096] [--workers 8]
+#   python crane_pipeline.py catalog.parquet results/ --restart
+#
+# Input: CSV, JSON Lines or Parquet (by extension, or --input-format), one
+# configuration per row. Columns named like a crane parameter (arm_len,
+# t_wall, ...) are parameters, blank cells take the default; any other
+# column (an ID, a catalog name) is carried through to the output as text.
+# The carried-through columns are fixed by the first chunk (for CSV and
+# Parquet: the header / schema) and kept in the manifest, so every part has
+# the same columns: a row without one gets '', a key first seen later
+# (JSON Lines) is not carried.
+# Rows are read in chunks and solved by the vectorized NumPy engine in
+# `workers` processes, with at most two chunks per worker in flight, so
+# memory stays bounded however long the catalog is.
+#
+# Output: a directory with one columnar part file per chunk
+# (part-000000.npz / .parquet / .csv, written by the worker that solved it)
+# and manifest.json listing the finished chunks. Columns: row (input row
+# number), the carried-through columns, every parameter, tip_dx/dy/dz,
+# max_stress, n_failures, failures (';'-separated members), error,
+# stress_<member> and reaction_<support>. Running the same command again
+# after an interruption skips the chunks already written; --restart
+# discards them. Throughput is printed to stderr while running and the
+# summary as JSON on stdout at the end. Parquet needs pyarrow.
+
+CHUNK_SIZE = 4096
+MANIFEST_VERSION = 2
+INPUT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet', '.pq': 'parquet'}
+OUTPUT_FORMATS = ('npz', 'parquet', 'csv')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet input/output needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+# --- input
+
+def input_format(path, fmt=None):
+    fmt = fmt or INPUT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in INPUT_FORMATS.values():
+        raise ValueError(f"Cannot tell the input format of {path} (use --input-format csv|jsonl|parquet)")
+    return fmt
+
+
+def read_rows(path, fmt=None):
+    # Yields one dict per configuration, streaming
+    fmt = input_format(path, fmt)
+    if fmt == 'parquet':
+        pq = _pyarrow().parquet
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_SIZE):
+            yield from batch.to_pylist()
+        return
+    with open(path, newline='' if fmt == 'csv' else None) as fh:
+        if fmt == 'csv':
+            yield from csv.DictReader(fh)
+            return
+        for n, line in enumerate(fh, 1):
+            if line.strip():
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError(f"{path}:{n}: expected a JSON object per line")
+                yield row
+
+
+def chunked(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def extra_columns(rows):
+    # Non-parameter keys of the rows, in first-seen order
+    return list(dict.fromkeys(k for row in rows for k in row if k not in DEFAULT_PARAMS))
+
+
+def prepare(rows, extra):
+    # Input rows -> (parsed param dicts, per-row error or None, {carried-through column: values});
+    # a row with an error keeps the values that did parse
+    params, errors = [], []
+    for row in rows:
+        p, error = {}, None
+        for key, value in row.items():
+            if key in DEFAULT_PARAMS:
+                if value is None or (isinstance(value, str) and not value.strip()):
+                    continue
+                try:
+                    p[key] = float(value)
+                except (TypeError, ValueError):
+                    error = error or f"Invalid value for {key}: {value!r}"
+            elif key == 'topology' and _text(value).strip() not in ('', DEFAULT_TOPOLOGY):
+                error = error or f"Only the '{DEFAULT_TOPOLOGY}' topology is supported (got {value!r})"
+            elif key == 'analysis' and _text(value).strip() not in ('', 'linear'):
+                error = error or f"Only the linear analysis is supported (got {value!r})"
+        params.append(p)
+        errors.append(error)
+    return params, errors, {k: [_text(row.get(k)) for row in rows] for k in extra}
+
+
+# --- solve + output
+
+def solve_rows(rows, offset, extra=()):
+    # One chunk of input rows -> flat output columns (extra: carried-through columns)
+    params, errors, extra = prepare(rows, extra)
+    # Rows with an error are solved with the defaults to keep the batch whole;
+    # their outputs are NaN and their parameter columns report the input
+    out = solve_batch(rows_to_columns([{} if e else p for p, e in zip(params, errors)]))
+    out['params'] = {k: np.array(v, dtype=float) for k, v in out['params'].items()}
+    for r, error in enumerate(errors):
+        if error is not None:
+            for key, values in out['params'].items():
+                values[r] = params[r].get(key, np.nan)
+            for key in ('tip', 'member_stress', 'reactions'):
+                out[key][r] = np.nan
+            out['failures'][r] = []
+            out['n_failures'][r] = 0
+            out['max_stress'][r] = np.nan
+            out['error'][r] = error
+    n = len(rows)
+    columns = {'row': np.arange(offset, offset + n, dtype=np.int64)}
+    columns.update({k: np.asarray(v, dtype=str) for k, v in extra.items()})
+    columns.update({k: np.asarray(v, dtype=float) for k, v in out['params'].items()})
+    for axis, name in enumerate(('tip_dx', 'tip_dy', 'tip_dz')):
+        columns[name] = out['tip'][:, axis]
+    columns['max_stress'] = out['max_stress']
+    columns['n_failures'] = np.asarray(out['n_failures'], dtype=np.int64)
+    columns['failures'] = np.asarray([';'.join(f) for f in out['failures']], dtype=str)
+    columns['error'] = np.asarray([_text(e) for e in out['error']], dtype=str)
+    for m, name in enumerate(MEMBER_NAMES):
+        columns[f'stress_{name}'] = out['member_stress'][:, m]
+    for s, name in enumerate(SUPPORT_NODES):
+        columns[f'reaction_{name}'] = out['reactions'][:, s]
+    return columns
+
+
+def part_path(out_dir, i, fmt):
+    return os.path.join(out_dir, f'part-{i:06d}.{fmt}')
+
+
+def write_part(path, columns, fmt):
+    # Written to a temporary name and renamed, so a part file is never partial
+    tmp = path + '.tmp'
+    if fmt == 'npz':
+        with open(tmp, 'wb') as fh:
+            np.savez(fh, **columns)
+    elif fmt == 'parquet':
+        pa = _pyarrow()
+        pa.parquet.write_table(pa.table({k: pa.array(v) for k, v in columns.items()}), tmp)
+    else:
+        with open(tmp, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(columns)
+            writer.writerows(zip(*(v.tolist() for v in columns.values())))
+    os.replace(tmp, path)
+
+
+def process_chunk(rows, i, chunk_size, out_dir, fmt, extra):
+    # Worker entry point: solve one chunk and write its part file
+    columns = solve_rows(rows, i * chunk_size, extra)
+    write_part(part_path(out_dir, i, fmt), columns, fmt)
+    return i, len(rows), int((columns['n_failures'] > 0).sum()), int((columns['error'] != '').sum())
+
+
+def read_part(path):
+    # One part file -> {column: array}
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {k: data[k] for k in data.files}
+    if path.endswith('.parquet'):
+        table = _pyarrow().parquet.read_table(path)
+        return {k: table.column(k).to_numpy(zero_copy_only=False) for k in table.column_names}
+    with open(path, newline='') as fh:
+        header, *body = list(csv.reader(fh))
+    columns = {}
+    for k, values in zip(header, zip(*body) if body else [()] * len(header)):
+        try:
+            columns[k] = np.asarray(values, dtype=np.int64 if k in ('row', 'n_failures') else float)
+        except ValueError:
+            columns[k] = np.asarray(values, dtype=str)
+    return columns
+
+
+def load_results(out_dir):
+    # Every finished part, concatenated in row order (for results that fit in memory)
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        raise ValueError(f"{out_dir} has no manifest.json")
+    parts = [read_part(part_path(out_dir, i, manifest['format'])) for i in sorted(map(int, manifest['chunks']))]
+    if not parts:
+        return {}
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+# --- manifest / resume
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, 'manifest.json')
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(manifest, fh, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def _input_identity(path):
+    st = os.stat(path)
+    return {'input': os.path.abspath(path), 'input_bytes': st.st_size, 'input_mtime': st.st_mtime}
+
+
+def open_manifest(input_path, out_dir, fmt, chunk_size, restart=False):
+    # The manifest of an earlier run of the same input / settings is resumed;
+    # anything else needs restart=True
+    os.makedirs(out_dir, exist_ok=True)
+    fresh = dict(_input_identity(input_path), version=MANIFEST_VERSION, format=fmt, chunk_size=chunk_size,
+                 chunks={}, complete=False, extra_columns=None)
+    old = read_manifest(out_dir)
+    if old is not None and not restart:
+        same = all(old.get(k) == v for k, v in fresh.items() if k not in ('chunks', 'complete', 'extra_columns'))
+        if not same:
+            raise ValueError(f"{out_dir} holds results of a different input or settings "
+                             "(same input, --format and --chunk-size resume; --restart starts over)")
+        return old
+    for name in os.listdir(out_dir):
+        if name.startswith('part-'):
+            os.remove(os.path.join(out_dir, name))
+    write_manifest(out_dir, fresh)
+    return fresh
+
+
+def print_progress(stats):
+    print(f"[pipeline] {stats['rows']} rows in {stats['chunks']} chunks, {stats['seconds']:.1f} s, "
+          f"{stats['rows_per_second']:.0f} rows/s", file=sys.stderr)
+
+
+def run_pipeline(input_path, out_dir, fmt='npz', chunk_size=CHUNK_SIZE, workers=None, in_format=None,
+                 restart=False, progress=print_progress):
+    # Returns the summary; progress(stats) is called after every chunk
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    if fmt == 'parquet':
+        _pyarrow()
+    chunk_size = max(int(chunk_size), 1)
+    workers = workers or os.cpu_count() or 1
+    rows = read_rows(input_path, in_format)
+    manifest = open_manifest(input_path, out_dir, fmt, chunk_size, restart)
+    done = manifest['chunks']  # str(chunk) -> [rows, failing rows, rows with errors]
+    chunks = chunked(rows, chunk_size)
+    first = next(chunks, [])
+    if manifest.get('extra_columns') is None:
+        manifest['extra_columns'] = extra_columns(first)
+        write_manifest(out_dir, manifest)
+    extra = manifest['extra_columns']
+    resumed = len(done)
+    stats = {'rows': 0, 'chunks': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+    t0 = time.perf_counter()
+
+    def finished(result):
+        i, n, failing, errors = result
+        done[str(i)] = [n, failing, errors]
+        write_manifest(out_dir, manifest)
+        stats['rows'] += n
+        stats['chunks'] += 1
+        stats['seconds'] = time.perf_counter() - t0
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress is not None:
+            progress(stats)
+
+    todo = ((i, chunk) for i, chunk in enumerate(itertools.chain([first], chunks)) if chunk and str(i) not in done)
+    if workers == 1:
+        for i, chunk in todo:
+            finished(process_chunk(chunk, i, chunk_size, out_dir, fmt, extra))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pending = set()
+        try:
+            for i, chunk in todo:
+                if len(pending) >= 2 * workers:
+                    complete, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in complete:
+                        finished(future.result())
+                pending.add(executor.submit(process_chunk, chunk, i, chunk_size, out_dir, fmt, extra))
+            while pending:
+                complete, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in complete:
+                    finished(future.result())
+        finally:
+            # On an interruption the finished chunks are in the manifest already
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    manifest['complete'] = True
+    write_manifest(out_dir, manifest)
+    totals = np.sum(list(done.values()), axis=0).tolist() if done else [0, 0, 0]
+    return {
+        'rows': totals[0],
+        'chunks': len(done),
+        'resumed_chunks': resumed,
+        'solved_rows': stats['rows'],
+        'seconds': time.perf_counter() - t0,
+        'rows_per_second': stats['rows_per_second'],
+        'failing_rows': totals[1],
+        'error_rows': totals[2],
+        'workers': workers,
+        'output': os.path.abspath(out_dir),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a catalog of crane configurations offline")
+    parser.add_argument('input', help="configurations (.csv, .jsonl or .parquet)")
+    parser.add_argument('output', help="output directory (part files + manifest.json)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='npz', help="part file format")
+    parser.add_argument('--input-format', choices=sorted(set(INPUT_FORMATS.values())))
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="configurations per chunk")
+    parser.add_argument('--workers', type=int, default=0, help="processes (default: every CPU; 1 runs inline)")
+    parser.add_argument('--restart', action='store_true', help="discard the results of an earlier run")
+    parser.add_argument('--quiet', action='store_true', help="no progress lines")
+    args = parser.parse_args(argv)
+    try:
+        summary = run_pipeline(args.input, args.output, args.format, args.chunk_size, args.workers or None,
+                               args.input_format, args.restart, None if args.quiet else print_progress)
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("interrupted: run the same command again to resume", file=sys.stderr)
+        return 130
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
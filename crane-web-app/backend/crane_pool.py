@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Runs CPU-bound solves off the event loop.
+#
+# kind='process' gives true parallelism for the PyNite engine (pure Python,
+# holds the GIL); kind='thread' is enough for the NumPy engine, whose heavy
+# lifting happens in LAPACK with the GIL released; kind='inline' runs on the
+# event loop (debugging only). Submissions beyond workers + max_queue are
+# rejected with PoolSaturated so callers can answer 429 instead of queueing
+# without bound.
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+class SolverPool:
+    def __init__(self, kind='process', workers=None, max_queue=None, timeout=30.0):
+        if kind not in ('process', 'thread', 'inline'):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 4 if max_queue is None else max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='crane-solver')
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+
+    async def run(self, fn, *args, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.active >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(
+                    f"Solver pool saturated ({self.active} solves running or queued)")
+            self.active += 1
+
+        if self.kind == 'inline':
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        try:
+            cf = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is released when the work itself finishes (or is cancelled
+        # while still queued), not when the caller stops waiting for it
+        cf.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cf), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise SolveTimeout(f"Solve exceeded {timeout:g} s")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for later requests
+            with self._lock:
+                self.failed += 1
+            self._executor = None
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        busy = min(self.active, self.workers)
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'timeout': self.timeout,
+            'running': busy,
+            'queued': self.active - busy,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'failed': self.failed,
+        }
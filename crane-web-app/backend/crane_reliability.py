@@ -0,0 +1,342 @@
+import functools
+import json
+import math
+from statistics import NormalDist
+import numpy as np
+
+from crane_loads import fixed_end_reactions
+from crane_solver import (
+    DENSITY, E_MODULUS, GRAVITY, STATIONS_PER_ELEMENT, assemble, build_model, element_station_stresses,
+    local_stiffness, section_properties,
+)
+from crane_topology import topology_for
+
+# Monte Carlo reliability of one crane configuration.
+#
+# t_wall, pipe_od, E, yield_stress and mass_tip are sampled from the
+# distributions below. Each sample is checked for
+#   yield       station von Mises utilization > 1 anywhere (hoist + self-weight)
+#   deflection  |tip dz| > deflection_limit (default arm_len / 100)
+#   uplift      vertical reaction < 0 at any support
+# The probabilities of those events (and of any of them) come with Wilson
+# score confidence intervals.
+#
+# The samples never re-solve the frame. The local beam stiffness is linear
+# in A and I (J = 2 I), and pipe_od moves every node by the same offset
+# (the tube centre line sits pipe_od / 2 above the ground), so
+#   K = E / E0 * (A K_A + I K_I)
+# with K_A, K_I fixed. One generalized eigendecomposition
+# K_I v = mu (K_A + c0 K_I) v (c0 = I / A at the nominal section)
+# diagonalizes every sample's stiffness:
+#   V^T K V = E / E0 * A * (1 + (c - c0) mu),  c = I / A.
+# The hoist and the self-weight load are linear in mass_tip and A, so one
+# sample costs a few small matrix products. Displacements scale with E0 / E.
+# Member forces and reactions do not depend on E.
+#
+# Samples are drawn and evaluated in chunks of CHUNK_SIZE. Chunk i always
+# uses SeedSequence(seed, spawn_key=(i,)), so the estimate depends on the
+# seed and the sample count only, not on how the chunks are spread over
+# workers.
+
+VARIABLES = ('t_wall', 'pipe_od', 'E', 'yield_stress', 'mass_tip')
+DISTRIBUTIONS = ('normal', 'lognormal', 'uniform', 'gumbel', 'fixed')
+
+# Mean defaults to the configuration's value (E: E_MODULUS); std may be
+# given directly or as cov (std / mean)
+DEFAULT_DISTRIBUTIONS = {
+    't_wall': {'dist': 'normal', 'cov': 0.05},
+    'pipe_od': {'dist': 'normal', 'cov': 0.005},
+    'E': {'dist': 'normal', 'cov': 0.03},
+    'yield_stress': {'dist': 'lognormal', 'cov': 0.07},
+    'mass_tip': {'dist': 'gumbel', 'cov': 0.2},
+}
+
+MODES = ('yield', 'deflection', 'uplift')
+CHUNK_SIZE = 4096
+MAX_SAMPLES = 10_000_000
+EULER_GAMMA = 0.5772156649015329
+
+
+def normalize_distributions(p, distributions=None):
+    # -> {variable: {'dist', 'mean', 'std'[, 'low', 'high']}} for every variable
+    distributions = distributions or {}
+    unknown = set(distributions) - set(VARIABLES)
+    if unknown:
+        raise ValueError(f"Unknown random variable(s): {', '.join(sorted(unknown))} "
+                         f"(expected {', '.join(VARIABLES)})")
+    out = {}
+    for name in VARIABLES:
+        spec = dict(DEFAULT_DISTRIBUTIONS[name], **(distributions.get(name) or {}))
+        dist = spec.get('dist')
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"{name}: unknown distribution {dist!r} (expected one of {', '.join(DISTRIBUTIONS)})")
+        mean = float(spec.get('mean', E_MODULUS if name == 'E' else p[name]))
+        std = float(spec['std']) if 'std' in spec else float(spec.get('cov', 0.0)) * abs(mean)
+        if not math.isfinite(mean) or not math.isfinite(std) or std < 0.0:
+            raise ValueError(f"{name}: mean and std must be finite and std >= 0")
+        entry = {'dist': dist, 'mean': mean, 'std': 0.0 if dist == 'fixed' else std}
+        if dist == 'uniform':
+            entry['low'] = float(spec.get('low', mean - math.sqrt(3.0) * std))
+            entry['high'] = float(spec.get('high', mean + math.sqrt(3.0) * std))
+            if not entry['low'] <= entry['high']:
+                raise ValueError(f"{name}: uniform low must not exceed high")
+        if dist == 'lognormal' and mean <= 0.0:
+            raise ValueError(f"{name}: a lognormal distribution needs a positive mean")
+        out[name] = entry
+    return out
+
+
+def draw(spec, rng, n):
+    # One distribution -> n samples
+    dist, mean, std = spec['dist'], spec['mean'], spec['std']
+    if dist == 'fixed' or (std == 0.0 and dist != 'uniform'):
+        return np.full(n, mean)
+    if dist == 'normal':
+        return rng.normal(mean, std, n)
+    if dist == 'lognormal':
+        s2 = math.log1p((std / mean) ** 2)
+        return rng.lognormal(math.log(mean) - s2 / 2.0, math.sqrt(s2), n)
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], n)
+    beta = std * math.sqrt(6.0) / math.pi
+    return rng.gumbel(mean - EULER_GAMMA * beta, beta, n)
+
+
+def draw_samples(distributions, seed, chunk, n):
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    return {name: draw(distributions[name], rng, n) for name in VARIABLES}
+
+
+def make_plan(params, distributions=None, n_samples=100_000, seed=0, deflection_limit=None, self_weight=True,
+              ballast=0.0, confidence=0.95):
+    # Validated, JSON-serializable description of one run (what every chunk needs)
+    topo = topology_for(params)
+    p = {k: float(v) for k, v in topo.with_defaults(params).items()}
+    n_samples = int(n_samples)
+    if not 1 <= n_samples <= MAX_SAMPLES:
+        raise ValueError(f"n_samples must be between 1 and {MAX_SAMPLES}")
+    if not 0.0 < confidence < 1.0:
+        raise ValueError("confidence must be between 0 and 1")
+    if deflection_limit is None:
+        if 'arm_len' not in p:
+            raise ValueError("deflection_limit is required for topologies without arm_len")
+        deflection_limit = p['arm_len'] / 100.0
+    if params.get('topology'):
+        p['topology'] = params['topology']
+    return {
+        'params': p,
+        'distributions': normalize_distributions(p, distributions),
+        'n_samples': n_samples,
+        'n_chunks': -(-n_samples // CHUNK_SIZE),
+        'seed': int(seed),
+        'deflection_limit': float(deflection_limit),
+        'self_weight': bool(self_weight),
+        'ballast': float(ballast),
+        'confidence': float(confidence),
+    }
+
+
+def build_basis(p, self_weight=True, ballast=0.0):
+    # Sample-independent operators of the eigen-decomposed stiffness
+    from scipy.linalg import eigh
+    topo = topology_for(p)
+    xyz = topo.coordinates(p)
+    moved = topo.coordinates(dict(p, pipe_od=p['pipe_od'] * 1.1)) - xyz
+    if not np.allclose(moved, moved[0], rtol=0.0, atol=1e-9 * (1.0 + np.abs(xyz).max())):
+        raise ValueError(f"Topology '{topo.name}': pipe_od changes the frame's shape, "
+                         "which the reliability analysis does not support")
+
+    model = build_model(p, topology=topo)
+    L, T, dofs = model['L'], model['T'], model['dofs']
+    kA = local_stiffness(L, 1.0, 0.0, 0.0, 0.0)
+    kI = local_stiffness(L, 0.0, 1.0, 1.0, 2.0)
+    Tt = np.swapaxes(T, -1, -2)
+    K_A = assemble(Tt @ kA @ T, dofs, topo.n_dof)
+    K_I = assemble(Tt @ kI @ T, dofs, topo.n_dof)
+
+    A0, I0 = float(model['A'][0]), float(model['I'][0])
+    c0 = I0 / A0
+    free, fixed = topo.free_dofs, topo.fixed_dofs
+    try:
+        mu, V = eigh(K_I[np.ix_(free, free)], K_A[np.ix_(free, free)] + c0 * K_I[np.ix_(free, free)])
+    except np.linalg.LinAlgError:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+
+    # Unit loads: 1 kg hoisted, self-weight per mm^2 of section area
+    F_hoist = np.zeros(topo.n_dof)
+    F_hoist[6 * topo.load_index + 2] = -GRAVITY
+    w_unit = np.einsum('eij,j->ei', model['R'], [0.0, 0.0, -DENSITY * GRAVITY if self_weight else 0.0])
+    fer_unit = fixed_end_reactions(L, w_unit)
+    F_sw = -np.bincount(dofs.ravel(), weights=(Tt @ fer_unit[..., None])[..., 0].ravel(), minlength=topo.n_dof)
+
+    # Local end forces (n_e * 12, n_free) per unit A and unit I, in eigen coordinates
+    def forces(k):
+        G = np.zeros((len(L), 12, topo.n_dof))
+        np.put_along_axis(G, np.broadcast_to(dofs[:, None, :], (len(L), 12, 12)), k @ T, axis=-1)
+        return G.reshape(-1, topo.n_dof)[:, free] @ V
+
+    zrows = fixed[2::3]
+    return {
+        'mu': mu, 'c0': c0,
+        'b': np.stack([V.T @ F_hoist[free], V.T @ F_sw[free]]),
+        'tip': V[np.searchsorted(free, 6 * topo.load_index + 2)],
+        'GA': forces(kA), 'GI': forces(kI),
+        'RA': K_A[np.ix_(zrows, free)] @ V, 'RI': K_I[np.ix_(zrows, free)] @ V,
+        'F_sw_z': F_sw[zrows], 'ballast_z': ballast * GRAVITY / len(zrows),
+        'fer_unit': fer_unit, 'w_unit': w_unit, 'L': L, 'n_e': len(L),
+        'elem_member': model['elem_member'],
+        'member_names': topo.member_names, 'support_nodes': topo.support_nodes,
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_basis(key):
+    p, self_weight, ballast = json.loads(key)
+    return build_basis(p, self_weight, ballast)
+
+
+def basis_for(plan):
+    # Memoized per process, so the chunks a worker runs share one decomposition
+    return _cached_basis(json.dumps([plan['params'], plan['self_weight'], plan['ballast']], sort_keys=True))
+
+
+def evaluate_samples(basis, s):
+    # Sampled variables (n,) each -> per-sample responses
+    R, A, I, J = section_properties(s['pipe_od'], s['t_wall'])
+    c = I / A
+    load = np.stack([s['mass_tip'], A], axis=1)                       # (n, 2)
+    y = (load @ basis['b']) / (A[:, None] * (1.0 + (c[:, None] - basis['c0']) * basis['mu']))
+    tip_dz = (y @ basis['tip']) * E_MODULUS / s['E']
+
+    f = A[:, None] * (y @ basis['GA'].T) + I[:, None] * (y @ basis['GI'].T)
+    f = f.reshape(len(A), basis['n_e'], 12) + A[:, None, None] * basis['fer_unit']
+    w = A[:, None, None] * basis['w_unit']
+    L = np.broadcast_to(basis['L'], f.shape[:-1])
+    st = element_station_stresses(f, L, (R[:, None], A[:, None], I[:, None], J[:, None]),
+                                  s['yield_stress'], w, STATIONS_PER_ELEMENT)
+    u = st['utilization'].reshape(len(A), -1)
+    worst = u.argmax(axis=1)
+
+    rz = (A[:, None] * (y @ basis['RA'].T) + I[:, None] * (y @ basis['RI'].T)
+          - A[:, None] * basis['F_sw_z'] + basis['ballast_z'])
+    return {
+        'max_utilization': u[np.arange(len(A)), worst],
+        'governing_member': basis['elem_member'][worst // STATIONS_PER_ELEMENT],
+        'tip_deflection': np.abs(tip_dz),
+        'reactions': rz,
+    }
+
+
+def _valid(s):
+    return ((s['t_wall'] > 0.0) & (s['t_wall'] < s['pipe_od'] / 2.0) & (s['E'] > 0.0)
+            & (s['yield_stress'] > 0.0) & (s['mass_tip'] >= 0.0))
+
+
+def run_chunk(plan, chunk):
+    # Pool entry point: counts for samples [chunk * CHUNK_SIZE, ...) of the plan
+    basis = basis_for(plan)
+    n = min(CHUNK_SIZE, plan['n_samples'] - chunk * CHUNK_SIZE)
+    s = draw_samples(plan['distributions'], plan['seed'], chunk, n)
+    ok = _valid(s)
+    r = evaluate_samples(basis, {k: v[ok] for k, v in s.items()})
+
+    failed = {
+        'yield': r['max_utilization'] > 1.0,
+        'deflection': r['tip_deflection'] > plan['deflection_limit'],
+        'uplift': (r['reactions'] < 0.0).any(axis=1),
+    }
+    failed['any'] = failed['yield'] | failed['deflection'] | failed['uplift']
+    stats = {}
+    for key, v in (('max_utilization', r['max_utilization']), ('tip_deflection', r['tip_deflection']),
+                   ('min_reaction', r['reactions'].min(axis=1))):
+        mean = float(v.mean()) if len(v) else 0.0
+        stats[key] = [mean, float(((v - mean) ** 2).sum()), float(v.min(initial=np.inf)), float(v.max(initial=-np.inf))]
+    return {
+        'chunk': chunk,
+        'n': int(ok.sum()),
+        'invalid': int(n - ok.sum()),
+        'failures': {k: int(v.sum()) for k, v in failed.items()},
+        'yield_members': np.bincount(r['governing_member'][failed['yield']],
+                                     minlength=len(basis['member_names'])).tolist(),
+        'uplift_supports': (r['reactions'] < 0.0).sum(axis=0).tolist(),
+        'stats': stats,
+    }
+
+
+def wilson(k, n, confidence=0.95):
+    # Wilson score interval for a binomial proportion (sound at k = 0 or n)
+    if n == 0:
+        return [0.0, 1.0]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    p = k / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return [max(0.0, centre - half), min(1.0, centre + half)]
+
+
+def summarize(plan, chunks):
+    # Merge chunk counts (in chunk order, so sums are reproducible) into the result dict
+    chunks = sorted(chunks, key=lambda c: c['chunk'])
+    n = sum(c['n'] for c in chunks)
+    topo = topology_for(plan['params'])
+    probabilities = {}
+    for mode in MODES + ('any',):
+        k = sum(c['failures'][mode] for c in chunks)
+        pf = k / n if n else 0.0
+        probabilities[mode] = {
+            'count': k, 'probability': pf, 'ci': wilson(k, n, plan['confidence']),
+            # Reliability index; None when no (or every) sample failed
+            'beta': -NormalDist().inv_cdf(pf) if 0.0 < pf < 1.0 else None,
+        }
+    statistics = {}
+    for key in ('max_utilization', 'tip_deflection', 'min_reaction'):
+        # Chunk means and squared deviations merged pairwise (Chan et al.)
+        count = mean = m2 = 0.0
+        for c in chunks:
+            if c['n']:
+                c_mean, c_m2 = c['stats'][key][:2]
+                delta = c_mean - mean
+                total = count + c['n']
+                mean += delta * c['n'] / total
+                m2 += c_m2 + delta * delta * count * c['n'] / total
+                count = total
+        statistics[key] = {
+            'mean': mean, 'std': math.sqrt(m2 / n) if n else 0.0,
+            'min': min((c['stats'][key][2] for c in chunks if c['n']), default=None),
+            'max': max((c['stats'][key][3] for c in chunks if c['n']), default=None),
+        }
+    return {
+        'n_samples': n,
+        'n_invalid': sum(c['invalid'] for c in chunks),
+        'n_requested': plan['n_samples'],
+        'complete': len(chunks) == plan['n_chunks'],
+        'seed': plan['seed'],
+        'confidence': plan['confidence'],
+        'deflection_limit': plan['deflection_limit'],
+        'probabilities': probabilities,
+        'yield_members': dict(zip(topo.member_names, np.sum([c['yield_members'] for c in chunks], axis=0).tolist())),
+        'uplift_supports': dict(zip(topo.support_nodes,
+                                    np.sum([c['uplift_supports'] for c in chunks], axis=0).tolist())),
+        'statistics': statistics,
+        'distributions': plan['distributions'],
+    }
+
+
+def run_reliability(params, executor=None, progress=None, **options):
+    # In-process run; with an executor (e.g. a ProcessPoolExecutor) the chunks
+    # are spread over it. progress(done, total) is called as chunks finish.
+    plan = make_plan(params, **options)
+    chunks = []
+    if executor is None:
+        for i in range(plan['n_chunks']):
+            chunks.append(run_chunk(plan, i))
+            if progress:
+                progress(len(chunks), plan['n_chunks'])
+    else:
+        from concurrent.futures import as_completed
+        futures = [executor.submit(run_chunk, plan, i) for i in range(plan['n_chunks'])]
+        for fut in as_completed(futures):
+            chunks.append(fut.result())
+            if progress:
+                progress(len(chunks), plan['n_chunks'])
+    return summarize(plan, chunks)
@@ -0,0 +1,185 @@
+import threading
+import numpy as np
+
+from crane_solver import (
+    DEFAULT_PARAMS, FIXED_DOFS, FREE_DOFS, GRAVITY, MEMBER_NAMES, NODE_NAMES, N_DOF, N_NODES,
+    STATIONS_PER_ELEMENT, SUPPORT_NODES, TIP_NODE, assemble, element_dofs, element_max_moments,
+    element_station_stresses, local_axes, local_stiffness, member_max, member_results,
+    member_stress_summary, node_coordinates, section_properties, split_members, stress_checks,
+    transformation, with_defaults,
+)
+from crane_topology import require_default
+
+# Incremental re-analysis for one interactive session (NumPy engine).
+#
+# Every parameter feeds a known stage of the pipeline
+#   geometry -> section -> stiffness -> factorization -> load -> solve -> post-process
+# and an update recomputes only the stages its changed parameters invalidate:
+#   yield_stress          post-process (pass/fail checks only)
+#   mass_tip              load + post-process: the analysis is linear, so the
+#                         stored 1 kg solution is scaled, no solve
+#   arm_len, arm_angle    geometry of A_tip/A_brace: only the M_arm and M_brace
+#                         element matrices are rebuilt and added to the cached
+#                         stiffness of the other members, then refactorized
+#   pipe_od, t_wall       section: all element matrices, no new geometry
+#   any other parameter   everything
+# If an arm move changes how members are subdivided, the update falls back to
+# a full rebuild.
+
+STAGES = ('geometry', 'section', 'stiffness', 'factorization', 'load', 'solve', 'post-process')
+
+PARAM_STAGES = {
+    'pipe_od': 'section',
+    't_wall': 'section',
+    'base_len': 'geometry',
+    'base_wid': 'geometry',
+    'arm_pivot_height': 'geometry',
+    'tripod_attach_height': 'geometry',
+    'brace_mast_height': 'geometry',
+    'arm_len': 'arm',
+    'arm_angle': 'arm',
+    'mass_tip': 'load',
+    'yield_stress': 'post-process',
+}
+
+ARM_MEMBERS = [MEMBER_NAMES.index('M_arm'), MEMBER_NAMES.index('M_brace')]
+
+# Stages rerun for each kind of change (in pipeline order)
+INVALIDATES = {
+    'geometry': STAGES,
+    'arm': ('geometry', 'stiffness', 'factorization', 'solve', 'post-process'),
+    'section': ('section', 'stiffness', 'factorization', 'solve', 'post-process'),
+    'load': ('load', 'post-process'),
+    'post-process': ('post-process',),
+}
+
+
+class CraneSession:
+    def __init__(self):
+        self.p = None
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._s = {}
+
+    def plan(self, params):
+        # -> (stages to run, scope 'full' | 'arm' | None, new params)
+        require_default(params, "Incremental sessions")
+        new = {k: float(v) for k, v in with_defaults(params).items()}
+        if self.p is None:
+            return STAGES, 'full', new
+        kinds = {PARAM_STAGES[k] for k in DEFAULT_PARAMS if new[k] != self.p[k]}
+        stages = {s for kind in kinds for s in INVALIDATES[kind]}
+        scope = 'full' if 'geometry' in kinds or 'section' in kinds else 'arm' if 'arm' in kinds else None
+        return tuple(s for s in STAGES if s in stages), scope, new
+
+    def update(self, params):
+        # Same result dict as calculate_crane_numpy, plus 'recomputed'
+        with self._lock:
+            stages, scope, p = self.plan(params)
+            geometry = None
+            if 'geometry' in stages:
+                xyz = node_coordinates(p)
+                geometry = (xyz, split_members(xyz))
+                if scope == 'arm' and geometry[1] is not self._s['elements']:
+                    # The arm now crosses a different set of nodes
+                    stages, scope = STAGES, 'full'
+            try:
+                self._run(stages, scope, p, geometry)
+            except Exception:
+                # Leave the session consistent: the next update rebuilds everything
+                self.p = None
+                self._s = {}
+                raise
+            self.p = p
+            self.updates += 1
+            for s in stages:
+                self.counts[s] += 1
+            return dict(self._s['result'], recomputed={'stages': list(stages), 'scope': scope})
+
+    def _run(self, stages, scope, p, geometry):
+        from scipy.linalg import cho_factor  # deferred until the first session
+        s = self._s
+        if 'geometry' in stages:
+            s['xyz'], elements = geometry
+            if scope != 'arm':
+                s['elements'] = elements
+                s['dofs'] = element_dofs(elements[0])
+                s['arm'] = np.isin(elements[1], ARM_MEMBERS)
+        if 'section' in stages:
+            s['section'] = tuple(float(v) for v in section_properties(p['pipe_od'], p['t_wall']))
+        if 'stiffness' in stages:
+            self._stiffness(scope)
+        if 'factorization' in stages:
+            try:
+                s['factor'] = cho_factor(s['K'][np.ix_(FREE_DOFS, FREE_DOFS)])
+            except np.linalg.LinAlgError:
+                raise ValueError("Stiffness matrix is singular: the structure is unstable")
+        if 'solve' in stages:
+            self._unit_solve()
+        if 'post-process' in stages:
+            s['result'] = self._post(p)
+
+    def _stiffness(self, scope):
+        s = self._s
+        elem_nodes = s['elements'][0]
+        _, A, I, J = s['section']
+        # Full: every element; arm: only the arm elements, the rest is reused
+        rebuild = s['arm'] if scope == 'arm' else np.ones(len(elem_nodes), dtype=bool)
+        xyz = s['xyz']
+        L, R = local_axes(xyz[elem_nodes[rebuild, 0]], xyz[elem_nodes[rebuild, 1]])
+        k = local_stiffness(L, A, I, I, J)
+        T = transformation(R)
+        Ke = np.swapaxes(T, -1, -2) @ k @ T
+        if scope != 'arm':
+            s['L'], s['k'], s['T'] = L, k, T
+            s['K_fixed'] = assemble(Ke[~s['arm']], s['dofs'][~s['arm']])
+            s['K'] = s['K_fixed'] + assemble(Ke[s['arm']], s['dofs'][s['arm']])
+        else:
+            s['L'][rebuild], s['k'][rebuild], s['T'][rebuild] = L, k, T
+            s['K'] = s['K_fixed'] + assemble(Ke, s['dofs'][rebuild])
+
+    def _unit_solve(self):
+        # Response to a 1 kg hoisted mass; the load stage only scales it
+        from scipy.linalg import cho_solve
+        s = self._s
+        F = np.zeros(N_DOF)
+        F[6 * TIP_NODE + 2] = -GRAVITY
+        D = np.zeros(N_DOF)
+        D[FREE_DOFS] = cho_solve(s['factor'], F[FREE_DOFS])
+        f = (s['k'] @ (s['T'] @ D[s['dofs'], None]))[..., 0]
+        model = {'elem_member': s['elements'][1]}
+        s['unit'] = {
+            'D': D.reshape(N_NODES, 6),
+            'reactions': (s['K'][FIXED_DOFS] @ D - F[FIXED_DOFS]).reshape(len(SUPPORT_NODES), 3),
+            'member_moment': member_max(model, element_max_moments(f, s['L'])),
+            'stations': element_station_stresses(f, s['L'], s['section'], 1.0, n_stations=STATIONS_PER_ELEMENT),
+        }
+
+    def _post(self, p):
+        s = self._s
+        u = s['unit']
+        m = p['mass_tip']
+        R_out, _, I, _ = s['section']
+        D = m * u['D']
+        moment = abs(m) * u['member_moment']
+        stress = moment * R_out / I
+        stations = {k: abs(m) * u['stations'][k] for k in ('axial', 'torque', 'normal', 'shear', 'von_mises')}
+        stations['utilization'] = stations['von_mises'] / p['yield_stress']
+        summary = member_stress_summary({'elem_member': s['elements'][1]}, stations)
+        checks = stress_checks(stress, summary, p['yield_stress'])
+        return {
+            'tip_displacement': {'dz': float(D[TIP_NODE, 2])},
+            'node_displacements': {
+                name: {'dx': float(D[i, 0]), 'dy': float(D[i, 1]), 'dz': float(D[i, 2])}
+                for i, name in enumerate(NODE_NAMES)
+            },
+            'member_results': member_results(moment, stress, summary),
+            'max_stress': checks.pop('max_stress'),
+            'yield_stress': p['yield_stress'],
+            **checks,
+            'reactions': {n: float(m * u['reactions'][i, 2]) for i, n in enumerate(SUPPORT_NODES)},
+        }
+
+    def stats(self):
+        return {'updates': self.updates, 'stage_runs': dict(self.counts)}
@@ -0,0 +1,165 @@
+import numpy as np
+
+from crane_batch import solve_batch
+from crane_solver import (
+    FIXED_DOFS, FREE_DOFS, GRAVITY, MEMBER_NAMES, NODE_INDEX, N_DOF, N_NODES, SUPPORT_NODES,
+    TIP_NODE, assemble, check_lengths, element_dofs, element_max_moments, intermediate_nodes,
+    local_axes, local_stiffness, member_max, node_coordinates, section_properties, split_members,
+    subdivision_keys, transformation, with_defaults,
+)
+from crane_topology import require_default
+
+# Slewing envelope: the crane evaluated over a range of arm angles.
+#
+# Only the arm and the arm brace move when the crane slews. The base, mast
+# and tripod sub-assembly is statically condensed once onto the two mast
+# nodes the arm attaches to (M_top, M_brace); each angle then solves a
+# 24-DOF system (those two nodes plus A_brace and A_tip), batched over all
+# angles, and the condensed interior is recovered with a precomputed matrix.
+
+ARM_MEMBERS = [MEMBER_NAMES.index('M_arm'), MEMBER_NAMES.index('M_brace')]
+INTERFACE_NODES = ['M_top', 'M_brace']
+ARM_NODES = ['A_brace', 'A_tip']
+
+MAX_ANGLES = 36000
+
+
+def slew_angles(start=0.0, stop=360.0, step=5.0):
+    if step <= 0.0:
+        raise ValueError("Angle step must be positive")
+    if stop < start:
+        raise ValueError("Slew range must have stop >= start")
+    n = int(np.floor((stop - start) / step + 1e-9)) + 1
+    if n > MAX_ANGLES:
+        raise ValueError(f"Slew range needs {n} angles; the limit is {MAX_ANGLES}")
+    angles = float(start) + float(step) * np.arange(n)
+    if stop - start >= 360.0:
+        # A full revolution: the end angle repeats the start
+        angles = angles[angles < start + 360.0 - 1e-9]
+    return angles
+
+
+def _node_dofs(names):
+    return np.concatenate([6 * NODE_INDEX[n] + np.arange(6) for n in names])
+
+
+def _element_matrices(xyz, elem_nodes, A, I, J):
+    L, R = local_axes(xyz[..., elem_nodes[:, 0], :], xyz[..., elem_nodes[:, 1], :])
+    k = local_stiffness(L, A, I, I, J)
+    T = transformation(R)
+    return L, k, T, np.swapaxes(T, -1, -2) @ k @ T
+
+
+def _solve_condensed(p, angles, xyz, elements):
+    elem_nodes, elem_member = elements
+    arm = np.isin(elem_member, ARM_MEMBERS)
+    dofs = element_dofs(elem_nodes)
+    R_out, A, I, J = (float(v) for v in section_properties(p['pipe_od'], p['t_wall']))
+
+    # Angle-independent sub-assembly, condensed onto the interface dofs
+    L_s, k_s, T_s, Ke_s = _element_matrices(xyz[0], elem_nodes[~arm], A, I, J)
+    K_s = assemble(Ke_s, dofs[~arm])
+    b = _node_dofs(INTERFACE_NODES)
+    a = _node_dofs(ARM_NODES)
+    i = np.setdiff1d(FREE_DOFS, np.concatenate([b, a]))
+    K_ii = K_s[np.ix_(i, i)]
+    K_ib = K_s[np.ix_(i, b)]
+    try:
+        X = np.linalg.solve(K_ii, K_ib)
+    except np.linalg.LinAlgError:
+        raise ValueError("Base sub-assembly is singular: the structure is unstable")
+    K_c = K_s[np.ix_(b, b)] - K_ib.T @ X
+
+    # Per angle: arm elements + condensed base on the 24 reduced dofs
+    L_a, k_a, T_a, Ke_a = _element_matrices(xyz, elem_nodes[arm], A, I, J)
+    K_a = assemble(Ke_a, dofs[arm])
+    r = np.concatenate([b, a])
+    K_r = K_a[:, r[:, None], r]
+    K_r[:, :len(b), :len(b)] += K_c
+
+    F = np.zeros(N_DOF)
+    F[6 * TIP_NODE + 2] = -p['mass_tip'] * GRAVITY
+    try:
+        D_r = np.linalg.solve(K_r, np.broadcast_to(F[r], (len(angles), len(r)))[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+
+    D = np.zeros((len(angles), N_DOF))
+    D[:, r] = D_r
+    D[:, i] = -D_r[:, :len(b)] @ X.T
+
+    # Member end forces: fixed elements share k/T across angles
+    f = np.empty((len(angles), len(elem_member), 12))
+    f[:, ~arm] = (k_s @ (T_s @ D[:, dofs[~arm], None]))[..., 0]
+    f[:, arm] = (k_a @ (T_a @ D[:, dofs[arm], None]))[..., 0]
+    L = np.empty((len(angles), len(elem_member)))
+    L[:, ~arm] = L_s
+    L[:, arm] = L_a
+    moment = member_max({'elem_member': elem_member}, element_max_moments(f, L))
+
+    # Supports connect only to the fixed sub-assembly
+    rxn = (K_s[FIXED_DOFS] @ D.T).T - F[FIXED_DOFS]
+    return D.reshape(-1, N_NODES, 6), moment * R_out / I, rxn.reshape(-1, len(SUPPORT_NODES), 3)
+
+
+def _separable(elements):
+    # The condensation assumes arm elements only touch interface/arm nodes and
+    # fixed elements never touch arm nodes (false only for degenerate geometry)
+    elem_nodes, elem_member = elements
+    arm = np.isin(elem_member, ARM_MEMBERS)
+    arm_nodes = [NODE_INDEX[n] for n in ARM_NODES]
+    allowed = arm_nodes + [NODE_INDEX[n] for n in INTERFACE_NODES]
+    return np.isin(elem_nodes[arm], allowed).all() and not np.isin(elem_nodes[~arm], arm_nodes).any()
+
+
+def _solve_batched(p, angles):
+    # Fallback when the member subdivision changes with the angle
+    out = solve_batch(dict(p, arm_angle=angles))
+    if any(out['error']):
+        raise ValueError(next(e for e in out['error'] if e))
+    return out
+
+
+def _governing(values, angles, fn):
+    k = int(fn(values))
+    return {'angle': float(angles[k]), 'value': float(values[k])}
+
+
+def slew_envelope(params, start=0.0, stop=360.0, step=5.0):
+    require_default(params, "The slew envelope")
+    p = with_defaults(params)
+    angles = slew_angles(start, stop, step)
+    xyz = node_coordinates(dict(p, arm_angle=angles))
+    check_lengths(xyz)
+
+    mask, t = intermediate_nodes(xyz)
+    keys = subdivision_keys(mask, t)
+    elements = split_members(xyz[0])
+    if np.all(keys == keys[0]) and _separable(elements):
+        D, stress, rxn = _solve_condensed(p, angles, xyz, elements)
+        tip = D[:, TIP_NODE, :3]
+        rz = rxn[..., 2]
+    else:
+        out = _solve_batched(p, angles)
+        stress, rz, tip = out['member_stress'], out['reactions'], out['tip']
+
+    max_stress = stress.max(axis=-1)
+    return {
+        'angles': angles.tolist(),
+        'tip_displacement': {'dx': tip[:, 0].tolist(), 'dy': tip[:, 1].tolist(), 'dz': tip[:, 2].tolist()},
+        'max_stress': max_stress.tolist(),
+        'member_stress': {m: stress[:, j].tolist() for j, m in enumerate(MEMBER_NAMES)},
+        'reactions': {n: rz[:, s].tolist() for s, n in enumerate(SUPPORT_NODES)},
+        'yield_stress': p['yield_stress'],
+        'governing': {
+            'tip_dz': _governing(tip[:, 2], angles, np.argmin),
+            'max_stress': _governing(max_stress, angles, np.argmax),
+            'members': {m: _governing(stress[:, j], angles, np.argmax) for j, m in enumerate(MEMBER_NAMES)},
+            'reactions': {
+                n: {'max': _governing(rz[:, s], angles, np.argmax),
+                    'min': _governing(rz[:, s], angles, np.argmin)}
+                for s, n in enumerate(SUPPORT_NODES)
+            },
+        },
+        'failure_angles': angles[(stress > p['yield_stress']).any(axis=-1)].tolist(),
+    }
@@ -0,0 +1,559 @@
+import functools
+import math
+import numpy as np
+
+from crane_topology import DEFAULT_TOPOLOGY, load_topology, topology_for
+
+# Native NumPy direct-stiffness engine for the fixed crane frame.
+# Units: length mm, force N, stress N/mm^2 (MPa) -- same as crane_calc.py.
+#
+# The kernels below accept parameters with leading batch dimensions, so the
+# same code solves one configuration or a stack of them.
+
+# ----------------------------
+# Topology
+# ----------------------------
+
+# Compiled from topologies/standard.json (see crane_topology.py). These
+# constants describe that standard frame; build_model, analyze and the
+# result helpers below also accept any other compiled topology.
+STANDARD = load_topology(DEFAULT_TOPOLOGY)
+
+NODE_NAMES = STANDARD.node_names
+NODE_INDEX = STANDARD.node_index
+N_NODES = STANDARD.n_nodes
+N_DOF = STANDARD.n_dof
+
+# Physical members (name, i-node, j-node), in result order
+MEMBERS = [(m, i, j) for m, (i, j) in zip(STANDARD.member_names, STANDARD.member_node_names)]
+MEMBER_NAMES = STANDARD.member_names
+MEMBER_NODES = STANDARD.member_nodes
+N_MEMBERS = STANDARD.n_members
+
+# Pinned supports: translations fixed, rotations free
+SUPPORT_NODES = STANDARD.support_nodes
+SUPPORT_INDEX = STANDARD.support_index
+FIXED_DOFS = STANDARD.fixed_dofs
+FREE_DOFS = STANDARD.free_dofs
+
+TIP_NODE = STANDARD.load_index
+
+# ----------------------------
+# Material & defaults
+# ----------------------------
+
+E_MODULUS = 2.05e5
+POISSON = 0.3
+G_MODULUS = E_MODULUS / (2.0 * (1.0 + POISSON))
+DENSITY = 7.85e-6
+GRAVITY = 9.81
+
+DEFAULT_PARAMS = dict(STANDARD.params)
+
+
+def with_defaults(params):
+    # Same fallback semantics as crane_calc: missing keys take the default
+    return STANDARD.with_defaults(params)
+
+
+def section_properties(pipe_od, t_wall):
+    # Circular hollow section -> (R, A, I, J), with Iy = Iz = I
+    R = np.asarray(pipe_od, dtype=float) / 2.0
+    r = R - t_wall
+    A = math.pi * (R**2 - r**2)
+    I = (math.pi / 4.0) * (R**4 - r**4)
+    return R, A, I, 2.0 * I
+
+
+def node_coordinates(p, topo=STANDARD):
+    # (..., n_nodes, 3) nodal coordinates; parameter values may be arrays
+    return topo.coordinates(p)
+
+
+# ----------------------------
+# Member subdivision
+# ----------------------------
+
+def member_lengths(xyz, topo=STANDARD):
+    # (..., n_members) lengths of the physical members
+    ends = topo.member_nodes
+    return np.linalg.norm(xyz[..., ends[:, 1], :] - xyz[..., ends[:, 0], :], axis=-1)
+
+
+def intermediate_nodes(xyz, topo=STANDARD):
+    # Nodes lying strictly inside each physical member, using the same colinearity
+    # tolerance as PyNite's PhysMember.descritize. Returns (mask, t), both
+    # (..., n_members, n_nodes); t is the distance from the i-node.
+    ends = topo.member_nodes
+    xi = xyz[..., ends[:, 0], :]
+    v = xyz[..., ends[:, 1], :] - xi
+    L = np.linalg.norm(v, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u = v / L[..., None]
+
+    d = xyz[..., None, :, :] - xi[..., :, None, :]
+    t = np.einsum('...mnk,...mk->...mn', d, u)
+    perp = d - t[..., None] * u[..., :, None, :]
+    d_perp = np.linalg.norm(perp, axis=-1)
+    tol = 1e-12 * (1.0 + L)
+
+    mask = (t > 0.0) & (t < L[..., None]) & (d_perp <= tol[..., None])
+    is_end = np.zeros((topo.n_members, topo.n_nodes), dtype=bool)
+    is_end[np.arange(topo.n_members), ends[:, 0]] = True
+    is_end[np.arange(topo.n_members), ends[:, 1]] = True
+    return mask & ~is_end, t
+
+
+def subdivision_keys(mask, t):
+    # (..., 2 * n_members * n_nodes) integer key identifying a member subdivision:
+    # which nodes lie on each member and in what order
+    order = np.argsort(np.where(mask, t, np.inf), axis=-1, kind='stable')
+    ranked = np.where(np.take_along_axis(mask, order, -1), order, -1)
+    key = np.concatenate([mask.astype(np.int8), ranked.astype(np.int8)], axis=-1)
+    return key.reshape(mask.shape[:-2] + (-1,))
+
+
+def check_lengths(xyz, topo=STANDARD):
+    L = member_lengths(xyz, topo)
+    if np.any(L == 0.0):
+        bad = np.unique(np.nonzero(L == 0.0)[-1])
+        raise ValueError(f"Zero-length member: {', '.join(topo.member_names[i] for i in bad)}")
+
+
+_split_cache = {}
+
+
+def split_members(xyz, topo=STANDARD):
+    # Sub-element connectivity for one geometry: (elem_nodes (n_e, 2), elem_member (n_e,)).
+    # Only a handful of distinct subdivisions exist, so they are memoized on the
+    # pattern of intermediate nodes and their order along each member.
+    check_lengths(xyz, topo)
+    mask, t = intermediate_nodes(xyz, topo)
+    key = (topo.key, subdivision_keys(mask, t).tobytes())
+    cached = _split_cache.get(key)
+    if cached is not None:
+        return cached
+
+    elem_nodes = []
+    elem_member = []
+    for m, (ni, nj) in enumerate(topo.member_nodes):
+        inner = np.nonzero(mask[m])[0]
+        chain = [ni] + list(inner[np.argsort(t[m, inner], kind='stable')]) + [nj]
+        for a, b in zip(chain[:-1], chain[1:]):
+            elem_nodes.append((a, b))
+            elem_member.append(m)
+    result = (np.array(elem_nodes), np.array(elem_member))
+    _split_cache[key] = result
+    return result
+
+
+def refine(model, n_div):
+    # Split every sub-element of a single-configuration model into n_div equal
+    # elements -> (xyz, elem_nodes, parent element). New nodes follow the
+    # topology's nodes: element e gets nodes n_nodes + e * (n_div - 1) + k
+    xyz, elem_nodes = model['xyz'], model['elem_nodes']
+    n_nodes, n_e = len(xyz), len(elem_nodes)
+    t = np.arange(1, n_div) / n_div
+    xi, xj = xyz[elem_nodes[:, 0]], xyz[elem_nodes[:, 1]]
+    inner = (xi[:, None, :] + t[None, :, None] * (xj - xi)[:, None, :]).reshape(-1, 3)
+    ids = n_nodes + np.arange(n_e * (n_div - 1)).reshape(n_e, n_div - 1)
+    chain = np.concatenate([elem_nodes[:, :1], ids, elem_nodes[:, 1:]], axis=1)
+    nodes = np.stack([chain[:, :-1], chain[:, 1:]], axis=-1).reshape(-1, 2)
+    parent = np.repeat(np.arange(n_e), n_div)
+    return np.concatenate([xyz, inner]), nodes, parent
+
+
+def element_dofs(elem_nodes):
+    return np.concatenate([6 * elem_nodes[:, :1] + np.arange(6),
+                           6 * elem_nodes[:, 1:] + np.arange(6)], axis=1)
+
+
+# ----------------------------
+# Element kernels
+# ----------------------------
+
+def _cross(a, b):
+    # np.cross without its axis bookkeeping (dominant cost for small inputs)
+    return np.stack([a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1],
+                     a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2],
+                     a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]], axis=-1)
+
+
+def _isclose(a, b):
+    # math.isclose with its default rel_tol (as used by PyNite's Member3D.T)
+    return np.abs(a - b) <= 1e-9 * np.maximum(np.abs(a), np.abs(b))
+
+
+def local_axes(xi, xj):
+    # Member length (...,) and direction-cosine matrix (..., 3, 3) with rows x, y, z.
+    # Follows PyNite's Member3D.T conventions so local My/Mz match member for member.
+    v = xj - xi
+    L = np.linalg.norm(v, axis=-1)
+    x = v / L[..., None]
+    Xi, Yi, Zi = xi[..., 0], xi[..., 1], xi[..., 2]
+    Xj, Yj, Zj = xj[..., 0], xj[..., 1], xj[..., 2]
+
+    vertical = _isclose(Xi, Xj) & _isclose(Zi, Zj)
+    horizontal = ~vertical & _isclose(Yi, Yj)
+    y_up = (Yj > Yi)[..., None]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Horizontal members: y = global Y, z = x cross y
+        y_h = np.broadcast_to(np.array([0.0, 1.0, 0.0]), x.shape)
+        z_h = _cross(x, y_h)
+        z_h /= np.linalg.norm(z_h, axis=-1, keepdims=True)
+
+        # General members: z is horizontal, y has an upward component
+        proj = np.stack([Xj - Xi, np.zeros_like(Xi), Zj - Zi], axis=-1)
+        z_g = np.where(y_up, _cross(proj, x), _cross(x, proj))
+        z_g /= np.linalg.norm(z_g, axis=-1, keepdims=True)
+        y_g = _cross(z_g, x)
+        y_g /= np.linalg.norm(y_g, axis=-1, keepdims=True)
+
+    # Vertical members (parallel to global Y)
+    y_v = np.where(y_up, np.array([-1.0, 0.0, 0.0]), np.array([1.0, 0.0, 0.0]))
+    z_v = np.broadcast_to(np.array([0.0, 0.0, 1.0]), x.shape)
+
+    y = np.where(vertical[..., None], y_v, np.where(horizontal[..., None], y_h, y_g))
+    z = np.where(vertical[..., None], z_v, np.where(horizontal[..., None], z_h, z_g))
+    return L, np.stack([x, y, z], axis=-2)
+
+
+def local_stiffness(L, A, Iy, Iz, J, E=E_MODULUS, G=G_MODULUS):
+    # (..., 12, 12) local elastic stiffness of a 3D Euler-Bernoulli beam
+    L, A, Iy, Iz, J, E, G = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (L, A, Iy, Iz, J, E, G)))
+    k = np.zeros(L.shape + (12, 12))
+
+    def put(i, j, val):
+        k[..., i, j] = val
+        k[..., j, i] = val
+
+    ax = E * A / L
+    tor = G * J / L
+    put(0, 0, ax); put(6, 6, ax); put(0, 6, -ax)
+    put(3, 3, tor); put(9, 9, tor); put(3, 9, -tor)
+
+    # Bending about local z (v, theta_z): dofs 1, 5, 7, 11
+    a, b, c, d = 12 * E * Iz / L**3, 6 * E * Iz / L**2, 4 * E * Iz / L, 2 * E * Iz / L
+    put(1, 1, a); put(7, 7, a); put(1, 7, -a)
+    put(1, 5, b); put(1, 11, b); put(5, 7, -b); put(7, 11, -b)
+    put(5, 5, c); put(11, 11, c); put(5, 11, d)
+
+    # Bending about local y (w, theta_y): dofs 2, 4, 8, 10
+    a, b, c, d = 12 * E * Iy / L**3, 6 * E * Iy / L**2, 4 * E * Iy / L, 2 * E * Iy / L
+    put(2, 2, a); put(8, 8, a); put(2, 8, -a)
+    put(2, 4, -b); put(2, 10, -b); put(4, 8, b); put(8, 10, b)
+    put(4, 4, c); put(10, 10, c); put(4, 10, d)
+    return k
+
+
+def transformation(R):
+    # (..., 12, 12) block-diagonal transformation from (..., 3, 3) direction cosines
+    T = np.zeros(R.shape[:-2] + (12, 12))
+    for b in range(4):
+        T[..., 3 * b:3 * b + 3, 3 * b:3 * b + 3] = R
+    return T
+
+
+def assemble(Ke, dofs, n_dof=N_DOF):
+    # Scatter (..., n_e, 12, 12) global element matrices into (..., n_dof, n_dof)
+    # with a single bincount over flat indices (batch entries offset by n_dof**2)
+    batch = Ke.shape[:-3]
+    n = int(np.prod(batch, dtype=int))
+    flat = (dofs[:, :, None] * n_dof + dofs[:, None, :]).ravel()
+    idx = (np.arange(n)[:, None] * n_dof**2 + flat).ravel()
+    K = np.bincount(idx, weights=Ke.ravel(), minlength=n * n_dof**2)
+    return K.reshape(batch + (n_dof, n_dof))
+
+
+def assemble_sparse(Ke, dofs, n_dof):
+    # assemble() as a scipy.sparse CSC matrix, for refined models
+    from scipy.sparse import coo_matrix
+    rows = np.broadcast_to(dofs[:, :, None], Ke.shape).ravel()
+    cols = np.broadcast_to(dofs[:, None, :], Ke.shape).ravel()
+    return coo_matrix((Ke.ravel(), (rows, cols)), shape=(n_dof, n_dof)).tocsc()
+
+
+# ----------------------------
+# Analysis
+# ----------------------------
+
+def build_model(params, elements=None, topology=None):
+    # Geometry, element matrices and global stiffness for one configuration,
+    # or a stack of configurations sharing the same member subdivision.
+    # topology defaults to the one params selects (standard)
+    topo = topology or topology_for(params)
+    p = topo.with_defaults(params)
+    xyz = topo.coordinates(p)
+    if elements is None:
+        elements = split_members(xyz.reshape(-1, topo.n_nodes, 3)[0], topo)
+    elem_nodes, elem_member = elements
+    dofs = element_dofs(elem_nodes)
+
+    R_out, A, I, J = section_properties(p['pipe_od'], p['t_wall'])
+    batch = xyz.shape[:-2]
+    A, I, J = (np.broadcast_to(v, batch)[..., None] for v in (A, I, J))
+
+    L, R = local_axes(xyz[..., elem_nodes[:, 0], :], xyz[..., elem_nodes[:, 1], :])
+    k = local_stiffness(L, A, I, I, J)
+    T = transformation(R)
+    K = assemble(np.swapaxes(T, -1, -2) @ k @ T, dofs, topo.n_dof)
+    return {
+        'topology': topo, 'params': p, 'batch': batch, 'xyz': xyz,
+        'elem_nodes': elem_nodes, 'elem_member': elem_member, 'dofs': dofs,
+        'R_out': np.asarray(R_out), 'A': A, 'I': I, 'J': J,
+        'L': L, 'R': R, 'k': k, 'T': T, 'K': K,
+    }
+
+
+def tip_load(model, factor=1.0):
+    # Nodal load vector for the hoisted mass at the arm tip, acting in -Z
+    topo = model['topology']
+    F = np.zeros(model['batch'] + (topo.n_dof,))
+    F[..., 6 * topo.load_index + 2] = -np.asarray(model['params']['mass_tip'], dtype=float) * GRAVITY * factor
+    return F
+
+
+def solve_static(model, F):
+    # Displacements (..., N_DOF) for load vectors F (..., N_DOF)
+    topo = model['topology']
+    free = topo.free_dofs
+    Kff = model['K'][..., free[:, None], free]
+    try:
+        D_free = np.linalg.solve(Kff, F[..., free, None])[..., 0]
+    except np.linalg.LinAlgError:
+        raise ValueError("Stiffness matrix is singular: the structure is unstable")
+    D = np.zeros(D_free.shape[:-1] + (topo.n_dof,))
+    D[..., free] = D_free
+    return D
+
+
+def support_reactions(model, D, F):
+    # (..., n_supports, 3) translational reactions = K D - F at the fixed dofs
+    topo = model['topology']
+    fixed = topo.fixed_dofs
+    Rxn = (model['K'][..., fixed, :] @ D[..., :, None])[..., 0] - F[..., fixed]
+    return Rxn.reshape(Rxn.shape[:-1] + (len(topo.support_nodes), 3))
+
+
+def end_forces(model, D, fer=None):
+    # (..., n_e, 12) local element end forces f = k T d (+ fixed-end reactions)
+    f = (model['k'] @ (model['T'] @ D[..., model['dofs'], None]))[..., 0]
+    if fer is not None:
+        f = f + fer
+    return f
+
+
+def element_max_moments(f, L, w=None):
+    # Largest |My| / |Mz| along each sub-element. Without member loads the
+    # moment is linear, so the extremes are the end values; a uniform local
+    # load w (..., n_e, 3) makes it quadratic with a possible interior peak.
+    m = np.abs(f[..., [4, 5, 10, 11]]).max(axis=-1)
+    if w is None:
+        return m
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # M_z(x) = f5 - f1 x - wy x^2/2 ; M_y(x) = -f4 - f2 x - wz x^2/2 (PyNite signs)
+        xz = -f[..., 1] / w[..., 1]
+        xy = -f[..., 2] / w[..., 2]
+        mz = f[..., 5] - f[..., 1] * xz - w[..., 1] * xz**2 / 2.0
+        my = -f[..., 4] - f[..., 2] * xy - w[..., 2] * xy**2 / 2.0
+    mz = np.where((xz > 0.0) & (xz < L), np.abs(mz), 0.0)
+    my = np.where((xy > 0.0) & (xy < L), np.abs(my), 0.0)
+    return np.maximum(m, np.maximum(mz, my))
+
+
+def element_station_moments(f, L, w=None, n_stations=11):
+    # (..., n_e, n_stations, 2) bending moments [My, Mz] at evenly spaced
+    # stations along each sub-element, from end forces and uniform local loads
+    # (same sign convention as PyNite's Member3D.moment)
+    x = L[..., None] * np.linspace(0.0, 1.0, n_stations)
+    wy = 0.0 if w is None else w[..., 1, None]
+    wz = 0.0 if w is None else w[..., 2, None]
+    my = -f[..., 4, None] - f[..., 2, None] * x - wz * x**2 / 2.0
+    mz = f[..., 5, None] - f[..., 1, None] * x - wy * x**2 / 2.0
+    return np.stack([my, mz], axis=-1)
+
+
+def element_station_stresses(f, L, section, yield_stress, w=None, n_stations=11):
+    # Stress resultants and stresses at evenly spaced stations along each
+    # sub-element, all (..., n_e, n_stations). section = (R_out, A, I, J)
+    # broadcastable against (..., n_e). At the outer fibre the worst normal
+    # stress is |N|/A + |M| R/I with |M| the resultant of My and Mz, the
+    # torsional shear is |T| R/J (transverse shear vanishes there), and the
+    # von Mises value combines the two.
+    R_out, A, I, J = (np.asarray(v, dtype=float)[..., None] for v in section)
+    x = L[..., None] * np.linspace(0.0, 1.0, n_stations)
+    wx = 0.0 if w is None else w[..., 0, None]
+    axial = -f[..., 0, None] - wx * x  # tension positive
+    torque = np.broadcast_to(-f[..., 3, None], x.shape)
+    M = element_station_moments(f, L, w, n_stations)
+    bending = np.hypot(M[..., 0], M[..., 1]) * R_out / I
+    normal = np.abs(axial) / A + bending
+    shear = np.abs(torque) * R_out / J
+    von_mises = np.sqrt(normal**2 + 3.0 * shear**2)
+    return {
+        'x': x, 'axial': axial, 'torque': torque, 'moment_y': M[..., 0], 'moment_z': M[..., 1],
+        'normal': normal, 'shear': shear, 'von_mises': von_mises,
+        'utilization': von_mises / np.asarray(yield_stress, dtype=float)[..., None, None],
+    }
+
+
+def member_stress_summary(model, stations):
+    # Physical-member maxima (..., n_members) of the station stresses
+    peak = lambda v: member_max(model, np.abs(v).max(axis=-1))
+    return {
+        'axial': peak(stations['axial']),
+        'torque': peak(stations['torque']),
+        'normal': peak(stations['normal']),
+        'shear': peak(stations['shear']),
+        'von_mises': peak(stations['von_mises']),
+        'utilization': peak(stations['utilization']),
+    }
+
+
+@functools.lru_cache(maxsize=64)
+def _member_starts(elem_member_bytes, n_members):
+    # First sub-element of each member when sub-elements are grouped by member
+    # in member order (as split_members builds them), else None
+    elem_member = np.frombuffer(elem_member_bytes, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(elem_member, prepend=-1))
+    return starts if np.array_equal(elem_member[starts], np.arange(n_members)) else None
+
+
+def member_max(model, elem_values):
+    # Reduce (..., n_e) sub-element values to (..., n_members) physical-member
+    # maxima; model needs 'elem_member' (and 'topology' unless standard)
+    n_members = model.get('topology', STANDARD).n_members
+    elem_member = np.asarray(model['elem_member'])
+    starts = _member_starts(elem_member.astype(np.int64).tobytes(), n_members)
+    if starts is not None:
+        return np.maximum(np.maximum.reduceat(elem_values, starts, axis=-1), 0.0)
+    out = np.zeros(elem_values.shape[:-1] + (n_members,))
+    for e, m in enumerate(elem_member):
+        out[..., m] = np.maximum(out[..., m], elem_values[..., e])
+    return out
+
+
+ANALYSIS_OUTPUTS = ('displacements', 'members', 'reactions')
+
+STATIONS_PER_ELEMENT = 11
+
+
+def analyze(params, elements=None, outputs=ANALYSIS_OUTPUTS, topology=None):
+    # Linear static analysis under the tip load. Returns arrays; member forces
+    # and reactions are only recovered when listed in `outputs` ('stresses'
+    # adds the combined station stresses on top of 'members').
+    model = build_model(params, elements, topology)
+    F = tip_load(model)
+    D = solve_static(model, F)
+    res = {
+        'xyz': model['xyz'],
+        'displacements': D.reshape(model['batch'] + (model['topology'].n_nodes, 6)),
+    }
+    if 'reactions' in outputs:
+        res['reactions'] = support_reactions(model, D, F)
+    if 'members' in outputs or 'stresses' in outputs:
+        f = end_forces(model, D)
+        member_moment = member_max(model, element_max_moments(f, model['L']))
+        res['member_moment'] = member_moment
+        res['member_stress'] = member_moment * model['R_out'][..., None] / model['I']
+    if 'stresses' in outputs:
+        section = (model['R_out'][..., None], model['A'], model['I'], model['J'])
+        stations = element_station_stresses(f, model['L'], section, model['params']['yield_stress'],
+                                            n_stations=STATIONS_PER_ELEMENT)
+        res['stations'] = stations
+        res['member_summary'] = member_stress_summary(model, stations)
+    return res
+
+
+def member_results(member_moment, member_stress, summary, names=MEMBER_NAMES):
+    # Per-member result dict shared by both engines: bending-only max_stress
+    # (as before) plus the combined station checks
+    return {
+        name: {
+            'max_moment': float(member_moment[m]),
+            'max_stress': float(member_stress[m]),
+            'max_axial': float(summary['axial'][m]),
+            'max_torque': float(summary['torque'][m]),
+            'max_normal_stress': float(summary['normal'][m]),
+            'max_shear_stress': float(summary['shear'][m]),
+            'max_von_mises': float(summary['von_mises'][m]),
+            'utilization': float(summary['utilization'][m]),
+        }
+        for m, name in enumerate(names)
+    }
+
+
+def stress_checks(member_stress, summary, yield_stress, names=MEMBER_NAMES):
+    # Top-level pass/fail entries shared by both engines
+    return {
+        'max_stress': float(max(member_stress.max(), 0.0)),
+        'max_von_mises': float(summary['von_mises'].max()),
+        'max_utilization': float(summary['utilization'].max()),
+        'failures': [name for m, name in enumerate(names) if member_stress[m] > yield_stress],
+        'utilization_failures': [name for m, name in enumerate(names) if summary['utilization'][m] > 1.0],
+    }
+
+
+def calculate_crane_numpy(params, outputs=ANALYSIS_OUTPUTS):
+    # Drop-in replacement for the PyNite path of calculate_crane: same result
+    # dict, restricted to the keys that belong to the requested outputs
+    topo = topology_for(params)
+    p = topo.with_defaults(params)
+    if 'members' in outputs:
+        outputs = tuple(outputs) + ('stresses',)
+    res = analyze(p, outputs=outputs, topology=topo)
+    D = res['displacements']
+
+    out = {'tip_displacement': {'dz': float(D[topo.load_index, 2])}}
+    out['node_displacements'] = {
+        name: {'dx': float(D[i, 0]), 'dy': float(D[i, 1]), 'dz': float(D[i, 2])}
+        for i, name in enumerate(topo.node_names)
+    }
+    if 'members' in outputs:
+        out['member_results'] = member_results(res['member_moment'], res['member_stress'], res['member_summary'],
+                                               topo.member_names)
+        checks = stress_checks(res['member_stress'], res['member_summary'], p['yield_stress'], topo.member_names)
+        out['max_stress'] = checks.pop('max_stress')
+        out['yield_stress'] = p['yield_stress']
+        out.update(checks)
+    else:
+        out['yield_stress'] = p['yield_stress']
+    if 'reactions' in outputs:
+        out['reactions'] = {n: float(res['reactions'][s, 2]) for s, n in enumerate(topo.support_nodes)}
+    return out
+
+
+def calculate_stations(params, n_stations=STATIONS_PER_ELEMENT):
+    # Station-by-station stresses along every physical member; x is measured
+    # from the member's first node (sub-elements are ordered along the member)
+    if n_stations < 2:
+        raise ValueError("n_stations must be at least 2")
+    topo = topology_for(params)
+    p = topo.with_defaults(params)
+    model = build_model(p, topology=topo)
+    D = solve_static(model, tip_load(model))
+    section = (model['R_out'][..., None], model['A'], model['I'], model['J'])
+    st = element_station_stresses(end_forces(model, D), model['L'], section, p['yield_stress'],
+                                  n_stations=n_stations)
+    start = model['xyz'][model['elem_nodes'][:, 0]]
+    member_start = model['xyz'][topo.member_nodes[model['elem_member'], 0]]
+    x = st['x'] + np.linalg.norm(start - member_start, axis=-1)[:, None]
+
+    keys = ('axial', 'torque', 'moment_y', 'moment_z', 'normal', 'shear', 'von_mises', 'utilization')
+    members = {}
+    for m, name in enumerate(topo.member_names):
+        e = np.nonzero(model['elem_member'] == m)[0]
+        members[name] = {'x': x[e].ravel().tolist()}
+        members[name].update({k: st[k][e].ravel().tolist() for k in keys})
+    utilization = st['utilization']
+    e, s = np.unravel_index(utilization.argmax(), utilization.shape)
+    return {
+        'n_stations': n_stations,
+        'yield_stress': p['yield_stress'],
+        'members': members,
+        'governing': {'member': topo.member_names[model['elem_member'][e]], 'x': float(x[e, s]),
+                      'utilization': float(utilization[e, s]),
+                      'von_mises': float(st['von_mises'][e, s])},
+    }
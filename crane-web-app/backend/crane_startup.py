@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# Cold-start support.
+#
+# warm_up runs once per solver worker from the app's lifespan hook: it
+# imports the deferred engines (scipy.linalg, and Pynite when it is warmed)
+# and solves the default crane with each engine, so the first real request
+# finds warm imports, allocator and caches. /ready reports 503 until every
+# worker has done so. The app warms only its default engine: a worker busy
+# importing Pynite (about 1.2 s) would hold up the first default answer.
+#
+# import_breakdown / measure_cold_start (and `python crane_startup.py`)
+# measure where start-up time goes:
+#   python crane_startup.py imports [--module main] [--top 15]
+#   python crane_startup.py cold-start
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def warm_up(engines=('pynite', 'numpy')):
+    # -> {'pid', 'import_ms', '<engine>_ms'}; runs inside a pool worker
+    from crane_calc import calculate_crane
+    out = {'pid': os.getpid()}
+    t0 = time.perf_counter()
+    if 'pynite' in engines:
+        import Pynite  # noqa: F401
+    import scipy.linalg  # noqa: F401
+    out['import_ms'] = (time.perf_counter() - t0) * 1e3
+    for engine in engines:
+        t0 = time.perf_counter()
+        calculate_crane({'engine': engine})
+        out[f'{engine}_ms'] = (time.perf_counter() - t0) * 1e3
+    return out
+
+
+def parse_importtime(text):
+    # `python -X importtime` stderr -> [{'module', 'self_ms', 'cumulative_ms', 'depth'}]
+    rows = []
+    for line in text.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append({'module': m.group(4), 'self_ms': int(m.group(1)) / 1e3,
+                         'cumulative_ms': int(m.group(2)) / 1e3, 'depth': len(m.group(3)) // 2})
+    return rows
+
+
+def import_breakdown(module='main', top=15):
+    # Imports `module` in a fresh interpreter; self time summed per top-level
+    # package, plus the slowest individual modules by cumulative time
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    rows = parse_importtime(proc.stderr)
+    packages = defaultdict(float)
+    for r in rows:
+        packages[r['module'].split('.')[0]] += r['self_ms']
+    total = next((r['cumulative_ms'] for r in rows if r['module'] == module and r['depth'] == 0), None)
+    return {
+        'module': module,
+        'total_ms': total,
+        'packages': dict(sorted(packages.items(), key=lambda kv: -kv[1])[:top]),
+        'modules': sorted(rows, key=lambda r: -r['cumulative_ms'])[:top],
+    }
+
+
+COLD_START_SCRIPT = '''
+import json, time
+from fastapi.testclient import TestClient
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    client.post("/calculate", json={})
+    t3 = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.01)
+    t4 = time.perf_counter()
+    client.post("/calculate", json={"engine": "numpy"})
+    t5 = time.perf_counter()
+    client.post("/calculate", json={"engine": "pynite"})
+    t6 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1e3, "startup_ms": (t2 - t0) * 1e3,
+                  "first_answer_ms": (t3 - t0) * 1e3, "ready_ms": (t4 - t0) * 1e3,
+                  "first_numpy_ms": (t5 - t0) * 1e3, "first_pynite_ms": (t6 - t0) * 1e3}))
+'''
+
+
+def measure_cold_start(env=None):
+    # Fresh interpreter: times from the start of `import main` to the app
+    # accepting requests, to the first answer from the default engine, to
+    # /ready and then to the first answer per engine
+    proc = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=BACKEND_DIR, capture_output=True,
+                          text=True, check=True, env=dict(os.environ, **(env or {})))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend start-up measurements")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imports = sub.add_parser('imports', help="import time per package / module")
+    imports.add_argument('--module', default='main')
+    imports.add_argument('--top', type=int, default=15)
+    sub.add_parser('cold-start', help="time to first answer in a fresh interpreter")
+    args = parser.parse_args(argv)
+
+    if args.command == 'imports':
+        b = import_breakdown(args.module, args.top)
+        print(f"import {b['module']}: {b['total_ms']:.1f} ms\n")
+        print(f"{'package':<32} {'self ms':>9}")
+        for name, ms in b['packages'].items():
+            print(f"{name:<32} {ms:9.1f}")
+        print(f"\n{'module':<48} {'self ms':>9} {'cumul. ms':>10}")
+        for r in b['modules']:
+            print(f"{r['module']:<48} {r['self_ms']:9.1f} {r['cumulative_ms']:10.1f}")
+    else:
+        for k, v in measure_cold_start().items():
+            print(f"{k:<16} {v:9.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
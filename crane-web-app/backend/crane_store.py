@@ -0,0 +1,555 @@
+import argparse
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import numpy as np
+from importlib import metadata
+
+from crane_cache import cache_key
+from crane_topology import topology_for
+
+# Persistent result store, shared by every worker process and kept across
+# restarts (the in-memory ResultCache is per process).
+#
+#   python crane_store.py STORE stats
+#   python crane_store.py STORE query "max_stress<235, arm_len>1200" [--order -max_utilization] [--limit 20]
+#   python crane_store.py STORE export results.jsonl
+#   python crane_store.py STORE import results.jsonl
+#   python crane_store.py STORE evict --max-mb 256
+#
+# Layout of the STORE directory:
+#   index.sqlite  one row per result (WAL mode: reads take no lock, so they
+#                 do not wait for writers; a hit writes its access time only
+#                 when the stored one is access_resolution seconds old):
+#                 key, engine, version, topology, analysis, params and the
+#                 rest of the result as JSON, plus one indexed REAL column
+#                 per scalar (topology parameters, max_stress,
+#                 max_utilization, tip_displacement_dz, p_delta_amplification,
+#                 ...) for range queries. Columns are added as new scalars
+#                 appear.
+#   arrays/       per topology layout, <layout>.nodes float64 (slot, n_nodes, 3)
+#                 node translations and <layout>.members float64
+#                 (slot, n_members, len(MEMBER_FIELDS)) member results, read
+#                 through read-only np.memmap views (no copy, no parse).
+#                 Slots of evicted or replaced rows are reused.
+#
+# The key is a SHA-256 of cache_key(params) (normalized, quantized
+# parameters) and the engine version: the engine package's version, a hash
+# of the solver modules' source (SOLVER_MODULES) and the topology's key (a
+# hash of its definition), so a changed solver or topology file never
+# serves old results. Entries are evicted least-recently-used once the total size
+# exceeds max_bytes. Writers serialize on SQLite's write lock
+# (BEGIN IMMEDIATE), which also guards slot allocation across processes.
+#
+# A reused slot is rewritten while other processes may still be reading it.
+# Every slot carries a generation, bumped and committed when the slot is
+# claimed, before its arrays are written; a row records the generation its
+# arrays were written under. A reader copies the arrays and then re-checks
+# the slot's generation: if it moved, a writer may have overwritten them
+# and the read is retried.
+
+STORE_VERSION = 1  # bump when the result layout changes
+SOLVER_MODULES = ('crane_solver', 'crane_calc', 'crane_pdelta', 'crane_topology')
+MEMBER_FIELDS = ('max_moment', 'max_stress', 'max_axial', 'max_torque', 'max_normal_stress', 'max_shear_stress',
+                 'max_von_mises', 'utilization')
+ENGINE_PACKAGES = {'pynite': 'PyNiteFEA', 'numpy': 'numpy'}
+ARRAY_RESULTS = ('node_displacements', 'member_results')
+TEXT_COLUMNS = ('engine', 'version', 'topology', 'analysis')
+MAX_QUERY_ROWS = 10000
+READ_RETRIES = 3
+ACCESS_RESOLUTION = 60.0  # seconds; LRU order is kept to this resolution
+
+_CONDITION = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(<=|>=|!=|<|>|=)\s*(\S+)\s*$')
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY, engine TEXT, version TEXT, topology TEXT, analysis TEXT,
+    layout TEXT, slot INTEGER, generation INTEGER, params TEXT NOT NULL, summary TEXT NOT NULL,
+    bytes INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS layouts (
+    layout TEXT PRIMARY KEY, n_nodes INTEGER NOT NULL, n_members INTEGER NOT NULL, next_slot INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS free_slots (layout TEXT NOT NULL, slot INTEGER NOT NULL, PRIMARY KEY (layout, slot));
+CREATE TABLE IF NOT EXISTS slots (
+    layout TEXT NOT NULL, slot INTEGER NOT NULL, generation INTEGER NOT NULL, PRIMARY KEY (layout, slot)
+);
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash(modules=SOLVER_MODULES):
+    # Short SHA-256 over the source files of the backend modules
+    h = hashlib.sha256()
+    for module in modules:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{module}.py'), 'rb') as fh:
+            h.update(fh.read())
+    return h.hexdigest()[:12]
+
+
+def engine_version(engine, topo):
+    try:
+        package = metadata.version(ENGINE_PACKAGES.get(engine, engine))
+    except metadata.PackageNotFoundError:
+        package = 'unknown'
+    return f"{STORE_VERSION}/{engine}-{package}/{source_hash()}/{topo.key[:12]}"
+
+
+def store_key(params, version=None):
+    # -> (hex key, version) of a configuration
+    version = version or engine_version(params.get('engine', 'pynite'), topology_for(params))
+    canonical = json.dumps([list(cache_key(params)), version], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest(), version
+
+
+def scalars(params, result):
+    # Indexed columns: the topology's parameters and every numeric scalar of
+    # the result, one dict level deep ('tip_displacement' -> tip_displacement_dz)
+    topo = topology_for(params)
+    out = {k: float(v) for k, v in topo.with_defaults(params).items()}
+    for key, value in result.items():
+        if key in ARRAY_RESULTS or key == 'reactions':
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[key] = float(value)
+        elif isinstance(value, dict):
+            for sub, v in value.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    out[f'{key}_{sub}'] = float(v)
+    return {k: v for k, v in out.items() if _IDENTIFIER.match(k) and k not in TEXT_COLUMNS}
+
+
+def parse_where(where):
+    # "max_stress<235, arm_len>1200" (',' or 'and' between conditions)
+    # -> [(column, operator, value)]
+    if not where or not where.strip():
+        return []
+    conditions = []
+    for part in re.split(r',|\band\b', where):
+        if not part.strip():
+            continue
+        m = _CONDITION.match(part)
+        if not m:
+            raise ValueError(f"Invalid condition: {part.strip()!r} (expected e.g. max_stress<235)")
+        column, op, value = m.groups()
+        if column not in TEXT_COLUMNS:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Condition {part.strip()!r} needs a number")
+        elif op not in ('=', '!='):
+            raise ValueError(f"{column} can only be compared with = or !=")
+        conditions.append((column, op, value))
+    return conditions
+
+
+def _quoted(columns):
+    return ', '.join(f'"{c}"' for c in columns)
+
+
+class ResultStore:
+    def __init__(self, path, max_bytes=1 << 30, access_resolution=ACCESS_RESOLUTION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.access_resolution = access_resolution
+        os.makedirs(os.path.join(path, 'arrays'), exist_ok=True)
+        self._local = threading.local()
+        self._maps = {}  # (layout, kind) -> read-only memmap over the whole file
+        self._lock = threading.Lock()
+        self._pending_hits = {}  # key -> hits not yet written to the row
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        with self._db() as db:
+            db.executescript(SCHEMA)
+        if 'generation' not in self.columns():  # store written before slot generations
+            try:
+                self._db().execute('ALTER TABLE results ADD COLUMN generation INTEGER')
+            except sqlite3.OperationalError as e:
+                if 'duplicate column' not in str(e):
+                    raise
+
+    def _db(self):
+        # One connection per thread (API calls run in asyncio.to_thread)
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(os.path.join(self.path, 'index.sqlite'), timeout=30.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def columns(self):
+        return [row[1] for row in self._db().execute('PRAGMA table_info(results)')]
+
+    def _scalar_columns(self):
+        fixed = {'key', 'layout', 'slot', 'generation', 'params', 'summary', 'bytes', 'created', 'accessed', 'hits'}
+        return [c for c in self.columns() if c not in fixed]
+
+    def _array_path(self, layout, kind):
+        return os.path.join(self.path, 'arrays', f'{layout}.{kind}')
+
+    def _row_shape(self, topo, kind):
+        return (topo.n_nodes, 3) if kind == 'nodes' else (topo.n_members, len(MEMBER_FIELDS))
+
+    def _view(self, layout, kind, slot, shape):
+        # Read-only view of one slot; the file is remapped when it has grown
+        key = (layout, kind)
+        with self._lock:
+            mm = self._maps.get(key)
+            if mm is None or slot >= len(mm):
+                path = self._array_path(layout, kind)
+                rows = os.path.getsize(path) // (8 * math.prod(shape))
+                mm = np.memmap(path, dtype=np.float64, mode='r', shape=(rows,) + shape)
+                self._maps[key] = mm
+        return mm[slot]
+
+    def _write_slot(self, layout, kind, slot, array):
+        path = self._array_path(layout, kind)
+        row = array.nbytes
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as fh:
+            fh.seek(0, os.SEEK_END)
+            if fh.tell() < (slot + 1) * row:
+                fh.truncate((slot + 1) * row)
+        mm = np.memmap(path, dtype=np.float64, mode='r+', offset=slot * row, shape=array.shape)
+        mm[:] = array
+        mm.flush()
+        del mm
+
+    def _arrays_of(self, result, topo):
+        # (nodes, members) float64 arrays, or None when the result does not
+        # have the standard shape (it is then kept in the JSON summary)
+        nodes = result.get('node_displacements')
+        members = result.get('member_results')
+        if (nodes is None or members is None or list(nodes) != topo.node_names
+                or list(members) != topo.member_names
+                or any(tuple(m) != MEMBER_FIELDS for m in members.values())):
+            return None
+        return (np.array([[d['dx'], d['dy'], d['dz']] for d in nodes.values()], dtype=np.float64),
+                np.array([[m[f] for f in MEMBER_FIELDS] for m in members.values()], dtype=np.float64))
+
+    def get(self, params, version=None):
+        key, _ = store_key(params, version)
+        return self.get_key(key)
+
+    def get_key(self, key):
+        db = self._db()
+        for _ in range(READ_RETRIES):
+            row = db.execute('SELECT topology, layout, slot, generation, summary, accessed FROM results WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None:
+                break
+            topology, layout, slot, generation, summary, accessed = row
+            result = json.loads(summary)
+            if layout is None:
+                break
+            arrays = self._read_arrays(topology, layout, slot)
+            nodes, members = (np.asarray(a).tolist() for a in (arrays['nodes'], arrays['members']))
+            if self._generation(db, layout, slot) != generation:
+                continue  # the slot was claimed again while we copied it
+            topo = arrays['topology']
+            result['node_displacements'] = {n: dict(zip(('dx', 'dy', 'dz'), d)) for n, d in zip(topo.node_names, nodes)}
+            result['member_results'] = {m: dict(zip(MEMBER_FIELDS, r)) for m, r in zip(topo.member_names, members)}
+            break
+        else:
+            row = None  # kept changing under us: solved again by the caller
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        now = time.time()
+        with self._lock:
+            pending = self._pending_hits.pop(key, 0) + 1
+            if now - accessed < self.access_resolution:
+                self._pending_hits[key] = pending
+                pending = 0
+        if pending:
+            db.execute('UPDATE results SET accessed = ?, hits = hits + ? WHERE key = ?', (now, pending, key))
+        order = result.pop('_order')
+        return {k: result[k] for k in order}
+
+    def _generation(self, db, layout, slot):
+        row = db.execute('SELECT generation FROM slots WHERE layout = ? AND slot = ?', (layout, slot)).fetchone()
+        return None if row is None else row[0]
+
+    def _read_arrays(self, topology, layout, slot):
+        topo = topology_for({'topology': topology})
+        return {
+            'topology': topo,
+            'nodes': self._view(layout, 'nodes', slot, self._row_shape(topo, 'nodes')),
+            'members': self._view(layout, 'members', slot, self._row_shape(topo, 'members')),
+        }
+
+    def arrays(self, params, version=None):
+        # Zero-copy read-only views {node_displacements (n_nodes, 3),
+        # member_results (n_members, len(MEMBER_FIELDS))} with their names,
+        # or None when the configuration is not stored. The views follow the
+        # slot: once the row is replaced or evicted they may show another
+        # result (get() copies and checks the slot's generation)
+        key, _ = store_key(params, version)
+        row = self._db().execute('SELECT topology, layout, slot FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] is None:
+            return None
+        a = self._read_arrays(*row)
+        return {'node_names': a['topology'].node_names, 'member_names': a['topology'].member_names,
+                'member_fields': MEMBER_FIELDS, 'node_displacements': a['nodes'], 'member_results': a['members']}
+
+    def put(self, params, result, version=None):
+        key, version = store_key(params, version)
+        topo = topology_for(params)
+        arrays = self._arrays_of(result, topo)
+        summary = {k: v for k, v in result.items() if arrays is None or k not in ARRAY_RESULTS}
+        # Key order of the full result, restored on read
+        summary['_order'] = list(result)
+        summary_json = json.dumps(summary, separators=(',', ':'))
+        params_json = json.dumps(params, separators=(',', ':'), sort_keys=True)
+        values = scalars(params, result)
+        size = len(summary_json) + len(params_json) + (0 if arrays is None else sum(a.nbytes for a in arrays))
+        layout = None if arrays is None else topo.key[:16]
+        now = time.time()
+
+        db = self._db()
+        self._add_columns(values)
+        slot = generation = None
+        if layout is not None:
+            # Claimed (and its generation bumped) in a committed transaction of
+            # its own, so readers of the slot's previous row see the change
+            # before the arrays are overwritten
+            slot, generation = self._claim(db, layout, topo)
+            try:
+                self._write_slot(layout, 'nodes', slot, arrays[0])
+                self._write_slot(layout, 'members', slot, arrays[1])
+            except BaseException:
+                self._release(db, layout, slot)
+                raise
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            old = db.execute('SELECT layout, slot FROM results WHERE key = ?', (key,)).fetchone()
+            if old is not None and old[0] is not None:
+                db.execute('INSERT OR IGNORE INTO free_slots VALUES (?, ?)', old)
+            columns = ['key', 'engine', 'version', 'topology', 'analysis', 'layout', 'slot', 'generation', 'params',
+                       'summary', 'bytes', 'created', 'accessed'] + list(values)
+            row = [key, params.get('engine', 'pynite'), version, topo.name, params.get('analysis', 'linear'),
+                   layout, slot, generation, params_json, summary_json, size, now, now] + list(values.values())
+            db.execute(f"INSERT OR REPLACE INTO results ({_quoted(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                       row)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            if layout is not None:
+                self._release(db, layout, slot)
+            raise
+        self.writes += 1
+        if self.max_bytes and self.total_bytes() > self.max_bytes:
+            self.evict()
+        return key
+
+    def _claim(self, db, layout, topo):
+        # A free slot (or a new one) with its next generation -> (slot, generation)
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            free = db.execute('SELECT slot FROM free_slots WHERE layout = ? ORDER BY slot LIMIT 1',
+                              (layout,)).fetchone()
+            if free is not None:
+                slot = free[0]
+                db.execute('DELETE FROM free_slots WHERE layout = ? AND slot = ?', (layout, slot))
+            else:
+                db.execute('INSERT OR IGNORE INTO layouts VALUES (?, ?, ?, 0)', (layout, topo.n_nodes, topo.n_members))
+                slot = db.execute('SELECT next_slot FROM layouts WHERE layout = ?', (layout,)).fetchone()[0]
+                db.execute('UPDATE layouts SET next_slot = ? WHERE layout = ?', (slot + 1, layout))
+            db.execute('INSERT OR IGNORE INTO slots VALUES (?, ?, 0)', (layout, slot))
+            db.execute('UPDATE slots SET generation = generation + 1 WHERE layout = ? AND slot = ?', (layout, slot))
+            generation = self._generation(db, layout, slot)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return slot, generation
+
+    def _release(self, db, layout, slot):
+        # A claimed slot whose row was never written goes back to the free list
+        db.execute('INSERT OR IGNORE INTO free_slots VALUES (?, ?)', (layout, slot))
+
+    def _add_columns(self, values):
+        missing = [c for c in values if c not in set(self.columns())]
+        for c in missing:
+            try:
+                self._db().execute(f'ALTER TABLE results ADD COLUMN "{c}" REAL')
+                self._db().execute(f'CREATE INDEX IF NOT EXISTS "results_{c}" ON results ("{c}")')
+            except sqlite3.OperationalError as e:
+                # Another worker added it first
+                if 'duplicate column' not in str(e):
+                    raise
+
+    def total_bytes(self):
+        return self._db().execute('SELECT COALESCE(SUM(bytes), 0) FROM results').fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        # Drop least-recently-used rows until the store fits max_bytes -> rows dropped
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            total = db.execute('SELECT COALESCE(SUM(bytes), 0) FROM results').fetchone()[0]
+            dropped = 0
+            for key, layout, slot, size in db.execute(
+                    'SELECT key, layout, slot, bytes FROM results ORDER BY accessed').fetchall():
+                if total <= limit:
+                    break
+                db.execute('DELETE FROM results WHERE key = ?', (key,))
+                if layout is not None:
+                    db.execute('INSERT OR IGNORE INTO free_slots VALUES (?, ?)', (layout, slot))
+                total -= size
+                dropped += 1
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self.evictions += dropped
+        return dropped
+
+    def query(self, where=None, order=None, limit=100):
+        # Rows matching every condition: {key, engine, topology, analysis,
+        # params, <scalar columns>}; order is a column, '-column' for descending
+        if not 1 <= limit <= MAX_QUERY_ROWS:
+            raise ValueError(f"limit must be between 1 and {MAX_QUERY_ROWS}")
+        known = set(self._scalar_columns())
+        sql, args = [], []
+        for column, op, value in parse_where(where) if isinstance(where, str) or where is None else where:
+            if column not in known:
+                raise ValueError(f"Unknown column: {column}")
+            sql.append(f'"{column}" {op} ?')
+            args.append(value)
+        columns = self._scalar_columns()
+        statement = f"SELECT key, params, {_quoted(columns)} FROM results"
+        if sql:
+            statement += ' WHERE ' + ' AND '.join(sql)
+        if order:
+            column = order.lstrip('-')
+            if column not in known:
+                raise ValueError(f"Unknown column: {column}")
+            statement += f' ORDER BY "{column}" {"DESC" if order.startswith("-") else "ASC"}'
+        statement += ' LIMIT ?'
+        rows = []
+        for key, params, *values in self._db().execute(statement, args + [limit]):
+            row = {'key': key, 'params': json.loads(params)}
+            row.update((c, v) for c, v in zip(columns, values) if v is not None)
+            rows.append(row)
+        return rows
+
+    def count(self):
+        return self._db().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def export_jsonl(self, fh):
+        # One {'params', 'version', 'result'} per line -> rows written
+        n = 0
+        for key, params, version in self._db().execute('SELECT key, params, version FROM results ORDER BY created'):
+            result = self.get_key(key)
+            if result is None:
+                continue
+            fh.write(json.dumps({'params': json.loads(params), 'version': version, 'result': result}) + '\n')
+            n += 1
+        return n
+
+    def import_jsonl(self, fh):
+        # Entries keep the version they were solved with -> rows imported
+        n = 0
+        for line in fh:
+            if line.strip():
+                entry = json.loads(line)
+                self.put(entry['params'], entry['result'], entry.get('version'))
+                n += 1
+        return n
+
+    def clear(self):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        db.execute('DELETE FROM results')
+        db.execute('DELETE FROM free_slots')
+        db.execute('UPDATE layouts SET next_slot = 0')
+        db.execute('COMMIT')
+
+    def stats(self):
+        db = self._db()
+        rows, size = db.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'rows': rows,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'columns': self._scalar_columns(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def flush_hits(self):
+        # Writes the hit counts kept back by get_key (access times stay as they are)
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if pending:
+            self._db().executemany('UPDATE results SET hits = hits + ? WHERE key = ?',
+                                   [(n, key) for key, n in pending.items()])
+
+    def close(self):
+        self.flush_hits()
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+        self._maps.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent crane result store")
+    parser.add_argument('store', help="store directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help="row count, size and indexed columns")
+    q = sub.add_parser('query', help="rows matching conditions on indexed columns")
+    q.add_argument('where', nargs='?', default='')
+    q.add_argument('--order')
+    q.add_argument('--limit', type=int, default=100)
+    exp = sub.add_parser('export', help="write every result as JSON Lines")
+    exp.add_argument('file')
+    imp = sub.add_parser('import', help="add the results of a JSON Lines export")
+    imp.add_argument('file')
+    ev = sub.add_parser('evict', help="drop least-recently-used rows down to a size")
+    ev.add_argument('--max-mb', type=float, required=True)
+    sub.add_parser('clear', help="drop every row")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.store, max_bytes=0)
+    if args.command == 'stats':
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == 'query':
+        for row in store.query(args.where, args.order, args.limit):
+            print(json.dumps(row))
+    elif args.command == 'export':
+        with open(args.file, 'w') as fh:
+            print(f"exported {store.export_jsonl(fh)} results to {args.file}", file=sys.stderr)
+    elif args.command == 'import':
+        with open(args.file) as fh:
+            print(f"imported {store.import_jsonl(fh)} results from {args.file}", file=sys.stderr)
+    elif args.command == 'evict':
+        print(f"evicted {store.evict(int(args.max_mb * 2**20))} results", file=sys.stderr)
+    else:
+        store.clear()
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
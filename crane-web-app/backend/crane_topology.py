@@ -0,0 +1,244 @@
+import ast
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import numpy as np
+
+try:
+    import yaml
+except ImportError:  # optional: only needed for .yaml / .yml topologies
+    yaml = None
+
+# Declarative crane topologies.
+#
+# A topology file (topologies/<name>.json, .yaml or .yml) describes one frame
+# layout:
+#   params     {name: default}; every parameter the geometry or the engines
+#              use (pipe_od, t_wall, mass_tip and yield_stress are required)
+#   vars       {name: expression}, evaluated in order; may use params and
+#              earlier vars
+#   nodes      {name: [x, y, z]}, each coordinate a number or an expression
+#   members    {name: [i-node, j-node]}, in result order
+#   supports   [node, ...], pinned: translations fixed, rotations free
+#   load_node  node carrying the hoisted mass (-Z)
+# Expressions are arithmetic (+ - * / ** %) over names, numbers, pi and the
+# functions in FUNCTIONS; they are applied elementwise, so parameters may be
+# arrays (batched geometry).
+#
+# compile_topology validates a spec once and turns it into a Topology:
+# integer connectivity / support / dof arrays plus one generated Python
+# function for all coordinates, so repeated builds do no per-name work.
+
+TOPOLOGY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topologies')
+DEFAULT_TOPOLOGY = 'standard'
+EXTENSIONS = ('.json', '.yaml', '.yml')
+
+REQUIRED_PARAMS = ('pipe_od', 't_wall', 'mass_tip', 'yield_stress')
+
+FUNCTIONS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'radians': np.radians, 'degrees': np.degrees,
+    'sqrt': np.sqrt, 'hypot': np.hypot, 'abs': np.abs, 'minimum': np.minimum, 'maximum': np.maximum,
+}
+CONSTANTS = {'pi': math.pi}
+
+_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_TOPOLOGY_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd)
+
+
+def _expression(text, known, where):
+    # Validated expression source; numbers pass through unchanged
+    if isinstance(text, bool) or not isinstance(text, (int, float, str)):
+        raise ValueError(f"{where}: expected a number or an expression, got {text!r}")
+    if not isinstance(text, str):
+        return repr(float(text))
+    try:
+        tree = ast.parse(text, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"{where}: invalid expression {text!r} ({e.msg})")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"{where}: only {', '.join(FUNCTIONS)} may be called in {text!r}")
+        elif isinstance(node, ast.Name):
+            if node.id not in known and node.id not in FUNCTIONS and node.id not in CONSTANTS:
+                raise ValueError(f"{where}: unknown name {node.id!r} in {text!r}")
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"{where}: only numeric constants are allowed in {text!r}")
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Load) + _OPERATORS):
+            raise ValueError(f"{where}: {type(node).__name__} is not allowed in {text!r}")
+    return f"({ast.unparse(tree)})"
+
+
+def _names(spec, key, where):
+    value = spec.get(key)
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f"{where}: '{key}' must be a non-empty mapping")
+    for name in value:
+        if not isinstance(name, str) or not _NAME.match(name):
+            raise ValueError(f"{where}: invalid {key[:-1]} name {name!r}")
+    return value
+
+
+class Topology:
+    def __init__(self, spec, source=None):
+        where = f"Topology {spec.get('name', source)!r}" if isinstance(spec, dict) else "Topology"
+        if not isinstance(spec, dict):
+            raise ValueError(f"{where}: expected a mapping")
+        self.spec = spec
+        self.name = str(spec.get('name') or source or 'unnamed')
+        self.description = spec.get('description', '')
+        self.key = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+        params = _names(spec, 'params', where)
+        missing = [k for k in REQUIRED_PARAMS if k not in params]
+        if missing:
+            raise ValueError(f"{where}: missing params {', '.join(missing)}")
+        try:
+            self.params = {k: float(v) for k, v in params.items()}
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}: param defaults must be numbers")
+
+        known = set(self.params)
+        lines = [f"    {k} = p[{k!r}]" for k in self.params]
+        for name, text in (spec.get('vars') or {}).items():
+            if not isinstance(name, str) or not _NAME.match(name) or name in known:
+                raise ValueError(f"{where}: invalid or duplicate var name {name!r}")
+            lines.append(f"    {name} = {_expression(text, known, f'{where}, var {name}')}")
+            known.add(name)
+
+        nodes = _names(spec, 'nodes', where)
+        self.node_names = list(nodes)
+        self.node_index = {n: i for i, n in enumerate(self.node_names)}
+        coords = []
+        for name, xyz in nodes.items():
+            if not isinstance(xyz, (list, tuple)) or len(xyz) != 3:
+                raise ValueError(f"{where}: node {name} needs [x, y, z]")
+            coords += [_expression(c, known, f"{where}, node {name}") for c in xyz]
+        lines.append(f"    return ({', '.join(coords)},)")
+        namespace = dict(FUNCTIONS, **CONSTANTS)
+        exec(compile("def coordinates(p):\n" + "\n".join(lines), f"<topology {self.name}>", 'exec'), namespace)
+        self._coordinates = namespace['coordinates']
+
+        members = _names(spec, 'members', where)
+        self.member_names = list(members)
+        self.member_index = {m: i for i, m in enumerate(self.member_names)}
+        conn = []
+        for name, ends in members.items():
+            if not isinstance(ends, (list, tuple)) or len(ends) != 2:
+                raise ValueError(f"{where}: member {name} needs [i-node, j-node]")
+            for n in ends:
+                if n not in self.node_index:
+                    raise ValueError(f"{where}: member {name} references unknown node {n!r}")
+            if ends[0] == ends[1]:
+                raise ValueError(f"{where}: member {name} connects node {ends[0]} to itself")
+            conn.append([self.node_index[ends[0]], self.node_index[ends[1]]])
+        self.member_nodes = np.array(conn, dtype=np.int64)
+
+        supports = spec.get('supports')
+        if not isinstance(supports, list) or not supports:
+            raise ValueError(f"{where}: 'supports' must be a non-empty list of nodes")
+        for n in supports:
+            if n not in self.node_index:
+                raise ValueError(f"{where}: unknown support node {n!r}")
+        self.support_nodes = list(supports)
+        self.support_index = np.array([self.node_index[n] for n in supports], dtype=np.int64)
+        load_node = spec.get('load_node')
+        if load_node not in self.node_index:
+            raise ValueError(f"{where}: unknown load_node {load_node!r}")
+        self.load_node = load_node
+        self.load_index = self.node_index[load_node]
+
+        self.n_nodes = len(self.node_names)
+        self.n_members = len(self.member_names)
+        self.n_dof = 6 * self.n_nodes
+        self.fixed_dofs = (6 * self.support_index[:, None] + np.arange(3)).ravel()
+        self.free_dofs = np.setdiff1d(np.arange(self.n_dof), self.fixed_dofs)
+        self.member_node_names = [(self.node_names[i], self.node_names[j]) for i, j in self.member_nodes]
+
+    def with_defaults(self, params):
+        # Every parameter of this topology, missing keys taking the default
+        return {k: params.get(k, v) for k, v in self.params.items()}
+
+    def coordinates(self, p):
+        # (..., n_nodes, 3) nodal coordinates; parameter values may be arrays
+        args = {k: np.asarray(p[k], dtype=float) for k in self.params}
+        shape = np.broadcast_shapes(*(v.shape for v in args.values()))
+        if not shape:
+            # One configuration: plain floats are much cheaper than 0-d arrays
+            values = self._coordinates({k: float(v) for k, v in args.items()})
+            return np.array(values, dtype=float).reshape(self.n_nodes, 3)
+        xyz = np.empty(shape + (3 * self.n_nodes,))
+        for i, v in enumerate(self._coordinates(args)):
+            xyz[..., i] = v
+        return xyz.reshape(shape + (self.n_nodes, 3))
+
+    def describe(self):
+        # JSON-friendly summary (connectivity and default geometry)
+        xyz = self.coordinates(self.params)
+        return {
+            'name': self.name,
+            'description': self.description,
+            'params': self.params,
+            'nodes': {n: xyz[i].tolist() for i, n in enumerate(self.node_names)},
+            'members': {m: list(ends) for m, ends in zip(self.member_names, self.member_node_names)},
+            'supports': self.support_nodes,
+            'load_node': self.load_node,
+        }
+
+
+def compile_topology(spec, source=None):
+    return Topology(spec, source)
+
+
+def read_spec(path):
+    with open(path) as fh:
+        if path.endswith('.json'):
+            return json.load(fh)
+        if yaml is None:
+            raise ValueError(f"Reading {os.path.basename(path)} requires PyYAML (pip install pyyaml)")
+        return yaml.safe_load(fh)
+
+
+def topology_path(name):
+    if not isinstance(name, str) or not _TOPOLOGY_NAME.match(name):
+        raise ValueError(f"Invalid topology name: {name!r}")
+    for ext in EXTENSIONS:
+        path = os.path.join(TOPOLOGY_DIR, name + ext)
+        if os.path.exists(path):
+            return path
+    raise ValueError(f"Unknown topology: {name} (available: {', '.join(available_topologies())})")
+
+
+@functools.lru_cache(maxsize=None)
+def load_topology(name=DEFAULT_TOPOLOGY):
+    # Compiled once per process; `name` is a file in TOPOLOGY_DIR (no path)
+    return compile_topology(read_spec(topology_path(name)), name)
+
+
+def load_topology_file(path):
+    # Any topology file on disk (scripts / CLI)
+    return compile_topology(read_spec(path), os.path.splitext(os.path.basename(path))[0])
+
+
+def topology_for(params):
+    # The topology a parameter dict selects ('topology' key, default standard)
+    return load_topology(params.get('topology') or DEFAULT_TOPOLOGY)
+
+
+def require_default(params, what):
+    # For analyses written against the standard frame's named members
+    name = params.get('topology') or DEFAULT_TOPOLOGY
+    if name != DEFAULT_TOPOLOGY:
+        raise ValueError(f"{what} supports only the '{DEFAULT_TOPOLOGY}' topology (got {name!r})")
+
+
+def available_topologies():
+    if not os.path.isdir(TOPOLOGY_DIR):
+        return []
+    return sorted({os.path.splitext(f)[0] for f in os.listdir(TOPOLOGY_DIR)
+                   if f.endswith(EXTENSIONS) and (yaml is not None or f.endswith('.json'))})
@@ -1,20 +1,147 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional, Union
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+import asyncio
+import json
+import math
 import os
 import secrets
+import time
 from crane_calc import calculate_crane
-
-app = FastAPI()
-security = HTTPBasic()
+from crane_solver import calculate_stations
+from crane_batch import expand_grid, rows_to_columns, solve_batch_json
+from crane_export import DEFAULT_SIDES, export_results
+from crane_export import MEDIA_TYPES as EXPORT_MEDIA_TYPES
+from crane_cache import ResultCache, cache_key
+from crane_store import ResultStore
+from crane_jobs import JobManager
+from crane_surrogate import DEFAULT_TOLERANCE, Surrogate, approximate
+from crane_encode import MEDIA_TYPES, check_format, encode, fields_key, parse_fields, project
+from crane_loads import calculate_load_cases
+from crane_slew import slew_envelope
+from crane_capacity import assemble_chart, capacity_rows, chart_chunks, rated_capacity
+from crane_optimize import optimize_crane
+from crane_modal import DEFAULT_DIV, DEFAULT_MODES, modal_analysis
+from crane_reliability import make_plan, run_chunk, summarize
+from crane_stream import STREAM_FORMATS, Sweep, encode_event, solve_records, start_event
+from crane_live import LiveChannel
+from crane_session import CraneSession
+from crane_topology import DEFAULT_TOPOLOGY, available_topologies, load_topology
+from crane_startup import warm_up
+from crane_pool import PoolSaturated, SolveTimeout, SolverPool
+from crane_metrics import (
+    PROMETHEUS_CONTENT_TYPE, Metrics, ServerTimingMiddleware, label, mark, note, phase, record_failure,
+    record_remote, timed_call,
+)
 
 # Environment variables for Basic Auth
 AUTH_USER = os.getenv("AUTH_USER", "admin")
 AUTH_PASS = os.getenv("AUTH_PASS", "password")
 
+# Solver engine used when a request does not choose one ('pynite' or 'numpy').
+# The Docker image sets numpy: the first Pynite answer waits for its import
+# (about 1.2 s), the numpy engine answers the same result in milliseconds
+DEFAULT_ENGINE = os.getenv("CRANE_ENGINE", "pynite")
+
+# Upper bound on configurations per /calculate/batch request
+MAX_BATCH = int(os.getenv("CRANE_MAX_BATCH", "100000"))
+
+# /calculate result cache (size 0 disables it)
+result_cache = ResultCache(
+    maxsize=int(os.getenv("CRANE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CRANE_CACHE_TTL", "3600")),
+)
+
+# Persistent /calculate result store shared by all workers and restarts
+# (CRANE_STORE: directory; unset disables it), evicted beyond CRANE_STORE_MB
+result_store = ResultStore(
+    os.getenv("CRANE_STORE"),
+    max_bytes=int(float(os.getenv("CRANE_STORE_MB", "1024")) * 2**20),
+) if os.getenv("CRANE_STORE") else None
+
+# Precomputed response surface for /calculate/surrogate and live drags
+# (CRANE_SURROGATE: a directory written by `crane_surrogate.py build`)
+surrogate = Surrogate.load(os.getenv("CRANE_SURROGATE")) if os.getenv("CRANE_SURROGATE") else None
+
+# Solves run in a worker pool so the event loop stays responsive.
+# CRANE_POOL: 'process' (default), 'thread' (fine for the numpy engine) or 'inline'
+solver_pool = SolverPool(
+    kind=os.getenv("CRANE_POOL", "process"),
+    workers=int(os.getenv("CRANE_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("CRANE_MAX_QUEUE")) if os.getenv("CRANE_MAX_QUEUE") else None,
+    timeout=float(os.getenv("CRANE_SOLVE_TIMEOUT", "30")),
+)
+BATCH_TIMEOUT = float(os.getenv("CRANE_BATCH_TIMEOUT", "300"))
+
+# The live channel's incremental numpy sessions hold per-connection state, so
+# they run in threads of this process rather than in solver_pool, but with
+# the same bounded admission and timeout (CRANE_SESSION_THREADS threads)
+session_pool = SolverPool(
+    kind='thread',
+    workers=int(os.getenv("CRANE_SESSION_THREADS", "0")) or None,
+    max_queue=int(os.getenv("CRANE_MAX_QUEUE")) if os.getenv("CRANE_MAX_QUEUE") else None,
+    timeout=solver_pool.timeout,
+)
+
+# Background jobs (/jobs) for long studies, kept on disk in CRANE_JOBS (unset
+# disables them) and run by CRANE_JOB_WORKERS niced processes that start no
+# new chunk while interactive solves are in flight
+job_manager = JobManager(
+    os.getenv("CRANE_JOBS"),
+    workers=int(os.getenv("CRANE_JOB_WORKERS", "0")) or None,
+    nice=int(os.getenv("CRANE_JOB_NICE", "10")),
+    busy=lambda: solver_pool.active > 0,
+) if os.getenv("CRANE_JOBS") else None
+
+# Upper bound on configurations per /calculate/stream request (results are
+# never held in memory, so this can be far above MAX_BATCH)
+MAX_STREAM = int(os.getenv("CRANE_MAX_STREAM", "10000000"))
+
+# Warm-up solve in every pool worker at startup (CRANE_WARMUP=0 disables it);
+# /ready answers 503 until it has finished. Only the default engine is warmed
+# unless CRANE_WARMUP_ENGINES lists others (e.g. "numpy,pynite")
+WARMUP = os.getenv("CRANE_WARMUP", "1") != "0"
+WARMUP_ENGINES = tuple(e.strip() for e in os.getenv("CRANE_WARMUP_ENGINES", DEFAULT_ENGINE).split(",") if e.strip())
+startup_state = {'ready': not WARMUP, 'warmup': None, 'error': None}
+
+async def warm_up_engines():
+    t0 = time.perf_counter()
+    try:
+        # One task per worker, submitted together so each lands on its own
+        # worker; the process pool forks all of them here, before the parent
+        # starts importing anything in a thread
+        workers = await asyncio.gather(*(solver_pool.run(warm_up, WARMUP_ENGINES, timeout=BATCH_TIMEOUT)
+                                         for _ in range(solver_pool.workers)))
+        # The live channel's numpy sessions run in this process
+        await session_pool.run(CraneSession().update, {})
+        startup_state['warmup'] = {'seconds': time.perf_counter() - t0, 'workers': workers}
+        startup_state['ready'] = True
+    except Exception as e:
+        startup_state['error'] = str(e)
+
+@asynccontextmanager
+async def lifespan(app):
+    warm = asyncio.create_task(warm_up_engines()) if WARMUP else None
+    if job_manager is not None:
+        job_manager.start()  # resumes jobs interrupted by the last shutdown
+    yield
+    if warm is not None:
+        warm.cancel()
+    if job_manager is not None:
+        await asyncio.to_thread(job_manager.close)
+    solver_pool.shutdown()
+    session_pool.shutdown()
+    if result_store is not None:
+        result_store.flush_hits()
+
+app = FastAPI(lifespan=lifespan)
+security = HTTPBasic()
+
 def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
     correct_username = secrets.compare_digest(credentials.username, AUTH_USER)
     correct_password = secrets.compare_digest(credentials.password, AUTH_PASS)
@@ -32,8 +159,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Per-phase timings: Server-Timing header on every response, aggregated at /metrics
+metrics = Metrics()
+app.add_middleware(ServerTimingMiddleware, metrics=metrics)
+
+async def run_timed(fn, *args, timeout=None):
+    # solver_pool.run, with the phases timed inside the worker merged into
+    # this request's Server-Timing
+    t0 = time.perf_counter()
+    reply = await solver_pool.run(timed_call, fn, *args, timeout=timeout)
+    return record_remote(reply, time.perf_counter() - t0)
+
 class CraneParams(BaseModel):
     pipe_od: float = 48.6
     t_wall: float = 2.4
@@ -46,15 +185,702 @@ class CraneParams(BaseModel):
     arm_angle: float = 180.0
     mass_tip: float = 50.0
     yield_stress: float = 235.0
+    engine: str = DEFAULT_ENGINE
+    # Frame layout (crane-web-app/backend/topologies); parameters that only
+    # a non-standard topology uses are passed as extra fields
+    topology: str = DEFAULT_TOPOLOGY
+    # 'linear' or 'p_delta' (second order); p_delta_div > 1 subdivides every
+    # member for P-delta along members (numpy engine)
+    analysis: str = 'linear'
+    p_delta_div: int = 1
+
+    class Config:
+        extra = 'allow'
 
 @app.post("/calculate")
-async def calculate(params: CraneParams):
+async def calculate(params: CraneParams, fields: Optional[str] = None, format: str = 'json',
+                    dtype: str = 'float64'):
+    # ?fields=tip_displacement.dz,max_stress projects the result;
+    # ?format=columnar|msgpack|binary (&dtype=float32) selects a compact encoding
+    mark('parse')
+    p = params.dict()
+    label(engine=p['engine'])
+    solved = False
+
+    async def compute():
+        nonlocal solved
+        if result_store is None:
+            solved = True
+            return await run_timed(calculate_crane, p, selected)
+        # The store keeps full results: projections are cut from them
+        stored = await asyncio.to_thread(result_store.get, p)
+        note('store', 'miss' if stored is None else 'hit')
+        if stored is None:
+            solved = True
+            stored = await run_timed(calculate_crane, p, None)
+            await asyncio.to_thread(result_store.put, p, stored)
+        return project(stored, selected)
+
+    try:
+        selected = parse_fields(fields)
+        check_format(format, dtype)
+        key = cache_key(p) if selected is None else cache_key(p) + (('fields', fields_key(selected)),)
+        result = await result_cache.get_or_compute(key, compute)
+        note('cache', 'miss' if solved else 'hit')
+        with phase('encode'):
+            if format == 'json':
+                return JSONResponse(result)
+            return Response(encode(result, format, dtype), media_type=MEDIA_TYPES[format])
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+@app.post("/calculate/surrogate")
+async def calculate_surrogate(params: CraneParams, tolerance: float = DEFAULT_TOLERANCE):
+    # Interpolated answer when the table covers params within `tolerance`
+    # (relative), else the exact solve (through the cache); result['surrogate']
+    # says which: {exact: false, error_estimate} or {exact: true, reason}
+    p = params.dict()
+    try:
+        result, reason = approximate(surrogate, p, tolerance)
+        note('surrogate', 'miss' if result is None else 'hit')
+        if result is not None:
+            return result
+        result = await result_cache.get_or_compute(cache_key(p), lambda: run_timed(calculate_crane, p, None))
+        return dict(result, surrogate={'exact': True, 'reason': reason})
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+@app.get("/store/stats")
+async def store_stats():
+    if result_store is None:
+        return {"error": "The result store is disabled (set CRANE_STORE)"}
+    return await asyncio.to_thread(result_store.stats)
+
+@app.get("/store/query")
+async def store_query(where: str = '', order: Optional[str] = None, limit: int = 100):
+    # e.g. ?where=max_stress<235,arm_len>1200&order=-max_utilization
+    try:
+        if result_store is None:
+            raise ValueError("The result store is disabled (set CRANE_STORE)")
+        return {'rows': await asyncio.to_thread(result_store.query, where, order, limit)}
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+@app.get("/pool/stats")
+async def pool_stats():
+    return solver_pool.stats()
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    # Readiness: engines imported and warm in every worker
+    return JSONResponse(startup_state, status_code=200 if startup_state['ready'] else 503)
+
+@app.get("/topologies")
+async def topologies():
+    return {'default': DEFAULT_TOPOLOGY, 'topologies': available_topologies()}
+
+@app.get("/topologies/{name}")
+async def topology(name: str):
+    # Parameters with defaults, default-geometry node coordinates and connectivity
+    try:
+        return load_topology(name).describe()
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Prometheus text format: request / phase histograms, failures, cache and pool state
+    body = metrics.render({'cache': result_cache.stats(), 'pool': solver_pool.stats(),
+                           'session_pool': session_pool.stats()})
+    return Response(body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+class BatchRequest(BaseModel):
+    # Either an explicit list of configurations, or a Cartesian grid
+    # {param: [values]} applied on top of `base`
+    params: List[CraneParams] = []
+    grid: Dict[str, List[float]] = {}
+    base: CraneParams = CraneParams()
+    # Adds node_displacements / member_stress per row (for /export)
+    include_shapes: bool = False
+
+@app.post("/calculate/batch")
+async def calculate_batch(req: BatchRequest):
+    # Always solved with the vectorized NumPy engine; results are columnar
+    try:
+        n = math.prod(len(v) for v in req.grid.values()) if req.grid else len(req.params)
+        if n > MAX_BATCH:
+            raise ValueError(f"Batch of {n} configurations exceeds the limit of {MAX_BATCH}")
+        if req.grid:
+            columns = expand_grid(req.grid, req.base.dict())
+        else:
+            columns = rows_to_columns([p.dict() for p in req.params])
+        return await run_timed(solve_batch_json, columns, req.include_shapes, timeout=BATCH_TIMEOUT)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class ExportFrame(BaseModel):
+    params: CraneParams = CraneParams()
+    # A calculate result for params; when omitted the cached result is used
+    # (solved once on a cache miss)
+    result: Optional[Dict] = None
+
+class ExportRequest(BaseModel):
+    # Frames in order: explicit (params, result) pairs, then the rows of a
+    # /calculate/batch response solved with include_shapes
+    frames: List[ExportFrame] = []
+    batch: Optional[Dict] = None
+    scale: Optional[float] = None  # displacement scale; None picks one for all frames
+    n_sides: int = DEFAULT_SIDES
+    fps: float = 10.0
+    color_by: str = 'utilization'
+
+@app.post("/export")
+async def export(req: ExportRequest, format: str = 'glb'):
+    # Deformed geometry as binary glTF (?format=glb, animated over the frames)
+    # or binary STL (?format=stl, one frame)
     try:
-        results = calculate_crane(params.dict())
-        return results
+        if format not in EXPORT_MEDIA_TYPES:
+            raise ValueError(f"Unknown export format: {format}")
+        items = []
+        for frame in req.frames:
+            p = frame.params.dict()
+            result = frame.result
+            if result is None:
+                result = await result_cache.get_or_compute(cache_key(p), lambda: run_timed(calculate_crane, p, None))
+            items.append((p, result))
+        body = await run_timed(export_results, items, req.batch, format, req.scale, req.n_sides, req.fps,
+                               req.color_by, timeout=BATCH_TIMEOUT)
+        return Response(body, media_type=EXPORT_MEDIA_TYPES[format],
+                        headers={"Content-Disposition": f'attachment; filename="crane.{format}"'})
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        record_failure(e)
         return {"error": str(e)}
 
+class NodalLoad(BaseModel):
+    node: str
+    direction: str  # FX, FY, FZ, MX, MY, MZ (global)
+    magnitude: float
+
+class MemberLoad(BaseModel):
+    member: str
+    direction: str  # FX, FY, FZ (global), uniform over the member
+    w: float        # N/mm
+
+class LoadCase(BaseModel):
+    name: str
+    hoist: float = 0.0        # factor on mass_tip * g at A_tip (dynamic amplification > 1)
+    self_weight: float = 0.0  # factor on the frame's self-weight
+    nodal_loads: List[NodalLoad] = []
+    member_loads: List[MemberLoad] = []
+
+class LoadCaseRequest(BaseModel):
+    params: CraneParams = CraneParams()
+    load_cases: List[LoadCase] = []
+    # {combo: {case: factor}}; defaults to one combo per case
+    combos: Dict[str, Dict[str, float]] = {}
+
+@app.post("/calculate/loads")
+async def calculate_loads(req: LoadCaseRequest):
+    cases = [c.dict() for c in req.load_cases]
+    try:
+        return await run_timed(calculate_load_cases, req.params.dict(), cases, req.combos)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class SlewRequest(BaseModel):
+    params: CraneParams = CraneParams()
+    start: float = 0.0   # deg
+    stop: float = 360.0  # deg; a full turn does not repeat the start angle
+    step: float = 5.0    # deg
+
+@app.post("/calculate/slew")
+async def calculate_slew(req: SlewRequest):
+    try:
+        return await run_timed(slew_envelope, req.params.dict(), req.start, req.stop, req.step)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class StationRequest(BaseModel):
+    params: CraneParams = CraneParams()
+    n_stations: int = 11  # per sub-element, ends included
+
+@app.post("/calculate/stations")
+async def calculate_station_stresses(req: StationRequest):
+    # Combined normal, torsional shear and von Mises stress along every member
+    try:
+        return await run_timed(calculate_stations, req.params.dict(), req.n_stations)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class CapacityOptions(BaseModel):
+    deflection_limit: Optional[float] = None  # mm at the arm tip; default arm_len / 100
+    self_weight: bool = True                  # include the frame's weight as dead load
+    ballast: float = 0.0                      # kg, split over the four base corners
+
+class CapacityRequest(CapacityOptions):
+    params: CraneParams = CraneParams()
+
+class LoadChartRequest(CapacityOptions):
+    params: CraneParams = CraneParams()
+    arm_lens: List[float]
+    arm_angles: List[float]
+
+def _capacity_options(req):
+    return {'deflection_limit': req.deflection_limit, 'self_weight': req.self_weight, 'ballast': req.ballast}
+
+@app.post("/capacity")
+async def capacity(req: CapacityRequest):
+    try:
+        return await run_timed(rated_capacity, req.params.dict(), req.deflection_limit, req.self_weight, req.ballast)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+@app.post("/capacity/chart")
+async def capacity_chart(req: LoadChartRequest):
+    # Rows of the chart are split into one task per pool worker
+    try:
+        n = len(req.arm_lens) * len(req.arm_angles)
+        if n > MAX_BATCH:
+            raise ValueError(f"Load chart of {n} points exceeds the limit of {MAX_BATCH}")
+        p = req.params.dict()
+        chunks = chart_chunks(req.arm_lens, solver_pool.workers)
+        parts = await asyncio.gather(*(
+            solver_pool.run(capacity_rows, p, chunk, req.arm_angles, _capacity_options(req), timeout=BATCH_TIMEOUT)
+            for chunk in chunks))
+        return assemble_chart(req.arm_lens, req.arm_angles, [row for part in parts for row in part])
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class OptimizeRequest(BaseModel):
+    params: CraneParams = CraneParams()
+    # {param: [lower, upper]}; empty: pipe_od, t_wall, brace_mast_height,
+    # tripod_attach_height with their default bounds
+    variables: Dict[str, Optional[List[float]]] = {}
+    deflection_limit: Optional[float] = None  # mm at the arm tip; default arm_len / 100
+    max_iter: int = 100
+
+@app.post("/optimize")
+async def optimize(req: OptimizeRequest):
+    # Minimum-mass section / mast geometry under the stress and deflection limits
+    try:
+        return await run_timed(optimize_crane, req.params.dict(), req.variables or None, req.deflection_limit,
+                               min(max(req.max_iter, 1), 500), timeout=BATCH_TIMEOUT)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class ModalRequest(BaseModel):
+    params: CraneParams = CraneParams()
+    n_modes: int = DEFAULT_MODES
+    mass: str = 'consistent'       # or 'lumped'
+    n_div: int = DEFAULT_DIV        # elements per sub-element of the static model
+    shift_hz: float = 0.0           # extract the modes nearest this frequency
+    include_tip_mass: bool = True
+
+@app.post("/modal")
+async def modal(req: ModalRequest):
+    # Natural frequencies and mode shapes (node-keyed like node_displacements)
+    try:
+        return await run_timed(modal_analysis, req.params.dict(), req.n_modes, req.mass, req.n_div, req.shift_hz,
+                               req.include_tip_mass)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+class ReliabilityRequest(CapacityOptions):
+    params: CraneParams = CraneParams()
+    # {variable: {'dist', 'mean', 'std' or 'cov', 'low', 'high'}} for t_wall,
+    # pipe_od, E, yield_stress, mass_tip; unlisted ones keep their defaults
+    distributions: Dict[str, Dict[str, Union[float, str]]] = {}
+    n_samples: int = 100000
+    seed: int = 0
+    confidence: float = 0.95
+
+def _reliability_plan(req):
+    return make_plan(req.params.dict(), req.distributions, req.n_samples, req.seed, req.deflection_limit,
+                     req.self_weight, req.ballast, req.confidence)
+
+async def _reliability_chunk(plan, i):
+    # Like the sweep stream, a busy pool is waited out after the first chunk
+    while True:
+        try:
+            return await solver_pool.run(run_chunk, plan, i, timeout=BATCH_TIMEOUT)
+        except PoolSaturated:
+            await asyncio.sleep(0.05)
+
+async def reliability_chunks(plan, start):
+    # One chunk per pool worker in flight; results come back in chunk order.
+    # Closing the generator cancels whatever is still pending.
+    pending = []
+    following = start
+    try:
+        while pending or following < plan['n_chunks']:
+            while following < plan['n_chunks'] and len(pending) < solver_pool.workers:
+                pending.append(asyncio.ensure_future(_reliability_chunk(plan, following)))
+                following += 1
+            yield await pending.pop(0)
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+async def _first_reliability_chunk(req):
+    # Validation and the first chunk happen before any response is sent, so
+    # bad input or a busy pool gets a proper status code
+    plan = _reliability_plan(req)
+    return plan, await solver_pool.run(run_chunk, plan, 0, timeout=BATCH_TIMEOUT)
+
+@app.post("/reliability")
+async def reliability(req: ReliabilityRequest):
+    # Monte Carlo failure probabilities (yield, deflection, uplift) with
+    # confidence intervals; chunks are spread over the pool workers
+    try:
+        plan, first = await _first_reliability_chunk(req)
+        chunks = [first]
+        async for chunk in reliability_chunks(plan, 1):
+            chunks.append(chunk)
+        return summarize(plan, chunks)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+async def reliability_events(plan, fmt, first, is_disconnected):
+    # progress carries the running estimate; end carries the full result
+    yield encode_event(fmt, 'start', json.dumps({'n_samples': plan['n_samples'], 'n_chunks': plan['n_chunks'],
+                                                 'seed': plan['seed']}))
+    chunks = [first]
+    cancelled = False
+    following = reliability_chunks(plan, 1)
+    try:
+        while True:
+            done = sum(c['n'] + c['invalid'] for c in chunks)
+            estimate = summarize(plan, chunks)['probabilities']
+            yield encode_event(fmt, 'progress', json.dumps({
+                'done': done, 'total': plan['n_samples'],
+                'probabilities': {mode: v['probability'] for mode, v in estimate.items()},
+            }))
+            if await is_disconnected():
+                cancelled = True
+                break
+            chunk = await following.__anext__() if len(chunks) < plan['n_chunks'] else None
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        yield encode_event(fmt, 'end', json.dumps({'cancelled': cancelled, 'result': summarize(plan, chunks)}))
+    except Exception as e:
+        yield encode_event(fmt, 'error', json.dumps({'error': str(e)}))
+    finally:
+        await following.aclose()
+
+@app.post("/reliability/stream")
+async def reliability_stream(req: ReliabilityRequest, request: Request, format: Optional[str] = None):
+    # Same analysis as /reliability, with a progress event per chunk (NDJSON or SSE)
+    if format is None:
+        format = 'sse' if 'text/event-stream' in request.headers.get('accept', '') else 'ndjson'
+    try:
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format: {format} (expected one of {', '.join(STREAM_FORMATS)})")
+        plan, first = await _first_reliability_chunk(req)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+    media_type = 'text/event-stream' if format == 'sse' else 'application/x-ndjson'
+    return StreamingResponse(reliability_events(plan, format, first, request.is_disconnected),
+                             media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+class StreamRequest(BatchRequest):
+    chunk_size: int = 256  # configurations per solve / progress event
+
+async def _solve_stream_chunk(sweep, start, stop):
+    # Mid-stream, a busy pool is waited out rather than ending the stream
+    while True:
+        try:
+            return await solver_pool.run(solve_records, sweep.chunk(start, stop), start, sweep.swept,
+                                         timeout=BATCH_TIMEOUT)
+        except PoolSaturated:
+            await asyncio.sleep(0.05)
+
+async def stream_events(sweep, fmt, chunk_size, first, is_disconnected):
+    # One chunk is solved ahead while the previous one is being sent; on
+    # client disconnect nothing further is scheduled and the lookahead is cancelled
+    chunks = sweep.chunks(chunk_size)
+    next(chunks)  # `first` is already solved
+    yield encode_event(fmt, 'start', start_event(sweep, chunk_size))
+    done = n_failures = 0
+    cancelled = False
+    pending = None
+    try:
+        result = first
+        while result is not None:
+            bounds = next(chunks, None)
+            pending = asyncio.ensure_future(_solve_stream_chunk(sweep, *bounds)) if bounds else None
+            records, failing = result
+            yield ''.join(encode_event(fmt, 'result', r) for r in records)
+            done += len(records)
+            n_failures += failing
+            yield encode_event(fmt, 'progress', json.dumps({'done': done, 'total': sweep.n}))
+            if await is_disconnected():
+                cancelled = True
+                break
+            result = await pending if pending else None
+        yield encode_event(fmt, 'end', json.dumps({'done': done, 'total': sweep.n,
+                                                   'n_failures': n_failures, 'cancelled': cancelled}))
+    except Exception as e:
+        yield encode_event(fmt, 'error', json.dumps({'error': str(e)}))
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+@app.post("/calculate/stream")
+async def calculate_stream(req: StreamRequest, request: Request, format: Optional[str] = None):
+    # Streams one record per configuration as NDJSON (default) or SSE
+    # (?format=sse or Accept: text/event-stream); always the NumPy engine
+    if format is None:
+        format = 'sse' if 'text/event-stream' in request.headers.get('accept', '') else 'ndjson'
+    try:
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format: {format} (expected one of {', '.join(STREAM_FORMATS)})")
+        chunk_size = min(max(req.chunk_size, 1), 4096)
+        if req.grid:
+            sweep = Sweep(grid=req.grid, base=req.base.dict())
+        else:
+            sweep = Sweep(rows=[p.dict() for p in req.params])
+        if sweep.n > MAX_STREAM:
+            raise ValueError(f"Sweep of {sweep.n} configurations exceeds the limit of {MAX_STREAM}")
+        if sweep.n == 0:
+            raise ValueError("Sweep has no configurations")
+        # The first chunk is solved before the response starts, so a busy
+        # pool or a failing sweep still gets a proper status code
+        first = await solver_pool.run(solve_records, sweep.chunk(0, chunk_size), 0, sweep.swept,
+                                      timeout=BATCH_TIMEOUT)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except SolveTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+    media_type = 'text/event-stream' if format == 'sse' else 'application/x-ndjson'
+    return StreamingResponse(stream_events(sweep, format, chunk_size, first, request.is_disconnected),
+                             media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+class JobRequest(BaseModel):
+    # kind: sweep (spec as /calculate/stream), reliability (as /reliability),
+    # chart (as /capacity/chart) or optimize (as /optimize); higher priority
+    # jobs get their chunks first
+    kind: str
+    priority: int = 0
+    spec: Dict = {}
+
+JOB_SPECS = {'sweep': StreamRequest, 'reliability': ReliabilityRequest, 'chart': LoadChartRequest,
+             'optimize': OptimizeRequest}
+
+def _jobs():
+    if job_manager is None:
+        raise ValueError("Background jobs are disabled (set CRANE_JOBS to a directory)")
+    return job_manager
+
+def _submit_job(req):
+    if req.kind not in JOB_SPECS:
+        raise ValueError(f"Unknown job kind: {req.kind} (expected one of {', '.join(JOB_SPECS)})")
+    spec = JOB_SPECS[req.kind](**req.spec).dict()
+    if req.kind == 'sweep':
+        n = math.prod(len(v) for v in spec['grid'].values()) if spec['grid'] else len(spec['params'])
+        if n > MAX_STREAM:
+            raise ValueError(f"Sweep of {n} configurations exceeds the limit of {MAX_STREAM}")
+    jobs = _jobs()
+    return jobs.get(jobs.submit(req.kind, spec, req.priority), partial=False)
+
+@app.post("/jobs")
+async def submit_job(req: JobRequest):
+    # Returns at once with the job id (202); poll GET /jobs/{id}
+    try:
+        return JSONResponse(await asyncio.to_thread(_submit_job, req), status_code=202)
+    except Exception as e:
+        record_failure(e)
+        return {"error": str(e)}
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 100):
+    try:
+        return {'jobs': await asyncio.to_thread(_jobs().list, status, min(max(limit, 1), 1000))}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/jobs/stats")
+async def job_stats():
+    try:
+        return await asyncio.to_thread(_jobs().stats)
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, partial: bool = True):
+    # Status and progress (chunks done / total); the result once done, else
+    # (partial=true) the result so far
+    try:
+        return await asyncio.to_thread(_jobs().get, job_id, partial)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No such job: {job_id}")
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    try:
+        return await asyncio.to_thread(_jobs().cancel, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No such job: {job_id}")
+    except Exception as e:
+        return {"error": str(e)}
+
+async def _live_solve(p):
+    # A busy pool is retried until the solve is superseded or the pool timeout passes
+    deadline = asyncio.get_running_loop().time() + solver_pool.timeout
+    while True:
+        try:
+            return await result_cache.get_or_compute(cache_key(p), lambda: solver_pool.run(calculate_crane, p))
+        except PoolSaturated:
+            if asyncio.get_running_loop().time() > deadline:
+                raise
+            await asyncio.sleep(0.02)
+
+async def _live_session_update(session, p):
+    # As _live_solve, on the session pool
+    deadline = asyncio.get_running_loop().time() + session_pool.timeout
+    while True:
+        try:
+            return await session_pool.run(session.update, p)
+        except PoolSaturated:
+            if asyncio.get_running_loop().time() > deadline:
+                raise
+            await asyncio.sleep(0.02)
+
+@app.websocket("/ws/calculate")
+async def calculate_live(websocket: WebSocket):
+    # Client sends {"seq": int, "params": {...}} on every change; the server
+    # answers {"seq", "result" | "error", "superseded"} for the latest state only.
+    # "settled": false marks an update mid-drag (the UI's sliders send it until
+    # released, then "settled": true): it is answered from the surrogate table
+    # when that is within tolerance
+    await websocket.accept()
+    # linear numpy-engine updates of the standard frame go through a
+    # per-connection incremental session
+    session = CraneSession()
+    updating = None  # the connection's session update, which a cancel cannot stop
+
+    async def solve(update):
+        nonlocal updating
+        p, settled = update
+        if not settled:
+            result, _ = approximate(surrogate, p)
+            if result is not None:
+                return result
+        if p['engine'] == 'numpy' and p['topology'] == DEFAULT_TOPOLOGY and p['analysis'] == 'linear':
+            # At most one session update per connection in the pool: a
+            # superseded one runs to completion before the next starts
+            if updating is not None and not updating.done():
+                await asyncio.wait({updating})
+            updating = asyncio.ensure_future(_live_session_update(session, p))
+            updating.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return await asyncio.shield(updating)
+        return await _live_solve(p)
+
+    channel = LiveChannel(solve, websocket.send_json)
+    runner = asyncio.create_task(channel.run())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            msg = None
+            try:
+                msg = json.loads(text)
+                seq = int(msg['seq'])
+                p = CraneParams(**msg.get('params', {})).dict()
+                settled = bool(msg.get('settled', True))
+            except (ValueError, TypeError, KeyError, AttributeError, ValidationError) as e:
+                seq = msg.get('seq') if isinstance(msg, dict) else None
+                await websocket.send_json({'seq': seq, 'error': f"Invalid message: {e}"})
+                continue
+            channel.submit(seq, (p, settled))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.close()
+        runner.cancel()
+
 # Serve Static Files
 frontend_dist = os.path.join(os.path.dirname(__file__), "../frontend/dist")
 if os.path.exists(frontend_dist):
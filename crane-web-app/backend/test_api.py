@@ -1,17 +1,24 @@
-import requests
-import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fastapi.testclient import TestClient
+from main import app
 
-# Wait for server to start
-time.sleep(3)
+# In-process: no running server, port or start-up sleep needed
+client = TestClient(app)
 
-url = "http://localhost:8000/calculate"
-data = {
-    "mass_tip": 100.0,
-    "arm_len": 1000.0
-}
+def test_calculate():
+    data = {
+        "mass_tip": 100.0,
+        "arm_len": 1000.0
+    }
+    response = client.post("/calculate", json=data)
+    assert response.status_code == 200
+    result = response.json()
+    print(result)
+    assert 'error' not in result
+    assert result['tip_displacement']['dz'] < 0.0
+    assert set(result['reactions']) == {'FL', 'FR', 'RL', 'RR'}
 
-try:
-    response = requests.post(url, json=data)
-    print(response.json())
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    test_calculate()
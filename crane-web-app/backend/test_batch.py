@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import expand_grid, rows_to_columns, solve_batch
+from crane_solver import SUPPORT_NODES, calculate_crane_numpy
+
+def test_batch_matches_single():
+    print("--- Batch vs single NumPy solves ---")
+    rows = [
+        {},
+        {'arm_angle': 45.0, 'arm_len': 1300.0, 'mass_tip': 300.0},
+        {'arm_len': 0.0},  # degenerate: reported per row, does not fail the batch
+        {'tripod_attach_height': 700.0, 'brace_mast_height': 1200.0},
+        {'t_wall': 1.8, 'yield_stress': 700.0},
+    ]
+    out = solve_batch(rows_to_columns(rows))
+    for i, params in enumerate(rows):
+        if out['error'][i]:
+            print(f"{params}: error {out['error'][i]}")
+            assert np.isnan(out['max_stress'][i])
+            continue
+        ref = calculate_crane_numpy(params)
+        assert abs(out['tip_dz'][i] - ref['tip_displacement']['dz']) < 1e-8
+        assert abs(out['max_stress'][i] - ref['max_stress']) < 1e-8
+        assert out['failures'][i] == ref['failures']
+        for s, n in enumerate(SUPPORT_NODES):
+            assert abs(out['reactions'][i, s] - ref['reactions'][n]) < 1e-6
+        print(f"{params}: dz {out['tip_dz'][i]:.3f}, stress {out['max_stress'][i]:.2f} [OK]")
+    assert out['error'][2] is not None
+
+def test_grid_throughput():
+    cols = expand_grid({
+        'arm_len': np.linspace(600.0, 1500.0, 25),
+        'arm_angle': np.linspace(0.0, 350.0, 20),
+        'mass_tip': [20.0, 50.0, 100.0, 200.0],
+        't_wall': [1.8, 2.0, 2.4, 3.2],
+    })
+    n = len(cols['arm_len'])
+    t0 = time.perf_counter()
+    out = solve_batch(cols)
+    dt = time.perf_counter() - t0
+    print(f"{n} configurations in {dt:.2f} s ({n / dt:.0f}/s)")
+    assert not any(out['error'])
+    # Linear analysis: stress scales with the tip mass
+    i = np.nonzero((cols['mass_tip'] == 50.0))[0][0]
+    j = np.nonzero((cols['mass_tip'] == 100.0) & (cols['arm_len'] == cols['arm_len'][i])
+                   & (cols['arm_angle'] == cols['arm_angle'][i]) & (cols['t_wall'] == cols['t_wall'][i]))[0][0]
+    assert abs(out['max_stress'][j] - 2.0 * out['max_stress'][i]) < 1e-6
+
+def test_batch_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate/batch", json={
+        "grid": {"arm_len": [800.0, 1000.0], "arm_angle": [90.0, 180.0]},
+        "base": {"mass_tip": 80.0},
+    })
+    data = r.json()
+    print(f"grid response: n={data['n']}, max_stress={data['max_stress']}")
+    assert data['n'] == 4
+    assert data['params']['mass_tip'] == [80.0] * 4
+    assert set(data['reactions']) == set(SUPPORT_NODES)
+
+    r = client.post("/calculate/batch", json={"params": [{"arm_len": 900.0}, {"arm_len": 0.0}]})
+    data = r.json()
+    assert data['n'] == 2 and data['max_stress'][1] is None and data['error'][1]
+
+    r = client.post("/calculate/batch", json={"grid": {"arm_length": [1.0]}})
+    assert 'error' in r.json()
+
+if __name__ == "__main__":
+    test_batch_matches_single()
+    test_grid_throughput()
+    test_batch_endpoint()
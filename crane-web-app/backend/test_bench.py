@@ -0,0 +1,49 @@
+import sys
+import os
+import copy
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_bench import QUICK, compare, format_rows, main, run_benchmarks
+
+def test_quick_run_structure():
+    config = dict(QUICK, solve_repeat={'numpy': 5}, sweep_sizes=[1, 8])
+    result = run_benchmarks(config, only=['solve', 'sweep'])
+    assert set(result['metrics']) == {'solve.numpy.p50_ms', 'solve.numpy.p99_ms',
+                                      'sweep.1.configs_per_s', 'sweep.8.configs_per_s'}
+    for m in result['metrics'].values():
+        assert m['value'] > 0.0 and m['better'] in ('lower', 'higher')
+    assert result['meta']['numpy']
+    print(format_rows(compare(result, result)))
+
+def test_compare_flags_regressions():
+    base = {'metrics': {
+        'solve.numpy.p50_ms': {'value': 2.0, 'unit': 'ms', 'better': 'lower'},
+        'sweep.256.configs_per_s': {'value': 4000.0, 'unit': 'configs/s', 'better': 'higher'},
+        'api.numpy.rps': {'value': 100.0, 'unit': 'req/s', 'better': 'higher'},
+    }}
+    cur = copy.deepcopy(base)
+    cur['metrics']['solve.numpy.p50_ms']['value'] = 3.0       # 50% slower
+    cur['metrics']['sweep.256.configs_per_s']['value'] = 2000.0  # half the throughput
+    cur['metrics']['api.numpy.rps']['value'] = 150.0           # faster
+    rows = {r['name']: r for r in compare(base, cur, threshold=0.25)}
+    assert rows['solve.numpy.p50_ms']['status'] == 'REGRESSION'
+    assert rows['sweep.256.configs_per_s']['status'] == 'REGRESSION'
+    assert rows['api.numpy.rps']['status'] == 'improved'
+    assert all(r['status'] == 'ok' for r in compare(base, base))
+
+def test_compare_cli_exit_status(tmp_path=None):
+    import json
+    import tempfile
+    d = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    base = {'metrics': {'solve.numpy.p50_ms': {'value': 2.0, 'unit': 'ms', 'better': 'lower'}}}
+    slow = {'metrics': {'solve.numpy.p50_ms': {'value': 2.2, 'unit': 'ms', 'better': 'lower'}}}
+    paths = [os.path.join(d, n) for n in ('base.json', 'slow.json')]
+    for path, data in zip(paths, (base, slow)):
+        with open(path, 'w') as fh:
+            json.dump(data, fh)
+    assert main(['compare', *paths]) == 0
+    assert main(['compare', *paths, '--threshold', '0.05']) == 1
+
+if __name__ == "__main__":
+    test_quick_run_structure()
+    test_compare_flags_regressions()
+    test_compare_cli_exit_status()
@@ -0,0 +1,82 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_cache import ResultCache, cache_key
+
+def test_cache_key_normalization():
+    # Omitted defaults and sub-quantum jitter map to the same entry
+    assert cache_key({}) == cache_key({'arm_len': 1000.0, 'mass_tip': 50.0})
+    assert cache_key({'arm_angle': 90.0}) == cache_key({'arm_angle': 90.0 + 1e-9})
+    assert cache_key({'arm_angle': 90.0}) != cache_key({'arm_angle': 91.0})
+    assert cache_key({'engine': 'numpy'}) != cache_key({'engine': 'pynite'})
+    print("[OK] cache keys")
+
+def test_lru_and_ttl():
+    cache = ResultCache(maxsize=2, ttl=0.05)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1   # 'a' becomes most recently used
+    cache.put('c', 3)            # evicts 'b'
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    print(f"[OK] LRU/TTL eviction: {cache.stats()}")
+
+def test_single_flight():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'max_stress': 1.0}
+
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_compute('k', compute) for _ in range(10)))
+        again = await cache.get_or_compute('k', compute)
+        return results, again
+
+    results, again = asyncio.run(run())
+    stats = cache.stats()
+    print(f"[OK] single flight: {len(calls)} solve for 11 requests, {stats}")
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results) and again is results[0]
+    assert stats['misses'] == 1 and stats['coalesced'] == 9 and stats['hits'] == 1
+
+def test_errors_are_not_cached():
+    cache = ResultCache()
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def run():
+        for _ in range(2):
+            try:
+                await cache.get_or_compute('bad', fail)
+            except ValueError:
+                pass
+
+    asyncio.run(run())
+    assert cache.stats()['misses'] == 2 and cache.stats()['size'] == 0
+
+def test_calculate_endpoint_hits_cache():
+    from fastapi.testclient import TestClient
+    from main import app, result_cache
+    client = TestClient(app)
+    result_cache.clear()
+    before = result_cache.stats()
+    first = client.post("/calculate", json={"engine": "numpy", "arm_angle": 123.0}).json()
+    second = client.post("/calculate", json={"engine": "numpy", "arm_angle": 123.0000000001}).json()
+    stats = client.get("/cache/stats").json()
+    print(f"[OK] endpoint cache stats: {stats}")
+    assert first == second
+    assert stats['hits'] - before['hits'] == 1
+
+if __name__ == "__main__":
+    test_cache_key_normalization()
+    test_lru_and_ttl()
+    test_single_flight()
+    test_errors_are_not_cached()
+    test_calculate_endpoint_hits_cache()
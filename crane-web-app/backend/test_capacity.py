@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_capacity import load_chart, rated_capacity
+from crane_loads import calculate_load_cases
+from crane_solver import GRAVITY, SUPPORT_NODES
+
+def resolve(params, mass, ballast=0.0):
+    # Independent re-analysis at a given hoisted mass with the same dead load
+    cases = [{'name': 'hoist', 'hoist': 1.0},
+             {'name': 'dead', 'self_weight': 1.0,
+              'nodal_loads': [{'node': n, 'direction': 'FZ', 'magnitude': -ballast * GRAVITY / 4}
+                              for n in SUPPORT_NODES]}]
+    r = calculate_load_cases(dict(params, mass_tip=mass), cases, {'total': {'hoist': 1.0, 'dead': 1.0}})
+    return r['combos']['total']
+
+def test_limits_reproduce_on_resolve():
+    print("--- Each capacity limit reproduces its criterion when re-solved ---")
+    for params, ballast in (({}, 200.0), ({'arm_len': 1400.0}, 500.0), ({'pipe_od': 34.0, 't_wall': 2.3}, 1000.0)):
+        cap = rated_capacity(params, ballast=ballast)
+        lim = cap['limits']
+        print(f"{params}, ballast {ballast} kg: {lim} -> {cap['capacity']:.1f} kg ({cap['governing']})")
+
+        r = resolve(params, lim['stress'], ballast)
+        assert abs(r['max_stress'] - cap['yield_stress']) < 1e-6 * cap['yield_stress']
+
+        r = resolve(params, lim['deflection'], ballast)
+        assert abs(abs(r['tip_displacement']['dz']) - cap['deflection_limit']) < 1e-6
+
+        r = resolve(params, lim['uplift'], ballast)
+        assert abs(r['reactions'][cap['governing_support']]) < 1e-6
+        assert min(r['reactions'].values()) > -1e-6
+
+def test_no_dead_load_lifts_immediately():
+    cap = rated_capacity({}, self_weight=False)
+    assert cap['limits']['uplift'] == 0.0
+    assert cap['governing'] == 'uplift'
+
+def test_load_chart():
+    lens, angles = [800.0, 1000.0, 1200.0, 1400.0], [0.0, 45.0, 90.0]
+    t0 = time.perf_counter()
+    serial = load_chart({}, lens, angles, ballast=300.0)
+    dt = time.perf_counter() - t0
+    print(f"{len(lens) * len(angles)} chart points in {dt * 1e3:.0f} ms")
+    assert len(serial['capacity']) == len(lens) and len(serial['capacity'][0]) == len(angles)
+    assert serial['capacity'][1][0] == rated_capacity({'arm_len': 1000.0, 'arm_angle': 0.0}, ballast=300.0)['capacity']
+    # Longer arms carry less
+    assert all(serial['capacity'][k][0] > serial['capacity'][k + 1][0] for k in range(len(lens) - 1))
+    with ProcessPoolExecutor(max_workers=2) as ex:
+        parallel = load_chart({}, lens, angles, executor=ex, workers=2, ballast=300.0)
+    assert parallel == serial
+
+def test_capacity_endpoints():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/capacity", json={"ballast": 300.0}).json()
+    assert r['capacity'] == rated_capacity({}, ballast=300.0)['capacity']
+    r = client.post("/capacity/chart", json={"arm_lens": [900.0, 1100.0], "arm_angles": [0.0, 30.0],
+                                             "ballast": 300.0}).json()
+    assert len(r['capacity']) == 2 and len(r['capacity'][0]) == 2
+    r = client.post("/capacity", json={"params": {"arm_len": 0.0}}).json()
+    assert 'error' in r
+
+if __name__ == "__main__":
+    test_limits_reproduce_on_resolve()
+    test_no_dead_load_lifts_immediately()
+    test_load_chart()
+    test_capacity_endpoints()
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_calc import calculate_crane
+from crane_encode import decode_binary, encode, msgpack, parse_fields, required_outputs
+from crane_solver import MEMBER_NAMES, NODE_NAMES, calculate_crane_numpy
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("max_stress, tip_displacement.dz") == {'max_stress': None, 'tip_displacement': ('dz',)}
+    assert parse_fields("reactions.FL,reactions.RR,reactions") == {'reactions': None}
+    for bad in ("stress", "tip_displacement.dx", "max_stress.x"):
+        try:
+            parse_fields(bad)
+        except ValueError as e:
+            print(f"[OK] {bad}: {e}")
+        else:
+            raise AssertionError(f"{bad} should be rejected")
+
+def test_projection_matches_full_result():
+    for engine in ('numpy', 'pynite'):
+        p = {'engine': engine, 'arm_angle': 135.0}
+        full = calculate_crane(p)
+        fields = parse_fields("tip_displacement.dz,max_stress,member_results.M_arm,reactions.FR")
+        r = calculate_crane(p, fields)
+        assert r == {'tip_displacement': {'dz': full['tip_displacement']['dz']}, 'max_stress': full['max_stress'],
+                     'member_results': {'M_arm': full['member_results']['M_arm']},
+                     'reactions': {'FR': full['reactions']['FR']}}
+
+def test_skipped_stages():
+    assert required_outputs(parse_fields("tip_displacement")) == ('displacements',)
+    r = calculate_crane_numpy({}, required_outputs(parse_fields("tip_displacement")))
+    assert 'member_results' not in r and 'reactions' not in r
+
+def test_binary_roundtrip():
+    full = calculate_crane({'engine': 'numpy'})
+    for dtype, tol in (('float64', 0.0), ('float32', 1e-6)):
+        body = encode(full, 'binary', dtype)
+        (n,) = np.frombuffer(body[:4], '<u4')
+        assert (4 + n) % 8 == 0
+        frame = decode_binary(body)
+        assert frame['names']['nodes'] == NODE_NAMES and frame['names']['members'] == MEMBER_NAMES
+        disp = frame['arrays']['node_displacements']
+        assert disp.shape == (len(NODE_NAMES), 3) and disp.dtype == np.dtype(dtype)
+        ref = np.array([[d['dx'], d['dy'], d['dz']] for d in full['node_displacements'].values()])
+        assert np.allclose(disp, ref, rtol=tol, atol=0.0)
+        stress = frame['arrays']['member_stress']
+        assert np.allclose(stress, [m['max_stress'] for m in full['member_results'].values()], rtol=tol, atol=0.0)
+        assert frame['scalars']['max_stress'] == full['max_stress']
+        assert frame['failures'] == full['failures']
+
+def test_calculate_endpoint_formats():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    body = {'engine': 'numpy', 'arm_angle': 40.0}
+    full = client.post("/calculate", json=body)
+    binary = client.post("/calculate?format=binary&dtype=float32", json=body)
+    columnar = client.post("/calculate?format=columnar", json=body)
+    small = client.post("/calculate?fields=tip_displacement.dz,max_stress", json=body)
+    print(f"json {len(full.content)} B, columnar {len(columnar.content)} B, "
+          f"binary/float32 {len(binary.content)} B, fields {len(small.content)} B")
+    assert binary.headers['content-type'] == 'application/octet-stream'
+    assert len(binary.content) < len(full.content) / 2
+    assert len(columnar.content) < len(full.content)
+    assert small.json() == {'tip_displacement': {'dz': full.json()['tip_displacement']['dz']},
+                            'max_stress': full.json()['max_stress']}
+    frame = decode_binary(binary.content)
+    assert abs(frame['arrays']['member_stress'].max() - full.json()['max_stress']) < 1e-4 * full.json()['max_stress']
+    assert json.loads(columnar.content)['arrays']['reactions'] == list(full.json()['reactions'].values())
+
+    r = client.post("/calculate?format=msgpack", json=body)
+    if msgpack is None:
+        assert 'msgpack' in r.json()['error']
+    else:
+        frame = msgpack.unpackb(r.content)
+        stress = np.frombuffer(frame['arrays']['member_stress']['data'], '<f8')
+        assert stress.max() == full.json()['max_stress']
+    assert 'error' in client.post("/calculate?format=xml", json=body).json()
+    assert 'error' in client.post("/calculate?fields=bogus", json=body).json()
+
+if __name__ == "__main__":
+    test_parse_fields()
+    test_projection_matches_full_result()
+    test_skipped_stages()
+    test_binary_roundtrip()
+    test_calculate_endpoint_formats()
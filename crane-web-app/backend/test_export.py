@@ -0,0 +1,188 @@
+import sys
+import os
+import json
+import struct
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import solve_batch_json
+from crane_export import (
+    DEFAULT_SIDES, export, frame_from_result, frame_mesh, frames_from_batch, load_frames, main, write_glb,
+    write_stl,
+)
+from crane_solver import calculate_crane_numpy
+
+P = {'arm_angle': 45.0, 'mass_tip': 100.0}
+
+def read_glb(data):
+    magic, version, length = struct.unpack_from('<4sII', data)
+    assert (magic, version, length) == (b'glTF', 2, len(data))
+    json_len, kind = struct.unpack_from('<I4s', data, 12)
+    assert kind == b'JSON' and json_len % 4 == 0
+    gltf = json.loads(data[20:20 + json_len])
+    bin_len, kind = struct.unpack_from('<I4s', data, 20 + json_len)
+    assert kind == b'BIN\0' and 28 + json_len + bin_len == len(data)
+    assert gltf['buffers'][0]['byteLength'] == bin_len
+    return gltf, data[28 + json_len:]
+
+def accessor_array(gltf, body, i):
+    a = gltf['accessors'][i]
+    v = gltf['bufferViews'][a['bufferView']]
+    dtype = {5126: np.float32, 5121: np.uint8, 5125: np.uint32}[a['componentType']]
+    width = {'SCALAR': 1, 'VEC3': 3, 'VEC4': 4}[a['type']]
+    assert v['byteOffset'] % 4 == 0
+    return np.frombuffer(body, dtype, a['count'] * width, v['byteOffset']).reshape(a['count'], width)
+
+def test_glb_single_frame():
+    result = calculate_crane_numpy(P)
+    frame = frame_from_result(result, P)
+    gltf, body = read_glb(write_glb([frame], scale=10.0))
+    prim = gltf['meshes'][0]['primitives'][0]
+    pos = accessor_array(gltf, body, prim['attributes']['POSITION'])
+    idx = accessor_array(gltf, body, prim['indices']).ravel()
+    acc = gltf['accessors'][prim['attributes']['POSITION']]
+    assert np.allclose(acc['min'], pos.min(axis=0)) and np.allclose(acc['max'], pos.max(axis=0))
+    assert idx.max() < len(pos) and len(idx) % 3 == 0
+    colors = accessor_array(gltf, body, prim['attributes']['COLOR_0'])
+    assert len(colors) == len(pos) and gltf['accessors'][prim['attributes']['COLOR_0']]['normalized']
+    assert 'animations' not in gltf and gltf['scenes'][0]['extras']['displacement_scale'] == 10.0
+    # The tip end cap sits on the scaled deformed tip node
+    topo = frame['topology']
+    tip = topo.coordinates(frame['params'])[topo.load_index] + 10.0 * frame['disp'][topo.load_index]
+    assert np.min(np.linalg.norm(pos - tip, axis=1)) < 1e-3
+
+def test_deformation_and_colors():
+    frame = frame_from_result(calculate_crane_numpy(P), P)
+    still, rgba, idx = frame_mesh(frame, 0.0)
+    bent, rgba_bent, idx_bent = frame_mesh(frame, 50.0)
+    assert still.dtype == np.float32 and rgba.dtype == np.uint8 and idx.dtype == np.uint32
+    assert np.array_equal(idx, idx_bent) and np.array_equal(rgba, rgba_bent)
+    assert np.abs(bent - still).max() > 1.0
+    # A tube around every sub-element: all side vertices at the pipe radius
+    # from the axis, every triangle facing outwards from it
+    a = still[2 * DEFAULT_SIDES::2 * DEFAULT_SIDES + 2]
+    ring = still.reshape(-1, 2 * DEFAULT_SIDES + 2, 3)[:, :DEFAULT_SIDES]
+    b = still[2 * DEFAULT_SIDES + 1::2 * DEFAULT_SIDES + 2]
+    u = (b - a) / np.linalg.norm(b - a, axis=1, keepdims=True)
+    radial = ring - a[:, None]
+    axial = np.einsum('skj,sj->sk', radial, u)
+    assert np.abs(axial).max() < 1e-3
+    assert np.allclose(np.linalg.norm(radial, axis=-1), frame['params']['pipe_od'] / 2.0, rtol=1e-5)
+    idx = idx.reshape(-1, 3).astype(np.int64)
+    seg = idx[:, 0] // (2 * DEFAULT_SIDES + 2)
+    n = np.cross(still[idx[:, 1]] - still[idx[:, 0]], still[idx[:, 2]] - still[idx[:, 0]])
+    centre = (a[seg] + b[seg]) / 2.0
+    outward = np.einsum('ij,ij->i', n, still[idx].mean(axis=1) - centre)
+    assert np.all(outward > 0.0)
+    # Utilization colours: the most utilized member is the reddest
+    util = frame['values']
+    hottest = colors_of(frame, rgba, int(np.nanargmax(util)))
+    coolest = colors_of(frame, rgba, int(np.nanargmin(util)))
+    assert hottest[0] > coolest[0] and hottest[2] < coolest[2]
+
+def colors_of(frame, rgba, member):
+    from crane_solver import split_members
+    topo = frame['topology']
+    _, elem_member = split_members(topo.coordinates(frame['params']), topo)
+    seg = int(np.flatnonzero(elem_member == member)[0])
+    return rgba[seg * (2 * DEFAULT_SIDES + 2)].astype(int)
+
+def test_stl():
+    frame = frame_from_result(calculate_crane_numpy(P), P)
+    data = write_stl(frame, scale=5.0, n_sides=8)
+    assert not data.startswith(b'solid')
+    n = struct.unpack_from('<I', data, 80)[0]
+    assert len(data) == 84 + 50 * n
+    assert n == len(frame_mesh(frame, 5.0, 8)[2]) // 3
+    normals = np.frombuffer(data, '<f4', count=3, offset=84)
+    assert abs(np.linalg.norm(normals) - 1.0) < 1e-5
+    attr = struct.unpack_from('<H', data, 84 + 48)[0]
+    assert attr & 0x8000
+    try:
+        export([frame, frame], 'stl')
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("several frames in one STL should be rejected")
+
+def test_batch_animation_without_solve():
+    angles = [0.0, 60.0, 120.0, 180.0]
+    batch = solve_batch_json({'arm_angle': angles, 'mass_tip': 80.0}, shapes=True)
+    assert len(batch['node_displacements'][0]) == 3 * len(batch['node_names'])
+    frames = frames_from_batch(batch)
+    assert [f['params']['arm_angle'] for f in frames] == angles
+    # The batch rows match the single-configuration solver
+    single = frame_from_result(calculate_crane_numpy({'arm_angle': 60.0, 'mass_tip': 80.0}),
+                               {'arm_angle': 60.0, 'mass_tip': 80.0})
+    assert np.allclose(frames[1]['disp'], single['disp'], rtol=1e-6, atol=1e-9)
+    gltf, body = read_glb(write_glb(frames, fps=4.0))
+    assert len(gltf['meshes']) == 4 and len(gltf['scenes'][0]['nodes']) == 1
+    # All frames share one index accessor
+    assert len({m['primitives'][0]['indices'] for m in gltf['meshes']}) == 1
+    anim = gltf['animations'][0]
+    assert len(anim['channels']) == 4 and all(s['interpolation'] == 'STEP' for s in anim['samplers'])
+    second = anim['samplers'][1]
+    times = accessor_array(gltf, body, second['input']).ravel()
+    shown = accessor_array(gltf, body, second['output'])[:, 0]
+    assert np.allclose(times, [0.0, 0.25, 0.5]) and np.allclose(shown, [0.0, 1.0, 0.0])
+    assert gltf['nodes'][0].get('scale') is None and gltf['nodes'][1]['scale'] == [0.0, 0.0, 0.0]
+    try:
+        frames_from_batch(solve_batch_json({'arm_angle': angles}))
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("a batch without shapes cannot be exported")
+
+def test_invalid_input():
+    result = calculate_crane_numpy(P)
+    try:
+        frame_from_result({'tip_displacement': result['tip_displacement']}, P)
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("a result without node displacements should be rejected")
+    frame = frame_from_result(result, P)
+    for kwargs in ({'fmt': 'obj'}, {'n_sides': 2}, {'fps': 0.0}):
+        try:
+            export([frame], **kwargs)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{kwargs} should be rejected")
+
+def test_cli(tmp_path=None):
+    import tempfile
+    d = tmp_path or tempfile.mkdtemp()
+    src = os.path.join(d, 'result.json')
+    with open(src, 'w') as fh:
+        json.dump([{'params': P, 'result': calculate_crane_numpy(P)},
+                   {'params': {}, 'result': calculate_crane_numpy({})}], fh)
+    main([src, os.path.join(d, 'out.glb'), '--scale', '20'])
+    with open(os.path.join(d, 'out.glb'), 'rb') as fh:
+        assert len(read_glb(fh.read())[0]['meshes']) == 2
+    main([src, os.path.join(d, 'out.stl')])
+    assert os.path.exists(os.path.join(d, 'out_0001.stl'))
+    with open(src) as fh:
+        assert len(load_frames(json.load(fh))) == 2
+
+def test_export_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/export", json={'frames': [{'params': dict(P, engine='numpy')}], 'scale': 10.0})
+    assert r.headers['content-type'] == 'model/gltf-binary', r.text
+    read_glb(r.content)
+    batch = client.post("/calculate/batch", json={'grid': {'arm_angle': [0.0, 90.0]}, 'include_shapes': True}).json()
+    r = client.post("/export?format=glb", json={'batch': batch})
+    assert len(read_glb(r.content)[0]['meshes']) == 2
+    r = client.post("/export?format=stl", json={'batch': batch})
+    assert 'error' in r.json()
+    assert 'error' in client.post("/export?format=obj", json={'batch': batch}).json()
+
+if __name__ == "__main__":
+    test_glb_single_frame()
+    test_deformation_and_colors()
+    test_stl()
+    test_batch_animation_without_solve()
+    test_invalid_input()
+    test_cli()
+    test_export_endpoint()
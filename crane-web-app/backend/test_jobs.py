@@ -0,0 +1,171 @@
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import expand_grid, solve_batch_json
+from crane_jobs import JobManager, main
+
+GRID = {'arm_len': [900.0, 1100.0, 1300.0, 1500.0], 'arm_angle': [0.0, 45.0, 90.0]}
+
+def finished(jobs, job_id, timeout=60.0):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        job = jobs.get(job_id, partial=False)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {job['status']} after {timeout} s")
+
+def test_sweep_matches_batch_and_partials():
+    paused = [True]
+    jobs = JobManager(tempfile.mkdtemp(), kind='thread', workers=1, busy=lambda: paused[0])
+    try:
+        job_id = jobs.submit('sweep', {'grid': GRID, 'chunk_size': 5})
+        time.sleep(0.1)
+        job = jobs.get(job_id)
+        # Interactive work in flight: nothing starts
+        assert job['status'] == 'queued' and job['progress'] == {'done': 0, 'total': 3, 'fraction': 0.0}
+        assert 'partial' not in job and jobs.stats()['paused'] > 0
+        paused[0] = False
+        result = finished(jobs, job_id)
+        assert result['status'] == 'done' and result['progress']['fraction'] == 1.0
+        done = jobs.get(job_id)['result']
+        expected = solve_batch_json(expand_grid(GRID))
+        assert done['row'] == list(range(12))
+        assert {k: v for k, v in done.items() if k != 'row'} == expected
+        # Partial results of a running job: the chunks finished so far
+        from crane_jobs import merge_sweep, plan_sweep, sweep_chunk
+        plan, _ = plan_sweep({'grid': GRID, 'chunk_size': 5})
+        partial = merge_sweep(plan, {2: sweep_chunk(plan, 2)})
+        assert partial['row'] == [10, 11] and partial['max_stress'] == expected['max_stress'][10:]
+    finally:
+        jobs.close()
+
+def test_priority_order():
+    paused = [True]
+    jobs = JobManager(tempfile.mkdtemp(), kind='thread', workers=1, busy=lambda: paused[0])
+    try:
+        low = jobs.submit('chart', {'arm_lens': [1000.0, 1200.0], 'arm_angles': [0.0, 90.0]})
+        high = jobs.submit('reliability', {'n_samples': 5000}, priority=10)
+        time.sleep(0.1)
+        paused[0] = False
+        low_job, high_job = finished(jobs, low), finished(jobs, high)
+        print(low_job, high_job)
+        assert high_job['finished'] <= low_job['started']
+        chart = jobs.get(low)['result']
+        assert chart['arm_len'] == [1000.0, 1200.0] and len(chart['capacity'][0]) == 2
+        assert jobs.get(high)['result']['n_samples'] == 5000
+    finally:
+        jobs.close()
+
+def test_resume_after_restart():
+    d = tempfile.mkdtemp()
+    spec = {'grid': dict(GRID, t_wall=[2.0, 2.4, 2.8, 3.2]), 'chunk_size': 1}
+    first = JobManager(d, kind='thread', workers=1)
+    job_id = first.submit('sweep', spec)
+    t0 = time.time()
+    while first.get(job_id, partial=False)['progress']['done'] < 2 and time.time() - t0 < 30:
+        time.sleep(0.005)
+    first.close()  # server shutdown mid-job
+    job = first.get(job_id)
+    assert job['status'] == 'running' and 2 <= job['progress']['done'] < 48
+    assert job['partial']['n'] == job['progress']['done']
+    second = JobManager(d, kind='thread', workers=2)
+    try:
+        second.start()
+        assert finished(second, job_id)['status'] == 'done'
+        done = second.get(job_id)
+        assert done['resumed'] == 1
+        assert done['result']['max_stress'] == solve_batch_json(expand_grid(spec['grid']))['max_stress']
+    finally:
+        second.close()
+
+def test_cancel_failure_and_validation():
+    paused = [True]
+    jobs = JobManager(tempfile.mkdtemp(), kind='thread', workers=1, busy=lambda: paused[0])
+    try:
+        job_id = jobs.submit('sweep', {'grid': GRID})
+        assert jobs.cancel(job_id)['status'] == 'cancelled'
+        assert jobs.cancel(job_id)['status'] == 'cancelled'  # idempotent
+        bad = jobs.submit('optimize', {'variables': {'mass_tip': [1.0, 2.0]}})
+        paused[0] = False
+        failed = finished(jobs, bad)
+        print(failed['error'])
+        assert failed['status'] == 'failed' and failed['error']
+        assert jobs.get(job_id)['progress']['done'] == 0
+        assert [j['status'] for j in jobs.list()] == ['failed', 'cancelled']
+        assert [j['id'] for j in jobs.list('cancelled')] == [job_id]
+        for kind, spec in (('bogus', {}), ('sweep', {'grid': {'bogus': [1.0]}}), ('reliability', {'n_samples': 0}),
+                           ('chart', {'arm_lens': []})):
+            try:
+                jobs.submit(kind, spec)
+            except ValueError as e:
+                print(f"[OK] {e}")
+            else:
+                raise AssertionError(f"{kind} {spec} should be rejected")
+        try:
+            jobs.get('missing')
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("unknown job id")
+        assert main([jobs.path, 'show', job_id]) == 0 and main([jobs.path, 'cancel', 'missing']) == 1
+    finally:
+        jobs.close()
+
+def test_process_workers():
+    jobs = JobManager(tempfile.mkdtemp(), kind='process', workers=2)
+    try:
+        job_id = jobs.submit('reliability', {'n_samples': 10000, 'seed': 3})
+        assert finished(jobs, job_id)['status'] == 'done'
+        from crane_reliability import run_reliability
+        assert jobs.get(job_id)['result'] == run_reliability({}, n_samples=10000, seed=3)
+        assert jobs.stats()['dispatcher'] is True
+    finally:
+        jobs.close()
+
+def test_endpoints():
+    from fastapi.testclient import TestClient
+    import main as app_module
+    client = TestClient(app_module.app)
+    saved = app_module.job_manager
+    app_module.job_manager = None
+    try:
+        r = client.post("/jobs", json={'kind': 'sweep'})
+        assert r.status_code == 200 and 'disabled' in r.json()['error']
+        app_module.job_manager = JobManager(tempfile.mkdtemp(), kind='thread', workers=2)
+        r = client.post("/jobs", json={'kind': 'sweep', 'spec': {'grid': GRID, 'base': {'mass_tip': 80.0}}})
+        assert r.status_code == 202
+        job_id = r.json()['id']
+        assert r.json()['status'] in ('queued', 'running')
+        finished(app_module.job_manager, job_id)
+        job = client.get(f"/jobs/{job_id}").json()
+        assert job['status'] == 'done' and job['result']['n'] == 12
+        assert job['result']['params']['mass_tip'] == [80.0] * 12
+        assert client.get(f"/jobs/{job_id}?partial=false").json()['result'] == job['result']
+        assert client.get("/jobs").json()['jobs'][0]['id'] == job_id
+        assert client.get("/jobs/stats").json()['jobs']['done'] == 1
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.delete("/jobs/missing").status_code == 404
+        r = client.post("/jobs", json={'kind': 'optimize', 'priority': -1, 'spec': {'max_iter': 5}}).json()
+        assert client.delete(f"/jobs/{r['id']}").json()['status'] in ('cancelled', 'done')
+        # Only a submitted job is 202 Accepted; rejected ones are 200 with an error like other endpoints
+        r = client.post("/jobs", json={'kind': 'nope'})
+        assert r.status_code == 200 and 'Unknown job kind' in r.json()['error']
+        r = client.post("/jobs", json={'kind': 'reliability', 'spec': {'n_samples': 0}})
+        assert r.status_code == 200 and 'error' in r.json()
+        r = client.post("/jobs", json={'kind': 'sweep', 'spec': {'grid': {'bogus': [1.0]}}})
+        assert r.status_code == 200 and 'bogus' in r.json()['error']
+    finally:
+        if app_module.job_manager is not None:
+            app_module.job_manager.close()
+        app_module.job_manager = saved
+
+if __name__ == "__main__":
+    test_sweep_matches_batch_and_partials()
+    test_priority_order()
+    test_resume_after_restart()
+    test_cancel_failure_and_validation()
+    test_process_workers()
+    test_endpoints()
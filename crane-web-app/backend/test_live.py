@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_cache import ResultCache
+from crane_calc import calculate_crane
+from crane_live import LiveChannel
+
+def test_only_latest_is_answered():
+    async def run():
+        started, replies = [], []
+
+        async def solve(params):
+            started.append(params['arm_angle'])
+            await asyncio.sleep(0.05)
+            return {'arm_angle': params['arm_angle']}
+
+        async def send(reply):
+            replies.append(reply)
+
+        channel = LiveChannel(solve, send)
+        runner = asyncio.create_task(channel.run())
+        for seq in range(1, 21):
+            channel.submit(seq, {'arm_angle': float(seq)})
+            await asyncio.sleep(0.01)  # a drag: updates faster than solves
+        channel.submit(3, {'arm_angle': 3.0})  # late out-of-order update
+        await asyncio.sleep(0.2)
+        channel.close()
+        await runner
+        return started, replies, channel.stats()
+
+    started, replies, stats = asyncio.run(run())
+    print(f"started {started}, replies {[r['seq'] for r in replies]}, stats {stats}")
+    assert replies[-1]['seq'] == 20 and replies[-1]['result'] == {'arm_angle': 20.0}
+    seqs = [r['seq'] for r in replies]
+    assert seqs == sorted(seqs) and len(replies) < 5
+    assert stats['cancelled'] > 0
+    assert stats['received'] == 21 and stats['answered'] + stats['superseded'] == 21
+
+def test_errors_are_answered():
+    async def run():
+        replies = []
+
+        async def solve(params):
+            raise ValueError("Zero-length member: M_arm")
+
+        async def send(reply):
+            replies.append(reply)
+
+        channel = LiveChannel(solve, send)
+        runner = asyncio.create_task(channel.run())
+        channel.submit(7, {})
+        await asyncio.sleep(0.01)
+        channel.close()
+        await runner
+        return replies
+
+    assert asyncio.run(run()) == [{'seq': 7, 'superseded': 0, 'error': "Zero-length member: M_arm"}]
+
+def test_cancelled_leader_hands_over():
+    cache = ResultCache()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return 'value'
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == 'value'
+
+def test_websocket_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    with client.websocket_connect("/ws/calculate") as ws:
+        for seq in range(1, 31):
+            ws.send_json({'seq': seq, 'params': {'engine': 'numpy', 'arm_angle': 6.0 * seq}})
+        replies = []
+        while not replies or replies[-1]['seq'] != 30:
+            replies.append(ws.receive_json())
+        print(f"30 updates -> replies for seq {[r['seq'] for r in replies]}")
+        assert [r['seq'] for r in replies] == sorted(r['seq'] for r in replies)
+        ref = calculate_crane({'engine': 'numpy', 'arm_angle': 180.0})
+        assert abs(replies[-1]['result']['max_stress'] - ref['max_stress']) < 1e-9
+
+        ws.send_text("not json")
+        assert 'error' in ws.receive_json()
+        ws.send_json({'seq': 31, 'params': {'arm_len': 'long'}})
+        reply = ws.receive_json()
+        assert reply['seq'] == 31 and 'error' in reply
+
+if __name__ == "__main__":
+    test_only_latest_is_answered()
+    test_errors_are_answered()
+    test_cancelled_leader_hands_over()
+    test_websocket_endpoint()
@@ -0,0 +1,124 @@
+import sys
+import os
+import io
+import contextlib
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Pynite import FEModel3D
+from crane_loads import calculate_load_cases
+from crane_solver import (
+    DENSITY, E_MODULUS, G_MODULUS, GRAVITY, MEMBERS, NODE_NAMES, POISSON, SUPPORT_NODES,
+    node_coordinates, section_properties, with_defaults,
+)
+
+CASES = [
+    {'name': 'hoist', 'hoist': 1.0},
+    {'name': 'self', 'self_weight': 1.0},
+    {'name': 'wind', 'member_loads': [
+        {'member': m, 'direction': 'FY', 'w': 0.5} for m in ('M_mast_1', 'M_mast_2', 'M_mast_3')
+    ] + [{'member': 'M_arm', 'direction': 'FX', 'w': 0.3}]},
+    {'name': 'side', 'nodal_loads': [{'node': 'A_tip', 'direction': 'FY', 'magnitude': 50.0}]},
+]
+COMBOS = {
+    'C1': {'hoist': 1.0, 'self': 1.0},
+    'C2': {'hoist': 1.25, 'self': 1.0, 'wind': 1.0},
+    'C3': {'hoist': 1.0, 'self': 1.0, 'side': 1.0, 'wind': -1.0},
+}
+
+def pynite_reference(params, cases, combos):
+    # Same loads applied through PyNite, one FEModel3D for all combos
+    p = with_defaults(params)
+    xyz = node_coordinates(p)
+    R, A, I, J = (float(v) for v in section_properties(p['pipe_od'], p['t_wall']))
+    model = FEModel3D()
+    model.add_material('Steel', E_MODULUS, G_MODULUS, POISSON, DENSITY)
+    model.add_section('Pipe', A=A, Iy=I, Iz=I, J=J)
+    for i, n in enumerate(NODE_NAMES):
+        model.add_node(n, *(float(c) for c in xyz[i]))
+    for name, ni, nj in MEMBERS:
+        model.add_member(name, ni, nj, 'Steel', 'Pipe')
+    for n in SUPPORT_NODES:
+        model.def_support(n, True, True, True, False, False, False)
+    for c in cases:
+        if c.get('hoist'):
+            model.add_node_load('A_tip', 'FZ', -p['mass_tip'] * GRAVITY * c['hoist'], c['name'])
+        for l in c.get('nodal_loads', []):
+            model.add_node_load(l['node'], l['direction'], l['magnitude'], c['name'])
+        for l in c.get('member_loads', []):
+            model.add_member_dist_load(l['member'], l['direction'], l['w'], l['w'], case=c['name'])
+        if c.get('self_weight'):
+            w = -DENSITY * A * GRAVITY * c['self_weight']
+            for name, _, _ in MEMBERS:
+                model.add_member_dist_load(name, 'FZ', w, w, case=c['name'])
+    for name, factors in combos.items():
+        model.add_load_combo(name, factors)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.analyze()
+
+    out = {}
+    for k in combos:
+        stress = {}
+        for name, member in model.members.items():
+            mz = max(abs(member.min_moment('Mz', k)), abs(member.max_moment('Mz', k)))
+            my = max(abs(member.min_moment('My', k)), abs(member.max_moment('My', k)))
+            stress[name] = max(mz, my) * R / I
+        out[k] = {
+            'dz': model.nodes['A_tip'].DZ[k],
+            'stress': stress,
+            'reactions': {n: (model.nodes[n].RxnFX[k], model.nodes[n].RxnFY[k], model.nodes[n].RxnFZ[k])
+                          for n in SUPPORT_NODES},
+        }
+    return out
+
+def test_load_cases_match_pynite():
+    print("--- Multi-load-case NumPy vs PyNite ---")
+    for params in ({}, {'arm_angle': 60.0, 'arm_len': 1200.0}):
+        ref = pynite_reference(params, CASES, COMBOS)
+        res = calculate_load_cases(params, CASES, COMBOS)
+        for k in COMBOS:
+            r, f = res['combos'][k], ref[k]
+            assert abs(r['tip_displacement']['dz'] - f['dz']) < 1e-6
+            for m, s in f['stress'].items():
+                assert abs(r['member_results'][m]['max_stress'] - s) < 1e-6
+            for n, (fx, fy, fz) in f['reactions'].items():
+                rf = r['reaction_forces'][n]
+                assert max(abs(rf['fx'] - fx), abs(rf['fy'] - fy), abs(rf['fz'] - fz)) < 1e-5
+            print(f"{params} {k}: dz {r['tip_displacement']['dz']:.3f}, stress {r['max_stress']:.2f} [OK]")
+    env = res['envelope']
+    print(f"Envelope: max stress {env['max_stress']}, tip dz min {env['tip_dz_min']}")
+    assert env['max_stress']['value'] == max(c['max_stress'] for c in res['combos'].values())
+
+def test_default_case_matches_single_solve():
+    from crane_solver import calculate_crane_numpy
+    res = calculate_load_cases({'arm_angle': 30.0})
+    single = calculate_crane_numpy({'arm_angle': 30.0})
+    combo = res['combos']['DL']
+    assert abs(combo['tip_displacement']['dz'] - single['tip_displacement']['dz']) < 1e-9
+    assert abs(combo['max_stress'] - single['max_stress']) < 1e-9
+
+def test_unknown_names_are_rejected():
+    for cases, combos in (([{'name': 'x', 'nodal_loads': [{'node': 'Nope', 'direction': 'FX', 'magnitude': 1.0}]}], None),
+                          ([{'name': 'x', 'hoist': 1.0}], {'C': {'y': 1.0}})):
+        try:
+            calculate_load_cases({}, cases, combos)
+        except ValueError as e:
+            print(f"[OK] rejected: {e}")
+        else:
+            raise AssertionError("invalid load definition was accepted")
+
+def test_loads_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate/loads", json={
+        "params": {"arm_angle": 90.0},
+        "load_cases": CASES,
+        "combos": COMBOS,
+    }).json()
+    assert set(r['combos']) == set(COMBOS)
+    assert r['envelope']['max_stress']['combo'] in COMBOS
+
+if __name__ == "__main__":
+    test_load_cases_match_pynite()
+    test_default_case_matches_single_solve()
+    test_unknown_names_are_rejected()
+    test_loads_endpoint()
@@ -0,0 +1,93 @@
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import crane_metrics
+from crane_calc import calculate_crane
+from crane_metrics import StackSampler, phase, timed_call
+
+def parse_server_timing(header):
+    out = {}
+    for part in header.split(', '):
+        name, _, rest = part.partition(';')
+        out[name] = float(rest[4:]) if rest.startswith('dur=') else rest[6:-1]
+    return out
+
+def test_phases_outside_a_request_are_free():
+    with phase('analyze'):
+        pass
+    result, phases, profile = timed_call(calculate_crane, {'engine': 'pynite'})
+    assert [name for name, _ in phases] == ['build', 'analyze', 'extract', 'project']
+    assert profile is None and 'max_stress' in result
+    _, phases, _ = timed_call(calculate_crane, {'engine': 'numpy'})
+    assert [name for name, _ in phases] == ['analyze', 'project']
+
+def test_server_timing_header():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    body = {'engine': 'pynite', 'arm_angle': 17.0}
+    miss = parse_server_timing(client.post("/calculate", json=body).headers['server-timing'])
+    print(miss)
+    assert miss['cache'] == 'miss'
+    for name in ('parse', 'pool', 'build', 'analyze', 'extract', 'encode', 'total'):
+        assert miss[name] >= 0.0
+    assert miss['total'] >= miss['analyze'] + miss['build']
+    hit = parse_server_timing(client.post("/calculate", json=body).headers['server-timing'])
+    assert hit['cache'] == 'hit' and 'analyze' not in hit
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    client.post("/calculate", json={'engine': 'numpy', 'arm_angle': 23.0})
+    client.post("/calculate", json={'engine': 'numpy', 'arm_len': 0.0})
+    text = client.get("/metrics").text
+    lines = {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if not line.startswith('#')}
+    assert lines['crane_http_requests_total{method="POST",route="/calculate",status="200"}'] >= 2
+    assert lines['crane_solver_failures_total{route="/calculate",error="ValueError"}'] >= 1
+    key = 'crane_phase_duration_seconds_count{route="/calculate",engine="numpy",phase="analyze"}'
+    assert lines[key] >= 1
+    assert lines[key.replace('_count', '_bucket').replace('}', ',le="+Inf"}')] == lines[key]
+    assert 'crane_cache_hits_total' in lines and 'crane_pool_workers' in lines
+    assert '# TYPE crane_phase_duration_seconds histogram' in text
+
+def busy_loop(seconds):
+    t_end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < t_end:
+        n += 1
+    return n
+
+def test_slow_solves_are_profiled():
+    directory = tempfile.mkdtemp()
+    saved = crane_metrics.PROFILE_SLOW_MS, crane_metrics.PROFILE_DIR
+    crane_metrics.PROFILE_SLOW_MS, crane_metrics.PROFILE_DIR = 50.0, directory
+    try:
+        _, _, fast = timed_call(busy_loop, 0.0)
+        _, _, slow = timed_call(busy_loop, 0.2)
+    finally:
+        crane_metrics.PROFILE_SLOW_MS, crane_metrics.PROFILE_DIR = saved
+    assert fast is None
+    assert os.path.dirname(slow) == directory
+    with open(slow) as fh:
+        folded = fh.read().splitlines()
+    print(f"{os.path.basename(slow)}: {folded[0]}")
+    stack, count = folded[0].rsplit(' ', 1)
+    assert 'busy_loop (test_metrics.py' in stack and int(count) > 5
+
+def test_sampler_counts():
+    # The sampler needs the GIL, so it runs at most once per switch interval (5 ms)
+    sampler = StackSampler(interval=1.0).start()
+    busy_loop(0.1)
+    stacks = sampler.stop()
+    assert sum(stacks.values()) >= 5
+    assert 'busy_loop' in stacks.most_common(1)[0][0]
+
+if __name__ == "__main__":
+    test_phases_outside_a_request_are_free()
+    test_server_timing_header()
+    test_metrics_endpoint()
+    test_slow_solves_are_profiled()
+    test_sampler_counts()
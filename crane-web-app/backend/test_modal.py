@@ -0,0 +1,91 @@
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_modal import local_mass, modal_analysis, modal_matrices
+from crane_solver import DENSITY, build_model, solve_static
+
+def test_element_mass():
+    for kind in ('consistent', 'lumped'):
+        m = local_mass(300.0, 350.0, 1e5, kind)
+        assert np.allclose(m, m.T) and np.linalg.eigvalsh(m).min() > 0.0
+        for d in range(3):
+            r = np.zeros(12)
+            r[[d, d + 6]] = 1.0
+            assert abs(r @ m @ r - DENSITY * 350.0 * 300.0) < 1e-12
+
+def test_shift_invert_matches_dense():
+    from scipy.linalg import eigh
+    mats = modal_matrices({'arm_angle': 60.0}, n_div=4)
+    f = mats['free']
+    lam = eigh(mats['K'][f][:, f].toarray(), mats['M'][f][:, f].toarray(), eigvals_only=True)[:8]
+    r = modal_analysis({'arm_angle': 60.0}, n_modes=8, n_div=4)
+    assert r['solver'] == 'shift-invert'
+    dense = np.sqrt(lam * 1000.0) / (2.0 * np.pi)
+    print([round(m['frequency_hz'], 4) for m in r['modes']])
+    assert np.allclose([m['frequency_hz'] for m in r['modes']], dense, rtol=1e-7)
+
+def test_heavy_tip_mass_matches_condensed_flexibility():
+    # With the hoisted mass dominating, the three lowest modes are those of a
+    # point mass on the frame's static tip flexibility
+    p = {'arm_angle': 30.0, 'mass_tip': 20000.0}
+    model = build_model(p)
+    tip = 6 * model['topology'].load_index
+    F = np.zeros((3, model['topology'].n_dof))
+    F[[0, 1, 2], tip + np.arange(3)] = 1.0
+    C = solve_static(model, F)[:, tip:tip + 3]
+    expected = np.sqrt(np.linalg.eigvalsh(np.linalg.inv(C)) / p['mass_tip'] * 1000.0) / (2.0 * np.pi)
+    r = modal_analysis(p, n_modes=3)
+    got = [m['frequency_hz'] for m in r['modes']]
+    print(got, expected)
+    assert np.allclose(got, expected, rtol=2e-3)
+    assert sum(r['cumulative_participation'].values()) > 2.9
+
+def test_mass_matrices_converge():
+    lumped = modal_analysis({}, n_modes=3, mass='lumped', n_div=12)
+    consistent = modal_analysis({}, n_modes=3, mass='consistent', n_div=12)
+    for a, b in zip(lumped['modes'], consistent['modes']):
+        assert abs(a['frequency_hz'] - b['frequency_hz']) < 1e-3 * b['frequency_hz']
+    assert lumped['frame_mass'] == consistent['frame_mass']
+
+def test_modes_and_shapes():
+    r = modal_analysis({'mass_tip': 50.0})
+    empty = modal_analysis({'mass_tip': 50.0}, include_tip_mass=False)
+    assert r['modes'][0]['frequency_hz'] < empty['modes'][0]['frequency_hz']
+    freqs = [m['frequency_hz'] for m in r['modes']]
+    assert freqs == sorted(freqs) and len(freqs) == 6
+    first = r['modes'][0]
+    assert abs(first['period_s'] * first['frequency_hz'] - 1.0) < 1e-12
+    shape = first['node_displacements']
+    assert set(shape) == set(build_model({})['topology'].node_names)
+    assert shape['FL'] == {'dx': 0.0, 'dy': 0.0, 'dz': 0.0}
+    assert max(abs(v) for d in shape.values() for v in d.values()) <= 1.0 + 1e-12
+    # Shift: the modes nearest 40 Hz
+    near = modal_analysis({'mass_tip': 50.0}, n_modes=2, shift_hz=40.0)
+    assert all(abs(m['frequency_hz'] - 40.0) < abs(freqs[0] - 40.0) for m in near['modes'])
+
+def test_invalid_options():
+    for kwargs in ({'n_modes': 0}, {'mass': 'diagonal'}, {'n_div': 0}, {'shift_hz': -1.0}):
+        try:
+            modal_analysis({}, **kwargs)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{kwargs} should be rejected")
+
+def test_modal_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/modal", json={'params': {'arm_angle': 90.0}, 'n_modes': 4}).json()
+    assert len(r['modes']) == 4 and 'A_tip' in r['modes'][0]['node_displacements'], r
+    assert 'error' in client.post("/modal", json={'mass': 'diagonal'}).json()
+
+if __name__ == "__main__":
+    test_element_mass()
+    test_shift_invert_matches_dense()
+    test_heavy_tip_mass_matches_condensed_flexibility()
+    test_mass_matrices_converge()
+    test_modes_and_shapes()
+    test_invalid_options()
+    test_modal_endpoint()
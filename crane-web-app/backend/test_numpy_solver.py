@@ -0,0 +1,74 @@
+import sys
+import os
+import io
+import time
+import contextlib
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_calc import calculate_crane
+
+CASES = [
+    {},
+    {'arm_angle': 45.0, 'arm_len': 1300.0, 'mass_tip': 80.0},
+    {'arm_angle': 270.0, 't_wall': 1.8},
+    {'arm_angle': 0.0, 'base_len': 1200.0, 'base_wid': 500.0},
+    # Brace above the tripod attachment: different member subdivision on the mast
+    {'tripod_attach_height': 700.0, 'brace_mast_height': 1200.0},
+    {'mass_tip': 400.0, 'yield_stress': 235.0},
+]
+
+def run_pynite(params):
+    # PyNite prints the statics check table; keep the test output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return calculate_crane(dict(params, engine='pynite'))
+
+def max_diff(a, b):
+    diffs = [abs(a['tip_displacement']['dz'] - b['tip_displacement']['dz']),
+             abs(a['max_stress'] - b['max_stress'])]
+    for n, d in a['node_displacements'].items():
+        diffs += [abs(d[k] - b['node_displacements'][n][k]) for k in ('dx', 'dy', 'dz')]
+    for m, r in a['member_results'].items():
+        diffs += [abs(r['max_stress'] - b['member_results'][m]['max_stress'])]
+    for n, rz in a['reactions'].items():
+        diffs += [abs(rz - b['reactions'][n]) * 1e-3]
+    return max(diffs)
+
+def test_numpy_matches_pynite():
+    print("--- NumPy engine vs PyNite ---")
+    for params in CASES:
+        ref = run_pynite(params)
+        res = calculate_crane(dict(params, engine='numpy'))
+        err = max_diff(ref, res)
+        print(f"{params}: max diff {err:.2e}, failures {res['failures']}")
+        assert err < 1e-6
+        assert res['failures'] == ref['failures']
+        assert list(res['node_displacements']) == list(ref['node_displacements'])
+        assert list(res['member_results']) == list(ref['member_results'])
+
+def test_numpy_rejects_degenerate_geometry():
+    try:
+        calculate_crane({'engine': 'numpy', 'arm_len': 0.0})
+    except ValueError as e:
+        print(f"[OK] Degenerate geometry rejected: {e}")
+    else:
+        raise AssertionError("Zero-length arm was not rejected")
+
+def test_numpy_speed():
+    n = 200
+    t0 = time.perf_counter()
+    for _ in range(n):
+        calculate_crane({'engine': 'numpy'})
+    t_numpy = (time.perf_counter() - t0) / n
+
+    t0 = time.perf_counter()
+    for _ in range(5):
+        run_pynite({})
+    t_pynite = (time.perf_counter() - t0) / 5
+
+    print(f"NumPy: {t_numpy * 1e6:.0f} us/solve, PyNite: {t_pynite * 1e3:.1f} ms/solve "
+          f"({t_pynite / t_numpy:.0f}x)")
+    assert t_numpy < t_pynite
+
+if __name__ == "__main__":
+    test_numpy_matches_pynite()
+    test_numpy_rejects_degenerate_geometry()
+    test_numpy_speed()
@@ -0,0 +1,82 @@
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_optimize import DEFAULT_VARIABLES, evaluate, optimize_crane
+from crane_solver import DEFAULT_PARAMS, calculate_crane_numpy
+
+def test_adjoint_gradients_match_finite_differences():
+    print("--- Adjoint sensitivities vs re-solved central differences ---")
+    names = list(DEFAULT_VARIABLES)
+    for p in ({'arm_angle': 135.0}, {'arm_angle': 40.0, 'pipe_od': 60.0, 't_wall': 3.0}):
+        r = evaluate(p, names)
+        for g in ('mass', 'stress', 'deflection'):
+            fd = []
+            for k in names:
+                x = p.get(k, DEFAULT_PARAMS[k])
+                h = 1e-5 * x
+                fd.append((evaluate(dict(p, **{k: x + h}), names, gradients=False)[g]
+                           - evaluate(dict(p, **{k: x - h}), names, gradients=False)[g]) / (2.0 * h))
+            err = np.abs(r[f'grad_{g}'] - fd).max() / np.abs(fd).max()
+            print(f"{g:<10} {np.round(r[f'grad_{g}'], 6)}  rel. error {err:.1e}")
+            assert err < 1e-5
+
+def test_responses_match_analysis():
+    p = {'arm_angle': 90.0, 'mass_tip': 80.0}
+    r = evaluate(p, [], gradients=False)
+    full = calculate_crane_numpy(p)
+    assert abs(r['tip_dz'] - full['tip_displacement']['dz']) < 1e-9
+    assert abs(r['max_utilization'] - full['max_utilization']) < 1e-12
+    # KS is an upper bound of the largest station utilization
+    assert r['stress'] + 1.0 >= r['max_utilization']
+
+def test_stress_governed_optimum():
+    res = optimize_crane({'arm_angle': 135.0, 'mass_tip': 100.0}, deflection_limit=1e4)
+    opt = res['optimum']
+    print(f"{res['message']}: {res['iterations']} iterations, mass {res['initial']['mass']:.2f} -> {opt['mass']:.2f} kg, "
+          f"active {res['active_constraints']}")
+    assert res['success'] and opt['mass'] < res['initial']['mass']
+    assert 0.95 < opt['max_utilization'] <= 1.0 + 1e-6
+    assert {'type': 'stress', 'member': opt['governing_member']}.items() <= res['active_constraints'][0].items()
+    # The optimum is feasible when re-analyzed from its parameters
+    check = calculate_crane_numpy(opt['params'])
+    assert check['max_utilization'] <= 1.0 + 1e-6
+    # History starts at the initial design and ends at the optimum
+    assert res['history'][0]['design'] == res['initial']['design']
+    assert res['history'][-1]['design'] == opt['design']
+    assert len(res['history']) >= res['iterations']
+
+def test_deflection_and_bounds_active():
+    res = optimize_crane({'mass_tip': 100.0}, variables={'pipe_od': None, 't_wall': [1.5, 4.0]}, deflection_limit=30.0)
+    types = {(a['type'], a.get('param')) for a in res['active_constraints']}
+    print(res['active_constraints'])
+    assert res['success'] and ('deflection', None) in types and ('bound', 't_wall') in types
+    assert abs(res['optimum']['tip_deflection'] - 30.0) < 1e-3
+    assert set(res['optimum']['design']) == {'pipe_od', 't_wall'}
+
+def test_invalid_variables():
+    for variables in ({'mass_tip': [10.0, 20.0]}, {'bogus': [0.0, 1.0]}, {'t_wall': [3.0, 2.0]}):
+        try:
+            optimize_crane({}, variables=variables)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{variables} should be rejected")
+
+def test_optimize_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/optimize", json={'params': {'arm_angle': 135.0}, 'variables': {'pipe_od': None, 't_wall': None}})
+    body = r.json()
+    assert r.status_code == 200 and body['success'], body
+    assert body['optimum']['mass'] < body['initial']['mass']
+    assert 'error' in client.post("/optimize", json={'variables': {'bogus': [0.0, 1.0]}}).json()
+
+if __name__ == "__main__":
+    test_adjoint_gradients_match_finite_differences()
+    test_responses_match_analysis()
+    test_stress_governed_optimum()
+    test_deflection_and_bounds_active()
+    test_invalid_variables()
+    test_optimize_endpoint()
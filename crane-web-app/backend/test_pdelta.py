@@ -0,0 +1,143 @@
+import sys
+import os
+import contextlib
+import io
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_cache import cache_key
+from crane_calc import calculate_crane
+from crane_pdelta import calculate_crane_pdelta, local_geometric_stiffness
+from crane_solver import calculate_crane_numpy
+
+SLENDER = {'arm_angle': 90.0, 'mass_tip': 400.0, 'pipe_od': 34.0, 't_wall': 2.0}
+
+def test_geometric_stiffness():
+    kg = local_geometric_stiffness(500.0, -1e4, 300.0)
+    assert np.allclose(kg, kg.T)
+    # Rigid translations carry no geometric force
+    for d in range(3):
+        r = np.zeros(12)
+        r[[d, d + 6]] = 1.0
+        assert np.allclose(kg @ r, 0.0)
+    # Compression softens a transverse sway, tension stiffens it
+    sway = np.zeros(12)
+    sway[7] = 1.0
+    assert sway @ kg @ sway < 0.0 < sway @ local_geometric_stiffness(500.0, 1e4, 300.0) @ sway
+
+def test_amplification_and_pynite():
+    p = {'arm_angle': 0.0, 'mass_tip': 150.0}
+    r = calculate_crane_pdelta(p)
+    lin = calculate_crane_numpy(p)
+    info = r['p_delta']
+    print(info)
+    assert abs(info['tip_displacement_linear']['dz'] - lin['tip_displacement']['dz']) < 1e-9
+    assert info['amplification'] > 1.0 and info['moment_amplification'] > 1.0
+    assert info['iterations'] <= 8
+    # Sway amplification close to the classic 1 / (1 - 1 / lambda_cr)
+    assert abs(info['amplification'] - 1.0 / (1.0 - 1.0 / info['critical_load_factor'])) < 5e-3
+    # Pynite's P-Delta (one step with the linear axial forces) agrees closely
+    with contextlib.redirect_stdout(io.StringIO()):
+        q = calculate_crane(dict(p, engine='pynite', analysis='p_delta'))
+    assert abs(r['tip_displacement']['dz'] - q['tip_displacement']['dz']) < 1e-4 * abs(q['tip_displacement']['dz'])
+    assert abs(r['max_utilization'] - q['max_utilization']) < 1e-4
+    for s in r['reactions']:
+        assert abs(r['reactions'][s] - q['reactions'][s]) < 1e-3
+    # Both engines report the same amplification block
+    for key in ('amplification', 'moment_amplification'):
+        assert abs(info[key] - q['p_delta'][key]) < 1e-4, key
+    assert abs(q['p_delta']['tip_displacement_linear']['dz'] - lin['tip_displacement']['dz']) < 1e-6 * abs(
+        lin['tip_displacement']['dz'])
+    assert q['p_delta']['amplification'] > 1.0
+
+def test_near_critical_and_buckling():
+    r = calculate_crane_pdelta(SLENDER)
+    info = r['p_delta']
+    print(info)
+    assert 1.0 < info['critical_load_factor'] < 1.2 and info['amplification'] > 1.05
+    assert info['iterations'] <= 15
+    try:
+        calculate_crane_pdelta(dict(SLENDER, mass_tip=500.0))
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("a load above the critical load should be rejected")
+
+def test_member_subdivision():
+    coarse = calculate_crane_pdelta(SLENDER, n_div=1)
+    fine = calculate_crane_pdelta(SLENDER, n_div=4)
+    finer = calculate_crane_pdelta(SLENDER, n_div=10)
+    # P-delta along members adds a little; the result converges with subdivision
+    assert abs(fine['tip_displacement']['dz']) > abs(coarse['tip_displacement']['dz'])
+    assert abs(fine['tip_displacement']['dz'] - finer['tip_displacement']['dz']) < 1e-4 * abs(finer['tip_displacement']['dz'])
+    assert list(fine['node_displacements']) == list(coarse['node_displacements'])
+    assert fine['p_delta']['n_div'] == 4
+    try:
+        calculate_crane_pdelta(SLENDER, n_div=0)
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("n_div=0 should be rejected")
+
+def test_calculate_crane_dispatch():
+    p = {'engine': 'numpy', 'analysis': 'p_delta', 'p_delta_div': 2, 'arm_angle': 45.0}
+    r = calculate_crane(p, {'p_delta': None, 'tip_displacement': None})
+    assert set(r) == {'p_delta', 'tip_displacement'} and r['p_delta']['n_div'] == 2
+    assert cache_key(p) != cache_key(dict(p, analysis='linear')) != cache_key(dict(p, p_delta_div=1))
+    assert cache_key({'engine': 'numpy'}) == cache_key({'engine': 'numpy', 'analysis': 'linear'})
+    for bad in ({'engine': 'numpy', 'analysis': 'nonlinear'}, {'engine': 'pynite', 'analysis': 'p_delta', 'p_delta_div': 4}):
+        try:
+            calculate_crane(bad)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{bad} should be rejected")
+    try:
+        calculate_crane({'engine': 'numpy'}, {'p_delta': None})
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("p_delta is not part of a linear result")
+
+def test_calculate_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate", json={'engine': 'numpy', 'analysis': 'p_delta', 'mass_tip': 150.0}).json()
+    assert r['p_delta']['amplification'] > 1.0, r
+    lin = client.post("/calculate", json={'engine': 'numpy', 'mass_tip': 150.0}).json()
+    assert 'p_delta' not in lin and abs(r['tip_displacement']['dz']) > abs(lin['tip_displacement']['dz'])
+    q = client.post("/calculate?fields=p_delta", json={'engine': 'pynite', 'analysis': 'p_delta', 'mass_tip': 150.0})
+    assert set(q.json()) == {'p_delta'} and q.json()['p_delta']['moment_amplification'] > 1.0, q.json()
+
+def test_batch_paths_reject_p_delta():
+    # The stacked batch solve is linear only: P-Delta rows are rejected, not
+    # answered with the linear result
+    from fastapi.testclient import TestClient
+    from main import app
+    from crane_batch import expand_grid, rows_to_columns
+    from crane_pipeline import solve_rows
+    for call in (lambda: rows_to_columns([{}, {'analysis': 'p_delta'}]),
+                 lambda: expand_grid({'arm_len': [900.0]}, {'analysis': 'p_delta'})):
+        try:
+            call()
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError("a P-Delta batch should be rejected")
+    client = TestClient(app)
+    p = {'engine': 'numpy', 'analysis': 'p_delta'}
+    assert 'linear' in client.post("/calculate/batch", json={'params': [p]}).json()['error']
+    assert 'linear' in client.post("/calculate/batch", json={'grid': {'arm_len': [900.0]}, 'base': p}).json()['error']
+    assert 'linear' in client.post("/calculate/stream", json={'params': [p]}).json()['error']
+    assert client.post("/calculate/batch", json={'params': [dict(p, analysis='linear')]}).json()['n'] == 1
+    out = solve_rows([{'analysis': 'p_delta'}, {'analysis': 'linear'}], 0)
+    assert 'linear' in out['error'][0] and np.isnan(out['tip_dz'][0]) and out['error'][1] == ''
+
+if __name__ == "__main__":
+    test_geometric_stiffness()
+    test_amplification_and_pynite()
+    test_near_critical_and_buckling()
+    test_member_subdivision()
+    test_calculate_crane_dispatch()
+    test_calculate_endpoint()
+    test_batch_paths_reject_p_delta()
@@ -0,0 +1,128 @@
+import sys
+import os
+import csv
+import json
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import rows_to_columns, solve_batch
+from crane_pipeline import load_results, main, read_manifest, run_pipeline
+
+def write_catalog(path, n):
+    rng = np.random.default_rng(1)
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['id', 'arm_len', 'arm_angle', 't_wall'])
+        for i in range(n):
+            writer.writerow([f'C{i:04d}', f'{rng.uniform(600, 2000):.1f}', f'{rng.uniform(0, 360):.1f}',
+                             '' if i % 3 else '3.2'])
+    return path
+
+def test_csv_matches_batch():
+    d = tempfile.mkdtemp()
+    src = write_catalog(os.path.join(d, 'catalog.csv'), 50)
+    summary = run_pipeline(src, os.path.join(d, 'out'), 'npz', chunk_size=16, workers=2, progress=None)
+    print(summary)
+    assert summary['rows'] == summary['solved_rows'] == 50 and summary['chunks'] == 4
+    assert summary['rows_per_second'] > 0
+    r = load_results(os.path.join(d, 'out'))
+    with open(src, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    expected = solve_batch(rows_to_columns([{k: float(v) for k, v in row.items() if k != 'id' and v}
+                                            for row in rows]))
+    assert list(r['row']) == list(range(50)) and r['id'][7] == 'C0007'
+    assert r['t_wall'][0] == 3.2 and r['t_wall'][1] == 2.4  # blank cell -> default
+    assert np.array_equal(r['max_stress'], expected['max_stress'])
+    assert np.array_equal(r['tip_dz'], expected['tip_dz'])
+    assert np.array_equal(r['reaction_FL'], expected['reactions'][:, 0])
+
+def test_resume_after_interruption():
+    d = tempfile.mkdtemp()
+    src = write_catalog(os.path.join(d, 'catalog.csv'), 40)
+    out = os.path.join(d, 'out')
+
+    def interrupt(stats):
+        if stats['chunks'] == 2:
+            raise KeyboardInterrupt
+
+    try:
+        run_pipeline(src, out, 'csv', chunk_size=8, workers=1, progress=interrupt)
+    except KeyboardInterrupt:
+        pass
+    else:
+        raise AssertionError("expected the run to be interrupted")
+    manifest = read_manifest(out)
+    assert sorted(manifest['chunks']) == ['0', '1'] and not manifest['complete']
+    summary = run_pipeline(src, out, 'csv', chunk_size=8, workers=2, progress=None)
+    assert summary['resumed_chunks'] == 2 and summary['solved_rows'] == 24 and summary['rows'] == 40
+    resumed = load_results(out)
+    full = os.path.join(d, 'full')
+    run_pipeline(src, full, 'csv', chunk_size=8, workers=1, progress=None)
+    assert all(np.array_equal(v, load_results(full)[k]) for k, v in resumed.items())
+    # A changed setting does not mix results; --restart starts over
+    try:
+        run_pipeline(src, out, 'csv', chunk_size=16, progress=None)
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("a different chunk size should not resume")
+    assert run_pipeline(src, out, 'npz', chunk_size=16, restart=True, progress=None)['resumed_chunks'] == 0
+    assert sorted(os.listdir(out)) == ['manifest.json', 'part-000000.npz', 'part-000001.npz', 'part-000002.npz']
+
+def test_jsonl_bad_rows_and_cli():
+    d = tempfile.mkdtemp()
+    src = os.path.join(d, 'catalog.jsonl')
+    with open(src, 'w') as fh:
+        for row in ({'name': 'ok', 'arm_len': 1200}, {'name': 'bad', 'arm_len': 'long', 't_wall': 3.0},
+                    {'name': 'other', 'topology': 'double_brace', 'arm_len': 850}, {'name': 'default'}):
+            fh.write(json.dumps(row) + '\n')
+    out = os.path.join(d, 'out')
+    assert main([src, out, '--quiet', '--workers', '1']) == 0
+    r = load_results(out)
+    print(list(r['error']))
+    assert list(r['name']) == ['ok', 'bad', 'other', 'default']
+    assert r['error'][0] == '' and 'arm_len' in r['error'][1] and 'topology' in r['error'][2]
+    assert np.isnan(r['max_stress'][1]) and r['max_stress'][3] > 0
+    # Error rows report their input, not the defaults they were never solved with
+    assert np.isnan(r['arm_len'][1]) and r['t_wall'][1] == 3.0 and r['arm_len'][2] == 850.0
+    assert np.isnan(r['t_wall'][2]) and r['arm_len'][3] == 1000.0
+    assert read_manifest(out)['chunks']['0'] == [4, 0, 2]
+    assert main([os.path.join(d, 'missing.csv'), out, '--quiet']) == 1
+    assert main([src, out, '--quiet', '--chunk-size', '2']) == 1  # would mix with the earlier run
+
+def test_same_columns_in_every_part():
+    d = tempfile.mkdtemp()
+    src = os.path.join(d, 'catalog.jsonl')
+    with open(src, 'w') as fh:
+        for row in ({'id': 'a', 'arm_len': 1000}, {'arm_len': 1100}, {'id': 'c', 'note': 'late'}):
+            fh.write(json.dumps(row) + '\n')
+    out = os.path.join(d, 'out')
+    run_pipeline(src, out, 'npz', chunk_size=1, workers=1, progress=None)
+    assert read_manifest(out)['extra_columns'] == ['id']
+    from crane_pipeline import part_path, read_part
+    parts = [read_part(part_path(out, i, 'npz')) for i in range(3)]
+    assert all(list(p) == list(parts[0]) for p in parts)
+    r = load_results(out)
+    assert list(r['id']) == ['a', '', 'c'] and 'note' not in r
+    assert list(r['arm_len']) == [1000.0, 1100.0, 1000.0]
+
+def test_parquet_round_trip():
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed: skipped")
+        return
+    d = tempfile.mkdtemp()
+    src = os.path.join(d, 'catalog.parquet')
+    pq.write_table(pyarrow.table({'id': ['a', 'b', 'c'], 'arm_len': [900.0, 1400.0, None]}), src)
+    run_pipeline(src, os.path.join(d, 'out'), 'parquet', chunk_size=2, workers=1, progress=None)
+    r = load_results(os.path.join(d, 'out'))
+    assert list(r['id']) == ['a', 'b', 'c'] and list(r['arm_len']) == [900.0, 1400.0, 1000.0]
+
+if __name__ == "__main__":
+    test_csv_matches_batch()
+    test_resume_after_interruption()
+    test_jsonl_bad_rows_and_cli()
+    test_same_columns_in_every_part()
+    test_parquet_round_trip()
@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_pool import PoolSaturated, SolveTimeout, SolverPool
+
+def slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def test_back_pressure():
+    pool = SolverPool('thread', workers=1, max_queue=1)
+
+    async def run():
+        return await asyncio.gather(*(pool.run(slow, 0.1) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    print(f"results: {results}, stats: {pool.stats()}")
+    assert sum(isinstance(r, PoolSaturated) for r in results) == 1
+    assert pool.stats()['rejected'] == 1
+    pool.shutdown()
+
+def test_timeout_keeps_slot_until_work_ends():
+    pool = SolverPool('thread', workers=1, max_queue=0, timeout=0.05)
+
+    async def run():
+        try:
+            await pool.run(slow, 0.3)
+        except SolveTimeout as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError("expected a timeout")
+        # The abandoned solve still occupies the only worker
+        try:
+            await pool.run(slow, 0.0)
+        except PoolSaturated:
+            print("[OK] pool still saturated by the abandoned solve")
+        else:
+            raise AssertionError("expected saturation")
+        await asyncio.sleep(0.35)
+        return await pool.run(slow, 0.0)
+
+    assert asyncio.run(run()) == 0.0
+    assert pool.stats()['timeouts'] == 1
+    pool.shutdown()
+
+def test_event_loop_stays_responsive():
+    import httpx
+    from main import app, solver_pool
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            t0 = time.perf_counter()
+            solve = asyncio.create_task(client.post("/calculate", json={"engine": "pynite", "arm_angle": 33.0}))
+            await asyncio.sleep(0.01)
+            stats = await client.get("/pool/stats")
+            t_stats = time.perf_counter() - t0
+            res = await solve
+            t_solve = time.perf_counter() - t0
+        return stats.json(), res.json(), t_stats, t_solve
+
+    stats, res, t_stats, t_solve = asyncio.run(run())
+    print(f"/pool/stats answered after {t_stats * 1e3:.0f} ms while the solve took {t_solve * 1e3:.0f} ms")
+    assert 'max_stress' in res
+    assert t_stats < t_solve
+    solver_pool.shutdown()
+
+if __name__ == "__main__":
+    test_back_pressure()
+    test_timeout_keeps_slot_until_work_ends()
+    test_event_loop_stays_responsive()
@@ -0,0 +1,116 @@
+import sys
+import os
+import json
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_loads import calculate_load_cases
+from crane_reliability import (
+    CHUNK_SIZE, basis_for, evaluate_samples, make_plan, run_chunk, run_reliability, summarize, wilson,
+)
+from crane_solver import E_MODULUS, calculate_crane_numpy
+
+def samples(p, **overrides):
+    s = {'t_wall': p.get('t_wall', 2.4), 'pipe_od': p.get('pipe_od', 48.6), 'E': E_MODULUS,
+         'yield_stress': p.get('yield_stress', 235.0), 'mass_tip': p.get('mass_tip', 50.0)}
+    s.update(overrides)
+    return {k: np.array([v], dtype=float) for k, v in s.items()}
+
+def test_samples_match_analysis():
+    print("--- Eigen-basis sample responses vs direct solves ---")
+    for p, over in (({'arm_angle': 135.0}, {}), ({'arm_angle': 40.0}, {'t_wall': 3.1, 'pipe_od': 50.0, 'mass_tip': 80.0})):
+        q = dict(p, **over)
+        # Hoist only: the full deterministic analysis
+        r = evaluate_samples(basis_for(make_plan(p, self_weight=False)), samples(q))
+        full = calculate_crane_numpy(q)
+        assert abs(r['tip_deflection'][0] - abs(full['tip_displacement']['dz'])) < 1e-9
+        assert abs(r['max_utilization'][0] - full['max_utilization']) < 1e-9
+        assert np.allclose(r['reactions'][0], list(full['reactions'].values()), atol=1e-8)
+        # Hoist + self-weight: the load-case analysis
+        basis = basis_for(make_plan(p))
+        r = evaluate_samples(basis, samples(q))
+        c = calculate_load_cases(q, [{'name': 'c', 'hoist': 1.0, 'self_weight': 1.0}])['combos']['c']
+        print(f"tip dz {r['tip_deflection'][0]:.9f} vs {abs(c['tip_displacement']['dz']):.9f}")
+        assert abs(r['tip_deflection'][0] - abs(c['tip_displacement']['dz'])) < 1e-9
+        assert np.allclose(r['reactions'][0], list(c['reactions'].values()), atol=1e-8)
+        # E only scales the displacements
+        stiff = evaluate_samples(basis, samples(q, E=2.0 * E_MODULUS))
+        assert abs(2.0 * stiff['tip_deflection'][0] - r['tip_deflection'][0]) < 1e-9
+        assert np.allclose(stiff['reactions'], r['reactions'])
+
+def test_wilson_interval():
+    lo, hi = wilson(0, 1000)
+    assert lo < 1e-12 and 0.003 < hi < 0.004
+    lo, hi = wilson(1000, 1000)
+    assert hi > 1.0 - 1e-12 and 0.996 < lo < 0.997
+    lo, hi = wilson(500, 1000)
+    assert abs((lo + hi) / 2.0 - 0.5) < 1e-12 and abs(hi - lo - 2 * 1.959964 * np.sqrt(0.25 / 1000)) < 1e-3
+    assert wilson(5, 100, 0.99)[1] > wilson(5, 100, 0.95)[1]
+
+def test_reproducible_and_chunk_independent():
+    opts = {'n_samples': 3 * CHUNK_SIZE + 100, 'seed': 7, 'ballast': 40.0}
+    a = run_reliability({'arm_angle': 0.0, 'mass_tip': 150.0}, **opts)
+    plan = make_plan({'arm_angle': 0.0, 'mass_tip': 150.0}, **opts)
+    # Chunks evaluated in any order give the same answer
+    b = summarize(plan, [run_chunk(plan, i) for i in reversed(range(plan['n_chunks']))])
+    assert a == b and a['complete'] and a['n_samples'] + a['n_invalid'] == opts['n_samples']
+    json.dumps(a)
+    c = run_reliability({'arm_angle': 0.0, 'mass_tip': 150.0}, **dict(opts, seed=8))
+    assert c['statistics'] != a['statistics']
+    print(json.dumps(a['probabilities'], indent=1))
+
+def test_failure_probabilities():
+    # Deterministic: no scatter at all gives the deterministic answer
+    fixed = {k: {'dist': 'fixed'} for k in ('t_wall', 'pipe_od', 'E', 'yield_stress', 'mass_tip')}
+    r = run_reliability({'arm_angle': 0.0, 'mass_tip': 150.0}, distributions=fixed, n_samples=500, ballast=40.0,
+                        self_weight=False)
+    full = calculate_crane_numpy({'arm_angle': 0.0, 'mass_tip': 150.0})
+    assert abs(r['statistics']['max_utilization']['mean'] - full['max_utilization']) < 1e-9
+    assert r['statistics']['max_utilization']['std'] < 1e-9
+    # A hoisted mass far beyond the rating fails every sample; a tiny one none
+    heavy = run_reliability({'mass_tip': 5000.0}, n_samples=2000, ballast=1e4)
+    assert heavy['probabilities']['yield']['probability'] == 1.0
+    light = run_reliability({'mass_tip': 1.0}, n_samples=2000, ballast=1e4, deflection_limit=1e3)
+    assert light['probabilities']['any']['count'] == 0 and light['probabilities']['any']['ci'][1] < 0.01
+    # More scatter in the hoisted mass -> larger yield probability near the limit
+    narrow = run_reliability({'arm_angle': 0.0, 'mass_tip': 120.0}, n_samples=20000,
+                             distributions={'mass_tip': {'dist': 'gumbel', 'cov': 0.05}})
+    wide = run_reliability({'arm_angle': 0.0, 'mass_tip': 120.0}, n_samples=20000,
+                           distributions={'mass_tip': {'dist': 'gumbel', 'cov': 0.4}})
+    assert wide['probabilities']['yield']['probability'] > narrow['probabilities']['yield']['probability']
+
+def test_invalid_options():
+    for kwargs in ({'distributions': {'bogus': {'dist': 'normal'}}},
+                   {'distributions': {'t_wall': {'dist': 'weibull'}}},
+                   {'distributions': {'E': {'std': -1.0}}},
+                   {'n_samples': 0}, {'confidence': 1.5}):
+        try:
+            make_plan({}, **kwargs)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{kwargs} should be rejected")
+
+def test_reliability_endpoints():
+    from fastapi.testclient import TestClient
+    from main import app
+    body = {'params': {'arm_angle': 0.0, 'mass_tip': 150.0}, 'ballast': 40.0, 'n_samples': 2 * CHUNK_SIZE + 5,
+            'seed': 3, 'distributions': {'mass_tip': {'dist': 'normal', 'cov': 0.1}}}
+    expected = run_reliability(body['params'], n_samples=body['n_samples'], seed=3, ballast=40.0,
+                               distributions=body['distributions'])
+    client = TestClient(app)
+    r = client.post("/reliability", json=body).json()
+    assert r == json.loads(json.dumps(expected)), r
+    lines = [json.loads(line) for line in client.post("/reliability/stream", json=body).text.splitlines()]
+    events = [e['type'] for e in lines]
+    assert events == ['start', 'progress', 'progress', 'progress', 'end'], events
+    assert lines[-2]['done'] == body['n_samples']
+    assert lines[-1]['result'] == r
+    assert 'error' in client.post("/reliability", json={'distributions': {'bogus': {}}}).json()
+
+if __name__ == "__main__":
+    test_samples_match_analysis()
+    test_wilson_interval()
+    test_reproducible_and_chunk_independent()
+    test_failure_probabilities()
+    test_invalid_options()
+    test_reliability_endpoints()
@@ -0,0 +1,140 @@
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_session import STAGES, CraneSession
+from crane_solver import calculate_crane_numpy
+
+def max_diff(a, b):
+    if isinstance(b, dict):
+        assert set(a) == set(b)
+        return max([max_diff(a[k], b[k]) for k in b] or [0.0])
+    if isinstance(b, list):
+        assert a == b
+        return 0.0
+    return abs(a - b) / (1.0 + abs(b))
+
+def test_updates_match_full_analysis():
+    print("--- Incremental session vs full re-analysis ---")
+    rng = np.random.default_rng(3)
+    session = CraneSession()
+    p = {}
+    ranges = {'arm_angle': (0.0, 360.0), 'arm_len': (600.0, 1500.0), 'mass_tip': (10.0, 150.0),
+              'yield_stress': (200.0, 700.0), 't_wall': (1.8, 3.2), 'base_len': (700.0, 1200.0)}
+    worst = 0.0
+    for _ in range(60):
+        k = rng.choice(list(ranges))
+        p = dict(p, **{k: float(rng.uniform(*ranges[k]))})
+        r = session.update(p)
+        r.pop('recomputed')
+        worst = max(worst, max_diff(r, calculate_crane_numpy(p)))
+    print(f"worst relative difference over 60 updates: {worst:.1e}, {session.stats()}")
+    assert worst < 1e-8
+
+def test_stage_planning():
+    session = CraneSession()
+    assert session.update({})['recomputed'] == {'stages': list(STAGES), 'scope': 'full'}
+    assert session.update({'yield_stress': 355.0})['recomputed']['stages'] == ['post-process']
+    assert session.update({'yield_stress': 355.0, 'mass_tip': 80.0})['recomputed']['stages'] == ['load', 'post-process']
+    r = session.update({'yield_stress': 355.0, 'mass_tip': 80.0, 'arm_angle': 150.0})['recomputed']
+    assert r == {'stages': ['geometry', 'stiffness', 'factorization', 'solve', 'post-process'], 'scope': 'arm'}
+    r = session.update({'yield_stress': 355.0, 'mass_tip': 80.0, 'arm_angle': 150.0, 't_wall': 3.2})['recomputed']
+    assert r['stages'] == ['section', 'stiffness', 'factorization', 'solve', 'post-process']
+    # Unchanged parameters: nothing to do
+    assert session.update({'yield_stress': 355.0, 'mass_tip': 80.0, 'arm_angle': 150.0, 't_wall': 3.2})['recomputed']['stages'] == []
+
+def test_failed_update_keeps_session_consistent():
+    session = CraneSession()
+    session.update({})
+    try:
+        session.update({'arm_len': 0.0})
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("expected a zero-length member error")
+    # The rejected geometry never reached the cached state
+    r = session.update({'mass_tip': 70.0})
+    assert r['recomputed']['stages'] == ['load', 'post-process']
+    assert max_diff({k: v for k, v in r.items() if k != 'recomputed'}, calculate_crane_numpy({'mass_tip': 70.0})) < 1e-8
+
+def test_skipping_the_solve_is_faster():
+    session = CraneSession()
+    session.update({})
+    n = 200
+    t0 = time.perf_counter()
+    for m in np.linspace(10.0, 100.0, n):
+        session.update({'mass_tip': m})
+    t_session = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for m in np.linspace(10.0, 100.0, n):
+        calculate_crane_numpy({'mass_tip': m})
+    t_full = (time.perf_counter() - t0) / n
+    print(f"mass_tip update: session {t_session * 1e3:.2f} ms, full re-analysis {t_full * 1e3:.2f} ms")
+    assert t_session < t_full / 2
+
+def test_live_channel_uses_session():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_json({'seq': 1, 'params': {'engine': 'numpy'}})
+        assert ws.receive_json()['result']['recomputed']['scope'] == 'full'
+        ws.send_json({'seq': 2, 'params': {'engine': 'numpy', 'mass_tip': 90.0}})
+        reply = ws.receive_json()
+        assert reply['result']['recomputed']['stages'] == ['load', 'post-process']
+        assert abs(reply['result']['max_stress'] - calculate_crane_numpy({'mass_tip': 90.0})['max_stress']) < 1e-9
+
+def test_live_session_updates_are_bounded():
+    # Superseded session updates cannot be cancelled once running: they run
+    # to completion in the bounded session pool, one at a time per connection
+    import json
+    import threading
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    counts = {'inflight': 0, 'max_inflight': 0, 'calls': 0}
+    lock = threading.Lock()
+
+    class SlowSession(CraneSession):
+        def update(self, params):
+            with lock:
+                counts['inflight'] += 1
+                counts['calls'] += 1
+                counts['max_inflight'] = max(counts['max_inflight'], counts['inflight'])
+            try:
+                time.sleep(0.02)
+                return super().update(params)
+            finally:
+                with lock:
+                    counts['inflight'] -= 1
+
+    saved = app_module.CraneSession
+    app_module.CraneSession = SlowSession
+    completed = app_module.session_pool.stats()['completed']
+    try:
+        client = TestClient(app_module.app)
+        with client.websocket_connect("/ws/calculate") as ws:
+            for seq in range(1, 21):
+                ws.send_text(json.dumps({'seq': seq, 'params': {'engine': 'numpy', 'mass_tip': 40.0 + seq}}))
+            reply = ws.receive_json()
+            while reply['seq'] != 20:
+                reply = ws.receive_json()
+        assert abs(reply['result']['max_stress'] - calculate_crane_numpy({'mass_tip': 60.0})['max_stress']) < 1e-9
+    finally:
+        app_module.CraneSession = saved
+    print(counts, app_module.session_pool.stats())
+    assert counts['max_inflight'] == 1 and counts['calls'] < 20
+    # Every update went through the session pool (its slot is released just after the reply)
+    t0 = time.perf_counter()
+    while app_module.session_pool.stats()['completed'] - completed < counts['calls'] and time.perf_counter() - t0 < 1.0:
+        time.sleep(0.01)
+    assert app_module.session_pool.stats()['completed'] - completed == counts['calls']
+
+if __name__ == "__main__":
+    test_updates_match_full_analysis()
+    test_stage_planning()
+    test_failed_update_keeps_session_consistent()
+    test_skipping_the_solve_is_faster()
+    test_live_channel_uses_session()
+    test_live_session_updates_are_bounded()
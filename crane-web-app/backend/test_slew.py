@@ -0,0 +1,45 @@
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import solve_batch
+from crane_slew import slew_angles, slew_envelope
+from crane_solver import SUPPORT_NODES, with_defaults
+
+def test_angles():
+    assert slew_angles(0.0, 360.0, 90.0).tolist() == [0.0, 90.0, 180.0, 270.0]
+    assert slew_angles(-45.0, 45.0, 15.0).tolist() == [-45.0, -30.0, -15.0, 0.0, 15.0, 30.0, 45.0]
+
+def test_slew_matches_batch():
+    print("--- Condensed slew envelope vs batch solve ---")
+    for params in ({}, {'arm_len': 1400.0, 'mass_tip': 120.0},
+                   {'tripod_attach_height': 700.0, 'brace_mast_height': 1200.0}):
+        t0 = time.perf_counter()
+        env = slew_envelope(params, 0.0, 360.0, 1.0)
+        dt = time.perf_counter() - t0
+        angles = np.array(env['angles'])
+        ref = solve_batch(dict(with_defaults(params), arm_angle=angles))
+        assert np.abs(np.array(env['max_stress']) - ref['max_stress']).max() < 1e-6
+        assert np.abs(np.array(env['tip_displacement']['dz']) - ref['tip_dz']).max() < 1e-6
+        for s, n in enumerate(SUPPORT_NODES):
+            assert np.abs(np.array(env['reactions'][n]) - ref['reactions'][:, s]).max() < 1e-5
+        gov = env['governing']
+        print(f"{params}: {len(angles)} angles in {dt * 1e3:.0f} ms, "
+              f"worst stress {gov['max_stress']}, worst uplift FR {gov['reactions']['FR']['min']}")
+        assert gov['max_stress']['value'] == max(env['max_stress'])
+
+def test_slew_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate/slew", json={"params": {"mass_tip": 80.0}, "step": 15.0}).json()
+    assert len(r['angles']) == 24
+    assert set(r['governing']['reactions']) == set(SUPPORT_NODES)
+    r = client.post("/calculate/slew", json={"step": 0.0}).json()
+    assert 'error' in r
+
+if __name__ == "__main__":
+    test_angles()
+    test_slew_matches_batch()
+    test_slew_endpoint()
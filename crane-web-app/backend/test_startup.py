@@ -0,0 +1,63 @@
+import sys
+import os
+import subprocess
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_startup import BACKEND_DIR, import_breakdown, measure_cold_start, parse_importtime, warm_up
+
+def test_heavy_imports_are_deferred():
+    # The app must come up without Pynite (and its matplotlib) or scipy.linalg
+    code = ("import sys, main; print(','.join(m for m in ('Pynite', 'matplotlib', 'scipy.linalg') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+def test_import_breakdown():
+    rows = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                            "import time:       120 |        120 |   numpy._utils\n"
+                            "import time:      2794 |     147752 | numpy\n")
+    assert rows == [{'module': 'numpy._utils', 'self_ms': 0.12, 'cumulative_ms': 0.12, 'depth': 1},
+                    {'module': 'numpy', 'self_ms': 2.794, 'cumulative_ms': 147.752, 'depth': 0}]
+    b = import_breakdown('crane_solver', top=5)
+    print(b['total_ms'], b['packages'])
+    assert b['total_ms'] > 0.0 and 'numpy' in b['packages']
+    assert len(b['modules']) == 5
+
+def test_warm_up():
+    r = warm_up()
+    assert r['pid'] == os.getpid() and r['pynite_ms'] > 0.0 and r['numpy_ms'] > 0.0
+
+def test_first_answer_with_numpy_default():
+    # The deployed image answers engine-less requests (the frontend's) with numpy,
+    # and its warm-up then leaves Pynite out of the workers
+    with open(os.path.join(BACKEND_DIR, '..', '..', 'Dockerfile')) as fh:
+        assert 'CRANE_ENGINE=numpy' in fh.read()
+    code = "import sys; from crane_startup import warm_up; warm_up(('numpy',)); print('Pynite' in sys.modules)"
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
+    times = measure_cold_start({'CRANE_ENGINE': 'numpy'})
+    print(times)
+    assert times['first_answer_ms'] < 1000.0
+
+def test_ready_after_warm_up():
+    from fastapi.testclient import TestClient
+    from main import app, solver_pool
+    client = TestClient(app)
+    assert client.get("/healthz").json() == {'status': 'ok'}
+    assert client.get("/ready").status_code == 503  # lifespan not started
+    with TestClient(app) as client:
+        t0 = time.perf_counter()
+        while client.get("/ready").status_code != 200:
+            assert time.perf_counter() - t0 < 60.0
+            time.sleep(0.02)
+        state = client.get("/ready").json()
+    print(state)
+    assert state['error'] is None
+    assert len(state['warmup']['workers']) == solver_pool.workers
+
+if __name__ == "__main__":
+    test_heavy_imports_are_deferred()
+    test_import_breakdown()
+    test_warm_up()
+    test_first_answer_with_numpy_default()
+    test_ready_after_warm_up()
@@ -0,0 +1,179 @@
+import sys
+import os
+import io
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_calc import calculate_crane
+from crane_store import ResultStore, engine_version, main, parse_where, source_hash, store_key
+
+def solved(**params):
+    p = dict(params, engine='numpy')
+    return p, calculate_crane(p)
+
+def test_round_trip_across_workers():
+    d = tempfile.mkdtemp()
+    first, second = ResultStore(d), ResultStore(d)  # two workers on one store
+    p, r = solved(arm_len=1300.0, analysis='p_delta')
+    first.put(p, r)
+    got = second.get(p)
+    assert got == r and list(got) == list(r)
+    # Keys are normalized like the cache: omitted defaults and tiny float noise match
+    assert second.get(dict(p, mass_tip=50.0 + 1e-9)) == r
+    assert second.get(dict(p, analysis='linear')) is None
+    # A different engine version never serves the old result
+    assert store_key(p)[0] != store_key(p, version='0/numpy-old')[0]
+    assert second.get(p, version='0/numpy-old') is None
+    # The version follows the solver's source and the topology's definition
+    from crane_topology import topology_for
+    version = store_key(p)[1]
+    assert source_hash() in version and topology_for(p).key[:12] in version
+    assert version == engine_version('numpy', topology_for(p))
+    assert store_key(dict(p, topology='double_brace'))[1] != version
+    assert source_hash(('crane_solver',)) != source_hash()
+    arrays = second.arrays(p)
+    assert isinstance(arrays['node_displacements'], np.memmap)
+    assert not arrays['node_displacements'].flags.writeable
+    tip = arrays['node_names'].index('A_tip')
+    assert arrays['node_displacements'][tip, 2] == r['tip_displacement']['dz']
+    assert arrays['member_results'].shape == (len(r['member_results']), len(arrays['member_fields']))
+
+def test_range_query():
+    store = ResultStore(tempfile.mkdtemp())
+    for arm_len in (900.0, 1100.0, 1250.0, 1500.0, 3500.0):
+        store.put(*solved(arm_len=arm_len))
+    rows = store.query("max_stress < 235, arm_len > 1200", order='-arm_len')
+    print([(row['arm_len'], round(row['max_stress'], 1)) for row in rows])
+    assert [row['arm_len'] for row in rows] == [1500.0, 1250.0]
+    assert all(row['max_stress'] < 235.0 for row in rows) and rows[0]['params']['arm_len'] == 1500.0
+    assert len(store.query("engine = numpy and arm_len <= 1100")) == 2
+    assert store.query(limit=1)[0]['engine'] == 'numpy'
+    for bad in ("max_stress ~ 3", "unknown_column > 1", "engine > a", "arm_len > x"):
+        try:
+            store.query(bad)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{bad!r} should be rejected")
+    assert parse_where("") == [] and parse_where("a>=1") == [('a', '>=', 1.0)]
+
+def test_eviction_reuses_slots():
+    store = ResultStore(tempfile.mkdtemp(), access_resolution=0.0)
+    entries = [solved(arm_angle=float(a)) for a in range(0, 100, 10)]
+    for p, r in entries:
+        store.put(p, r)
+    per_row = store.total_bytes() / len(entries)
+    store.get(entries[0][0])  # recently used: survives
+    assert store.evict(int(per_row * 4.5)) == 6
+    assert store.count() == 4 and store.get(entries[0][0]) == entries[0][1]
+    assert store.get(entries[1][0]) is None and store.get(entries[-1][0]) == entries[-1][1]
+    layout = store._db().execute('SELECT layout FROM results').fetchone()[0]
+    size = os.path.getsize(store._array_path(layout, 'nodes'))
+    for p, r in (solved(arm_angle=float(a)) for a in range(1, 6)):
+        store.put(p, r)
+    # Freed slots are reused before the array files grow
+    assert os.path.getsize(store._array_path(layout, 'nodes')) == size
+    # max_bytes caps the store on every write
+    small = ResultStore(tempfile.mkdtemp(), max_bytes=int(per_row * 3.5))
+    for p, r in entries:
+        small.put(p, r)
+    assert small.count() == 3 and small.stats()['evictions'] == len(entries) - 3
+
+def test_hits_do_not_write_every_time():
+    store = ResultStore(tempfile.mkdtemp())
+    p, r = solved(arm_len=1400.0)
+    store.put(p, r)
+    key = store_key(p)[0]
+    row = lambda: store._db().execute('SELECT accessed, hits FROM results WHERE key = ?', (key,)).fetchone()
+    written = row()
+    for _ in range(5):
+        assert store.get(p) == r
+    assert row() == written  # accessed just now: no write
+    store.flush_hits()
+    assert row() == (written[0], 5)
+    store._db().execute('UPDATE results SET accessed = accessed - 3600 WHERE key = ?', (key,))
+    store.get(p)
+    accessed, hits = row()
+    assert accessed > written[0] and hits == 6
+
+def test_read_while_slot_is_reused():
+    d = tempfile.mkdtemp()
+    writer, reader = ResultStore(d), ResultStore(d)
+    (p1, r1), (p2, r2) = solved(arm_len=900.0), solved(arm_len=1700.0)
+    writer.put(p1, r1)
+    read_arrays = reader._read_arrays
+
+    def overwritten(*row):
+        # Another worker replaces p1 and hands its old slot to p2 while the
+        # reader holds a view of it
+        reader._read_arrays = read_arrays
+        writer.put(p1, r1)
+        writer.put(p2, r2)
+        return read_arrays(*row)
+
+    reader._read_arrays = overwritten
+    assert reader.get(p1) == r1 and reader.get(p2) == r2
+    # Evicted under the reader, slot reused: a miss, never p2's arrays under p1's summary
+    d = tempfile.mkdtemp()
+    writer, reader = ResultStore(d), ResultStore(d)
+    writer.put(p1, r1)
+    read_arrays = reader._read_arrays
+
+    def evicted(*row):
+        reader._read_arrays = read_arrays
+        writer.evict(0)
+        writer.put(p2, r2)
+        return read_arrays(*row)
+
+    reader._read_arrays = evicted
+    assert reader.get(p1) is None and reader.get(p2) == r2
+
+def test_import_export():
+    src, dst = ResultStore(tempfile.mkdtemp()), ResultStore(tempfile.mkdtemp())
+    entries = [solved(mass_tip=m) for m in (20.0, 60.0)]
+    entries.append(({'engine': 'numpy'}, {'tip_displacement': {'dz': -1.0}}))  # no arrays: kept as JSON
+    for p, r in entries:
+        src.put(p, r)
+    buf = io.StringIO()
+    assert src.export_jsonl(buf) == 3
+    buf.seek(0)
+    assert dst.import_jsonl(buf) == 3
+    for p, r in entries:
+        assert dst.get(p) == r
+    d = tempfile.mkdtemp()
+    path = os.path.join(d, 'results.jsonl')
+    with open(path, 'w') as fh:
+        fh.write(buf.getvalue())
+    assert main([os.path.join(d, 'store'), 'import', path]) == 0
+    assert ResultStore(os.path.join(d, 'store')).count() == 3
+
+def test_calculate_uses_store():
+    from fastapi.testclient import TestClient
+    import main as app_module
+    client = TestClient(app_module.app)
+    saved = app_module.result_store
+    app_module.result_store = ResultStore(tempfile.mkdtemp())
+    try:
+        p = {'engine': 'numpy', 'arm_len': 1234.5}
+        full = client.post("/calculate", json=p).json()
+        app_module.result_cache.clear()
+        r = client.post("/calculate", json=p)
+        assert 'store;desc="hit"' in r.headers['server-timing'] and r.json() == full
+        part = client.post("/calculate?fields=max_stress", json=p).json()
+        assert part == {'max_stress': full['max_stress']}
+        rows = client.get("/store/query", params={'where': 'arm_len>1234'}).json()['rows']
+        assert len(rows) == 1 and rows[0]['max_stress'] == full['max_stress']
+        assert 'error' in client.get("/store/query", params={'where': 'bogus>1'}).json()
+        assert client.get("/store/stats").json()['rows'] == 1
+    finally:
+        app_module.result_store = saved
+        app_module.result_cache.clear()
+
+if __name__ == "__main__":
+    test_round_trip_across_workers()
+    test_range_query()
+    test_eviction_reuses_slots()
+    test_hits_do_not_write_every_time()
+    test_read_while_slot_is_reused()
+    test_import_export()
+    test_calculate_uses_store()
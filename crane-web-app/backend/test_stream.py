@@ -0,0 +1,123 @@
+import sys
+import os
+import json
+import asyncio
+import tracemalloc
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_batch import expand_grid, grid_columns, solve_batch
+from crane_stream import Sweep, solve_records
+from crane_solver import SUPPORT_NODES
+
+GRID = {'arm_angle': [0.0, 45.0, 90.0, 135.0, 180.0], 'arm_len': [800.0, 1000.0, 1200.0], 'mass_tip': [20.0, 60.0]}
+
+def parse_ndjson(text):
+    return [json.loads(line) for line in text.splitlines() if line]
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append(dict(json.loads(lines['data']), type=lines['event']))
+    return events
+
+def test_grid_chunks_match_expand_grid():
+    full = expand_grid(GRID, {'pipe_od': 42.7})
+    parts = [grid_columns(GRID, {'pipe_od': 42.7}, s, s + 7) for s in range(0, 30, 7)]
+    for k, v in full.items():
+        assert np.array_equal(np.concatenate([p[k] for p in parts]), v)
+
+def test_ndjson_stream_matches_batch():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate/stream", json={"grid": GRID, "chunk_size": 8})
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    events = parse_ndjson(r.text)
+    assert events[0]['type'] == 'start' and events[0]['n'] == 30 and events[0]['swept'] == list(GRID)
+    results = [e for e in events if e['type'] == 'result']
+    progress = [e['done'] for e in events if e['type'] == 'progress']
+    print(f"{len(results)} results, progress {progress}, end {events[-1]}")
+    assert progress == [8, 16, 24, 30]
+    assert events[-1]['type'] == 'end' and events[-1]['done'] == 30 and not events[-1]['cancelled']
+
+    ref = solve_batch(expand_grid(GRID))
+    assert [e['i'] for e in results] == list(range(30))
+    for e in results:
+        i = e['i']
+        assert e['params']['arm_angle'] == ref['params']['arm_angle'][i]
+        assert abs(e['max_stress'] - ref['max_stress'][i]) < 1e-9
+        assert abs(e['tip_dz'] - ref['tip_dz'][i]) < 1e-12
+        assert np.allclose(e['reactions'], ref['reactions'][i])
+    assert events[-1]['n_failures'] == int((ref['n_failures'] > 0).sum())
+
+def test_sse_stream_and_errors():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    rows = [{"arm_angle": 10.0}, {"arm_angle": 20.0}, {"arm_len": 0.0}]
+    r = client.post("/calculate/stream", json={"params": rows}, headers={"Accept": "text/event-stream"})
+    assert r.headers['content-type'].startswith('text/event-stream')
+    events = parse_sse(r.text)
+    assert [e['type'] for e in events] == ['start', 'result', 'result', 'result', 'progress', 'end']
+    assert events[0]['swept'] == ['arm_len', 'arm_angle']
+    assert events[3]['error'] and events[3]['max_stress'] is None
+    assert len(events[1]['reactions']) == len(SUPPORT_NODES)
+
+    assert 'error' in client.post("/calculate/stream?format=xml", json={"grid": GRID}).json()
+    assert 'error' in client.post("/calculate/stream", json={"grid": {"bogus": [1.0]}}).json()
+
+def test_disconnect_stops_solving():
+    from main import solver_pool, stream_events
+    sweep = Sweep(grid={'arm_angle': list(np.linspace(0.0, 359.0, 400))})
+
+    async def run():
+        calls = 0
+
+        async def is_disconnected():
+            nonlocal calls
+            calls += 1
+            return calls >= 2
+
+        before = solver_pool.stats()['completed']
+        first = solve_records(sweep.chunk(0, 16), 0, sweep.swept)
+        events = [e async for e in stream_events(sweep, 'ndjson', 16, first, is_disconnected)]
+        await asyncio.sleep(0.5)
+        return events, solver_pool.stats()['completed'] - before
+
+    events, solved = asyncio.run(run())
+    end = parse_ndjson(events[-1])[-1]
+    print(f"end {end}, chunks solved by the pool: {solved} of 25")
+    assert end['cancelled'] and end['done'] == 32
+    assert solved <= 2
+
+def test_memory_stays_flat():
+    from main import stream_events
+
+    async def consume(n):
+        sweep = Sweep(grid={'arm_angle': list(np.linspace(0.0, 359.0, n))})
+        first = solve_records(sweep.chunk(0, 256), 0, sweep.swept)
+
+        async def connected():
+            return False
+
+        count = 0
+        async for e in stream_events(sweep, 'ndjson', 256, first, connected):
+            count += e.count('"result"')
+        return count
+
+    peaks = []
+    for n in (1024, 4096):
+        tracemalloc.start()
+        assert asyncio.run(consume(n)) == n
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"peak traced memory: {peaks[0] / 1e6:.1f} MB for 1024 rows, {peaks[1] / 1e6:.1f} MB for 4096 rows")
+    assert peaks[1] < 1.5 * peaks[0]
+
+if __name__ == "__main__":
+    test_grid_chunks_match_expand_grid()
+    test_ndjson_stream_matches_batch()
+    test_sse_stream_and_errors()
+    test_disconnect_stops_solving()
+    test_memory_stays_flat()
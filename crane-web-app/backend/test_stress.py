@@ -0,0 +1,130 @@
+import sys
+import os
+import io
+import time
+import contextlib
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Pynite import FEModel3D
+from crane_calc import calculate_crane
+from crane_solver import (
+    DENSITY, E_MODULUS, G_MODULUS, GRAVITY, MEMBERS, NODE_NAMES, POISSON, SUPPORT_NODES,
+    calculate_stations, element_station_stresses, node_coordinates, section_properties, with_defaults,
+)
+
+def pynite_model(params):
+    p = with_defaults(params)
+    xyz = node_coordinates(p)
+    section = tuple(float(v) for v in section_properties(p['pipe_od'], p['t_wall']))
+    model = FEModel3D()
+    model.add_material('Steel', E_MODULUS, G_MODULUS, POISSON, DENSITY)
+    model.add_section('Pipe', A=section[1], Iy=section[2], Iz=section[2], J=section[3])
+    for i, n in enumerate(NODE_NAMES):
+        model.add_node(n, *(float(c) for c in xyz[i]))
+    for name, ni, nj in MEMBERS:
+        model.add_member(name, ni, nj, 'Steel', 'Pipe')
+    for n in SUPPORT_NODES:
+        model.def_support(n, True, True, True, False, False, False)
+    model.add_node_load('A_tip', 'FZ', -p['mass_tip'] * GRAVITY, 'DL')
+    # A side load on the arm tip adds torsion and biaxial bending
+    model.add_node_load('A_tip', 'FY', 0.2 * p['mass_tip'] * GRAVITY, 'DL')
+    model.add_load_combo('Combo 1', {'DL': 1.0})
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.analyze()
+    return model, section
+
+def test_stations_match_pynite_internal_forces():
+    print("--- Station resultants vs PyNite member diagrams ---")
+    model, section = pynite_model({'arm_angle': 60.0})
+    subs = [sub for member in model.members.values() for sub in member.sub_members.values()]
+    f = np.array([sub.f('Combo 1')[:, 0] for sub in subs])
+    L = np.array([sub.L() for sub in subs])
+    st = element_station_stresses(f, L, section, 235.0, n_stations=7)
+    worst = 0.0
+    for e, sub in enumerate(subs):
+        for s, x in enumerate(st['x'][e]):
+            ref = [-sub.axial(x, 'Combo 1'), sub.moment('My', x, 'Combo 1'), sub.moment('Mz', x, 'Combo 1')]
+            got = [st['axial'][e, s], st['moment_y'][e, s], st['moment_z'][e, s]]
+            worst = max(worst, max(abs(a - b) for a, b in zip(got, ref)))
+            assert abs(abs(st['torque'][e, s]) - abs(sub.torque(x, 'Combo 1'))) < 1e-6
+    print(f"worst resultant difference {worst:.2e}")
+    assert worst < 1e-5
+
+def test_combined_stress_formulas():
+    # One element: N = 1000 N tension, T = 2e4 Nmm, My = 3e4, Mz = 4e4 Nmm at the i end
+    R, A, I, J = (float(v) for v in section_properties(48.6, 2.4))
+    f = np.zeros((1, 12))
+    f[0, [0, 3, 4, 5]] = [-1000.0, -2e4, -3e4, -4e4]
+    st = element_station_stresses(f, np.array([100.0]), (R, A, I, J), 235.0, n_stations=2)
+    normal = 1000.0 / A + 5e4 * R / I
+    shear = 2e4 * R / J
+    assert abs(st['normal'][0, 0] - normal) < 1e-9
+    assert abs(st['shear'][0, 0] - shear) < 1e-9
+    assert abs(st['von_mises'][0, 0] - np.sqrt(normal**2 + 3 * shear**2)) < 1e-9
+    assert abs(st['utilization'][0, 0] - st['von_mises'][0, 0] / 235.0) < 1e-12
+
+def test_result_keys_and_checks():
+    for engine in ('numpy', 'pynite'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = calculate_crane({'engine': engine, 'arm_angle': 33.0, 'mass_tip': 160.0})
+        for m in r['member_results'].values():
+            assert m['max_normal_stress'] >= m['max_stress'] - 1e-9
+            assert m['max_von_mises'] >= m['max_normal_stress'] - 1e-9
+        assert r['max_utilization'] == max(m['utilization'] for m in r['member_results'].values())
+        assert r['utilization_failures'] == [k for k, m in r['member_results'].items() if m['utilization'] > 1.0]
+        print(f"{engine}: max stress {r['max_stress']:.1f}, von Mises {r['max_von_mises']:.1f}, "
+              f"utilization {r['max_utilization']:.3f}, failures {r['utilization_failures']}")
+
+def test_stage_is_cheaper_than_member_calls():
+    model, section = pynite_model({})
+    t0 = time.perf_counter()
+    for member in model.members.values():
+        max(abs(member.min_moment('Mz', 'Combo 1')), abs(member.max_moment('Mz', 'Combo 1')))
+        max(abs(member.min_moment('My', 'Combo 1')), abs(member.max_moment('My', 'Combo 1')))
+    t_calls = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    subs = [sub for member in model.members.values() for sub in member.sub_members.values()]
+    f = np.array([sub.f('Combo 1')[:, 0] for sub in subs])
+    L = np.array([sub.L() for sub in subs])
+    element_station_stresses(f, L, section, 235.0)
+    t_stage = time.perf_counter() - t0
+    print(f"per-member min/max_moment calls {t_calls * 1e3:.1f} ms, vectorized stations {t_stage * 1e3:.1f} ms")
+    assert t_stage < t_calls
+
+def test_calculate_stations_agrees_with_summary():
+    # The station tables peak where the numpy engine's member summary does
+    params = {'arm_angle': 33.0}
+    r = calculate_crane(dict(params, engine='numpy'))
+    st = calculate_stations(params)
+    for name, m in st['members'].items():
+        assert max(m['von_mises']) == r['member_results'][name]['max_von_mises']
+        assert max(m['utilization']) == r['member_results'][name]['utilization']
+        assert m['x'] == sorted(m['x'])
+    assert st['governing']['utilization'] == r['max_utilization']
+    assert len(calculate_stations(params, n_stations=3)['members']['M_brace']['x']) == 3
+    try:
+        calculate_stations(params, n_stations=1)
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("n_stations=1 should be rejected")
+
+def test_stations_endpoint():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    r = client.post("/calculate/stations", json={"params": {"arm_angle": 33.0}, "n_stations": 5}).json()
+    arm = r['members']['M_arm']
+    assert arm['x'][0] == 0.0 and abs(arm['x'][-1] - 1000.0) < 1e-9
+    assert len(arm['x']) == len(arm['utilization'])
+    assert r['governing']['utilization'] == max(max(m['utilization']) for m in r['members'].values())
+    assert abs(r['governing']['utilization'] - calculate_crane({'engine': 'numpy', 'arm_angle': 33.0})['max_utilization']) < 1e-12
+    assert 'error' in client.post("/calculate/stations", json={"n_stations": 1}).json()
+
+if __name__ == "__main__":
+    test_stations_match_pynite_internal_forces()
+    test_combined_stress_formulas()
+    test_result_keys_and_checks()
+    test_stage_is_cheaper_than_member_calls()
+    test_calculate_stations_agrees_with_summary()
+    test_stations_endpoint()
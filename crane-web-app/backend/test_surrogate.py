@@ -0,0 +1,136 @@
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_solver import calculate_crane_numpy
+from crane_surrogate import (
+    QUICK_GRID, Surrogate, answer, build_table, check, load_table, main, save_table, table_version,
+)
+
+GRID = dict(QUICK_GRID, t_wall=[1.6, 2.4, 3.2, 4.0])
+
+_table = None
+
+def table():
+    global _table
+    if _table is None:
+        _table = build_table(GRID, workers=1)
+    return _table
+
+def test_lookup_matches_exact():
+    s = Surrogate(table())
+    p = {'arm_len': 1234.0, 'arm_angle': 100.0, 't_wall': 2.9, 'mass_tip': 80.0, 'yield_stress': 300.0}
+    result, estimate = s.lookup(p, tolerance=1.0)
+    exact = calculate_crane_numpy(p)
+    assert set(result) == set(exact)
+    assert list(result['member_results']['M_arm']) == list(exact['member_results']['M_arm'])
+    for key in ('max_stress', 'max_von_mises', 'max_utilization'):
+        assert abs(result[key] - exact[key]) <= max(estimate, 1e-3) * exact[key], key
+    assert abs(result['tip_displacement']['dz'] / exact['tip_displacement']['dz'] - 1.0) <= max(estimate, 1e-3)
+    for s_name, r in exact['reactions'].items():
+        assert abs(result['reactions'][s_name] - r) < 2e-2 * abs(exact['reactions']['FL'])
+
+def test_grid_points_and_mass_linearity():
+    s = Surrogate(table())
+    # On a grid point the table is exact (up to float32) for any mass
+    for mass in (0.0, 25.0, 180.0):
+        p = {'arm_len': 1250.0, 'arm_angle': 90.0, 't_wall': 2.4, 'mass_tip': mass}
+        result, estimate = s.lookup(p)
+        exact = calculate_crane_numpy(p)
+        assert estimate == 0.0
+        assert abs(result['max_stress'] - exact['max_stress']) <= 1e-5 * max(exact['max_stress'], 1.0)
+        assert abs(result['tip_displacement']['dz'] - exact['tip_displacement']['dz']) <= 1e-5 * max(
+            abs(exact['tip_displacement']['dz']), 1e-3)
+    # arm_angle wraps around
+    a, _ = s.lookup({'arm_angle': 370.0, 'arm_len': 1250.0, 't_wall': 2.4})
+    b, _ = s.lookup({'arm_angle': 10.0, 'arm_len': 1250.0, 't_wall': 2.4})
+    assert a == b
+
+def test_error_estimate_and_fallback():
+    s = Surrogate(table())
+    summary = check(s, samples=150, tolerance=0.01)
+    print(summary)
+    assert summary['answered'] > 50 and summary['max_error'] <= 0.01
+    reasons = []
+    for p in ({'arm_len': 2500.0}, {'pipe_od': 60.0}, {'topology': 'other'}, {'analysis': 'p_delta'},
+              {'arm_len': 1234.0, 'arm_angle': 100.0, 't_wall': 2.9}):
+        result, reason = s.lookup(p, tolerance=1e-6)
+        assert result is None
+        reasons.append(reason)
+    print(reasons)
+    assert 'outside' in reasons[0] and 'pipe_od' in reasons[1] and 'exceeds' in reasons[-1]
+    exact = answer(s, {'arm_len': 2500.0, 'engine': 'numpy'})
+    assert exact['surrogate']['exact'] and exact['max_stress'] == calculate_crane_numpy({'arm_len': 2500.0})['max_stress']
+    approx = answer(s, {'arm_len': 1250.0, 'arm_angle': 90.0, 't_wall': 2.4})
+    assert approx['surrogate'] == {'exact': False, 'error_estimate': 0.0, 'tolerance': 0.01}
+
+def test_save_load_versioned():
+    root = tempfile.mkdtemp()
+    path = save_table(table(), root)
+    loaded = load_table(root)
+    assert isinstance(loaded['values'], np.memmap)
+    assert np.array_equal(loaded['values'], table()['values'])
+    p = {'arm_len': 1111.0, 'arm_angle': 33.0, 't_wall': 2.0, 'mass_tip': 70.0}
+    assert Surrogate(loaded).lookup(p, 1.0) == Surrogate(table()).lookup(p, 1.0)
+    # A table from another solver version is not used
+    meta_path = os.path.join(path, 'meta.json')
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    assert meta['version'] == table_version(meta['grid'], meta['base'])
+    stale = os.path.join(root, 'stale')
+    os.makedirs(stale)
+    with open(os.path.join(stale, 'meta.json'), 'w') as fh:
+        json.dump(dict(meta, version='0', built='9999'), fh)
+    assert load_table(root)['meta']['version'] == meta['version']
+    try:
+        load_table(stale)
+    except ValueError as e:
+        print(f"[OK] {e}")
+    else:
+        raise AssertionError("a stale table should be rejected")
+
+def test_cli_build():
+    root = tempfile.mkdtemp()
+    assert main(['build', '--out', root, '--quick', '--workers', '2']) == 0
+    assert Surrogate.load(root).meta['points'] == np.prod([len(v) for v in QUICK_GRID.values()])
+
+def test_endpoint_and_live_drag():
+    from fastapi.testclient import TestClient
+    import main as app_module
+    client = TestClient(app_module.app)
+    saved = app_module.surrogate
+    app_module.surrogate = Surrogate(table())
+    try:
+        p = {'engine': 'numpy', 'arm_len': 1234.0, 'arm_angle': 100.0, 't_wall': 2.9}
+        r = client.post("/calculate/surrogate", json=p).json()
+        assert r['surrogate']['exact'] is False and r['surrogate']['error_estimate'] <= 0.01
+        r = client.post("/calculate/surrogate?tolerance=1e-6", json=p).json()
+        assert r['surrogate']['exact'] is True and 'exceeds' in r['surrogate']['reason']
+        assert r['max_stress'] == calculate_crane_numpy(p)['max_stress']
+        with client.websocket_connect("/ws/calculate") as ws:
+            ws.send_text(json.dumps({'seq': 1, 'params': p, 'settled': False}))
+            assert ws.receive_json()['result']['surrogate']['exact'] is False
+            ws.send_text(json.dumps({'seq': 2, 'params': p, 'settled': True}))
+            assert 'surrogate' not in ws.receive_json()['result']
+    finally:
+        app_module.surrogate = saved
+
+def test_frontend_marks_drags():
+    # The shipped UI sends settled: false while a slider moves and settled: true on release
+    import re
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'src', 'App.tsx')) as fh:
+        app = fh.read()
+    assert 'settled: !draggingRef.current' in app
+    sliders = re.findall(r'onChange=\{handleChange\((\'\w+\')\)\}( onChangeCommitted=\{handleCommit\((\'\w+\')\)\})?', app)
+    assert sliders and all(commit == change for change, _, commit in sliders)
+
+if __name__ == "__main__":
+    test_lookup_matches_exact()
+    test_grid_points_and_mass_linearity()
+    test_error_estimate_and_fallback()
+    test_save_load_versioned()
+    test_cli_build()
+    test_endpoint_and_live_drag()
+    test_frontend_marks_drags()
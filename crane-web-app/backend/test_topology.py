@@ -0,0 +1,109 @@
+import sys
+import os
+import contextlib
+import io
+import json
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from crane_calc import calculate_crane
+from crane_topology import (
+    TOPOLOGY_DIR, available_topologies, compile_topology, load_topology, load_topology_file, yaml,
+)
+
+def read_standard():
+    with open(os.path.join(TOPOLOGY_DIR, 'standard.json')) as fh:
+        return json.load(fh)
+
+def test_standard_topology():
+    topo = load_topology('standard')
+    assert topo.n_nodes == 13 and topo.n_members == 13 and topo.n_dof == 78
+    assert topo.support_nodes == ['FL', 'FR', 'RR', 'RL'] and topo.load_node == 'A_tip'
+    assert topo.member_node_names[topo.member_index['M_brace']] == ('M_brace', 'A_brace')
+    assert len(topo.free_dofs) + len(topo.fixed_dofs) == topo.n_dof
+    # Default geometry (arm at 180 deg from the mast top)
+    xyz = topo.coordinates(topo.params)
+    z0 = 48.6 / 2.0
+    assert np.allclose(xyz[topo.node_index['FR']], [450.0, -300.0, z0])
+    assert np.allclose(xyz[topo.node_index['A_tip']], [-1450.0, 0.0, z0 + 1800.0])
+    # Batched parameters broadcast to (..., n_nodes, 3), row by row equal to the scalar path
+    angles = np.array([0.0, 90.0, 200.0])
+    batch = topo.coordinates(dict(topo.params, arm_angle=angles))
+    assert batch.shape == (3, 13, 3)
+    for k, a in enumerate(angles):
+        assert np.array_equal(batch[k], topo.coordinates(dict(topo.params, arm_angle=a)))
+    assert load_topology('standard') is topo
+    assert {'standard', 'double_brace'} <= set(available_topologies())
+
+def test_variant_engines_agree():
+    print("--- double_brace: numpy vs pynite ---")
+    for angle in (0.0, 135.0):
+        p = {'topology': 'double_brace', 'arm_angle': angle, 'brace2_ratio': 0.7}
+        n = calculate_crane(dict(p, engine='numpy'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            q = calculate_crane(dict(p, engine='pynite'))
+        assert list(n['member_results']) == list(q['member_results'])
+        assert 'M_brace2' in n['member_results'] and len(n['node_displacements']) == 15
+        dz_n, dz_q = n['tip_displacement']['dz'], q['tip_displacement']['dz']
+        print(f"arm_angle={angle}: dz numpy {dz_n:.6f}, pynite {dz_q:.6f}")
+        assert abs(dz_n - dz_q) < 1e-6 * abs(dz_q)
+        assert abs(n['max_stress'] - q['max_stress']) < 1e-6 * q['max_stress']
+        for s in n['reactions']:
+            assert abs(n['reactions'][s] - q['reactions'][s]) < 1e-6 * (1.0 + abs(q['reactions'][s]))
+    # The second brace stiffens the frame for a side load
+    base = calculate_crane({'engine': 'numpy', 'arm_angle': 90.0})['tip_displacement']['dz']
+    braced = calculate_crane({'engine': 'numpy', 'arm_angle': 90.0, 'topology': 'double_brace',
+                              'base_len': 900.0, 'arm_len': 1000.0})['tip_displacement']['dz']
+    assert abs(braced) < abs(base)
+
+def test_invalid_specs_rejected():
+    bad = []
+    spec = read_standard()
+    spec['members']['M_extra'] = ['FL', 'nowhere']
+    bad.append(spec)
+    spec = read_standard()
+    spec['vars']['z0'] = "__import__('os').getcwd()"
+    bad.append(spec)
+    spec = read_standard()
+    spec['nodes']['FL'] = ['x_mast.real', 0, 0]
+    bad.append(spec)
+    spec = read_standard()
+    del spec['params']['yield_stress']
+    bad.append(spec)
+    spec = read_standard()
+    spec['load_node'] = 'A_missing'
+    bad.append(spec)
+    for spec in bad:
+        try:
+            compile_topology(spec)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError("expected the topology to be rejected")
+    for name in ('../standard', 'missing'):
+        try:
+            load_topology(name)
+        except ValueError as e:
+            print(f"[OK] {e}")
+        else:
+            raise AssertionError(f"{name} should not load")
+
+def test_yaml_file(tmp_path=None):
+    if yaml is None:
+        print("PyYAML not installed, skipping")
+        return
+    import tempfile
+    directory = str(tmp_path) if tmp_path is not None else tempfile.mkdtemp()
+    path = os.path.join(directory, 'copy.yaml')
+    with open(path, 'w') as fh:
+        yaml.safe_dump(read_standard(), fh, sort_keys=False)
+    topo = load_topology_file(path)
+    standard = load_topology('standard')
+    assert topo.node_names == standard.node_names and topo.support_nodes == standard.support_nodes
+    assert np.array_equal(topo.member_nodes, standard.member_nodes)
+    assert np.array_equal(topo.coordinates(topo.params), standard.coordinates(standard.params))
+
+if __name__ == "__main__":
+    test_standard_topology()
+    test_variant_engines_agree()
+    test_invalid_specs_rejected()
+    test_yaml_file()
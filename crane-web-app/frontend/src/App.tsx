@@ -1,4 +1,4 @@
-import { useState, Suspense, useMemo, useEffect } from 'react';
+import { useState, Suspense, useMemo, useEffect, useRef } from 'react';
 import { Canvas } from '@react-three/fiber';
 import { OrbitControls, Grid, Environment } from '@react-three/drei';
 import { Box, Slider, Typography, Paper, Stack, CircularProgress, ToggleButton, ToggleButtonGroup, useMediaQuery, useTheme, IconButton, Select, MenuItem, FormControl, InputLabel, Button } from '@mui/material';
@@ -225,8 +225,64 @@ export default function App() {
     }
   };
 
-  // Real-time calculation with debounce
+  // Live calculation over a WebSocket: every change is sent immediately with a
+  // sequence number; the server cancels superseded solves and only answers the
+  // latest state. Falls back to the debounced POST when the socket is down.
+  // While a slider is dragged, updates carry settled: false and the server may
+  // answer them from its surrogate table; releasing the slider sends
+  // settled: true for the exact solve.
+  const wsRef = useRef<WebSocket | null>(null);
+  const seqRef = useRef(0);
+  const paramsRef = useRef(params);
+  paramsRef.current = params;
+  const draggingRef = useRef(false);
+
+  const sendLive = (state: CraneParams) => {
+    const ws = wsRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN) return false;
+    seqRef.current += 1;
+    setLoading(true);
+    ws.send(JSON.stringify({ seq: seqRef.current, params: state, settled: !draggingRef.current }));
+    return true;
+  };
+
   useEffect(() => {
+    let closed = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+      const ws = new WebSocket(`${protocol}://${window.location.host}/ws/calculate`);
+      ws.onopen = () => {
+        wsRef.current = ws;
+        seqRef.current += 1;
+        ws.send(JSON.stringify({ seq: seqRef.current, params: paramsRef.current }));
+      };
+      ws.onmessage = (event) => {
+        const reply = JSON.parse(event.data);
+        // Ignore anything older than the latest update we sent
+        if (reply.seq !== seqRef.current) return;
+        if (reply.result && !reply.result.error) setResults(reply.result);
+        else console.error(reply.error ?? reply.result?.error);
+        setLoading(false);
+      };
+      ws.onclose = () => {
+        wsRef.current = null;
+        if (!closed) retry = setTimeout(connect, 2000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      wsRef.current?.close();
+    };
+  }, []);
+
+  // Real-time calculation: live channel, or POST with debounce as a fallback
+  useEffect(() => {
+    if (sendLive(params)) return;
     const timer = setTimeout(() => {
       handleCalculate();
     }, 500); // 500ms debounce
@@ -235,9 +291,21 @@ export default function App() {
   }, [params]);
 
   const handleChange = (key: keyof CraneParams) => (_: Event, value: number | number[]) => {
+    draggingRef.current = true;
     setParams(prev => ({ ...prev, [key]: value as number }));
   };
 
+  // Slider released: the final value goes out settled. When it is already the
+  // current state no params change follows, so it is sent here.
+  const handleCommit = (key: keyof CraneParams) => (_: unknown, value: number | number[]) => {
+    draggingRef.current = false;
+    if (paramsRef.current[key] !== value) {
+      setParams(prev => ({ ...prev, [key]: value as number }));
+      return;
+    }
+    sendLive(paramsRef.current);
+  };
+
   return (
     <div style={{ display: 'flex', height: '100vh', width: '100vw', overflow: 'hidden' }}>
 
@@ -327,35 +395,35 @@ export default function App() {
 
             <Box>
               <Typography>台座 長さ: {params.base_len} mm</Typography>
-              <Slider value={params.base_len} min={500} max={2000} onChange={handleChange('base_len')} />
+              <Slider value={params.base_len} min={500} max={2000} onChange={handleChange('base_len')} onChangeCommitted={handleCommit('base_len')} />
             </Box>
             <Box>
               <Typography>台座 幅: {params.base_wid} mm</Typography>
-              <Slider value={params.base_wid} min={300} max={1500} onChange={handleChange('base_wid')} />
+              <Slider value={params.base_wid} min={300} max={1500} onChange={handleChange('base_wid')} onChangeCommitted={handleCommit('base_wid')} />
             </Box>
             <Box>
               <Typography>三脚取付高さ: {params.tripod_attach_height} mm</Typography>
-              <Slider value={params.tripod_attach_height} min={500} max={params.arm_pivot_height} onChange={handleChange('tripod_attach_height')} />
+              <Slider value={params.tripod_attach_height} min={500} max={params.arm_pivot_height} onChange={handleChange('tripod_attach_height')} onChangeCommitted={handleCommit('tripod_attach_height')} />
             </Box>
             <Box>
               <Typography>ブレース取付高さ: {params.brace_mast_height} mm</Typography>
-              <Slider value={params.brace_mast_height} min={300} max={params.tripod_attach_height} onChange={handleChange('brace_mast_height')} />
+              <Slider value={params.brace_mast_height} min={300} max={params.tripod_attach_height} onChange={handleChange('brace_mast_height')} onChangeCommitted={handleCommit('brace_mast_height')} />
             </Box>
             <Box>
               <Typography>アーム長さ: {params.arm_len} mm</Typography>
-              <Slider value={params.arm_len} min={500} max={2000} onChange={handleChange('arm_len')} />
+              <Slider value={params.arm_len} min={500} max={2000} onChange={handleChange('arm_len')} onChangeCommitted={handleCommit('arm_len')} />
             </Box>
             <Box>
               <Typography>アーム角度: {params.arm_angle} deg</Typography>
-              <Slider value={params.arm_angle} min={0} max={360} onChange={handleChange('arm_angle')} />
+              <Slider value={params.arm_angle} min={0} max={360} onChange={handleChange('arm_angle')} onChangeCommitted={handleCommit('arm_angle')} />
             </Box>
             <Box>
               <Typography>先端荷重: {params.mass_tip} kg</Typography>
-              <Slider value={params.mass_tip} min={0} max={200} onChange={handleChange('mass_tip')} />
+              <Slider value={params.mass_tip} min={0} max={200} onChange={handleChange('mass_tip')} onChangeCommitted={handleCommit('mass_tip')} />
             </Box>
             <Box>
               <Typography>アーム取付高さ: {params.arm_pivot_height} mm</Typography>
-              <Slider value={params.arm_pivot_height} min={1000} max={3000} onChange={handleChange('arm_pivot_height')} />
+              <Slider value={params.arm_pivot_height} min={1000} max={3000} onChange={handleChange('arm_pivot_height')} onChangeCommitted={handleCommit('arm_pivot_height')} />
             </Box>
 
             <Button
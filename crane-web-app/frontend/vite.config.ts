@@ -11,6 +11,10 @@ export default defineConfig({
         changeOrigin: true,
         secure: false,
       },
+      '/ws': {
+        target: 'ws://127.0.0.1:3000',
+        ws: true,
+      },
     },
   },
 })
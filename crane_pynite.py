@@ -4,6 +4,15 @@
 
 from Pynite import FEModel3D
 import math
+import os
+import sys
+
+# フレームの形（節点・部材・支点・荷重点）は Web バックエンドと共通の
+# トポロジー定義 crane-web-app/backend/topologies/*.json から組み立てる
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crane-web-app', 'backend'))
+from crane_topology import load_topology
+
+topology = load_topology('standard')
 
 # ----------------------------
 # 1. ジオメトリ & 荷重パラメータ
@@ -73,47 +82,15 @@ model.add_section('Pipe48x2p4', A=A, Iy=Iy, Iz=Iz, J=J)
 # 4. 節点座標（OpenSCAD と同じ幾何）
 # ----------------------------
 
-L = base_len
-W = base_wid
-
-# 台座四隅
-nodes = {}
-
-nodes['FL'] = (-L/2.0, -W/2.0, z0)   # front-left
-nodes['FR'] = ( L/2.0, -W/2.0, z0)   # front-right
-nodes['RR'] = ( L/2.0,  W/2.0, z0)   # rear-right
-nodes['RL'] = (-L/2.0,  W/2.0, z0)   # rear-left
-
-# 台座中間
-nodes['Fmid']   = (0.0, -W/2.0, z0)  # 前側中央
-nodes['Rmid']   = (0.0,  W/2.0, z0)  # 後側中央
-nodes['Lmid']   = (-L/2.0, 0.0, z0)  # 左中央（＝垂直の棒根元）
-nodes['RmidX0'] = ( L/2.0, 0.0, z0)  # 右中央
-
-# 垂直の棒関連
-# nodes['M_base']  = nodes['Lmid']                       # (-450, 0, z0) -> Use Lmid directly
-nodes['M_brace'] = (-L/2.0, 0.0, z0 + brace_mast_height)    # ブレース取り付き
-nodes['M_attach'] = (-L/2.0, 0.0, z0 + tripod_attach_height) # 三脚脚取り付き
-nodes['M_top']    = (-L/2.0, 0.0, z0 + arm_pivot_height)     # アーム接続点
-
-# アーム関連
-arm_dir = (
-    math.cos(math.radians(arm_angle)),
-    math.sin(math.radians(arm_angle)),
-    0.0
-)
-
-nodes['A_tip'] = (
-    nodes['M_top'][0] + arm_len * arm_dir[0],
-    nodes['M_top'][1] + arm_len * arm_dir[1],
-    nodes['M_top'][2] + arm_len * arm_dir[2],
-)
-
-nodes['A_brace'] = (
-    nodes['M_top'][0] + (arm_len * 0.5) * arm_dir[0],
-    nodes['M_top'][1] + (arm_len * 0.5) * arm_dir[1],
-    nodes['M_top'][2] + (arm_len * 0.5) * arm_dir[2],
-)
+# トポロジーの座標関数にパラメータを渡して全節点を一度に計算
+params = {
+    'pipe_od': pipe_od, 't_wall': t_wall, 'base_len': base_len, 'base_wid': base_wid,
+    'arm_pivot_height': arm_pivot_height, 'tripod_attach_height': tripod_attach_height,
+    'brace_mast_height': brace_mast_height, 'arm_len': arm_len, 'arm_angle': arm_angle,
+    'mass_tip': mass_tip,
+}
+xyz = topology.coordinates(topology.with_defaults(params)).tolist()
+nodes = {name: tuple(c) for name, c in zip(topology.node_names, xyz)}
 
 # ----------------------------
 # 5. PyNite に節点を追加
@@ -126,8 +103,8 @@ for name, (x, y, z) in nodes.items():
 # 6. 部材（単管）を追加
 # ----------------------------
 
-# ヘルパー：部材追加
-def add_member(mname, ni, nj):
+# 台座外周・中桟、垂直の棒（ブレース・三脚接続点で分割）、三脚脚、アーム、ブレース
+for mname, (ni, nj) in zip(topology.member_names, topology.member_node_names):
     model.add_member(
         name=mname,
         i_node=ni,
@@ -136,38 +113,13 @@ def add_member(mname, ni, nj):
         section_name='Pipe48x2p4'
     )
 
-# 台座外周
-add_member('M_base_FL_FR', 'FL', 'FR')
-add_member('M_base_FR_RR', 'FR', 'RR')
-add_member('M_base_RR_RL', 'RR', 'RL')
-add_member('M_base_RL_FL', 'RL', 'FL')
-
-# 台座中桟
-add_member('M_base_Fmid_Rmid', 'Fmid', 'Rmid')
-add_member('M_base_Lmid_RmidX0', 'Lmid', 'RmidX0')
-
-# 垂直の棒：途中で節点を切っておく（ブレース・三脚接続点）
-add_member('M_mast_1', 'Lmid',  'M_brace')
-add_member('M_mast_2', 'M_brace', 'M_attach')
-add_member('M_mast_3', 'M_attach','M_top')
-
-# 三脚脚
-add_member('M_tripod_FL', 'M_attach', 'FL')
-add_member('M_tripod_RL', 'M_attach', 'RL')
-
-# アーム
-add_member('M_arm', 'M_top', 'A_tip')
-
-# ブレース（垂直の棒〜アーム）
-add_member('M_brace', 'M_brace', 'A_brace')
-
 # ----------------------------
 # 7. 支持条件（台座四隅を固定）
 # ----------------------------
 
 # ここでは簡易的に、台座四隅の平行移動を全部固定、回転は自由とする
 # def_support(node, DX, DY, DZ, RX, RY, RZ)
-for n in ['FL', 'FR', 'RR', 'RL']:
+for n in topology.support_nodes:
     model.def_support(n, True, True, True, False, False, False)
 
 # ----------------------------
@@ -176,7 +128,7 @@ for n in ['FL', 'FR', 'RR', 'RL']:
 
 # FZ 方向の荷重（グローバル Z マイナス）
 # load case name を 'DL'（Dead Load）としておく
-model.add_node_load('A_tip', 'FZ', -P_tip, 'DL')
+model.add_node_load(topology.load_node, 'FZ', -P_tip, 'DL')
 
 # ----------------------------
 # 9. 解析実行
@@ -212,7 +164,7 @@ for n_name in mast_nodes:
 print('---------------------------------')
 
 # 台座四隅の反力も見てみる
-for n in ['FL', 'FR', 'RR', 'RL']:
+for n in topology.support_nodes:
     node = model.nodes[n]
     # 反力もロードコンボごとの辞書
     rz = node.RxnFZ.get(combo, 0.0)
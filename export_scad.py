@@ -1,19 +1,17 @@
+import os
 import sys
-import math
-
-# Import the model from the existing script
-# This will run the analysis, but that's acceptable
-try:
-    from crane_pynite import model, pipe_od
-except ImportError:
-    # Fallback if run from a different context, though we expect to run in the same dir
-    sys.path.append('.')
-    from crane_pynite import model, pipe_od
-
-def generate_scad(model, filename="crane_model.scad"):
+
+# Geometry comes from the shared topology template
+# (crane-web-app/backend/topologies/*.json); no analysis is run
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crane-web-app', 'backend'))
+from crane_topology import load_topology
+
+def generate_scad(topology, params=None, filename="crane_model.scad"):
+    p = topology.with_defaults(params or {})
+    xyz = topology.coordinates(p).tolist()
     with open(filename, 'w') as f:
-        f.write("// Generated from crane_pynite.py\n")
-        f.write(f"pipe_od = {pipe_od};\n")
+        f.write(f"// Generated from topology '{topology.name}'\n")
+        f.write(f"pipe_od = {p['pipe_od']};\n")
         f.write("$fn = 32;\n\n")
         
         # Helper module for pipes (using user's logic)
@@ -43,13 +41,10 @@ module pipe_segment(p1, p2, od=pipe_od) {
         
         f.write("union() {\n")
         
-        for m_name, member in model.members.items():
-            # Get node coordinates
-            ni = member.i_node
-            nj = member.j_node
-            
-            p1 = f"[{ni.X}, {ni.Y}, {ni.Z}]"
-            p2 = f"[{nj.X}, {nj.Y}, {nj.Z}]"
+        for m_name, (i, j) in zip(topology.member_names, topology.member_nodes):
+            # Node coordinates
+            p1 = f"[{xyz[i][0]}, {xyz[i][1]}, {xyz[i][2]}]"
+            p2 = f"[{xyz[j][0]}, {xyz[j][1]}, {xyz[j][2]}]"
             
             f.write(f"    // Member: {m_name}\n")
             f.write(f"    pipe_segment({p1}, {p2});\n")
@@ -57,5 +52,6 @@ module pipe_segment(p1, p2, od=pipe_od) {
         f.write("}\n")
 
 if __name__ == "__main__":
-    generate_scad(model)
+    # python export_scad.py [topology]
+    generate_scad(load_topology(sys.argv[1] if len(sys.argv) > 1 else 'standard'))
     print("OpenSCAD file generated: crane_model.scad")